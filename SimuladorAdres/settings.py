@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -75,12 +76,45 @@ WSGI_APPLICATION = 'SimuladorAdres.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Por defecto SQLite en modo WAL: las lecturas (dashboard) no bloquean a quien escribe
+# y los escritores esperan su turno (timeout) en vez de fallar con "database is locked".
+# Con DB_MOTOR=postgres se usa PostgreSQL con conexiones persistentes (varios workers
+# de gunicorn escribiendo a la vez).
+DB_MOTOR = os.environ.get('DB_MOTOR', 'sqlite')
+
+if DB_MOTOR == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',  # Requiere psycopg (pip install "psycopg[binary]")
+            'NAME': os.environ.get('DB_NOMBRE', 'simulador_adres'),
+            'USER': os.environ.get('DB_USUARIO', 'postgres'),
+            'PASSWORD': os.environ.get('DB_CLAVE', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PUERTO', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),  # Segundos que se reutiliza una conexión
+            'CONN_HEALTH_CHECKS': True,  # Descarta conexiones caídas antes de usarlas
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NOMBRE', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': int(os.environ.get('DB_TIMEOUT', '20')),  # busy_timeout: segundos esperando el bloqueo de escritura
+                # BEGIN IMMEDIATE: la transacción pide el bloqueo al empezar, así no falla a mitad
+                # de camino al pasar de lectura a escritura
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'  # Seguro con WAL; fsync solo en los checkpoints
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'  # ~20 MB de cache de páginas por conexión
+                    'PRAGMA mmap_size=134217728;'  # 128 MB de lectura mapeada en memoria
+                ),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -123,4 +157,88 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'  # La URL pública: http://localhost/media/archivo.pdf
 MEDIA_ROOT = BASE_DIR / 'media' # La carpeta física en tu disco duro
 
-
+# Soportes por contenido: soportes_soat/ab/cd/<sha256>.pdf, fotos grandes recomprimidas y
+# barrido de huérfanos con `manage.py barrer_soportes` (ver auditoria/almacenamiento.py)
+STORAGES = {
+    'default': {'BACKEND': 'auditoria.almacenamiento.AlmacenamientoSoportes'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+SOPORTES_COMPRIMIR_DESDE_MB = float(os.environ.get('SOPORTES_COMPRIMIR_DESDE_MB', '2'))  # Fotos más livianas se guardan tal cual
+SOPORTES_CALIDAD_JPEG = int(os.environ.get('SOPORTES_CALIDAD_JPEG', '85'))  # Calidad al recomprimir fotos JPG
+SOPORTES_GRACIA_BARRIDO_MIN = int(os.environ.get('SOPORTES_GRACIA_BARRIDO_MIN', '60'))  # El barrido no toca archivos más nuevos
+
+# Subidas: el SOAT se escribe por bloques (hash y formato al vuelo, ver auditoria/subidas.py)
+# en una carpeta del mismo disco que MEDIA_ROOT, así pasarlo a soportes_soat/ es un rename
+FILE_UPLOAD_TEMP_DIR = os.environ.get('SUBIDAS_CARPETA_TEMPORAL', str(BASE_DIR / 'subidas_tmp'))
+FILE_UPLOAD_HANDLERS = [
+    'auditoria.subidas.SubidaSoatHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+SOAT_TAMANO_MAXIMO_MB = int(os.environ.get('SOAT_TAMANO_MAXIMO_MB', '20'))  # Se corta la subida al pasar este tamaño
+SOAT_MAX_PAGINAS_ARCHIVO = int(os.environ.get('SOAT_MAX_PAGINAS_ARCHIVO', '50'))  # PDF más largos se rechazan antes del OCR
+
+
+
+# Motor OCR (EasyOCR): un lector por proceso, reutilizado entre peticiones
+OCR_PRECALENTAR = os.environ.get('OCR_PRECALENTAR', '0') == '1'  # Cargar spaCy y EasyOCR al arrancar el worker
+OCR_MAX_CONCURRENCIA = int(os.environ.get('OCR_MAX_CONCURRENCIA', '1'))  # Inferencias simultáneas por proceso
+OCR_USAR_GPU = os.environ.get('OCR_USAR_GPU', '1') == '1'
+OCR_REGIONES = os.environ.get('OCR_REGIONES', '1') == '1'  # Leer solo las cajas de placa y total en plantillas conocidas
+OCR_MAX_PIXELES = int(os.environ.get('OCR_MAX_PIXELES', '9000000'))  # Tope de píxeles por imagen (controla la RAM)
+OCR_ENDEREZAR = os.environ.get('OCR_ENDEREZAR', '1') == '1'  # Corregir inclinación de escaneos/fotos
+OCR_BINARIZAR = os.environ.get('OCR_BINARIZAR', '0') == '1'  # EasyOCR suele leer mejor en gris que binarizado
+OCR_PROCESOS_ASGI = int(os.environ.get('OCR_PROCESOS_ASGI', '2'))  # Procesos del OCR en la carga síncrona (0 = hilos del event loop)
+OCR_TAMANO_LOTE = int(os.environ.get('OCR_TAMANO_LOTE', '4'))  # Páginas por pasada del detector en el OCR por lote
+OCR_BATCH_SIZE = int(os.environ.get('OCR_BATCH_SIZE', '16'))  # Recortes de texto por pasada del reconocedor
+OCR_HILOS = int(os.environ.get('OCR_HILOS', '0'))  # Hilos de torch por proceso en CPU (0 = automático)
+SOAT_MAX_PAGINAS = int(os.environ.get('SOAT_MAX_PAGINAS', '10'))  # Páginas que se revisan por PDF (se para al hallar placa y monto)
+SOAT_MULTIPOLIZA = os.environ.get('SOAT_MULTIPOLIZA', '0') == '1'  # Una auditoría por cada póliza de un PDF con varias
+SOAT_MOTOR_EXTRACCION = os.environ.get('SOAT_MOTOR_EXTRACCION', 'escaner')  # escaner (una pasada, sin spaCy), spacy o regex
+SOAT_MODO_CARRERA = os.environ.get('SOAT_MODO_CARRERA', '0') == '1'  # Texto nativo y OCR rápido a la vez; gana el primero con placa
+SOAT_PLAZO_DOCUMENTO_S = float(os.environ.get('SOAT_PLAZO_DOCUMENTO_S', '20'))  # Modo carrera: tope duro por documento
+SOAT_CARRERA_ALTO_PX = int(os.environ.get('SOAT_CARRERA_ALTO_PX', '1600'))  # Modo carrera: alto del OCR rápido (~150 DPI en carta)
+SOAT_CARRERA_EXIGIR_MONTO = os.environ.get('SOAT_CARRERA_EXIGIR_MONTO', '0') == '1'  # Modo carrera: una rama gana solo con placa y monto
+SOAT_HILOS_CARRERA = int(os.environ.get('SOAT_HILOS_CARRERA', '4'))  # Modo carrera: hilos por proceso (2 por documento)
+
+# Cola de auditorías: si está activa, la carga solo encola y `manage.py procesar_cola` hace el OCR
+AUDITORIA_ASINCRONA = os.environ.get('AUDITORIA_ASINCRONA', '1') == '1'
+
+# Cache por contenido (SHA-256) de los resultados de extracción
+CACHE_EXTRACCION_TTL_DIAS = int(os.environ.get('CACHE_EXTRACCION_TTL_DIAS', '90'))
+CACHE_EXTRACCION_MAX_ENTRADAS = int(os.environ.get('CACHE_EXTRACCION_MAX_ENTRADAS', '50000'))
+
+# Duplicados (ver auditoria/duplicados.py): Jaccard estimado del texto propio de la póliza
+# para "mismo contenido", bits de diferencia del pHash para "misma imagen" y tope de candidatas
+DUPLICADOS_UMBRAL_TEXTO = float(os.environ.get('DUPLICADOS_UMBRAL_TEXTO', '0.5'))
+DUPLICADOS_DISTANCIA_IMAGEN = int(os.environ.get('DUPLICADOS_DISTANCIA_IMAGEN', '6'))
+DUPLICADOS_MAX_CANDIDATAS = int(os.environ.get('DUPLICADOS_MAX_CANDIDATAS', '200'))
+
+# Consulta RUNT: 'api' (datos.gov.co en cada auditoría) o 'local' (espejo de `manage.py importar_runt`)
+RUNT_BACKEND = os.environ.get('RUNT_BACKEND', 'api')
+RUNT_URL = os.environ.get('RUNT_URL', 'https://www.datos.gov.co/resource/g7i9-xkxz.json')
+RUNT_CACHE_TTL = int(os.environ.get('RUNT_CACHE_TTL', '3600'))  # Segundos para placas encontradas
+RUNT_CACHE_TTL_NEGATIVO = int(os.environ.get('RUNT_CACHE_TTL_NEGATIVO', '300'))  # Placas no encontradas
+RUNT_CACHE_MAX_ENTRADAS = int(os.environ.get('RUNT_CACHE_MAX_ENTRADAS', '10000'))  # Placas en memoria por proceso (LRU)
+RUNT_VERSION_TTL = int(os.environ.get('RUNT_VERSION_TTL', '600'))  # Cada cuánto se revisa si el dataset cambió
+
+# Métricas por etapa en /metrics (formato Prometheus). Apagadas por defecto: el endpoint no
+# pide autenticación, actívelo solo si queda detrás de la red interna o un proxy que la pida
+METRICAS_HABILITADAS = os.environ.get('METRICAS_HABILITADAS', '0') == '1'
+# Con varios workers web: carpeta compartida donde cada proceso deja sus métricas y /metrics las suma
+METRICAS_DIRECTORIO = os.environ.get('METRICAS_DIRECTORIO', '')
+
+# Logs del pipeline (antes eran print): DEBUG muestra cada paso del OCR
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'auditoria': {'handlers': ['consola'], 'level': os.environ.get('LOG_NIVEL', 'INFO'), 'propagate': False},
+    },
+}
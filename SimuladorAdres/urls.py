@@ -18,10 +18,12 @@ from django.contrib import admin
 from django.urls import path, include # <--- Asegúrate de importar 'include'
 from django.conf import settings # <--- NUEVO
 from django.conf.urls.static import static # <--- NUEVO
+from auditoria.views import metricas
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auditoria/', include('auditoria.urls')), # <--- Conectamos tu app (esto lo haremos funcionar en un segundo)
+    path('metrics', metricas, name='metricas'),  # Prometheus busca /metrics en la raíz
 ]
 
 # Esto solo funciona en modo DEBUG (tu PC), en producción se hace diferente
@@ -0,0 +1,201 @@
+import re
+from typing import NamedTuple
+
+# ---------------------------------------------------------
+# ESCÁNER DE CANDIDATOS: PLACA Y MONTO EN UNA SOLA PASADA
+# ---------------------------------------------------------
+# Antes: ventanas de 15 tokens después de cada ancla y, si no aparecía la placa,
+# fuerza bruta sobre las primeras 70 palabras. Cada palabra recorría la lista negra
+# con un `for` y armaba dos tablas `str.maketrans` nuevas en cada llamada.
+#
+# Ahora el texto completo se recorre UNA vez (tokens separados por espacios):
+# - tablas de corrección, lista negra y formas de placa/monto se compilan al cargar el módulo;
+# - una sola regex clasifica cada token como ancla, candidato a placa (LLLDDD carros,
+#   LLLDDL motos), candidato a monto o nada; Python solo trabaja con los candidatos;
+# - el puntaje de un candidato depende de su cercanía a la última ancla de su campo
+#   (PLACA/VEHÍCULO/MODELO y TOTAL A PAGAR/LEGALES), de si está en la cabecera y de si
+#   hubo que corregirlo. Se retornan todos los candidatos ordenados por puntaje.
+
+TAMANO_VENTANA = 15  # Tokens después de un ancla en los que un candidato suma cercanía
+CABECERA = 70  # Primeras palabras: la placa suele estar en el encabezado de la póliza
+
+# --- Tablas precompiladas ---
+
+# Confusiones visuales del OCR en la parte de letras (0->O, 1->I, 5->S, 8->B, 2->Z) y en la de números
+_A_LETRAS = str.maketrans("01582", "OISBZ")
+_A_NUMEROS = str.maketrans("OISBZ", "01582")
+# Monto: mismas correcciones y, de paso, se borran "$", puntos, comas y espacios
+_MONTO = str.maketrans("OISB", "0158", "$., ")
+
+_BORDES = ".,;:()[]-"
+
+# Palabras comunes en el formato que al convertirlas parecen placas
+# VATIOS -> VAT105 (Falso positivo común), MOTOS -> MOT05, DATOS -> DAT05
+PALABRAS_PROHIBIDAS = (
+    "VATIOS", "CILINDRAJE", "MODELO", "CLASE", "DATOS",
+    "MOTOR", "SERIE", "CHASIS", "POLIZA", "TOTAL", "VALOR",
+    "FECHA", "DESDE", "HASTA", "MOTOS", "AUTO", "SITIO",
+)
+# Una sola regex (alternación) en vez de un `in` por palabra
+_RE_PROHIBIDAS = re.compile("|".join(PALABRAS_PROHIBIDAS))
+
+# Forma de placa ya limpia y en mayúsculas: 3 + 3 caracteres, con guion opcional
+_RE_FORMA_PLACA = re.compile(r"[A-Z0-9]{3}-?[A-Z0-9]{3}")
+
+MONTO_MINIMO = 100000
+MONTO_MAXIMO = 5000000
+
+# Un match por token (palabra entre espacios). Si el token completo, sin la puntuación de
+# los bordes, es un ancla o tiene forma de placa o de monto, `lastgroup` dice cuál; si no,
+# lo consume `\S+` y `lastgroup` es None. Las anclas toleran las confusiones del OCR (LEGALE5).
+_RE_ESCANER = re.compile(r"""
+    (?<!\S) [.,;:()\[\]-]* (?:
+        (?P<ancla_placa> PLACA | VEH[IÍ1]CUL[O0] | M[O0]DEL[O0] )
+      | (?P<ancla_monto> LEGALE[S5] )
+      | (?P<total> T[O0]TAL )
+      | (?P<pagar> PAGAR )
+      | (?P<placa> [A-Z0-9]{3} -? [A-Z0-9]{3} )
+      | (?P<monto> \$? [0-9OISB] [0-9OISB.,]{5,14} )
+    ) [.,;:()\[\]-]* (?!\S)
+  | \S+
+""", re.IGNORECASE | re.VERBOSE)
+
+
+class Candidato(NamedTuple):
+    valor: object  # Placa normalizada (str) o monto (int)
+    puntaje: float
+    posicion: int  # Índice del token en el texto
+    token: str  # Texto original del token
+
+
+# ---------------------------------------------------------
+# VALIDACIÓN Y CORRECCIÓN (ESTRICTAS)
+# ---------------------------------------------------------
+
+def validar_y_corregir_placa(palabra_raw):
+    """
+    Valida y corrige una posible placa: LLLDDD (carros) o LLLDDL (motos).
+    Incluye filtros anti-falsos positivos (ej: VATIOS -> VAT105).
+    """
+    # Si la palabra original trae un slash (/), es una unidad de medida o etiqueta compuesta.
+    # Ej: "CILINDRAJE/VATIOS" o "/VATIOS"
+    if "/" in palabra_raw:
+        return None
+
+    # Quitamos puntuación externa, pero NO interna todavía.
+    limpio = palabra_raw.strip(_BORDES).upper()
+
+    # Placa normal: 6 chars. Placa con guion: 7 chars. (Lo más barato va primero)
+    if not _RE_FORMA_PLACA.fullmatch(limpio):
+        return None
+
+    # Lista negra: también con los dígitos vueltos letras, para atrapar VAT1OS o M0TOS
+    if _RE_PROHIBIDAS.search(limpio) or _RE_PROHIBIDAS.search(limpio.translate(_A_LETRAS)):
+        return None
+
+    limpio = limpio.replace("-", "")
+    # Al menos una letra de verdad: "810500" es un monto, no la placa BIO500
+    if limpio[:3].isdigit():
+        return None
+    parte_letras = limpio[:3].translate(_A_LETRAS)
+    if not (parte_letras.isascii() and parte_letras.isalpha()):
+        return None
+
+    # Carro (LLLDDD): la última posición se corrige como número
+    parte_numeros = limpio[3:].translate(_A_NUMEROS)
+    if parte_numeros.isdigit():
+        return parte_letras + parte_numeros
+
+    # Moto (LLLDDL): dos dígitos y una letra que el OCR no confunde con número
+    if parte_numeros[:2].isdigit() and limpio[5].isalpha():
+        return parte_letras + parte_numeros[:2] + limpio[5]
+    return None
+
+
+def intentar_reparar_monto(token_texto):
+    """Convierte texto sucio en valor monetario."""
+    limpio = token_texto.upper().translate(_MONTO)  # Correcciones visuales
+    if limpio.isdigit():
+        valor = int(limpio)
+        # Filtro de lógica de negocio (Valor razonable SOAT)
+        if MONTO_MINIMO < valor < MONTO_MAXIMO:
+            return valor
+    return None
+
+
+# ---------------------------------------------------------
+# ESCÁNER
+# ---------------------------------------------------------
+
+def _cercania(posicion, ancla, ventana):
+    """1.0 justo después del ancla, baja linealmente y es 0 fuera de la ventana."""
+    if ancla is None or posicion - ancla > ventana:
+        return 0.0
+    return 1.0 - (posicion - ancla - 1) / ventana
+
+
+def _agregar(candidatos, valor, puntaje, posicion, token):
+    """Se guarda la mejor aparición de cada valor; repetirse en el documento suma un poco."""
+    previo = candidatos.get(valor)
+    if previo is None:
+        candidatos[valor] = Candidato(valor, puntaje, posicion, token)
+        return
+    mejor = previo if previo.puntaje >= puntaje else Candidato(valor, puntaje, posicion, token)
+    # Un monto sin ancla que se repite (ej: la tasa RUNT) sigue sin ancla
+    extra = 0.1 if min(previo.puntaje, puntaje) > 0 else 0.0
+    candidatos[valor] = mejor._replace(puntaje=mejor.puntaje + extra)
+
+
+def _ordenar(candidatos):
+    return sorted(candidatos.values(), key=lambda c: (-c.puntaje, c.posicion))
+
+
+def escanear_candidatos(texto, ventana=TAMANO_VENTANA, cabecera=CABECERA):
+    """
+    Recorre el texto una sola vez y retorna {'placa': [...], 'monto': [...]}: listas de
+    `Candidato` ordenadas de mayor a menor puntaje (a igual puntaje, el primero del texto).
+
+    Placa: 0.1 por aparecer + cercanía a un ancla (hasta 1.0) + 0.3 en la cabecera
+           + 0.1 si no hubo que corregir ningún carácter.
+    Monto: cercanía a un ancla (0 si no hay ninguna antes: la prima y la contribución
+           también son montos válidos, solo el total va después de TOTAL A PAGAR/LEGALES).
+    """
+    placas, montos = {}, {}
+    ancla_placa = ancla_monto = total = None
+
+    for i, coincidencia in enumerate(_RE_ESCANER.finditer(texto or "")):
+        tipo = coincidencia.lastgroup
+        if tipo is None:
+            continue
+        if tipo == "ancla_placa":
+            ancla_placa = i
+        elif tipo == "ancla_monto" or (tipo == "pagar" and total is not None and i - total <= 2):  # TOTAL A PAGAR
+            ancla_monto = i
+        elif tipo == "total":
+            total = i
+        else:
+            # Candidato a placa o a monto ("810500" tiene la forma de los dos)
+            token = coincidencia.group()
+            placa = validar_y_corregir_placa(token) if tipo == "placa" else None
+            if placa is not None:
+                puntaje = 0.1 + _cercania(i, ancla_placa, ventana)
+                if i < cabecera:
+                    puntaje += 0.3
+                if coincidencia.group("placa").upper().replace("-", "") == placa:
+                    puntaje += 0.1
+                _agregar(placas, placa, puntaje, i, token)
+                continue
+            monto = intentar_reparar_monto(token)
+            if monto is not None:
+                _agregar(montos, monto, _cercania(i, ancla_monto, ventana), i, token)
+
+    return {"placa": _ordenar(placas), "monto": _ordenar(montos)}
+
+
+def resolver_candidatos(candidatos):
+    """Mejor placa y mejor monto anclado ({'placa', 'monto'}, como los demás motores)."""
+    placas, montos = candidatos["placa"], candidatos["monto"]
+    return {
+        "placa": placas[0].valor if placas else None,
+        "monto": montos[0].valor if montos and montos[0].puntaje > 0 else None,
+    }
@@ -0,0 +1,84 @@
+import re
+
+# ---------------------------------------------------------
+# CLASIFICADOR DIGITAL vs ESCANEADO (HUELLAS POR PLANTILLA)
+# ---------------------------------------------------------
+# Decide si el texto nativo de un PDF (pdfplumber) es confiable comparándolo con
+# las plantillas conocidas de SOAT. Cada plantilla se reduce UNA vez a su "huella":
+# el conjunto de pares de palabras consecutivas (shingles). Comparar un documento
+# cuesta una pasada lineal sobre su texto + intersecciones de conjuntos.
+
+_RE_PALABRA = re.compile(r"\w+")
+_SIN_TILDES = str.maketrans("áéíóúüàèìòù", "aeiouuaeiou")
+
+TAMANO_SHINGLE = 2
+UMBRAL_DIGITAL = 0.6  # Fracción de la huella de la plantilla presente en el documento
+
+
+def normalizar_palabras(texto):
+    """Palabras en minúsculas y sin tildes (pdfplumber no siempre extrae bien los acentos)."""
+    # Solo traducimos las palabras que no son ASCII: translate() carácter a carácter es lo más costoso
+    return [p if p.isascii() else p.translate(_SIN_TILDES) for p in _RE_PALABRA.findall((texto or "").lower())]
+
+
+def calcular_huella(texto, k=TAMANO_SHINGLE):
+    """Conjunto de shingles de k palabras del texto normalizado."""
+    palabras = normalizar_palabras(texto)
+    if len(palabras) < k:
+        return frozenset([tuple(palabras)]) if palabras else frozenset()
+    # Tuplas de k palabras consecutivas (zip evita armar strings intermedios)
+    return frozenset(zip(*(palabras[i:] for i in range(k))))
+
+
+class ClasificadorPlantillas:
+    """
+    Compara un texto contra las huellas precalculadas de varias plantillas de SOAT.
+    Para agregar una aseguradora basta con `registrar(id, texto_de_ejemplo)`.
+    """
+
+    def __init__(self, plantillas=None, umbral=UMBRAL_DIGITAL):
+        self.umbral = umbral
+        self._huellas = {}
+        for plantilla_id, texto in (plantillas or {}).items():
+            self.registrar(plantilla_id, texto)
+
+    def registrar(self, plantilla_id, texto):
+        self._huellas[plantilla_id] = calcular_huella(texto)
+
+    @property
+    def plantillas(self):
+        return list(self._huellas)
+
+    def puntajes(self, texto):
+        """Fracción (0 a 1) de la huella de cada plantilla que aparece en el texto."""
+        huella = calcular_huella(texto)
+        return {
+            plantilla_id: len(huella_plantilla & huella) / len(huella_plantilla) if huella_plantilla else 0.0
+            for plantilla_id, huella_plantilla in self._huellas.items()
+        }
+
+    def clasificar(self, texto):
+        """
+        Retorna {'digital': bool, 'plantilla': id o None, 'similitud': 0-100}.
+        'digital' es True si el texto se parece lo suficiente a alguna plantilla.
+        """
+        if not texto or not self._huellas:
+            return {'digital': False, 'plantilla': None, 'similitud': 0.0}
+
+        puntajes = self.puntajes(texto)
+        plantilla_id = max(puntajes, key=puntajes.get)
+        puntaje = puntajes[plantilla_id]
+        digital = puntaje >= self.umbral
+        return {
+            'digital': digital,
+            'plantilla': plantilla_id if digital else None,
+            'similitud': puntaje * 100,
+        }
+
+
+def similitud_huellas(texto_base, texto_nuevo):
+    """Similitud (0-100) de Jaccard entre las huellas de dos textos. Lineal en el tamaño del texto."""
+    a, b = calcular_huella(texto_base), calcular_huella(texto_nuevo)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b) * 100
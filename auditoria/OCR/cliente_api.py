@@ -1,34 +1,263 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
 import requests
+from requests.adapters import HTTPAdapter
+
+# Endpoint oficial de datos.gov.co (vehículos activos del RUNT)
+URL_RUNT = "https://www.datos.gov.co/resource/g7i9-xkxz.json"
+
+NO_EXISTE = {'existe': False, 'datos': None}
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_placa(placa):
+    """ABC-123 / abc 123 -> ABC123 (así se guarda y se busca en el espejo local)."""
+    return "".join((placa or "").split()).replace("-", "").upper()
 
-def consultar_runt_publico(placa_buscada):
+
+class ClienteRunt:
     """
-    Consulta la API de Datos Abiertos de Colombia.
-    Retorna True si la placa existe (Vehículo Activo), False si no.
+    Cliente de la API del RUNT con:
+    - Una sola sesión HTTP (pool de conexiones TCP/TLS reutilizadas).
+    - Cache TTL en memoria, también para placas que NO existen (con un TTL más corto),
+      acotada a `max_entradas` (LRU): un worker de larga vida no la deja crecer sin límite.
+    - Un segundo nivel de cache opcional (ej: la BD), con métodos obtener/guardar.
+    - Coalescencia: si varias auditorías preguntan la misma placa a la vez, se hace una sola llamada.
+    - Consulta por lote: muchas placas en un solo request con `$where placa in (...)`.
     """
-    # Endpoint oficial de datos.gov.co
-    url_base = "https://www.datos.gov.co/resource/g7i9-xkxz.json"
-    
-    # FILTRO: Le pedimos a la API que solo traiga la fila donde la columna 'placa' coincida
-    # Convertimos a mayúsculas por si acaso
-    params = {'placa': placa_buscada.upper()} 
-    
-    try:
-        # Hacemos el "Request" (la llamada telefónica a la API)
-        respuesta = requests.get(url_base, params=params, timeout=5)
-        
+
+    def __init__(self, url=URL_RUNT, ttl=3600, ttl_negativo=300, timeout=5,
+                 tamano_pool=10, cache_secundario=None, tamano_lote=100, max_entradas=10000):
+        self.url = url
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.timeout = timeout
+        self.tamano_pool = tamano_pool
+        self.tamano_lote = tamano_lote
+        self.cache_secundario = cache_secundario
+        self.max_entradas = max(1, max_entradas)
+
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool)
+        self.sesion.mount('https://', adaptador)
+        self.sesion.mount('http://', adaptador)
+
+        self._cache = OrderedDict()  # placa -> (expira_en, resultado), de la menos a la más usada
+        self._en_vuelo = {}  # placa -> threading.Event de la consulta en curso
+        self._candado = threading.Lock()
+
+    # --- Cache ---
+
+    def _leer_memoria(self, placa):
+        with self._candado:
+            entrada = self._cache.get(placa)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.monotonic():
+                del self._cache[placa]  # Vencida
+                return None
+            self._cache.move_to_end(placa)
+            return entrada[1]
+
+    def _leer_cache(self, placa):
+        resultado = self._leer_memoria(placa)
+        if resultado is not None:
+            return resultado
+
+        if self.cache_secundario is not None:
+            resultado = self.cache_secundario.obtener(placa)
+            if resultado is not None:
+                self._guardar_en_memoria(placa, resultado)
+                return resultado
+        return None
+
+    def _guardar_en_memoria(self, placa, resultado):
+        with self._candado:
+            self._cache[placa] = (time.monotonic() + self._ttl(resultado), resultado)
+            self._cache.move_to_end(placa)
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)  # La usada hace más tiempo
+
+    def _ttl(self, resultado):
+        return self.ttl if resultado['existe'] else self.ttl_negativo
+
+    def _guardar_cache(self, placa, resultado):
+        self._guardar_en_memoria(placa, resultado)
+        if self.cache_secundario is not None:
+            self.cache_secundario.guardar(placa, resultado, self._ttl(resultado))
+
+    def limpiar_cache(self):
+        with self._candado:
+            self._cache.clear()
+
+    # --- HTTP ---
+
+    def _pedir(self, params):
+        # Hacemos el "Request" (la llamada telefónica a la API) reutilizando la conexión
+        respuesta = self.sesion.get(self.url, params=params, timeout=self.timeout)
+        respuesta.raise_for_status()
         # Convertimos la respuesta a JSON (lista de diccionarios)
-        datos = respuesta.json()
-        
+        return respuesta.json()
+
+    @staticmethod
+    def _interpretar(datos):
         # Lógica: Si la lista tiene al menos 1 elemento, el vehículo está activo
         if len(datos) > 0:
-            vehiculo = datos[0] # Tomamos el primer resultado
-            return {
-                'existe': True,
-                'datos': vehiculo # Devolvemos marca, modelo, etc. por si quieres mostrarlos
-            }
-        else:
-            return {'existe': False, 'datos': None}
-            
-    except Exception as e:
-        print(f"Error conectando a la API: {e}")
-        return {'existe': False, 'datos': None} # En caso de error, asumimos que no se pudo verificar
\ No newline at end of file
+            return {'existe': True, 'datos': datos[0]}
+        return dict(NO_EXISTE)
+
+    def _consultar_api(self, placa):
+        return self._interpretar(self._pedir({'placa': placa}))
+
+    # --- Consultas ---
+
+    def consultar(self, placa_buscada):
+        placa = normalizar_placa(placa_buscada)
+        resultado = self._leer_cache(placa)
+        if resultado is not None:
+            return resultado
+
+        # Coalescencia: el primero en llegar hace la llamada, los demás esperan su respuesta
+        with self._candado:
+            evento = self._en_vuelo.get(placa)
+            lider = evento is None
+            if lider:
+                evento = self._en_vuelo[placa] = threading.Event()
+
+        if not lider:
+            evento.wait(self.timeout + 1)
+            resultado = self._leer_cache(placa)
+            return resultado if resultado is not None else dict(NO_EXISTE)
+
+        try:
+            resultado = self._consultar_api(placa)
+            self._guardar_cache(placa, resultado)
+            return resultado
+        except Exception as e:
+            # En caso de error no guardamos nada: asumimos que no se pudo verificar
+            logger.warning("Error conectando a la API del RUNT: %s", e)
+            return dict(NO_EXISTE)
+        finally:
+            with self._candado:
+                self._en_vuelo.pop(placa, None)
+            evento.set()
+
+    def consultar_lote(self, placas, usar_cache=True, estricto=False):
+        """
+        Consulta muchas placas con pocos requests (`$where placa in (...)`).
+        Retorna {placa_normalizada: resultado}.
+        - usar_cache=False: no lee las caches (sí guarda lo que responde la API).
+        - estricto=True: si la API falla, las placas de ese request no quedan en el resultado
+          (no se pudo verificar) en vez de quedar como NO_EXISTE.
+        """
+        resultados = {}
+        faltantes = []
+        for placa in dict.fromkeys(normalizar_placa(p) for p in placas if p):
+            resultado = self._leer_cache(placa) if usar_cache else None
+            if resultado is not None:
+                resultados[placa] = resultado
+            else:
+                faltantes.append(placa)
+
+        for i in range(0, len(faltantes), self.tamano_lote):
+            grupo = faltantes[i:i + self.tamano_lote]
+            lista = ", ".join("'" + p.replace("'", "''") + "'" for p in grupo)
+            try:
+                filas = self._pedir({'$where': f"placa in ({lista})", '$limit': len(grupo) * 10})
+            except Exception as e:
+                logger.warning("Error conectando a la API del RUNT: %s", e)
+                if not estricto:
+                    for placa in grupo:
+                        resultados[placa] = dict(NO_EXISTE)
+                continue
+
+            encontrados = {}
+            for fila in filas:
+                encontrados.setdefault(normalizar_placa(fila.get('placa')), fila)
+            for placa in grupo:
+                resultado = {'existe': True, 'datos': encontrados[placa]} if placa in encontrados else dict(NO_EXISTE)
+                self._guardar_cache(placa, resultado)
+                resultados[placa] = resultado
+
+        return resultados
+
+
+class ClienteRuntAsync(ClienteRunt):
+    """
+    ClienteRunt para el event loop (vistas ASGI): la misma cache y las mismas respuestas,
+    pero la llamada HTTP va por httpx.AsyncClient (un pool de conexiones por event loop) y
+    la coalescencia espera un Future de asyncio en vez de un threading.Event.
+    El cache secundario, si hay, debe tener `aobtener`/`aguardar` (ver runt.CacheRuntBD).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._clientes_http = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+        self._en_vuelo_async = {}  # placa -> Future de la consulta en curso
+
+    def _cliente_http(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        cliente = self._clientes_http.get(loop)
+        if cliente is None:
+            limites = httpx.Limits(max_connections=self.tamano_pool, max_keepalive_connections=self.tamano_pool)
+            cliente = self._clientes_http[loop] = httpx.AsyncClient(timeout=self.timeout, limits=limites)
+        return cliente
+
+    async def cerrar(self):
+        """Cierra el pool de conexiones del event loop actual."""
+        cliente = self._clientes_http.pop(asyncio.get_running_loop(), None)
+        if cliente is not None:
+            await cliente.aclose()
+
+    async def _aleer_cache(self, placa):
+        resultado = self._leer_memoria(placa)
+        if resultado is None and self.cache_secundario is not None:
+            resultado = await self.cache_secundario.aobtener(placa)
+            if resultado is not None:
+                self._guardar_en_memoria(placa, resultado)
+        return resultado
+
+    async def _aguardar_cache(self, placa, resultado):
+        self._guardar_en_memoria(placa, resultado)
+        if self.cache_secundario is not None:
+            await self.cache_secundario.aguardar(placa, resultado, self._ttl(resultado))
+
+    async def aconsultar(self, placa_buscada):
+        placa = normalizar_placa(placa_buscada)
+        resultado = await self._aleer_cache(placa)
+        if resultado is not None:
+            return resultado
+
+        # Coalescencia: el primero hace la llamada y los demás (del mismo event loop) esperan su Future
+        loop = asyncio.get_running_loop()
+        futuro = self._en_vuelo_async.get(placa)
+        if futuro is not None and futuro.get_loop() is loop:
+            try:
+                return await asyncio.wait_for(asyncio.shield(futuro), self.timeout + 1)
+            except asyncio.TimeoutError:
+                return dict(NO_EXISTE)
+
+        futuro = self._en_vuelo_async[placa] = loop.create_future()
+        resultado = dict(NO_EXISTE)
+        try:
+            respuesta = await self._cliente_http().get(self.url, params={'placa': placa})
+            respuesta.raise_for_status()
+            resultado = self._interpretar(respuesta.json())
+            await self._aguardar_cache(placa, resultado)
+        except Exception as e:
+            # En caso de error no guardamos nada: asumimos que no se pudo verificar
+            logger.warning("Error conectando a la API del RUNT: %s", e)
+        finally:
+            if self._en_vuelo_async.get(placa) is futuro:
+                del self._en_vuelo_async[placa]
+            futuro.set_result(resultado)
+        return resultado
+
@@ -0,0 +1,115 @@
+import hashlib
+import zlib
+
+import numpy as np
+
+from .clasificador import calcular_huella
+
+# ---------------------------------------------------------
+# HUELLAS PARA BUSCAR DUPLICADOS (TEXTO E IMAGEN)
+# ---------------------------------------------------------
+# Se calculan una vez, al leer el documento, y se guardan con la auditoría (ver
+# duplicados.py). Comparar una carga nueva contra todas las anteriores no vuelve a
+# abrir ningún archivo.
+#
+# Texto: MinHash de los shingles de la página de la placa SIN los de las plantillas.
+# Dos SOAT distintos de la misma aseguradora comparten casi todo el texto fijo (Jaccard
+# de hasta 0.95 en el corpus sintético); quitando la plantilla queda lo propio de la
+# póliza (número, fechas, motor, chasis, tomador...): pólizas distintas quedan por debajo
+# de 0.3 y la misma póliza con la placa cambiada, en ~0.95.
+# La firma (NUM_PERMUTACIONES enteros) se parte en BANDAS de FILAS: dos firmas que
+# coinciden en una banda completa son candidatas (LSH). Con 15 bandas de 4 filas una
+# pareja con Jaccard 0.8 sale candidata el 99.96% de las veces, una de 0.5 el 62% y una
+# de 0.2 (las pólizas distintas más parecidas: misma marca, ciudad, vigencia...) el 2%:
+# la búsqueda solo mira unas pocas auditorías. Con bandas de 3 filas salían candidatas
+# más del 1% de las guardadas.
+#
+# Imagen: hash perceptual (pHash) de 64 bits de la página: DCT de la página reducida a
+# 32x32 y el signo de las 8x8 frecuencias bajas frente a su mediana. Se calcula sobre la
+# imagen que ya se dibujó para el OCR (lector_soat.cargar_imagen): un PDF digital, que
+# no se dibuja, no lleva huella de imagen (le basta la de texto). Sobrevive a recompresión,
+# cambio de tamaño y grano, pero las páginas de una misma plantilla quedan a 0-6 bits
+# entre sí: solo sirve para confirmar candidatos que ya comparten algo (la placa).
+
+NUM_PERMUTACIONES = 60
+BANDAS = 15
+FILAS = NUM_PERMUTACIONES // BANDAS
+MIN_SHINGLES = 8  # Menos que esto (ej: solo el texto de las regiones) no da una firma confiable
+
+LADO_PHASH = 32
+LADO_FRECUENCIAS = 8
+
+_MASCARA_32 = np.uint64(0xFFFFFFFF)
+_generador = np.random.default_rng(20240501)  # Fija: las firmas guardadas deben seguir siendo comparables
+# Hash universal multiplicar-desplazar: (a * x + b) >> 32, con `a` impar de 64 bits
+_A = _generador.integers(1, 2 ** 63, NUM_PERMUTACIONES, dtype=np.uint64) | np.uint64(1)
+_B = _generador.integers(0, 2 ** 63, NUM_PERMUTACIONES, dtype=np.uint64)
+
+_k = np.arange(LADO_PHASH)
+_DCT = np.cos(np.pi * (2 * _k[None, :] + 1) * _k[:, None] / (2 * LADO_PHASH)).astype(np.float32)
+
+
+# --- Texto (MinHash + LSH) ---
+
+def shingles_propios(texto, excluir=frozenset()):
+    """Shingles del texto que no están en `excluir` (los de las plantillas)."""
+    return calcular_huella(texto) - excluir
+
+
+def firma_minhash(shingles):
+    """Firma MinHash (uint32[NUM_PERMUTACIONES]) de un conjunto de shingles, o None si es muy chico."""
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    # crc32 y no hash(): hash() cambia en cada proceso y las firmas se guardan en la BD
+    valores = np.fromiter(
+        (zlib.crc32(" ".join(shingle).encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles),
+    )
+    with np.errstate(over='ignore'):  # El desborde de uint64 es parte del hash
+        permutados = (valores[:, None] * _A[None, :] + _B[None, :]) >> np.uint64(32)
+    return (permutados & _MASCARA_32).min(axis=0).astype('<u4')
+
+
+def firma_texto(texto, excluir=frozenset()):
+    """Firma del texto de una página como bytes, o None."""
+    firma = firma_minhash(shingles_propios(texto, excluir))
+    return firma.tobytes() if firma is not None else None
+
+
+def desde_bytes(firma):
+    return np.frombuffer(firma, dtype='<u4')
+
+
+def bandas_lsh(firma):
+    """
+    Claves (int64 con signo, para un BigIntegerField) de las bandas de la firma. El número
+    de banda va dentro del hash: una sola columna indexada sirve para todas.
+    """
+    firma = desde_bytes(firma) if isinstance(firma, (bytes, memoryview)) else firma
+    claves = []
+    for banda in range(BANDAS):
+        filas = firma[banda * FILAS:(banda + 1) * FILAS].tobytes()
+        digest = hashlib.blake2b(bytes([banda]) + filas, digest_size=8).digest()
+        claves.append(int.from_bytes(digest, 'little', signed=True))
+    return claves
+
+
+def similitud_firmas(firma_a, firma_b):
+    """Jaccard estimado (0 a 1): fracción de permutaciones donde las firmas coinciden."""
+    return float(np.mean(desde_bytes(firma_a) == desde_bytes(firma_b)))
+
+
+# --- Imagen (pHash) ---
+
+def hash_perceptual(gris):
+    """pHash de 64 bits de una imagen en gris, como entero con signo (cabe en un BigIntegerField)."""
+    import cv2
+
+    reducida = cv2.resize(gris, (LADO_PHASH, LADO_PHASH), interpolation=cv2.INTER_AREA).astype(np.float32)
+    frecuencias = (_DCT @ reducida @ _DCT.T)[:LADO_FRECUENCIAS, :LADO_FRECUENCIAS].ravel()
+    # La componente continua (brillo medio) no entra en la mediana
+    bits = frecuencias > np.median(frecuencias[1:])
+    return int(np.packbits(bits).view('>i8')[0])
+
+
+def distancia_hamming(hash_a, hash_b):
+    return ((hash_a ^ hash_b) & 0xFFFFFFFFFFFFFFFF).bit_count()
@@ -1,172 +1,256 @@
-import spacy
-from spacy.matcher import Matcher
 import os
+import re
+import time
+import bisect
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from concurrent import futures
 import pdfplumber
-import easyocr
-import numpy as np
-import difflib
-
-# Cargar modelo de spaCy
-try:
-    nlp = spacy.load("es_core_news_sm")
-except:
-    print("Descargando modelo spaCy...")
-    os.system("python -m spacy download es_core_news_sm")
-    nlp = spacy.load("es_core_news_sm")
+from .motor_ocr import obtener_pool, leer_configuracion
+from .regiones import ALTO_OBJETIVO_PX, leer_regiones, leer_regiones_lote
+from .preprocesamiento import (
+    MAX_PIXELES, agregar_mediciones, contar_paginas_pdf, preparar_imagen, medir_etapa, reiniciar_mediciones,
+    ultimas_mediciones,
+)
+from .clasificador import ClasificadorPlantillas, calcular_huella, similitud_huellas
+from .huellas import firma_texto, hash_perceptual
+from .palabras import PalabrasOCR, buscar_por_geometria
+from .candidatos import (
+    TAMANO_VENTANA, escanear_candidatos, intentar_reparar_monto, resolver_candidatos, validar_y_corregir_placa,
+)
+
+# Versión del pipeline de extracción. Súbala cuando cambie la lógica de lectura:
+# invalida los resultados guardados en la cache por contenido (CacheExtraccion).
+VERSION_PIPELINE = "8"
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------
-# 1. FUNCIONES DE VALIDACIÓN Y CORRECCIÓN (ESTRICTAS)
+# 0. CARGA DIFERIDA DE spaCy
 # ---------------------------------------------------------
+# spaCy NO se importa al cargar este módulo: así `manage.py migrate`, el dashboard
+# y el arranque de cada worker no pagan segundos ni cientos de MB por un modelo
+# que quizá no usen. Se carga en el primer uso (o con `precalentar()`).
+#
+# La extracción solo usa el texto de los tokens y el atributo LOWER, así que basta
+# con el tokenizer: desactivamos tagger, parser, NER, etc.
+
+MODELO_SPACY = "es_core_news_sm"
+COMPONENTES_EXCLUIDOS = ["tok2vec", "morphologizer", "parser", "senter", "attribute_ruler", "lemmatizer", "ner"]
+
+_nlp = None
+_candado_nlp = threading.Lock()
+
+
+def obtener_nlp():
+    """Pipeline liviano de spaCy (solo tokenizer), cargado una vez por proceso."""
+    global _nlp
+    if _nlp is None:
+        with _candado_nlp:
+            if _nlp is None:
+                import spacy
+
+                try:
+                    _nlp = spacy.load(MODELO_SPACY, exclude=COMPONENTES_EXCLUIDOS)
+                except OSError:
+                    # Sin el modelo instalado usamos el tokenizer base de español (mismo resultado)
+                    logger.warning("Modelo %s no instalado, usando tokenizer base de spaCy", MODELO_SPACY)
+                    _nlp = spacy.blank("es")
+    return _nlp
+
+
+def precalentar():
+    """Carga el extractor (spaCy, si es el motor configurado) y EasyOCR por adelantado (ej: al arrancar el worker)."""
+    obtener_extractor()
+    obtener_pool().precalentar()
 
-def validar_y_corregir_placa(palabra_raw):
-    """
-    Valida y corrige una posible placa.
-    Incluye filtros anti-falsos positivos (ej: VATIOS -> VAT105).
-    """
-    # -----------------------------------------------------------
-    # 1. FILTRO DE CARACTERES INVALIDANTES (Contexto inmediato)
-    # -----------------------------------------------------------
-    # Si la palabra original trae un slash (/), es una unidad de medida o etiqueta compuesta.
-    # Ej: "CILINDRAJE/VATIOS" o "/VATIOS"
-    if "/" in palabra_raw:
-        return None
-
-    # -----------------------------------------------------------
-    # 2. LIMPIEZA
-    # -----------------------------------------------------------
-    # Quitamos puntuación externa, pero NO interna todavía.
-    limpio = palabra_raw.strip(".,;:()[]-")
-    limpio = limpio.upper()
-
-    # -----------------------------------------------------------
-    # 3. LISTA NEGRA (STOPWORDS DE SOAT)
-    # -----------------------------------------------------------
-    # Palabras comunes en el formato que al convertirlas parecen placas
-    # VATIOS -> VAT105 (Falso positivo común)
-    # MOTOS  -> MOT05
-    # DATOS  -> DAT05
-    PALABRAS_PROHIBIDAS = {
-        "VATIOS", "CILINDRAJE", "MODELO", "CLASE", "DATOS", 
-        "MOTOR", "SERIE", "CHASIS", "POLIZA", "TOTAL", "VALOR", 
-        "FECHA", "DESDE", "HASTA", "MOTOS", "AUTO", "SITIO"
-    }
-    
-    # Verificamos si la palabra (antes de volverla números) es una palabra prohibida
-    # Usamos in para detectar si dice "VATIOS" o "DE/VATIOS"
-    for prohibida in PALABRAS_PROHIBIDAS:
-        if prohibida in limpio:
-            return None
-
-    # -----------------------------------------------------------
-    # 4. VALIDACIÓN DE LONGITUD
-    # -----------------------------------------------------------
-    # Placa normal: 6 chars. Placa con guion: 7 chars.
-    if len(limpio) < 6 or len(limpio) > 7:
-        return None
-
-    # Normalizamos quitando guion
-    limpio = limpio.replace("-", "")
-
-    # -----------------------------------------------------------
-    # 5. CORRECCIÓN HEURÍSTICA (LLLDDD)
-    # -----------------------------------------------------------
-    parte_letras = limpio[:3]
-    parte_numeros = limpio[3:]
-
-    # Letras: 0->O, 1->I, 5->S
-    parte_letras = parte_letras.translate(str.maketrans("015", "OIS"))
-    
-    # Números: O->0, I->1, S->5, B->8, Z->2
-    parte_numeros = parte_numeros.translate(str.maketrans("OISBZ", "01582"))
-
-    # -----------------------------------------------------------
-    # 6. VALIDACIÓN FINAL DE ESTRUCTURA
-    # -----------------------------------------------------------
-    # Debe ser estrictamente 3 LETRAS y 3 DIGITOS
-    if parte_letras.isalpha() and parte_numeros.isdigit():
-        return parte_letras + parte_numeros
-    
-    return None
-
-def intentar_reparar_monto(token_texto):
-    """Convierte texto sucio en valor monetario."""
-    limpio = token_texto.replace("$", "").replace(".", "").replace(",", "").replace(" ", "").upper()
-    limpio = limpio.translate(str.maketrans("OISB", "0158")) # Correcciones visuales
-    
-    if limpio.isdigit():
-        valor = int(limpio)
-        # Filtro de lógica de negocio (Valor razonable SOAT)
-        if 100000 < valor < 5000000: 
-            return valor
-    return None
+# ---------------------------------------------------------
+# 1. FUNCIONES DE VALIDACIÓN Y CORRECCIÓN (ESTRICTAS)
+# ---------------------------------------------------------
+# Viven en candidatos.py junto con el escáner de una pasada (tablas y lista negra
+# precompiladas); se importan aquí para los llamadores de siempre.
 
 # ---------------------------------------------------------
 # 2. LÓGICA DE EXTRACCIÓN INTELIGENTE
 # ---------------------------------------------------------
 
-def extraer_con_inteligencia_hibrida(texto_completo):
-    """
-    Fase 1: Búsqueda Contextual (Cerca de palabras clave).
-    Fase 2: Búsqueda por Fuerza Bruta en Cabecera (Primeras 30 palabras).
-    """
-    doc = nlp(texto_completo)
-    matcher = Matcher(nlp.vocab)
-    
-    resultados = {"placa": None, "monto": None}
-
-    # --- FASE 1: SPACY CONTEXTUAL ---
-    
-    # Patrones Ancla
-    patron_placa = [[{"LOWER": "placa"}], [{"LOWER": "vehiculo"}], [{"LOWER": "modelo"}]]
-    patron_monto = [[{"LOWER": "total"}, {"LOWER": "pagar"}], [{"LOWER": "legales"}]]
-
-    matcher.add("ANCLA_PLACA", patron_placa)
-    matcher.add("ANCLA_MONTO", patron_monto)
-
-    matches = matcher(doc)
-
-    for match_id, start, end in matches:
-        string_id = nlp.vocab.strings[match_id]
-        
-        # Miramos los 8 tokens siguientes
-        ventana = doc[end : end + 15] 
-        
-        if string_id == "ANCLA_PLACA" and not resultados["placa"]:
-            for token in ventana:
-                # Usamos la validación estricta
-                candidato = validar_y_corregir_placa(token.text)
+# Patrones Ancla (los mismos para los motores spacy y regex)
+PATRONES_ANCLA = {
+    "ANCLA_PLACA": [[{"LOWER": "placa"}], [{"LOWER": "vehiculo"}], [{"LOWER": "modelo"}]],
+    "ANCLA_MONTO": [[{"LOWER": "total"}, {"LOWER": "pagar"}], [{"LOWER": "legales"}]],
+}
+
+# Motor alterno sin spaCy: las mismas anclas como una sola regex compilada
+_RE_ANCLAS = re.compile(r"\b(?:(?P<placa>placa|vehiculo|modelo)|(?P<monto>total\s+pagar|legales))\b", re.IGNORECASE)
+_RE_TOKEN = re.compile(r"\S+")
+
+
+class ExtractorSoat:
+    """
+    Extractor precompilado: el Matcher y sus patrones se construyen UNA vez y se
+    reutilizan en todos los documentos. Solo se tokeniza (nlp.make_doc), sin pipeline.
+
+    motor='spacy': Matcher de spaCy sobre los tokens.
+    motor='regex': regex compilada de anclas sobre el texto (no necesita spaCy);
+                   los tokens son las palabras separadas por espacios.
+    motor='escaner': una sola pasada sobre todo el texto con candidatos puntuados por
+                     cercanía a las anclas (ver candidatos.py). Es el motor por defecto.
+    """
+
+    MOTORES = ('escaner', 'spacy', 'regex')
+
+    def __init__(self, motor='escaner'):
+        if motor not in self.MOTORES:
+            raise ValueError(f"Motor de extracción desconocido: {motor}")
+        self.motor = motor
+        if motor == 'spacy':
+            from spacy.matcher import Matcher
+
+            self.nlp = obtener_nlp()
+            self.matcher = Matcher(self.nlp.vocab)
+            for nombre, patrones in PATRONES_ANCLA.items():
+                self.matcher.add(nombre, patrones)
+
+    # --- Fase 1: ventanas de tokens después de cada ancla ---
+
+    def _ventanas_spacy(self, doc):
+        for match_id, start, end in self.matcher(doc):
+            yield self.nlp.vocab.strings[match_id], [t.text for t in doc[end : end + TAMANO_VENTANA]]
+
+    def _ventanas_regex(self, texto_completo):
+        tokens = [(m.start(), m.group()) for m in _RE_TOKEN.finditer(texto_completo)]
+        inicios = [inicio for inicio, _ in tokens]
+        for ancla in _RE_ANCLAS.finditer(texto_completo):
+            # Primer token que empieza después del ancla
+            i = bisect.bisect_left(inicios, ancla.end())
+            nombre = "ANCLA_PLACA" if ancla.group('placa') else "ANCLA_MONTO"
+            yield nombre, [texto for _, texto in tokens[i : i + TAMANO_VENTANA]]
+
+    # --- Extracción ---
+
+    def candidatos(self, texto_completo):
+        """Candidatos ordenados por puntaje para placa y monto (ver `escanear_candidatos`)."""
+        return escanear_candidatos(texto_completo)
+
+    def extraer(self, texto_completo):
+        if self.motor == 'escaner':
+            return resolver_candidatos(escanear_candidatos(texto_completo))
+        if self.motor == 'spacy':
+            ventanas = self._ventanas_spacy(self.nlp.make_doc(texto_completo))
+        else:
+            ventanas = self._ventanas_regex(texto_completo)
+        return self._resolver(texto_completo, ventanas)
+
+    def extraer_lote(self, textos, batch_size=64):
+        """Extrae de muchos textos a la vez (nlp.pipe). Retorna los resultados en el mismo orden."""
+        textos = list(textos)
+        if self.motor == 'spacy':
+            docs = self.nlp.pipe(textos, batch_size=batch_size)
+            return [self._resolver(texto, self._ventanas_spacy(doc)) for texto, doc in zip(textos, docs)]
+        return [self.extraer(texto) for texto in textos]
+
+    def _resolver(self, texto_completo, ventanas):
+        """
+        Fase 1: Búsqueda Contextual (Cerca de palabras clave).
+        Fase 2: Búsqueda por Fuerza Bruta en Cabecera (Primeras 70 palabras).
+        """
+        resultados = {"placa": None, "monto": None}
+
+        # --- FASE 1: CONTEXTUAL ---
+        for string_id, ventana in ventanas:
+            if string_id == "ANCLA_PLACA" and not resultados["placa"]:
+                for texto in ventana:
+                    # Usamos la validación estricta
+                    candidato = validar_y_corregir_placa(texto)
+                    if candidato:
+                        resultados["placa"] = candidato
+                        break
+
+            elif string_id == "ANCLA_MONTO" and not resultados["monto"]:
+                for texto in ventana:
+                    candidato = intentar_reparar_monto(texto)
+                    if candidato:
+                        resultados["monto"] = candidato
+                        break
+
+        # --- FASE 2: FALLBACK (BÚSQUEDA EN CABECERA) ---
+        # Si no encontramos la placa por contexto, buscamos en las primeras 70 palabras.
+
+        if not resultados["placa"]:
+            logger.debug("Placa no encontrada por contexto. Buscando en las primeras 70 palabras...")
+
+            # Usamos split() nativo para respetar "espacio antes y después".
+            # Esto crea una lista de palabras aisladas.
+            palabras_cabecera = texto_completo.split()[:70]
+
+            for palabra in palabras_cabecera:
+                # Enviamos la palabra tal cual viene (con posibles signos de puntuación pegados)
+                # La función validar_y_corregir_placa se encarga de limpiar bordes
+                candidato = validar_y_corregir_placa(palabra)
+
                 if candidato:
+                    logger.debug("Placa encontrada en cabecera: %s", candidato)
                     resultados["placa"] = candidato
                     break
-                    
-        elif string_id == "ANCLA_MONTO" and not resultados["monto"]:
-            for token in ventana:
-                candidato = intentar_reparar_monto(token.text)
-                if candidato:
-                    resultados["monto"] = candidato
-                    break
 
-    # --- FASE 2: FALLBACK (BÚSQUEDA EN CABECERA) ---
-    # Si spaCy falló al encontrar la placa por contexto, buscamos en las primeras 70 palabras.
-    
-    if not resultados["placa"]:
-        print("   ⚠️ Placa no encontrada por contexto. Buscando en las primeras 70 palabras...")
-        
-        # Usamos split() nativo para respetar "espacio antes y después".
-        # Esto crea una lista de palabras aisladas.
-        palabras_cabecera = texto_completo.split()[:70]
-        
-        for palabra in palabras_cabecera:
-            # Enviamos la palabra tal cual viene (con posibles signos de puntuación pegados)
-            # La función validar_y_corregir_placa se encarga de limpiar bordes
-            candidato = validar_y_corregir_placa(palabra)
-            
-            if candidato:
-                print(f"   ✅ Placa encontrada en cabecera: {candidato}")
-                resultados["placa"] = candidato
-                break
+        return resultados
 
-    return resultados
+
+_extractores = {}
+_candado_extractores = threading.Lock()
+
+
+def motor_configurado():
+    return leer_configuracion('SOAT_MOTOR_EXTRACCION', 'escaner')
+
+
+def obtener_extractor(motor=None):
+    """Extractor compartido del proceso (uno por motor; sin motor, el de SOAT_MOTOR_EXTRACCION)."""
+    motor = motor or motor_configurado()
+    extractor = _extractores.get(motor)
+    if extractor is None:
+        with _candado_extractores:
+            extractor = _extractores.get(motor)
+            if extractor is None:
+                extractor = _extractores[motor] = ExtractorSoat(motor)
+    return extractor
+
+
+def extraer_con_inteligencia_hibrida(texto_completo, motor=None):
+    """Busca placa y monto en el texto con el extractor precompilado del proceso."""
+    with medir_etapa('extraccion'):
+        return obtener_extractor(motor).extraer(texto_completo)
+
+
+def extraer_de_pagina(texto, palabras=None):
+    """
+    {'placa', 'monto', 'confianza'} de una página. Con las palabras del OCR de página
+    completa cada campo se busca primero por geometría (junto a su ancla, ver palabras.py)
+    y si no, en el texto como siempre; 'confianza' es la menor de los fragmentos de donde
+    salieron. Sin palabras (texto nativo o regiones) la confianza es None.
+    """
+    datos = extraer_con_inteligencia_hibrida(texto)
+    if palabras is None:
+        return dict(datos, confianza=None)
+
+    confianzas = []
+    with medir_etapa('extraccion'):
+        for campo in ('placa', 'monto'):
+            valor, confianza = buscar_por_geometria(palabras, campo)
+            if valor is None and datos[campo] is not None:
+                valor, confianza = datos[campo], palabras.confianza_de(campo, datos[campo])
+            datos = dict(datos, **{campo: valor})
+            if confianza is not None:
+                confianzas.append(confianza)
+    return dict(datos, confianza=round(min(confianzas), 3) if confianzas else None)
+
+
+def repuntuar_evidencia(evidencia):
+    """`extraer_de_pagina` otra vez sobre la evidencia guardada de una auditoría (sin repetir el OCR)."""
+    palabras = PalabrasOCR.desde_bytes(evidencia)
+    return extraer_de_pagina(palabras.texto, palabras)
 
 # ---------------------------------------------------------
 # 3. MOTORES DE LECTURA (PDF/IMG)
@@ -226,33 +310,121 @@ institución prestadora de servicios de salud.
 terceros.
 """
 
+# Campos del formato regulado del SOAT, comunes a todas las aseguradoras
+TEXTO_SOAT_GENERICO = """
+SEGURO OBLIGATORIO DE DAÑOS CORPORALES CAUSADOS A LAS PERSONAS EN ACCIDENTES DE TRÁNSITO SOAT
+No. DE PÓLIZA FECHA DE EXPEDICIÓN VIGENCIA DESDE HASTA
+PLACA No. CLASE VEHÍCULO SERVICIO CILINDRAJE MODELO MARCA LÍNEA CARROCERÍA
+No. MOTOR No. CHASIS No. SERIE No. VIN CAPACIDAD TON. PASAJEROS
+APELLIDOS Y NOMBRES DEL TOMADOR TELÉFONO DEL TOMADOR TIPO DE DOCUMENTO No. DE DOCUMENTO CIUDAD RESIDENCIA TOMADOR
+CÓDIGO DE ASEGURADORA SUCURSAL EXPEDIDORA CLAVE PRODUCTOR No. FORMULARIO CIUDAD EXPEDICIÓN
+TARIFA PRIMA SOAT CONTRIBUCIÓN TASA RUNT TOTAL A PAGAR AMPAROS POR VICTIMA HASTA
+GASTOS MÉDICOS QUIRÚRGICOS FARMACÉUTICOS Y HOSPITALARIOS INCAPACIDAD PERMANENTE
+MUERTE Y GASTOS FUNERARIOS GASTOS DE TRANSPORTE Y MOVILIZACIÓN DE VICTIMAS
+SALARIOS MÍNIMOS LEGALES DIARIOS VIGENTES FIRMA AUTORIZADA
+"""
+
+# Las huellas de las plantillas se calculan una sola vez, al cargar el módulo
+CLASIFICADOR = ClasificadorPlantillas({
+    'seguros_del_estado': TEXTO_REF,
+    'soat_generico': TEXTO_SOAT_GENERICO,
+})
+# Texto fijo de las plantillas: no cuenta para la huella de texto de una póliza (ver huellas.py)
+SHINGLES_PLANTILLAS = calcular_huella(TEXTO_REF) | calcular_huella(TEXTO_SOAT_GENERICO)
+
+
 def evaluar_similitud(texto_base, texto_nuevo):
+    """Similitud 0-100 entre dos textos (Jaccard de shingles, tiempo lineal)."""
     if not texto_nuevo: return 0.0
-    s1 = " ".join(texto_base.split()).lower()
-    s2 = " ".join(texto_nuevo.split()).lower()
-    return difflib.SequenceMatcher(None, s1, s2).ratio() * 100
+    return similitud_huellas(texto_base, texto_nuevo)
+
+# pHash de las páginas que se dibujaron para el OCR, hasta que `agregar_huella_imagen`
+# las recoge: la huella de imagen sale de ese dibujo y no de otro.
+MAX_DOCUMENTOS_DIBUJADOS = 256  # Los que nunca se recogen (lectura fallida) no se acumulan
+_paginas_dibujadas = OrderedDict()  # ruta -> {página (desde 0): pHash}
+_candado_dibujadas = threading.Lock()
+
+
+def recordar_dibujo(ruta, pagina):
+    """Función para `preparar_imagen(al_dibujar=...)` que guarda el pHash de esa página."""
+    def recordar(gris):
+        try:
+            with medir_etapa('huellas'):
+                huella = hash_perceptual(gris)
+        except Exception:
+            logger.warning("No se pudo calcular la huella de %s (página %d)", ruta, pagina + 1, exc_info=True)
+            return
+        with _candado_dibujadas:
+            _paginas_dibujadas.setdefault(ruta, {})[pagina] = huella
+            _paginas_dibujadas.move_to_end(ruta)
+            while len(_paginas_dibujadas) > MAX_DOCUMENTOS_DIBUJADOS:
+                _paginas_dibujadas.popitem(last=False)
+    return recordar
+
+
+def cargar_imagen(ruta, modo_pdf=False, dpi=300, alto_objetivo=None, reutilizar=True, pagina=0):
+    """
+    Imagen en gris uint8 de una página del PDF (índice desde 0) o de la foto, con memoria
+    acotada (ver preprocesamiento.py). Con `alto_objetivo` el DPI/tamaño se adapta a ese alto.
+    Deja el pHash de la página para `agregar_huella_imagen`.
+    """
+    return preparar_imagen(
+        ruta, modo_pdf=modo_pdf, dpi=dpi, alto_objetivo=alto_objetivo,
+        deskew=leer_configuracion('OCR_ENDEREZAR', True),
+        binarizado=leer_configuracion('OCR_BINARIZAR', False),
+        max_pixeles=leer_configuracion('OCR_MAX_PIXELES', MAX_PIXELES),
+        reutilizar=reutilizar, pagina=pagina, al_dibujar=recordar_dibujo(ruta, pagina),
+    )
 
-def obtener_texto_con_ocr(ruta, modo_pdf=False):
-    """Usa EasyOCR"""
-    print("   ...Ejecutando EasyOCR...")
-    try:
-        reader = easyocr.Reader(['es'], gpu=True)
-    except:
-        reader = easyocr.Reader(['es'], gpu=False)
-    
-    texto_out = ""
-    if modo_pdf:
-        with pdfplumber.open(ruta) as pdf:
-            # Solo primera página para SOAT
-            im = pdf.pages[0].to_image(resolution=300)
-            arr = np.array(im.original)
-            res = reader.readtext(arr, detail=0)
-            texto_out = " ".join(res)
-    else:
-        res = reader.readtext(ruta, detail=0)
-        texto_out = " ".join(res)
-        
-    return texto_out
+
+def obtener_palabras_con_ocr(ruta, modo_pdf=False, pagina=0, alto_objetivo=None):
+    """
+    Usa EasyOCR y retorna `PalabrasOCR` (texto, caja y confianza de cada fragmento).
+    Con `alto_objetivo` lee a resolución reducida (OCR rápido del modo carrera).
+    """
+    logger.debug("Ejecutando EasyOCR de página completa: %s (página %d)", ruta, pagina + 1)
+    # El lector se carga una sola vez por proceso (ver motor_ocr.py)
+    pool = obtener_pool()
+
+    # Una página a la vez (PDF a 300 DPI; fotos dentro del presupuesto de píxeles)
+    arr = cargar_imagen(ruta, modo_pdf=modo_pdf, dpi=300, alto_objetivo=alto_objetivo, pagina=pagina)
+    with medir_etapa('ocr'):
+        res = pool.leer(arr, detail=1)
+    return PalabrasOCR.desde_readtext(res, arr.shape)
+
+
+def obtener_texto_por_regiones(ruta, modo_pdf=False, pagina=0):
+    """
+    OCR solo de las cajas de PLACA y TOTAL A PAGAR de las plantillas conocidas,
+    a resolución reducida. Retorna (plantilla_id, texto) o (None, None).
+    """
+    logger.debug("Ejecutando EasyOCR por regiones: %s (página %d)", ruta, pagina + 1)
+    pool = obtener_pool()
+    imagen = cargar_imagen(ruta, modo_pdf=modo_pdf, alto_objetivo=ALTO_OBJETIVO_PX, pagina=pagina)
+    with medir_etapa('ocr_regiones'):
+        return leer_regiones(imagen, lambda recorte: pool.leer(recorte, detail=0))
+
+
+def leer_con_ocr(ruta, modo_pdf=False, pagina=0, regiones=None, alto_objetivo=None, cancelado=None):
+    """
+    Primero intenta el OCR por regiones (rápido); si no hay plantilla o no aparece
+    la placa, hace el OCR de página completa (a `alto_objetivo` píxeles de alto, o a 300 DPI).
+    `regiones` por defecto es settings.OCR_REGIONES.
+    Retorna (texto, origen, plantilla_id, palabras); `palabras` solo en la página completa.
+    """
+    origen = "OCR Scan" if modo_pdf else "OCR Imagen"
+
+    if regiones is None:
+        regiones = leer_configuracion('OCR_REGIONES', True)
+    if regiones:
+        plantilla, texto = obtener_texto_por_regiones(ruta, modo_pdf, pagina)
+        if texto and extraer_con_inteligencia_hibrida(texto)['placa']:
+            return texto, origen + " (regiones)", plantilla, None
+        logger.debug("Regiones sin placa. Usando OCR de página completa...")
+        revisar_cancelacion(cancelado)
+
+    palabras = obtener_palabras_con_ocr(ruta, modo_pdf, pagina, alto_objetivo)
+    return palabras.texto, origen, None, palabras
 
 # ---------------------------------------------------------
 # 4. FUNCIÓN PRINCIPAL
@@ -260,58 +432,492 @@ def obtener_texto_con_ocr(ruta, modo_pdf=False):
 
 # ... (Todo tu código de imports y funciones auxiliares VALIDAR/CORREGIR queda IGUAL) ...
 
-def extraer_datos_soat(ruta_archivo):
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png'}
+
+# Páginas: se leen en orden y de a una, y se para apenas aparecen placa y monto.
+# Así un PDF con portada o con varias pólizas no falla por mirar solo la página 1,
+# y no pagamos OCR de páginas que no hacen falta.
+MAX_PAGINAS = 10  # Tope de páginas por documento (cada página escaneada es un OCR)
+MIN_PALABRAS_NATIVAS = 20
+FRACCION_PALABRAS_RARAS = 0.3  # Más que esto y la capa de texto es OCR malo, no texto real
+_RE_PALABRA_RARA = re.compile(r"^(?=.*[A-Za-zÁÉÍÓÚÑáéíóúñ])(?=.*\d)")
+
+
+def leer_pagina_nativa(texto_nativo):
+    """
+    Decide si el texto nativo de una página sirve tal cual.
+    Retorna (texto, origen, plantilla_id, None), o None si la página necesita OCR.
+    """
+    # ¿El texto nativo se parece a alguna plantilla conocida de SOAT?
+    with medir_etapa('clasificacion'):
+        clasificacion = CLASIFICADOR.clasificar(texto_nativo)
+    if clasificacion['digital']:
+        return texto_nativo, "Digital", clasificacion['plantilla'], None
+
+    # Capa de texto real pero de otra cosa (portada, anexo, otra aseguradora): no hace falta OCR.
+    # "(cid:N)" es lo que deja pdfplumber cuando la fuente no trae su tabla de caracteres.
+    if len(texto_nativo.split()) >= MIN_PALABRAS_NATIVAS and "(cid:" not in texto_nativo:
+        return texto_nativo, "Digital", None, None
+    return None
+
+
+def capa_de_texto_basura(texto):
+    """
+    True si la capa de texto parece OCR malo: muchas palabras con letras y dígitos mezclados
+    ("P0L1ZA", "VEH1CUL0"). En una portada o un SOAT digital casi solo la placa es así.
+    """
+    palabras = [p for p in texto.split() if len(p) >= 3 and not p.isdigit()]
+    if not palabras:
+        return False
+    raras = sum(1 for p in palabras if _RE_PALABRA_RARA.match(p))
+    return raras / len(palabras) > FRACCION_PALABRAS_RARAS
+
+
+def confirmar_con_ocr(lectura):
+    """
+    True si una página que pasó por texto nativo igual necesita OCR: no es de una plantilla
+    conocida, no trae placa y su capa de texto es basura. Pasa con los PDF escaneados
+    "buscables", cuya capa es el OCR (malo) del escáner. Una portada o un anexo digital no.
+    """
+    texto, _, plantilla, _ = lectura
+    return (
+        plantilla is None
+        and not extraer_con_inteligencia_hibrida(texto)['placa']
+        and capa_de_texto_basura(texto)
+    )
+
+
+def leer_texto_nativo(ruta_archivo):
+    """
+    Texto nativo de la primera página de un PDF, si sirve sin OCR.
+    Retorna ((texto, origen, plantilla_id, None) o None, número de páginas).
+    """
+    with pdfplumber.open(ruta_archivo) as pdf:
+        with medir_etapa('pdfplumber'):
+            texto_nativo = (pdf.pages[0].extract_text() or "") if pdf.pages else ""
+        return leer_pagina_nativa(texto_nativo), len(pdf.pages)
+
+
+def iterar_paginas(ruta_archivo, modo_pdf=True, leer_ocr=leer_con_ocr, cancelado=None):
+    """
+    Genera (numero_pagina, texto, origen, plantilla_id, palabras) en orden, sin leer una página
+    antes de que se la pida: primero el texto nativo y OCR solo si la página lo necesita
+    (no parece texto real o no trae placa).
+    `leer_ocr(ruta, modo_pdf, pagina)` hace ese OCR; con None esas páginas se saltan.
+    Con `cancelado` (threading.Event) se deja de leer en la página siguiente.
+    """
+    if not modo_pdf:
+        revisar_cancelacion(cancelado)
+        yield (1,) + leer_ocr(ruta_archivo, False, 0)
+        return
+
+    max_paginas = leer_configuracion('SOAT_MAX_PAGINAS', MAX_PAGINAS)
+    with pdfplumber.open(ruta_archivo) as pdf:
+        for indice, pagina in enumerate(pdf.pages[:max_paginas]):
+            revisar_cancelacion(cancelado)
+            with medir_etapa('pdfplumber'):
+                texto_nativo = pagina.extract_text() or ""
+                pagina.close()  # Liberamos los objetos ya parseados de la página
+            lectura = leer_pagina_nativa(texto_nativo)
+            if lectura is None:
+                if leer_ocr is None:
+                    continue
+                # OJO: OCR es lento, esto puede tardar unos segundos
+                lectura = leer_ocr(ruta_archivo, True, indice)
+            elif leer_ocr is not None and confirmar_con_ocr(lectura):
+                logger.debug("Página %d: el texto nativo no trae placa. Usando OCR...", indice + 1)
+                try:
+                    lectura = leer_ocr(ruta_archivo, True, indice)
+                except LecturaCancelada:
+                    raise
+                except Exception:
+                    # Sin OCR nos quedamos con lo que había (ej: una portada sin placa)
+                    logger.warning("OCR de la página %d de %s falló: queda el texto nativo",
+                                   indice + 1, ruta_archivo, exc_info=True)
+            yield (indice + 1,) + lectura
+
+
+def iterar_paginas_ocr(ruta_archivo, modo_pdf, leer_ocr, cancelado=None):
+    """Como `iterar_paginas`, pero todas las páginas van por `leer_ocr` sin mirar el texto nativo."""
+    paginas = contar_paginas_pdf(ruta_archivo) if modo_pdf else 1
+    for indice in range(min(paginas, leer_configuracion('SOAT_MAX_PAGINAS', MAX_PAGINAS))):
+        revisar_cancelacion(cancelado)
+        yield (indice + 1,) + leer_ocr(ruta_archivo, modo_pdf, indice)
+
+
+def resultado_sin_placa():
+    # Si no hay placa, fallamos. (El monto es secundario, pero la placa es vital)
+    return {
+        'exito': False,
+        'mensaje': "No pudimos detectar la PLACA. Intente con una foto más clara o un PDF digital."
+    }
+
+
+def armar_resultado(lecturas):
+    """
+    Recorre las lecturas de `iterar_paginas` y se detiene (salida temprana) cuando ya
+    tiene placa y monto. Arma la respuesta de `extraer_datos_soat`, con la confianza, la
+    evidencia (palabras del OCR, ver palabras.py) y la huella de texto de la página de la placa.
+    """
+    encontrada = None  # (placa, origen, plantilla, pagina, confianza, palabras, texto)
+    monto = monto_previo = None
+    paginas_leidas = 0
+
+    for pagina, texto, origen, plantilla, palabras in lecturas:
+        paginas_leidas += 1
+        # B. Procesamiento
+        datos = extraer_de_pagina(texto, palabras)
+        if encontrada is None:
+            if datos['placa']:
+                encontrada = (datos['placa'], origen, plantilla, pagina, datos['confianza'], palabras, texto)
+                monto = datos['monto']  # El monto de la misma página de la placa manda
+            else:
+                monto_previo = monto_previo or datos['monto']
+        elif monto is None:
+            monto = datos['monto']  # La póliza puede seguir en la página siguiente
+
+        if encontrada and monto:
+            break
+
+    # C. Validación Crítica (AQUI DECIDIMOS EL EXITO)
+    if encontrada is None:
+        return resultado_sin_placa()
+
+    placa, origen, plantilla, pagina, confianza, palabras, texto = encontrada
+    monto = monto or monto_previo
+
+    # D. Retorno Exitoso
+    return {
+        'exito': True,
+        'placa': placa,
+        'monto': monto if monto else 0, # Si no hay monto, ponemos 0
+        'origen': origen,
+        'plantilla': plantilla,
+        'pagina': pagina,
+        'paginas_leidas': paginas_leidas,
+        'confianza': confianza,
+        'evidencia': palabras.a_bytes() if palabras is not None else None,
+        'huella_texto': firma_texto(texto, SHINGLES_PLANTILLAS),
+        'mensaje': "Lectura exitosa"
+    }
+
+
+def armar_polizas(lecturas):
+    """
+    Modo multipóliza: lee todas las páginas (hasta el tope) y arma una póliza por cada
+    placa distinta. Una página sin placa completa el monto de la póliza anterior.
+    La respuesta es la de la primera póliza más la lista completa en 'polizas'.
+    """
+    polizas = []
+    paginas_leidas = 0
+    for pagina, texto, origen, plantilla, palabras in lecturas:
+        paginas_leidas += 1
+        datos = extraer_de_pagina(texto, palabras)
+        if datos['placa'] and (not polizas or polizas[-1]['placa'] != datos['placa']):
+            polizas.append({
+                'placa': datos['placa'], 'monto': datos['monto'],
+                'origen': origen, 'plantilla': plantilla, 'pagina': pagina,
+                'confianza': datos['confianza'], 'evidencia': palabras.a_bytes() if palabras is not None else None,
+                'huella_texto': firma_texto(texto, SHINGLES_PLANTILLAS),
+            })
+        elif polizas and not polizas[-1]['monto']:
+            polizas[-1]['monto'] = datos['monto']
+
+    if not polizas:
+        return resultado_sin_placa()
+
+    for poliza in polizas:
+        poliza['monto'] = poliza['monto'] or 0
+    return dict(polizas[0], exito=True, polizas=polizas, paginas_leidas=paginas_leidas, mensaje="Lectura exitosa")
+
+
+def extraer_datos_soat(ruta_archivo, multipoliza=False):
+    """
+    Lee placa y monto de un SOAT (PDF de una o varias páginas, o foto).
+    Con `multipoliza=True` retorna además 'polizas': una por cada placa encontrada.
+    """
     # Validar existencia
     if not os.path.exists(ruta_archivo):
         return {'exito': False, 'placa': None, 'monto': None, 'mensaje': "Archivo no encontrado"}
 
+    ext = os.path.splitext(ruta_archivo)[1].lower()
+    if ext != '.pdf' and ext not in EXTENSIONES_IMAGEN:
+        return {'exito': False, 'mensaje': "Formato no soportado (Use PDF, JPG, PNG)"}
+
+    modo_pdf = ext == '.pdf'
+    if not multipoliza and leer_configuracion('SOAT_MODO_CARRERA', False):
+        with medir_etapa('carrera'):
+            resultado = extraer_en_carrera(ruta_archivo, modo_pdf)
+        return agregar_huella_imagen(resultado, ruta_archivo)
+
+    # A. Extracción del Texto Crudo (perezosa: página por página)
+    lecturas = iterar_paginas(ruta_archivo, modo_pdf=modo_pdf)
     try:
-        ext = os.path.splitext(ruta_archivo)[1].lower()
-        texto_final = ""
-        origen = ""
-
-        # A. Extracción del Texto Crudo
-        if ext == '.pdf':
-            with pdfplumber.open(ruta_archivo) as pdf:
-                texto_nativo = pdf.pages[0].extract_text() if pdf.pages else ""
-            
-            similitud = evaluar_similitud(TEXTO_REF, texto_nativo)
-            if similitud > 70.0:
-                texto_final = texto_nativo
-                origen = "Digital"
-            else:
-                # OJO: OCR es lento, esto puede tardar unos segundos
-                texto_final = obtener_texto_con_ocr(ruta_archivo, modo_pdf=True)
-                origen = "OCR Scan"
-                
-        elif ext in {'.jpg', '.jpeg', '.png'}:
-            texto_final = obtener_texto_con_ocr(ruta_archivo, modo_pdf=False)
-            origen = "OCR Imagen"
-        else:
-            return {'exito': False, 'mensaje': "Formato no soportado (Use PDF, JPG, PNG)"}
+        resultado = armar_polizas(lecturas) if multipoliza else armar_resultado(lecturas)
+    except Exception as e:
+        return {'exito': False, 'mensaje': f"Error técnico analizando el archivo: {str(e)}"}
+    finally:
+        lecturas.close()  # Cierra el PDF aunque hayamos salido antes de la última página
+    return agregar_huella_imagen(resultado, ruta_archivo)
 
-        # B. Procesamiento
-        datos = extraer_con_inteligencia_hibrida(texto_final)
-        
-        placa = datos.get('placa')
-        monto = datos.get('monto')
-
-        # C. Validación Crítica (AQUI DECIDIMOS EL EXITO)
-        if not placa:
-            # Si no hay placa, fallamos. (El monto es secundario, pero la placa es vital)
-            return {
-                'exito': False, 
-                'mensaje': "No pudimos detectar la PLACA. Intente con una foto más clara o un PDF digital."
-            }
-
-        # D. Retorno Exitoso
-        return {
-            'exito': True,
-            'placa': placa,
-            'monto': monto if monto else 0, # Si no hay monto, ponemos 0
-            'origen': origen,
-            'mensaje': "Lectura exitosa"
-        }
 
+def agregar_huella_imagen(resultado, ruta_archivo):
+    """
+    Agrega 'huella_imagen' (pHash de la página, ver huellas.py) a cada póliza de un resultado
+    exitoso, con lo que dejó `cargar_imagen`. Una página que no se dibujó (texto nativo)
+    queda en None: no se vuelve a abrir el archivo solo para eso.
+    """
+    with _candado_dibujadas:
+        dibujadas = _paginas_dibujadas.pop(ruta_archivo, {})
+    if not resultado.get('exito'):
+        return resultado
+
+    for poliza in resultado.get('polizas') or [resultado]:
+        poliza['huella_imagen'] = dibujadas.get(poliza.get('pagina', 1) - 1)
+    if resultado.get('polizas'):
+        resultado['huella_imagen'] = resultado['polizas'][0]['huella_imagen']
+    return resultado
+
+
+# ---------------------------------------------------------
+# 4b. MODO CARRERA (PRESUPUESTO DE LATENCIA)
+# ---------------------------------------------------------
+# El camino normal es secuencial: texto nativo y, si la página no sirve, regiones y
+# página completa a 300 DPI, uno detrás de otro. Con SOAT_MODO_CARRERA=1 (una póliza
+# por archivo):
+# 1. Arrancan a la vez la rama nativa (pdfplumber, sin OCR) y un OCR rápido a baja
+#    resolución: regiones y página completa a SOAT_CARRERA_ALTO_PX de alto (~150 DPI
+#    en carta; se da en píxeles para que también aplique a las fotos).
+# 2. Gana la primera rama con placa válida (y monto, con SOAT_CARRERA_EXIGIR_MONTO);
+#    la otra se cancela.
+# 3. Si ninguna sirve, se escala al OCR de página completa a 300 DPI.
+# 4. Todo dentro de SOAT_PLAZO_DOCUMENTO_S: vencido el plazo se responde sin lectura.
+# La cancelación es cooperativa (un threading.Event que se revisa entre páginas y
+# entre etapas): una inferencia de EasyOCR que ya empezó termina y se descarta.
+
+PLAZO_DOCUMENTO_S = 20.0
+HILOS_CARRERA = 4  # Cada documento usa hasta 2 hilos a la vez
+
+
+class LecturaCancelada(Exception):
+    """La otra rama ya ganó o se venció el plazo del documento."""
+
+
+def revisar_cancelacion(cancelado):
+    if cancelado is not None and cancelado.is_set():
+        raise LecturaCancelada()
+
+
+_pool_carrera = None
+_pid_pool_carrera = None
+_candado_carrera = threading.Lock()
+
+
+def obtener_pool_carrera():
+    """Hilos para las ramas, uno por proceso (si el proceso es un fork se crea otro: los hilos no se heredan)."""
+    global _pool_carrera, _pid_pool_carrera
+    pid = os.getpid()
+    if _pool_carrera is None or _pid_pool_carrera != pid:
+        with _candado_carrera:
+            if _pool_carrera is None or _pid_pool_carrera != pid:
+                _pool_carrera = futures.ThreadPoolExecutor(
+                    max_workers=leer_configuracion('SOAT_HILOS_CARRERA', HILOS_CARRERA),
+                    thread_name_prefix='carrera_soat',
+                )
+                _pid_pool_carrera = pid
+    return _pool_carrera
+
+
+def correr_rama(lecturas):
+    """
+    `armar_resultado` de una rama, en su hilo. Las mediciones son por hilo, así que se
+    retornan para sumarlas en el llamador. Retorna (resultado o None si se canceló, mediciones).
+    """
+    reiniciar_mediciones()
+    try:
+        resultado = armar_resultado(lecturas)
+    except LecturaCancelada:
+        resultado = None
     except Exception as e:
-        return {'exito': False, 'mensaje': f"Error técnico analizando el archivo: {str(e)}"}
\ No newline at end of file
+        resultado = {'exito': False, 'mensaje': f"Error técnico analizando el archivo: {str(e)}"}
+    finally:
+        lecturas.close()
+    return resultado, ultimas_mediciones()
+
+
+def _sirve(resultado, exigir_monto):
+    return bool(resultado and resultado['exito'] and (resultado['monto'] or not exigir_monto))
+
+
+def _preferir(actual, nuevo):
+    """Entre dos lecturas que no ganaron: la que tiene placa (aunque le falte el monto) o la última."""
+    if actual and actual['exito']:
+        return actual
+    return nuevo or actual
+
+
+def resultado_plazo_agotado(plazo):
+    return {
+        'exito': False,
+        'plazo_agotado': True,
+        'mensaje': f"La lectura tomó más de {plazo:g} s. Intente de nuevo o use un PDF digital.",
+    }
+
+
+def extraer_en_carrera(ruta_archivo, modo_pdf=True):
+    """
+    `extraer_datos_soat` con presupuesto de latencia (ver arriba). Mismo diccionario de
+    salida; si se vence el plazo sin ninguna placa trae además 'plazo_agotado'.
+    """
+    plazo = float(leer_configuracion('SOAT_PLAZO_DOCUMENTO_S', PLAZO_DOCUMENTO_S))
+    exigir_monto = leer_configuracion('SOAT_CARRERA_EXIGIR_MONTO', False)
+    limite = time.monotonic() + plazo
+    cancelado = threading.Event()
+    pool = obtener_pool_carrera()
+
+    rapido = functools.partial(
+        leer_con_ocr, alto_objetivo=leer_configuracion('SOAT_CARRERA_ALTO_PX', ALTO_OBJETIVO_PX), cancelado=cancelado,
+    )
+    ramas = [pool.submit(correr_rama, iterar_paginas_ocr(ruta_archivo, modo_pdf, rapido, cancelado))]
+    if modo_pdf:
+        ramas.append(pool.submit(correr_rama, iterar_paginas(ruta_archivo, leer_ocr=None, cancelado=cancelado)))
+
+    mejor = None  # Placa sin monto (con SOAT_CARRERA_EXIGIR_MONTO) o el fallo para reportar
+    try:
+        for rama in futures.as_completed(ramas, timeout=max(0.0, limite - time.monotonic())):
+            resultado, mediciones = rama.result()
+            agregar_mediciones(mediciones)
+            if _sirve(resultado, exigir_monto):
+                return resultado
+            mejor = _preferir(mejor, resultado)
+
+        logger.debug("Ninguna rama rápida sirvió. Escalando a OCR de página completa a 300 DPI...")
+        completo = functools.partial(leer_con_ocr, regiones=False, cancelado=cancelado)
+        escalamiento = pool.submit(
+            correr_rama, iterar_paginas(ruta_archivo, modo_pdf, leer_ocr=completo, cancelado=cancelado),
+        )
+        resultado, mediciones = escalamiento.result(timeout=max(0.0, limite - time.monotonic()))
+        agregar_mediciones(mediciones)
+        if _sirve(resultado, exigir_monto):
+            return resultado
+        return _preferir(mejor, resultado) or resultado_sin_placa()
+    except futures.TimeoutError:
+        logger.warning("Plazo de %.1fs agotado leyendo %s", plazo, ruta_archivo)
+        return mejor if mejor and mejor['exito'] else resultado_plazo_agotado(plazo)
+    finally:
+        cancelado.set()  # La rama que perdió (o la que se pasó del plazo) para en su próxima revisión
+
+
+def extraer_con_mediciones(ruta_archivo, multipoliza=False):
+    """
+    `extraer_datos_soat` y la lista de `medir_etapa` de esa lectura. Para correrla en
+    otro proceso (vistas ASGI): las mediciones se quedarían en el hijo.
+    """
+    reiniciar_mediciones()
+    resultado = extraer_datos_soat(ruta_archivo, multipoliza)
+    return resultado, ultimas_mediciones()
+
+
+# ---------------------------------------------------------
+# 5. EXTRACCIÓN POR LOTE (VARIOS DOCUMENTOS, OCR AGRUPADO)
+# ---------------------------------------------------------
+# Los PDF digitales se resuelven uno a uno (no usan OCR). Los escaneos y fotos se
+# juntan y se leen con `PoolLectoresOCR.leer_lote` (readtext_batched): primero las
+# regiones de todas las páginas y luego, solo para las que no dieron placa, la
+# página completa. El resultado por documento es el mismo que `extraer_datos_soat`.
+
+def _leer_lote_ocr(imagenes, detail=0):
+    return obtener_pool().leer_lote(
+        imagenes,
+        tamano_grupo=leer_configuracion('OCR_TAMANO_LOTE', 4),
+        batch_size=leer_configuracion('OCR_BATCH_SIZE', 16),
+        detail=detail,
+    )
+
+
+def leer_con_ocr_lote(documentos):
+    """
+    Versión por lote de `leer_con_ocr`. `documentos`: lista de (ruta, modo_pdf).
+    Retorna una lista de (texto, origen, plantilla_id, palabras), en el mismo orden.
+    """
+    origenes = ["OCR Scan" if modo_pdf else "OCR Imagen" for _, modo_pdf in documentos]
+    lecturas = [None] * len(documentos)
+    pendientes = list(range(len(documentos)))
+
+    if leer_configuracion('OCR_REGIONES', True):
+        logger.debug("Ejecutando EasyOCR por regiones (%d documentos)", len(documentos))
+        imagenes = [cargar_imagen(ruta, modo_pdf=modo_pdf, alto_objetivo=ALTO_OBJETIVO_PX, reutilizar=False)
+                    for ruta, modo_pdf in documentos]
+        with medir_etapa('ocr_regiones'):
+            regiones = leer_regiones_lote(imagenes, _leer_lote_ocr)
+        del imagenes
+        pendientes = []
+        for i, (plantilla, texto) in enumerate(regiones):
+            if texto and extraer_con_inteligencia_hibrida(texto)['placa']:
+                lecturas[i] = (texto, origenes[i] + " (regiones)", plantilla, None)
+            else:
+                pendientes.append(i)
+
+    if pendientes:
+        logger.debug("Ejecutando EasyOCR de página completa (%d documentos)", len(pendientes))
+        imagenes = [cargar_imagen(documentos[i][0], modo_pdf=documentos[i][1], dpi=300, reutilizar=False)
+                    for i in pendientes]
+        with medir_etapa('ocr'):
+            resultados = _leer_lote_ocr(imagenes, detail=1)
+        # El relleno del lote va abajo y a la derecha: las cajas siguen en píxeles de cada imagen
+        for i, imagen, res in zip(pendientes, imagenes, resultados):
+            palabras = PalabrasOCR.desde_readtext(res, imagen.shape)
+            lecturas[i] = (palabras.texto, origenes[i], None, palabras)
+
+    return lecturas
+
+
+def extraer_datos_soat_lote(rutas, multipoliza=False):
+    """
+    `extraer_datos_soat` para varios archivos, agrupando el OCR de los que lo necesitan.
+    Solo se agrupan fotos y escaneos de una página; los PDF de varias páginas siguen la
+    lectura perezosa de `extraer_datos_soat`.
+    Retorna una lista de resultados en el orden de `rutas`.
+    """
+    resultados = [None] * len(rutas)
+    lecturas = {}
+    para_ocr = []  # (índice, ruta, modo_pdf)
+
+    for i, ruta in enumerate(rutas):
+        ext = os.path.splitext(ruta)[1].lower()
+        if ext in EXTENSIONES_IMAGEN and os.path.exists(ruta):
+            para_ocr.append((i, ruta, False))
+            continue
+        if ext != '.pdf' or not os.path.exists(ruta):
+            # Archivo inexistente o formato no soportado: mismo mensaje que el caso individual
+            resultados[i] = extraer_datos_soat(ruta, multipoliza)
+            continue
+
+        try:
+            lectura, num_paginas = leer_texto_nativo(ruta)
+        except Exception as e:
+            resultados[i] = {'exito': False, 'mensaje': f"Error técnico analizando el archivo: {str(e)}"}
+            continue
+        if num_paginas > 1:
+            resultados[i] = extraer_datos_soat(ruta, multipoliza)
+        elif lectura is None or confirmar_con_ocr(lectura):
+            para_ocr.append((i, ruta, True))
+        else:
+            lecturas[i] = lectura
+
+    if para_ocr:
+        try:
+            leidas = leer_con_ocr_lote([(ruta, modo_pdf) for _, ruta, modo_pdf in para_ocr])
+            lecturas.update(zip((i for i, _, _ in para_ocr), leidas))
+        except Exception:
+            # Un archivo dañado no debe tumbar el lote: reintentamos uno a uno
+            for i, ruta, _ in para_ocr:
+                resultados[i] = extraer_datos_soat(ruta, multipoliza)
+
+    armar = armar_polizas if multipoliza else armar_resultado
+    for i, lectura in lecturas.items():
+        try:
+            resultados[i] = agregar_huella_imagen(armar([(1,) + lectura]), rutas[i])
+        except Exception as e:
+            resultados[i] = {'exito': False, 'mensaje': f"Error técnico analizando el archivo: {str(e)}"}
+    return resultados
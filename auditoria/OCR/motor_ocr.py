@@ -0,0 +1,197 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+# ---------------------------------------------------------
+# POOL DE LECTORES EASYOCR (UNO POR PROCESO)
+# ---------------------------------------------------------
+# Cargar un easyocr.Reader lee de disco los pesos de detección y reconocimiento,
+# y eso tarda varios segundos. Aquí lo cargamos UNA sola vez por proceso (worker
+# de gunicorn) y lo reutilizamos en todas las peticiones siguientes.
+
+IDIOMAS_OCR = ['es']
+
+logger = logging.getLogger(__name__)
+
+
+def rellenar(imagen, alto, ancho):
+    """Copia la imagen sobre un lienzo blanco de alto x ancho (esquina superior izquierda)."""
+    if imagen.shape[:2] == (alto, ancho):
+        return imagen
+    lienzo = np.full((alto, ancho) + imagen.shape[2:], 255, dtype=imagen.dtype)
+    lienzo[:imagen.shape[0], :imagen.shape[1]] = imagen
+    return lienzo
+
+
+def agrupar_por_tamano(imagenes, tamano_grupo):
+    """
+    Índices de las imágenes en grupos de `tamano_grupo`, ordenadas por tamaño para que
+    el relleno a un mismo tamaño dentro de cada grupo desperdicie poco.
+    """
+    orden = sorted(range(len(imagenes)), key=lambda i: imagenes[i].shape[:2])
+    return [orden[i:i + tamano_grupo] for i in range(0, len(orden), tamano_grupo)]
+
+
+class PoolLectoresOCR:
+    """
+    Mantiene un único easyocr.Reader por proceso y limita cuántas inferencias
+    corren al mismo tiempo (cada inferencia usa bastante CPU/RAM).
+    """
+
+    def __init__(self, max_concurrencia=1, usar_gpu=True, hilos=0):
+        self.max_concurrencia = max(1, int(max_concurrencia))
+        self.usar_gpu = usar_gpu
+        self.hilos = int(hilos or 0)  # Hilos de torch en CPU (0 = lo que decida torch)
+        self._lector = None
+        self._pid = None  # Proceso dueño del lector (por si gunicorn hace fork después de cargar)
+        self._candado_carga = threading.Lock()
+        self._cupos = threading.BoundedSemaphore(self.max_concurrencia)
+
+        # Métricas: cuánto cuesta cargar vs. cuánto cuesta leer
+        self._candado_metricas = threading.Lock()
+        self._metricas = {
+            'cargas': 0,
+            'segundos_carga': 0.0,
+            'inferencias': 0,
+            'lotes': 0,
+            'segundos_inferencia': 0.0,
+            'segundos_espera_cupo': 0.0,
+        }
+
+    # --- Carga ---
+
+    def _crear_lector(self):
+        import easyocr  # Import diferido: torch pesa cientos de MB
+
+        if self.hilos:
+            import torch
+            torch.set_num_threads(self.hilos)
+
+        if self.usar_gpu:
+            try:
+                return easyocr.Reader(IDIOMAS_OCR, gpu=True)
+            except Exception:
+                pass
+        return easyocr.Reader(IDIOMAS_OCR, gpu=False)
+
+    def obtener_lector(self):
+        """Devuelve el lector del proceso actual, cargándolo si hace falta."""
+        pid = os.getpid()
+        if self._lector is not None and self._pid == pid:
+            return self._lector
+
+        with self._candado_carga:
+            # Doble verificación: otro hilo pudo cargarlo mientras esperábamos
+            if self._lector is None or self._pid != pid:
+                inicio = time.perf_counter()
+                self._lector = self._crear_lector()
+                self._pid = pid
+                duracion = time.perf_counter() - inicio
+                with self._candado_metricas:
+                    self._metricas['cargas'] += 1
+                    self._metricas['segundos_carga'] += duracion
+                logger.info("EasyOCR cargado en %.2fs (pid %d)", duracion, pid)
+        return self._lector
+
+    def precalentar(self):
+        """Carga el modelo por adelantado (ej: al arrancar el worker)."""
+        self.obtener_lector()
+
+    @property
+    def cargado(self):
+        return self._lector is not None and self._pid == os.getpid()
+
+    # --- Inferencia ---
+
+    def _inferir(self, funcion, imagenes, lotes):
+        """Corre `funcion(lector)` dentro de un cupo, registrando tiempos y conteos."""
+        lector = self.obtener_lector()
+
+        inicio_espera = time.perf_counter()
+        with self._cupos:
+            inicio = time.perf_counter()
+            try:
+                return funcion(lector)
+            finally:
+                fin = time.perf_counter()
+                with self._candado_metricas:
+                    self._metricas['inferencias'] += imagenes
+                    self._metricas['lotes'] += lotes
+                    self._metricas['segundos_inferencia'] += fin - inicio
+                    self._metricas['segundos_espera_cupo'] += inicio - inicio_espera
+
+    def leer(self, imagen, **kwargs):
+        """
+        Ejecuta reader.readtext sobre una ruta o un arreglo NumPy.
+        Si todos los cupos están ocupados, espera su turno.
+        """
+        return self._inferir(lambda lector: lector.readtext(imagen, **kwargs), 1, 0)
+
+    def leer_lote(self, imagenes, tamano_grupo=4, batch_size=16, **kwargs):
+        """
+        OCR de varias imágenes (arreglos NumPy) con reader.readtext_batched.
+
+        La detección (CRAFT) recibe un tensor con `tamano_grupo` imágenes a la vez y el
+        reconocimiento procesa los recortes de texto de a `batch_size`: menos llamadas
+        al modelo y mejor uso de las unidades vectoriales de la CPU que una imagen por vez.
+        readtext_batched exige que todas tengan el mismo tamaño, así que cada grupo se
+        rellena de blanco hasta la imagen más grande (ordenando por tamaño antes).
+
+        Retorna una lista de resultados en el mismo orden que `imagenes`.
+        """
+        if not imagenes:
+            return []
+        grupos = agrupar_por_tamano(imagenes, max(1, int(tamano_grupo)))
+
+        def correr(lector):
+            resultados = [None] * len(imagenes)
+            for grupo in grupos:
+                alto = max(imagenes[i].shape[0] for i in grupo)
+                ancho = max(imagenes[i].shape[1] for i in grupo)
+                lote = [rellenar(imagenes[i], alto, ancho) for i in grupo]
+                for i, resultado in zip(grupo, lector.readtext_batched(lote, batch_size=batch_size, **kwargs)):
+                    resultados[i] = resultado
+            return resultados
+
+        return self._inferir(correr, len(imagenes), len(grupos))
+
+    # --- Métricas ---
+
+    def metricas(self):
+        with self._candado_metricas:
+            datos = dict(self._metricas)
+        n = datos['inferencias']
+        datos['promedio_inferencia'] = datos['segundos_inferencia'] / n if n else 0.0
+        datos['cargado'] = self.cargado
+        datos['max_concurrencia'] = self.max_concurrencia
+        return datos
+
+
+_pool = None
+_candado_pool = threading.Lock()
+
+
+def leer_configuracion(nombre, defecto):
+    """Valor de settings si Django está configurado; si no (ej: scripts sueltos), el defecto."""
+    try:
+        from django.conf import settings
+        return getattr(settings, nombre, defecto)
+    except Exception:
+        return defecto
+
+
+def obtener_pool():
+    """Pool compartido del proceso, configurado desde settings (si Django está disponible)."""
+    global _pool
+    if _pool is None:
+        with _candado_pool:
+            if _pool is None:
+                _pool = PoolLectoresOCR(
+                    max_concurrencia=leer_configuracion('OCR_MAX_CONCURRENCIA', 1),
+                    usar_gpu=leer_configuracion('OCR_USAR_GPU', True),
+                    hilos=leer_configuracion('OCR_HILOS', 0),
+                )
+    return _pool
@@ -0,0 +1,163 @@
+import re
+import struct
+import zlib
+
+import numpy as np
+
+from .candidatos import intentar_reparar_monto, validar_y_corregir_placa
+
+# ---------------------------------------------------------
+# PALABRAS DEL OCR CON CAJA Y CONFIANZA
+# ---------------------------------------------------------
+# Antes: readtext(detail=0) solo devolvía textos. Se perdían la caja y la confianza
+# de cada fragmento y todo se juntaba en un string que luego se volvía a partir.
+#
+# Ahora la página completa se lee con detail=1 y se guarda en arreglos NumPy, una
+# fila por fragmento (lo que EasyOCR reconoce de una vez: "PLACA No.", "ASA534"...):
+# - cajas: (N, 4) float32 con x0, y0, x1, y1 relativos a la página (0 a 1);
+# - confianzas: (N,) float32;
+# - textos: lista de strings (el texto de la página es " ".join(textos), como antes).
+# Con esto la placa y el monto se buscan por geometría (el valor a la derecha o debajo
+# del ancla "PLACA" / "TOTAL A PAGAR") y la página queda guardada como evidencia en la
+# auditoría: un blob binario comprimido (ver `a_bytes`) con el que se puede volver a
+# puntuar sin repetir el OCR.
+
+FIRMA = b'PAL1'
+_CABECERA = struct.Struct('<4sI')  # Firma y número de fragmentos
+_ESCALA_CAJA = 65535  # Coordenadas en uint16: resolución de 1/65535 de página
+_ESCALA_CONFIANZA = 255  # Confianza en uint8
+
+# Anclas por campo (sobre el texto de un fragmento, en mayúsculas)
+ANCLAS = {
+    'placa': re.compile(r"PLACA"),
+    'monto': re.compile(r"PAGAR|LEGALE[S5]"),
+}
+VALIDADORES = {
+    'placa': validar_y_corregir_placa,
+    'monto': intentar_reparar_monto,
+}
+MAX_DERECHA = 0.5  # Hasta media página a la derecha del ancla, en la misma línea
+MAX_DEBAJO = 0.1  # Hasta un 10% de la página por debajo, en la misma columna
+TOLERANCIA = 0.005  # Cajas que se tocan o se montan un poco siguen contando
+
+
+class PalabrasOCR:
+    """Fragmentos de texto de una página con su caja (relativa a la página) y su confianza."""
+
+    __slots__ = ('textos', 'cajas', 'confianzas')
+
+    def __init__(self, textos, cajas, confianzas):
+        self.textos = list(textos)
+        self.cajas = np.asarray(cajas, dtype=np.float32).reshape(-1, 4)
+        self.confianzas = np.asarray(confianzas, dtype=np.float32).reshape(-1)
+
+    @classmethod
+    def desde_readtext(cls, resultados, forma):
+        """Desde la salida de readtext(detail=1): [(4 puntos, texto, confianza), ...] sobre una imagen de `forma`."""
+        alto, ancho = forma[:2]
+        textos, cajas, confianzas = [], [], []
+        for puntos, texto, confianza in resultados:
+            puntos = np.asarray(puntos, dtype=np.float32)
+            x0, y0 = puntos.min(axis=0)
+            x1, y1 = puntos.max(axis=0)
+            textos.append(texto)
+            cajas.append((x0 / ancho, y0 / alto, x1 / ancho, y1 / alto))
+            confianzas.append(confianza)
+        return cls(textos, cajas, confianzas)
+
+    def __len__(self):
+        return len(self.textos)
+
+    @property
+    def texto(self):
+        return " ".join(self.textos)
+
+    # --- Evidencia compacta ---
+
+    def a_bytes(self):
+        """Blob comprimido: cabecera, cajas en uint16, confianzas en uint8 y los textos separados por '\\n'."""
+        cajas = np.round(np.clip(self.cajas, 0.0, 1.0) * _ESCALA_CAJA).astype('<u2')
+        confianzas = np.round(np.clip(self.confianzas, 0.0, 1.0) * _ESCALA_CONFIANZA).astype(np.uint8)
+        textos = "\n".join(texto.replace("\n", " ") for texto in self.textos).encode('utf-8')
+        return zlib.compress(_CABECERA.pack(FIRMA, len(self)) + cajas.tobytes() + confianzas.tobytes() + textos)
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        """Inverso de `a_bytes` (cajas y confianzas con la precisión con que se guardaron)."""
+        datos = zlib.decompress(datos)
+        firma, n = _CABECERA.unpack_from(datos)
+        if firma != FIRMA:
+            raise ValueError("El blob no es una evidencia de palabras del OCR")
+        inicio = _CABECERA.size
+        cajas = np.frombuffer(datos, dtype='<u2', count=n * 4, offset=inicio).astype(np.float32) / _ESCALA_CAJA
+        inicio += n * 8
+        confianzas = np.frombuffer(datos, dtype=np.uint8, count=n, offset=inicio).astype(np.float32) / _ESCALA_CONFIANZA
+        textos = datos[inicio + n:].decode('utf-8').split("\n") if n else []
+        return cls(textos, cajas, confianzas)
+
+    # --- Búsqueda ---
+
+    def confianza_de(self, campo, valor):
+        """Mayor confianza de los fragmentos donde aparece `valor` (ya corregido) del campo, o None."""
+        confianzas = [
+            float(self.confianzas[i]) for i, texto in enumerate(self.textos)
+            if valor in _valores(texto, VALIDADORES[campo])
+        ]
+        return max(confianzas) if confianzas else None
+
+
+def _valores(texto, validar):
+    """Valores válidos de un fragmento: cada palabra y el fragmento sin espacios (el OCR parte "ASA 534")."""
+    valores = []
+    for token in texto.split() + [texto.replace(" ", "")]:
+        valor = validar(token)
+        if valor is not None:
+            valores.append(valor)
+    return valores
+
+
+def _cercanos(cajas, ancla):
+    """
+    Distancia de cada caja al ancla si está a su derecha (misma línea) o debajo (misma
+    columna), o infinito si no. A la derecha se mide en ancho de página y debajo en alto.
+    """
+    x0, y0, x1, y1 = cajas[:, 0], cajas[:, 1], cajas[:, 2], cajas[:, 3]
+    ax0, ay0, ax1, ay1 = ancla
+    centro_y = (y0 + y1) / 2
+    derecha = (centro_y >= ay0) & (centro_y <= ay1) & (x0 >= ax1 - TOLERANCIA) & (x0 - ax1 <= MAX_DERECHA)
+    debajo = (x0 <= ax1) & (x1 >= ax0) & (y0 >= ay1 - TOLERANCIA) & (y0 - ay1 <= MAX_DEBAJO)
+
+    distancia = np.full(len(cajas), np.inf, dtype=np.float32)
+    distancia[debajo] = np.maximum(y0[debajo] - ay1, 0.0)
+    distancia[derecha] = np.minimum(distancia[derecha], np.maximum(x0[derecha] - ax1, 0.0))
+    return distancia
+
+
+def buscar_por_geometria(palabras, campo):
+    """
+    (valor, confianza) del valor válido de `campo` más cercano a alguna de sus anclas:
+    en el mismo fragmento después del ancla ("PLACA No. ASA534"), a la derecha o debajo.
+    A igual distancia gana el de mayor confianza. (None, None) si no hay.
+    """
+    patron, validar = ANCLAS[campo], VALIDADORES[campo]
+    candidatos = []  # (distancia, -confianza, valor)
+    for i, texto in enumerate(palabras.textos):
+        coincidencia = patron.search(texto.upper())
+        if coincidencia is None:
+            continue
+        # El valor puede venir en el mismo fragmento que el ancla
+        confianza = float(palabras.confianzas[i])
+        candidatos.extend((0.0, -confianza, valor) for valor in _valores(texto[coincidencia.end():], validar))
+
+        distancias = _cercanos(palabras.cajas, palabras.cajas[i])
+        distancias[i] = np.inf
+        for j in np.flatnonzero(np.isfinite(distancias)):
+            confianza = float(palabras.confianzas[j])
+            candidatos.extend(
+                (float(distancias[j]), -confianza, valor) for valor in _valores(palabras.textos[j], validar)
+            )
+
+    if not candidatos:
+        return None, None
+    _, confianza, valor = min(candidatos, key=lambda c: c[:2])
+    return valor, -confianza
@@ -0,0 +1,250 @@
+import math
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# ---------------------------------------------------------
+# PREPROCESAMIENTO DE IMÁGENES CON MEMORIA ACOTADA
+# ---------------------------------------------------------
+# Antes: el PDF se rasterizaba a 300 DPI en RGB, se copiaba a np.array y las fotos
+# se le pasaban a EasyOCR como ruta (decodificadas a resolución completa). Una foto
+# de celular o una página grande podía subir cientos de MB el worker.
+#
+# Ahora:
+# 1. Se decodifica directamente en gris y ya reducido (draft de JPEG / escala de pdfium).
+# 2. Nunca se superan MAX_PIXELES (el DPI o el tamaño se ajustan al presupuesto).
+# 3. La imagen se convierte a uint8 en gris UNA sola vez.
+# 4. Enderezado (deskew) y binarizado con OpenCV escriben en buffers reutilizados.
+
+MAX_PIXELES = 9_000_000  # ~ Carta a 300 DPI en gris = 8.4 MB
+DPI_POR_DEFECTO = 300
+UMBRAL_ANGULO = 0.5  # Grados: por debajo no vale la pena rotar
+
+
+# --- Mediciones de memoria por etapa ---
+
+_mediciones = threading.local()
+_candado_picos = threading.Lock()
+PICOS_POR_ETAPA = {}  # etapa -> mayor RSS pico (MB) observado en este proceso
+
+
+def rss_actual_mb():
+    """RSS actual del proceso (Linux: /proc/self/statm; en otros sistemas, el pico)."""
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return rss_pico_mb()
+
+
+def rss_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+@contextmanager
+def medir_etapa(nombre):
+    """Registra tiempo, RSS al salir y crecimiento del RSS pico de una etapa."""
+    inicio = time.perf_counter()
+    pico_antes = rss_pico_mb()
+    try:
+        yield
+    finally:
+        pico_despues = rss_pico_mb()
+        medicion = {
+            'etapa': nombre,
+            'segundos': time.perf_counter() - inicio,
+            'rss_mb': rss_actual_mb(),
+            'rss_pico_mb': pico_despues,
+            'crecimiento_pico_mb': pico_despues - pico_antes,
+        }
+        if not hasattr(_mediciones, 'lista'):
+            _mediciones.lista = []
+        _mediciones.lista.append(medicion)
+        with _candado_picos:
+            PICOS_POR_ETAPA[nombre] = max(PICOS_POR_ETAPA.get(nombre, 0.0), pico_despues)
+
+
+def reiniciar_mediciones():
+    _mediciones.lista = []
+
+
+def ultimas_mediciones():
+    """Mediciones de este hilo desde el último `reiniciar_mediciones()`."""
+    return list(getattr(_mediciones, 'lista', []))
+
+
+def agregar_mediciones(mediciones):
+    """Suma a este hilo mediciones tomadas en otro (ej: las ramas del modo carrera)."""
+    if not hasattr(_mediciones, 'lista'):
+        _mediciones.lista = []
+    _mediciones.lista.extend(mediciones)
+
+
+# --- Buffers reutilizables (uno por hilo) ---
+
+class BufferesImagen:
+    """
+    Memoria de trabajo reutilizada entre llamadas: las operaciones de OpenCV escriben
+    en estos arreglos (parámetro dst) en vez de reservar uno nuevo cada vez.
+    """
+
+    def __init__(self):
+        self._bloques = {}
+
+    def obtener(self, nombre, forma):
+        tamano = forma[0] * forma[1]
+        bloque = self._bloques.get(nombre)
+        if bloque is None or bloque.size < tamano:
+            bloque = self._bloques[nombre] = np.empty(tamano, dtype=np.uint8)
+        return bloque[:tamano].reshape(forma)
+
+
+_bufferes = threading.local()
+
+
+def bufferes():
+    if not hasattr(_bufferes, 'instancia'):
+        _bufferes.instancia = BufferesImagen()
+    return _bufferes.instancia
+
+
+# --- Decodificación acotada ---
+
+def escala_para_presupuesto(ancho, alto, max_pixeles=MAX_PIXELES):
+    """Factor (<= 1) para que ancho*alto no supere el presupuesto de píxeles."""
+    pixeles = ancho * alto
+    return 1.0 if pixeles <= max_pixeles else math.sqrt(max_pixeles / pixeles)
+
+
+def rasterizar_pdf(ruta, dpi=DPI_POR_DEFECTO, alto_objetivo=None, max_pixeles=MAX_PIXELES, pagina=0):
+    """Página del PDF en gris uint8, al DPI pedido pero sin pasar del presupuesto de píxeles."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(ruta)
+    try:
+        hoja = pdf[pagina]
+        ancho_pt, alto_pt = hoja.get_size()
+        if alto_objetivo:
+            dpi = alto_objetivo / (alto_pt / 72.0)
+        escala = dpi / 72.0
+        escala *= escala_para_presupuesto(ancho_pt * escala, alto_pt * escala, max_pixeles)
+        # pdfium dibuja directo en gris: sin la copia RGB intermedia
+        bitmap = hoja.render(scale=escala, grayscale=True)
+        return np.array(bitmap.to_numpy(), dtype=np.uint8, copy=True)
+    finally:
+        pdf.close()
+
+
+def contar_paginas_pdf(ruta):
+    """Páginas del PDF (pdfium lee la tabla de páginas, sin dibujar nada)."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(ruta)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def decodificar_imagen(ruta, alto_objetivo=None, max_pixeles=MAX_PIXELES):
+    """Foto en gris uint8, reducida durante la decodificación cuando el formato lo permite."""
+    from PIL import Image
+
+    with Image.open(ruta) as im:
+        ancho, alto = im.size
+        escala = escala_para_presupuesto(ancho, alto, max_pixeles)
+        if alto_objetivo and alto * escala > alto_objetivo:
+            escala = alto_objetivo / alto
+        destino = (max(1, int(ancho * escala)), max(1, int(alto * escala)))
+
+        # JPEG: el decodificador reduce 1/2, 1/4 o 1/8 sin armar la imagen completa
+        im.draft('L', destino)
+        im = im.convert('L')
+        if im.size != destino and escala < 1.0:
+            im = im.resize(destino, Image.BILINEAR)
+        return np.asarray(im, dtype=np.uint8)
+
+
+# --- Mejoras con OpenCV ---
+
+def estimar_inclinacion(gris):
+    """Ángulo (grados) del texto, con minAreaRect sobre los píxeles oscuros de una versión reducida."""
+    import cv2
+
+    paso = max(1, max(gris.shape) // 1000)  # Submuestreo: la inclinación no necesita resolución
+    muestra = gris[::paso, ::paso]
+    _, tinta = cv2.threshold(muestra, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    puntos = cv2.findNonZero(tinta)
+    if puntos is None or len(puntos) < 50:
+        return 0.0
+    angulo = cv2.minAreaRect(puntos)[-1]
+    # OpenCV >= 4.5 reporta [0, 90): lo llevamos a (-45, 45]
+    if angulo > 45:
+        angulo -= 90
+    return angulo
+
+
+def _salida(nombre, forma, reutilizar):
+    return bufferes().obtener(nombre, forma) if reutilizar else np.empty(forma, dtype=np.uint8)
+
+
+def enderezar(gris, reutilizar=True):
+    import cv2
+
+    angulo = estimar_inclinacion(gris)
+    if abs(angulo) < UMBRAL_ANGULO:
+        return gris
+    alto, ancho = gris.shape
+    matriz = cv2.getRotationMatrix2D((ancho / 2, alto / 2), angulo, 1.0)
+    salida = _salida('enderezada', (alto, ancho), reutilizar)
+    cv2.warpAffine(gris, matriz, (ancho, alto), dst=salida, flags=cv2.INTER_LINEAR,
+                   borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+    return salida
+
+
+def binarizar(gris, reutilizar=True):
+    import cv2
+
+    salida = _salida('binarizada', gris.shape, reutilizar)
+    cv2.adaptiveThreshold(gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15, dst=salida)
+    return salida
+
+
+def preparar_imagen(ruta, modo_pdf=False, dpi=DPI_POR_DEFECTO, alto_objetivo=None,
+                    deskew=True, binarizado=False, max_pixeles=MAX_PIXELES, reutilizar=True, pagina=0,
+                    al_dibujar=None):
+    """
+    Pipeline completo: decodificar acotado -> gris uint8 -> enderezar -> binarizar.
+    OJO: con `reutilizar=True` el resultado puede ser un buffer reutilizado; úselo antes
+    de la siguiente llamada en el mismo hilo. Para juntar varias páginas (OCR por lote)
+    use `reutilizar=False`.
+    `al_dibujar(gris)`, si se da, recibe la página recién dibujada, antes de enderezarla.
+    """
+    with medir_etapa('rasterizar' if modo_pdf else 'decodificar'):
+        if modo_pdf:
+            gris = rasterizar_pdf(ruta, dpi=dpi, alto_objetivo=alto_objetivo, max_pixeles=max_pixeles, pagina=pagina)
+        else:
+            gris = decodificar_imagen(ruta, alto_objetivo=alto_objetivo, max_pixeles=max_pixeles)
+    if al_dibujar is not None:
+        al_dibujar(gris)
+
+    try:
+        import cv2  # noqa: F401  (opencv-python-headless)
+    except ImportError:
+        return gris
+
+    if deskew:
+        with medir_etapa('enderezar'):
+            gris = enderezar(gris, reutilizar)
+    if binarizado:
+        with medir_etapa('binarizar'):
+            gris = binarizar(gris, reutilizar)
+    return gris
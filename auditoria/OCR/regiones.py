@@ -0,0 +1,121 @@
+# ---------------------------------------------------------
+# OCR POR REGIONES DE INTERÉS (ROI)
+# ---------------------------------------------------------
+# En un SOAT escaneado solo nos interesan dos datos: la placa y el total a pagar.
+# Para las plantillas conocidas definimos dónde suelen estar (cajas relativas a la
+# página: x0, y0, x1, y1 entre 0 y 1) y qué palabra ancla debe aparecer en cada caja.
+# Se reconoce solo el texto de esos recortes; si alguna ancla no aparece, la
+# plantilla no aplica y el llamador vuelve al OCR de página completa.
+#
+# La plantilla se elige ANTES de leer sus recortes, con una sola lectura del encabezado
+# (CAJA_ENCABEZADO): el de Seguros del Estado trae su nombre o su NIT, el de las demás
+# el título del SOAT. Si el encabezado no identifica ninguna, se va directo a la página
+# completa: probar las plantillas una tras otra leía ~1.2 páginas (0.38 + 0.85) antes
+# de rendirse en los formatos desconocidos.
+
+PLANTILLAS_REGIONES = {
+    'seguros_del_estado': {
+        # Encabezado "PLACA No." y la fila de valores justo debajo
+        'placa': {'caja': (0.00, 0.06, 0.80, 0.30), 'anclas': ('placa',)},
+        # Bloque de tarifa: "TOTAL A PAGAR" / "LEGALES" y el valor
+        'monto': {'caja': (0.00, 0.40, 0.60, 0.72), 'anclas': ('total', 'pagar', 'legales')},
+    },
+    'soat_generico': {
+        # Otras aseguradoras: franjas más amplias (más área, pero aún menos que la página completa)
+        'placa': {'caja': (0.00, 0.00, 1.00, 0.40), 'anclas': ('placa',)},
+        'monto': {'caja': (0.00, 0.35, 1.00, 0.80), 'anclas': ('total', 'pagar', 'legales')},
+    },
+}
+
+# Franja superior de la página y palabras que identifican cada plantilla (en orden: la
+# primera que aparezca gana; el título SOAT también está en el encabezado de Seguros del Estado)
+CAJA_ENCABEZADO = (0.00, 0.00, 1.00, 0.12)
+ANCLAS_ENCABEZADO = {
+    'seguros_del_estado': ('seguros del estado', '860.009.578'),
+    'soat_generico': ('seguro obligatorio', 'soat'),
+}
+
+# Resolución para el modo ROI: apuntamos a este alto en píxeles en vez de 300 DPI fijos
+ALTO_OBJETIVO_PX = 1600
+DPI_MINIMO = 110
+DPI_MAXIMO = 300
+
+
+def dpi_adaptativo(alto_puntos, alto_objetivo=ALTO_OBJETIVO_PX):
+    """DPI para que la página (alto en puntos PDF, 1/72 de pulgada) quede de ~alto_objetivo píxeles."""
+    if not alto_puntos:
+        return DPI_MAXIMO
+    dpi = alto_objetivo / (alto_puntos / 72.0)
+    return int(min(DPI_MAXIMO, max(DPI_MINIMO, dpi)))
+
+
+def recortar(imagen, caja):
+    """Recorte NumPy (vista, sin copiar) de una caja relativa de la imagen."""
+    alto, ancho = imagen.shape[:2]
+    x0, y0, x1, y1 = caja
+    return imagen[int(y0 * alto):int(y1 * alto), int(x0 * ancho):int(x1 * ancho)]
+
+
+def elegir_plantilla(encabezado, plantillas=PLANTILLAS_REGIONES):
+    """Plantilla que identifica el texto del encabezado, o None."""
+    encabezado = encabezado.lower()
+    for plantilla_id in plantillas:
+        if any(ancla in encabezado for ancla in ANCLAS_ENCABEZADO.get(plantilla_id, ())):
+            return plantilla_id
+    return None
+
+
+def tiene_ancla(texto, region):
+    texto = texto.lower()
+    return any(ancla in texto for ancla in region['anclas'])
+
+
+def leer_regiones(imagen, leer, plantillas=PLANTILLAS_REGIONES):
+    """
+    Lee el encabezado, elige con él una plantilla y reconoce solo sus recortes.
+    `leer(recorte)` debe retornar la lista de textos del OCR.
+    Retorna (plantilla_id, texto_de_las_regiones) o (None, None) si ninguna aplica.
+    """
+    plantilla_id = elegir_plantilla(" ".join(leer(recortar(imagen, CAJA_ENCABEZADO))), plantillas)
+    if plantilla_id is None:
+        return None, None
+
+    textos = []
+    for region in plantillas[plantilla_id].values():
+        texto = " ".join(leer(recortar(imagen, region['caja'])))
+        if not tiene_ancla(texto, region):
+            return None, None  # Ancla no encontrada: la plantilla no aplica
+        textos.append(texto)
+    return plantilla_id, " ".join(textos)
+
+
+def leer_regiones_lote(imagenes, leer_lote, plantillas=PLANTILLAS_REGIONES):
+    """
+    Como `leer_regiones`, pero para varias páginas a la vez: una llamada a `leer_lote`
+    con los encabezados de todas las páginas y otra con los recortes de las plantillas elegidas.
+    `leer_lote(recortes)` debe retornar una lista de textos del OCR por recorte.
+    Retorna una lista de (plantilla_id, texto) o (None, None), en el orden de `imagenes`.
+    """
+    resultados = [(None, None)] * len(imagenes)
+    if not imagenes:
+        return resultados
+    encabezados = leer_lote([recortar(imagen, CAJA_ENCABEZADO) for imagen in imagenes])
+    elegidas = [
+        (i, plantilla_id) for i, textos in enumerate(encabezados)
+        if (plantilla_id := elegir_plantilla(" ".join(textos), plantillas)) is not None
+    ]
+    if not elegidas:
+        return resultados
+
+    recortes, tramos = [], []
+    for i, plantilla_id in elegidas:
+        regiones = list(plantillas[plantilla_id].values())
+        tramos.append((i, plantilla_id, regiones, len(recortes)))
+        recortes.extend(recortar(imagenes[i], region['caja']) for region in regiones)
+    textos = [" ".join(t) for t in leer_lote(recortes)]
+
+    for i, plantilla_id, regiones, inicio in tramos:
+        propios = textos[inicio:inicio + len(regiones)]
+        if all(tiene_ancla(texto, region) for texto, region in zip(propios, regiones)):
+            resultados[i] = (plantilla_id, " ".join(propios))
+    return resultados
@@ -0,0 +1,324 @@
+import io
+import itertools
+import mimetypes
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+# ---------------------------------------------------------
+# ALMACENAMIENTO DE SOPORTES POR CONTENIDO
+# ---------------------------------------------------------
+# Antes: todos los soportes en una sola carpeta plana (soportes_soat/), con el nombre que
+# traía el usuario y un sufijo al azar si se repetía. Con decenas de miles de archivos,
+# listar la carpeta y sacar copias de seguridad se volvió lento, y las auditorías
+# fallidas o eliminadas borraban su archivo en la misma petición.
+#
+# Ahora:
+# 1. El nombre es el SHA-256 del archivo subido, repartido en dos niveles de carpetas:
+#    soportes_soat/ab/cd/abcd...ef.pdf (256 x 256 carpetas, pocas entradas en cada una).
+#    El mismo contenido siempre cae en el mismo nombre: guardarlo otra vez no escribe nada.
+# 2. Las fotos grandes se guardan reducidas al presupuesto de píxeles del OCR y
+#    recomprimidas (solo si el resultado pesa menos). El nombre sigue siendo el hash de
+#    lo que subió el usuario: es el que usan la cache y la deduplicación.
+# 3. `respuesta_soporte` entrega el archivo por bloques y atiende Range (206), así el visor
+#    de PDF del navegador pide solo las partes que muestra.
+# 4. Nadie borra archivos en la petición: `manage.py barrer_soportes` recorre el storage por
+#    lotes y borra los que ninguna auditoría usa (con un margen de gracia para no pisar una
+#    carga que guardó el archivo y todavía no insertó su fila).
+
+CARPETA_SOPORTES = 'soportes_soat/'
+TAMANO_BLOQUE = 64 * 1024
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png'}
+
+_RE_FRAGMENTADO = re.compile(r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[A-Za-z0-9]+$')
+# Lo mismo para la BD (lookup __regex): nombres que todavía están en la carpeta plana
+PATRON_FRAGMENTADO_SQL = r'/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.'
+
+
+def es_fragmentado(nombre):
+    return bool(_RE_FRAGMENTADO.search(nombre or ''))
+
+
+def ruta_por_hash(nombre, hash_archivo):
+    """'soportes_soat/soat.PDF' + hash -> 'soportes_soat/ab/cd/abcd...ef.pdf' (idempotente)."""
+    if es_fragmentado(nombre):
+        return nombre
+    carpeta = os.path.dirname(nombre) or CARPETA_SOPORTES.rstrip('/')
+    extension = os.path.splitext(nombre)[1].lower()
+    return f"{carpeta}/{hash_archivo[:2]}/{hash_archivo[2:4]}/{hash_archivo}{extension}"
+
+
+def comprimir_imagen(nombre, contenido):
+    """
+    ContentFile con la foto reducida a MAX_PIXELES y recomprimida, o None si no es una
+    foto, pesa menos de SOPORTES_COMPRIMIR_DESDE_MB o no queda más liviana.
+    """
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension not in EXTENSIONES_IMAGEN or contenido.size < settings.SOPORTES_COMPRIMIR_DESDE_MB * 1024 * 1024:
+        return None
+
+    from PIL import Image
+    from .OCR.preprocesamiento import escala_para_presupuesto
+
+    salida = io.BytesIO()
+    try:
+        contenido.seek(0)
+        with Image.open(contenido) as im:
+            exif = im.info.get('exif')  # La orientación de las fotos de celular está en el EXIF
+            escala = escala_para_presupuesto(*im.size)
+            if escala < 1.0:
+                destino = (max(1, int(im.width * escala)), max(1, int(im.height * escala)))
+                im.draft(im.mode, destino)
+                im = im.resize(destino, Image.LANCZOS)
+            if extension == '.png':
+                im.save(salida, 'PNG', optimize=True)
+            else:
+                if im.mode not in ('RGB', 'L', 'CMYK'):
+                    im = im.convert('RGB')
+                opciones = {'exif': exif} if exif else {}
+                im.save(salida, 'JPEG', quality=settings.SOPORTES_CALIDAD_JPEG, optimize=True, **opciones)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None  # Foto dañada o rara: se guarda tal cual llegó
+    finally:
+        contenido.seek(0)
+
+    if salida.tell() >= contenido.size:
+        return None
+    return ContentFile(salida.getvalue(), name=os.path.basename(nombre))
+
+
+def renovar_archivo(nombre, storage=None):
+    """
+    Marca un archivo ya guardado como recién escrito (mtime = ahora) al reutilizarlo: así
+    `barrer_huerfanos` le da el margen de gracia mientras se inserta la auditoría que lo
+    va a usar. False si el archivo no existe.
+    """
+    storage = storage or default_storage
+    try:
+        os.utime(storage.path(nombre))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class AlmacenamientoSoportes(FileSystemStorage):
+    """
+    FileSystemStorage que guarda lo de soportes_soat/ por contenido (ruta_por_hash) y
+    comprime las fotos grandes. Lo demás se guarda como en FileSystemStorage.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not name.startswith(CARPETA_SOPORTES):
+            return super().save(name, content, max_length)
+
+        if not es_fragmentado(name):
+            from .cache_contenido import calcular_hash  # cache_contenido usa este módulo
+
+            name = ruta_por_hash(name, getattr(content, 'hash_archivo', None) or calcular_hash(content))
+        if renovar_archivo(name, self):
+            return name  # Mismo contenido ya guardado (otra auditoría, u otra carga en paralelo)
+        return super().save(name, comprimir_imagen(name, content) or content, max_length)
+
+
+# ---------------------------------------------------------
+# ENTREGA DEL ARCHIVO CON RANGOS (HTTP 206)
+# ---------------------------------------------------------
+
+_RE_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def interpretar_rango(cabecera, tamano):
+    """
+    (inicio, fin) inclusivos de un Range de un solo tramo ('bytes=0-99', 'bytes=100-',
+    'bytes=-500'), o None para entregar el archivo completo (cabecera rara o varios tramos).
+    ValueError si el tramo queda fuera del archivo (416).
+    """
+    coincidencia = _RE_RANGO.match((cabecera or '').strip())
+    if not coincidencia or coincidencia.groups() == ('', ''):
+        return None
+    inicio, fin = coincidencia.groups()
+    if inicio == '':
+        # Sufijo: los últimos N bytes
+        inicio, fin = max(0, tamano - int(fin)), tamano - 1
+    else:
+        inicio, fin = int(inicio), min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        raise ValueError(cabecera)
+    return inicio, fin
+
+
+def _leer_tramo(archivo, inicio, largo):
+    try:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def respuesta_soporte(request, nombre, etag=None, storage=None):
+    """
+    Respuesta HTTP con el archivo `nombre` del storage: completo (FileResponse, que usa
+    sendfile si el servidor lo tiene) o el tramo pedido con Range (206). `etag` (el hash)
+    permite el 304 y que If-Range no mezcle tramos de dos versiones.
+    """
+    storage = storage or default_storage
+    tamano = storage.size(nombre)
+    etag_http = f'"{etag}"' if etag else None
+
+    if etag_http and etag_http in request.headers.get('If-None-Match', ''):
+        respuesta = HttpResponse(status=304)
+        respuesta['ETag'] = etag_http
+        return respuesta
+
+    rango = request.headers.get('Range')
+    if rango and request.headers.get('If-Range', etag_http) != etag_http:
+        rango = None  # El cliente tiene otra versión: va el archivo completo
+    try:
+        tramo = interpretar_rango(rango, tamano) if rango else None
+    except ValueError:
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f'bytes */{tamano}'
+        return respuesta
+
+    tipo = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+    archivo = storage.open(nombre, 'rb')
+    if tramo is None:
+        respuesta = FileResponse(archivo, content_type=tipo)
+    else:
+        inicio, fin = tramo
+        respuesta = StreamingHttpResponse(_leer_tramo(archivo, inicio, fin - inicio + 1), status=206, content_type=tipo)
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+        respuesta['Content-Length'] = str(fin - inicio + 1)
+        respuesta['Content-Disposition'] = f'inline; filename="{os.path.basename(nombre)}"'
+    respuesta['Accept-Ranges'] = 'bytes'
+    if etag_http:
+        respuesta['ETag'] = etag_http
+        # Por contenido: el mismo nombre nunca cambia de bytes
+        respuesta['Cache-Control'] = 'private, max-age=86400'
+    return respuesta
+
+
+# ---------------------------------------------------------
+# BARRIDO DE HUÉRFANOS Y REUBICACIÓN DE LA CARPETA PLANA
+# ---------------------------------------------------------
+
+def _por_lotes(iterable, tamano_lote):
+    iterador = iter(iterable)
+    while lote := list(itertools.islice(iterador, tamano_lote)):
+        yield lote
+
+
+def _nombres_en_storage(storage, carpeta=CARPETA_SOPORTES):
+    raiz = storage.path(carpeta)
+    for directorio, _, archivos in os.walk(raiz):
+        relativo = os.path.relpath(directorio, storage.path(''))
+        for archivo in archivos:
+            yield os.path.join(relativo, archivo).replace(os.sep, '/')
+
+
+def _borrar_carpetas_vacias(storage, nombre):
+    """Sube desde la carpeta del archivo borrando las que quedaron vacías (sin tocar soportes_soat/)."""
+    raiz = os.path.normpath(storage.path(CARPETA_SOPORTES))
+    carpeta = os.path.dirname(storage.path(nombre))
+    while os.path.normpath(carpeta) != raiz and carpeta.startswith(raiz):
+        try:
+            os.rmdir(carpeta)
+        except OSError:
+            return  # No está vacía (o ya no existe)
+        carpeta = os.path.dirname(carpeta)
+
+
+def barrer_huerfanos(tamano_lote=500, gracia_minutos=None, simular=False, storage=None):
+    """
+    Borra los archivos de soportes_soat/ que ninguna auditoría usa y las subidas temporales
+    abandonadas (FILE_UPLOAD_TEMP_DIR) con más de `gracia_minutos`. Una consulta por lote
+    de `tamano_lote` archivos. Con `simular=True` solo cuenta.
+    Retorna {'revisados', 'borrados', 'bytes', 'temporales'}.
+    """
+    from .models import Auditoria
+
+    storage = storage or default_storage
+    if gracia_minutos is None:
+        gracia_minutos = settings.SOPORTES_GRACIA_BARRIDO_MIN
+    limite = time.time() - gracia_minutos * 60
+    reporte = {'revisados': 0, 'borrados': 0, 'bytes': 0, 'temporales': 0}
+
+    for lote in _por_lotes(_nombres_en_storage(storage), tamano_lote):
+        reporte['revisados'] += len(lote)
+        usados = set(Auditoria.objects.filter(archivo_soat__in=lote).values_list('archivo_soat', flat=True))
+        for nombre in lote:
+            if nombre in usados:
+                continue
+            try:
+                estado = os.stat(storage.path(nombre))
+            except FileNotFoundError:
+                continue
+            if estado.st_mtime > limite:
+                continue  # Recién guardado: su auditoría puede estar por insertarse
+            reporte['borrados'] += 1
+            reporte['bytes'] += estado.st_size
+            if not simular:
+                storage.delete(nombre)
+                _borrar_carpetas_vacias(storage, nombre)
+
+    carpeta_temporal = settings.FILE_UPLOAD_TEMP_DIR
+    if carpeta_temporal and os.path.isdir(carpeta_temporal):
+        for entrada in os.scandir(carpeta_temporal):
+            if entrada.is_file() and entrada.stat().st_mtime <= limite:
+                reporte['temporales'] += 1
+                if not simular:
+                    os.remove(entrada.path)
+    return reporte
+
+
+def reubicar_soportes(tamano_lote=500, simular=False, storage=None):
+    """
+    Pasa los archivos de la carpeta plana (nombres de antes de este módulo) a su ruta por
+    contenido y actualiza las auditorías que los usan, por lotes. Las copias repetidas
+    quedan huérfanas y las recoge el barrido.
+    Retorna {'reubicados', 'faltantes'}.
+    """
+    from .cache_contenido import calcular_hash
+    from .models import Auditoria
+
+    storage = storage or default_storage
+    reporte = {'reubicados': 0, 'faltantes': 0}
+    # Se trae la lista completa antes de escribir: SQLite no aísla un cursor abierto de los UPDATE
+    planos = list(
+        Auditoria.objects.filter(archivo_soat__startswith=CARPETA_SOPORTES)
+        .exclude(archivo_soat__regex=PATRON_FRAGMENTADO_SQL)
+        .values_list('archivo_soat', flat=True).distinct().order_by('archivo_soat')
+    )
+    for lote in _por_lotes(planos, tamano_lote):
+        cambios = []
+        for viejo in lote:
+            if not storage.exists(viejo):
+                reporte['faltantes'] += 1
+                continue
+            hash_archivo = calcular_hash(storage.path(viejo))
+            nuevo = ruta_por_hash(viejo, hash_archivo)
+            cambios.append((viejo, nuevo, hash_archivo))
+            if simular or storage.exists(nuevo):
+                continue
+            os.makedirs(os.path.dirname(storage.path(nuevo)), exist_ok=True)
+            os.replace(storage.path(viejo), storage.path(nuevo))
+
+        reporte['reubicados'] += len(cambios)
+        if not simular:
+            with transaction.atomic():
+                for viejo, nuevo, hash_archivo in cambios:
+                    Auditoria.objects.filter(archivo_soat=viejo).update(archivo_soat=nuevo, hash_archivo=hash_archivo)
+    return reporte
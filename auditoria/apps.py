@@ -2,4 +2,26 @@ from django.apps import AppConfig
 
 
 class AuditoriaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
     name = 'auditoria'
+
+    def ready(self):
+        from django.conf import settings
+        from .resumen import conectar_senales
+
+        # Contadores diarios del dashboard (ver resumen.py)
+        conectar_senales()
+
+        # Carpeta donde se escriben las subidas mientras llegan (ver subidas.py)
+        if settings.FILE_UPLOAD_TEMP_DIR:
+            import os
+
+            os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+
+        # Precarga opcional de spaCy y EasyOCR al arrancar cada worker, para que la
+        # primera auditoría no pague los segundos de carga de los modelos.
+        if getattr(settings, 'OCR_PRECALENTAR', False):
+            import threading
+            from .OCR.lector_soat import precalentar
+
+            threading.Thread(target=precalentar, daemon=True).start()
@@ -0,0 +1,113 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache_contenido import buscar_en_cache, calcular_hash, guardar_en_cache
+from .metricas import picos_por_etapa, registrar_resultado, tiempos_por_etapa
+from .procesamiento import aplicar_veredictos, guardar_archivo_carga, guardar_resultado, marcar_versiones, polizas_de
+from .runt import aversion_registro, consultar_runt_async
+from .OCR.cliente_api import normalizar_placa
+from .OCR.lector_soat import extraer_con_mediciones
+
+# ---------------------------------------------------------
+# CAMINO ASÍNCRONO (VISTAS ASGI)
+# ---------------------------------------------------------
+# Con uvicorn un proceso atiende muchas peticiones en un solo event loop, así que
+# nada puede bloquearlo. Lo que en WSGI corre de corrido dentro de la petición aquí:
+# - el OCR / extracción (CPU) va a un pool de procesos (OCR_PROCESOS_ASGI) con run_in_executor.
+#   Los procesos se crean con 'spawn': un fork en medio de otras peticiones podía heredar
+#   un candado tomado por otro hilo y quedarse esperando para siempre. El hijo solo importa
+#   el paquete OCR (no usa la BD ni necesita django.setup());
+# - el RUNT va por httpx.AsyncClient con pool de conexiones, o por el ORM asíncrono
+#   si el backend es el espejo local (runt.consultar_runt_async);
+# - la BD: API asíncrona del ORM (aget, afirst...) donde la consulta es nueva y
+#   sync_to_async para las funciones que ya existían (transacciones incluidas).
+# Bajo WSGI las mismas vistas siguen funcionando: Django las corre en un event loop propio.
+
+_pool = None
+_candado_pool = threading.Lock()
+
+
+def obtener_pool_ocr():
+    """Pool de procesos del OCR de las vistas, o None (hilos del event loop) con OCR_PROCESOS_ASGI=0."""
+    global _pool
+    if settings.OCR_PROCESOS_ASGI <= 0:
+        return None
+    if _pool is None:
+        with _candado_pool:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.OCR_PROCESOS_ASGI, mp_context=multiprocessing.get_context('spawn'),
+                )
+    return _pool
+
+
+async def verificar_en_runt_async(resultado_ocr):
+    """Llena 'resultado' en cada póliza de un resultado exitoso; las placas se consultan a la vez."""
+    placas = sorted({normalizar_placa(poliza['placa']) for poliza in polizas_de(resultado_ocr)})
+    marcar_versiones([resultado_ocr], await aversion_registro())
+    verificaciones = await asyncio.gather(*(consultar_runt_async(placa) for placa in placas))
+    aplicar_veredictos([resultado_ocr], dict(zip(placas, verificaciones)))
+
+
+async def analizar_archivo_async(ruta_archivo, hash_archivo=None):
+    """
+    `analizar_archivo` para el event loop: mismo diccionario de salida (con 'resultado'
+    si hubo éxito y 'tiempos'), con cache por contenido, OCR en el pool y RUNT asíncrono.
+    """
+    multipoliza = settings.SOAT_MULTIPOLIZA
+    inicio = time.perf_counter()
+    if not hash_archivo:
+        hash_archivo = await sync_to_async(calcular_hash, thread_sensitive=False)(ruta_archivo)
+    resultado_ocr = None if multipoliza else await sync_to_async(buscar_en_cache)(hash_archivo)
+    tiempos = {'cache': time.perf_counter() - inicio}
+
+    if resultado_ocr is None:
+        loop = asyncio.get_running_loop()
+        resultado_ocr, mediciones = await loop.run_in_executor(
+            obtener_pool_ocr(), extraer_con_mediciones, ruta_archivo, multipoliza,
+        )
+        tiempos.update(tiempos_por_etapa(mediciones))
+        resultado_ocr['picos_rss'] = picos_por_etapa(mediciones)
+        inicio = time.perf_counter()
+        await sync_to_async(guardar_en_cache)(hash_archivo, resultado_ocr)
+        tiempos['cache'] += time.perf_counter() - inicio
+
+    if resultado_ocr['exito']:
+        inicio = time.perf_counter()
+        await verificar_en_runt_async(resultado_ocr)
+        tiempos['runt'] = time.perf_counter() - inicio
+
+    resultado_ocr['tiempos'] = {etapa: round(segundos, 4) for etapa, segundos in tiempos.items()}
+    registrar_resultado(resultado_ocr)
+    return resultado_ocr
+
+
+async def auditar_carga_async(auditoria, archivo):
+    """
+    Carga síncrona desde las vistas: `auditoria` todavía NO está en la BD ni tiene su archivo
+    en el storage. Se hace el OCR + RUNT primero y la fila se inserta una sola vez, ya con su
+    resultado. Si la subida ya está en disco (subidas.py) se lee donde quedó y solo pasa a
+    soportes_soat/ si la lectura tuvo éxito: una lectura fallida no escribe nada.
+    Retorna el diccionario de `extraer_datos_soat`.
+    """
+    en_disco = hasattr(archivo, 'temporary_file_path')
+    if en_disco:
+        resultado_ocr = await analizar_archivo_async(archivo.temporary_file_path(), getattr(archivo, 'hash_archivo', None))
+    else:
+        # Subida en memoria: hay que guardarla para poder leerla (si falla, la recoge `barrer_soportes`)
+        await sync_to_async(guardar_archivo_carga)(auditoria, archivo)
+        resultado_ocr = await analizar_archivo_async(auditoria.archivo_soat.path, auditoria.hash_archivo)
+
+    if not resultado_ocr['exito']:
+        return resultado_ocr
+
+    if en_disco:
+        await sync_to_async(guardar_archivo_carga)(auditoria, archivo)
+    await sync_to_async(guardar_resultado)(auditoria, resultado_ocr)
+    return resultado_ocr
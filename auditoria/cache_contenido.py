@@ -0,0 +1,167 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .almacenamiento import renovar_archivo, ruta_por_hash
+from .models import Auditoria, CacheExtraccion
+from .OCR.lector_soat import VERSION_PIPELINE
+
+# ---------------------------------------------------------
+# CACHE POR CONTENIDO (SHA-256 DEL ARCHIVO)
+# ---------------------------------------------------------
+# 1. Resultados: si el mismo archivo ya se leyó con esta versión del pipeline,
+#    devolvemos placa/monto/origen sin abrir pdfplumber ni EasyOCR.
+# 2. Archivos: si el mismo archivo ya está en soportes_soat/, no guardamos otra copia
+#    (el nombre sale del hash, ver almacenamiento.py).
+
+TAMANO_BLOQUE = 64 * 1024
+PURGAR_CADA = 100
+_guardados_sin_purgar = 0
+
+
+def calcular_hash(archivo):
+    """SHA-256 de una ruta o de un archivo abierto (leído por bloques, sin cargarlo entero)."""
+    sha = hashlib.sha256()
+    if isinstance(archivo, str):
+        with open(archivo, 'rb') as f:
+            for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b''):
+                sha.update(bloque)
+        return sha.hexdigest()
+
+    if hasattr(archivo, 'chunks'):
+        for bloque in archivo.chunks():
+            sha.update(bloque)
+    else:
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b''):
+            sha.update(bloque)
+    archivo.seek(0)  # Dejamos el archivo listo para guardarlo
+    return sha.hexdigest()
+
+
+# --- Resultados de extracción ---
+
+def buscar_en_cache(hash_archivo):
+    """Retorna el resultado guardado (como el de extraer_datos_soat) o None."""
+    if not hash_archivo:
+        return None
+
+    limite_ttl = timezone.now() - timedelta(days=settings.CACHE_EXTRACCION_TTL_DIAS)
+    entrada = CacheExtraccion.objects.filter(
+        hash_archivo=hash_archivo, version_pipeline=VERSION_PIPELINE, ultimo_acceso__gte=limite_ttl,
+    ).first()
+    if entrada is None:
+        return None
+
+    # LRU: marcamos el acceso para que no sea desalojada pronto
+    CacheExtraccion.objects.filter(pk=entrada.pk).update(ultimo_acceso=timezone.now(), aciertos=F('aciertos') + 1)
+
+    return {
+        'exito': True,
+        'placa': entrada.placa,
+        'monto': entrada.monto or 0,
+        'origen': entrada.origen,
+        'confianza': entrada.confianza,
+        'evidencia': bytes(entrada.evidencia) if entrada.evidencia is not None else None,
+        'huella_texto': bytes(entrada.huella_texto) if entrada.huella_texto is not None else None,
+        'huella_imagen': entrada.huella_imagen,
+        'mensaje': "Lectura exitosa (cache)",
+        'desde_cache': True,
+    }
+
+
+def guardar_en_cache(hash_archivo, resultado_ocr):
+    """Guarda un resultado exitoso. Los fallos no se guardan (pueden ser transitorios)."""
+    if not hash_archivo or not resultado_ocr.get('exito'):
+        return
+
+    try:
+        CacheExtraccion.objects.update_or_create(
+            hash_archivo=hash_archivo,
+            version_pipeline=VERSION_PIPELINE,
+            defaults={
+                'placa': resultado_ocr['placa'],
+                'monto': resultado_ocr.get('monto') or None,
+                'origen': resultado_ocr.get('origen', ''),
+                'confianza': resultado_ocr.get('confianza'),
+                'evidencia': resultado_ocr.get('evidencia'),
+                'huella_texto': resultado_ocr.get('huella_texto'),
+                'huella_imagen': resultado_ocr.get('huella_imagen'),
+                'ultimo_acceso': timezone.now(),
+            },
+        )
+    except IntegrityError:
+        # Otro worker guardó la misma entrada al mismo tiempo: nos sirve igual
+        pass
+
+    # El desalojo cuenta y borra filas: no lo hacemos en cada escritura (compite por el
+    # bloqueo de escritura con las cargas), sino una vez cada PURGAR_CADA guardados por proceso
+    global _guardados_sin_purgar
+    _guardados_sin_purgar += 1
+    if _guardados_sin_purgar >= PURGAR_CADA:
+        _guardados_sin_purgar = 0
+        purgar_cache()
+
+
+def purgar_cache():
+    """Desalojo por TTL, versiones viejas del pipeline y, si sobra, por LRU."""
+    limite_ttl = timezone.now() - timedelta(days=settings.CACHE_EXTRACCION_TTL_DIAS)
+    CacheExtraccion.objects.filter(ultimo_acceso__lt=limite_ttl).delete()
+    CacheExtraccion.objects.exclude(version_pipeline=VERSION_PIPELINE).delete()
+
+    sobrantes = CacheExtraccion.objects.count() - settings.CACHE_EXTRACCION_MAX_ENTRADAS
+    if sobrantes > 0:
+        viejas = CacheExtraccion.objects.order_by('ultimo_acceso').values_list('pk', flat=True)[:sobrantes]
+        CacheExtraccion.objects.filter(pk__in=list(viejas)).delete()
+
+
+# --- Archivos deduplicados ---
+
+def buscar_archivo_existente(hash_archivo, ruta_destino=None):
+    """
+    Nombre en el storage de un archivo idéntico ya guardado, o None. El que se encuentra
+    queda renovado (renovar_archivo): el barrido no lo borra antes de que se use.
+    """
+    if not hash_archivo:
+        return None
+    # Ruta por contenido: basta un stat, sin consultar la BD
+    if ruta_destino is not None:
+        nombre = ruta_por_hash(ruta_destino, hash_archivo)
+        if renovar_archivo(nombre):
+            return nombre
+    # Archivos de la carpeta plana que `barrer_soportes --reubicar` todavía no movió
+    nombres = (
+        Auditoria.objects.filter(hash_archivo=hash_archivo)
+        .exclude(archivo_soat='')
+        .values_list('archivo_soat', flat=True)
+    )
+    for nombre in nombres:
+        if renovar_archivo(nombre):
+            return nombre
+    return None
+
+
+def guardar_archivo_deduplicado(ruta_destino, archivo, hash_archivo=None):
+    """
+    Guarda el archivo en el storage solo si no existe ya una copia idéntica.
+    Retorna (nombre_guardado, hash_archivo).
+    """
+    # Las subidas de SOAT traen el hash calculado mientras se escribían (subidas.py)
+    hash_archivo = hash_archivo or getattr(archivo, 'hash_archivo', None) or calcular_hash(archivo)
+    existente = buscar_archivo_existente(hash_archivo, ruta_destino)
+    if existente:
+        return existente, hash_archivo
+    return default_storage.save(ruta_por_hash(ruta_destino, hash_archivo), archivo), hash_archivo
+
+
+def asignar_archivo_deduplicado(auditoria, archivo):
+    """Guarda el archivo (o reutiliza una copia idéntica) y lo asigna a la auditoría, SIN guardarla en la BD."""
+    ruta_destino = Auditoria._meta.get_field('archivo_soat').generate_filename(auditoria, archivo.name)
+    nombre, auditoria.hash_archivo = guardar_archivo_deduplicado(ruta_destino, archivo)
+    auditoria.archivo_soat = nombre
+    return auditoria
+
@@ -0,0 +1,169 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .metricas import observar
+from .models import TrabajoAuditoria
+from .procesamiento import (
+    procesar_auditoria, procesar_auditorias, descartar_auditoria, guardar_archivo_carga, mensaje_exito,
+)
+
+# ---------------------------------------------------------
+# COLA DE TRABAJOS RESPALDADA EN LA BASE DE DATOS
+# ---------------------------------------------------------
+# La vista solo guarda el archivo y crea un TrabajoAuditoria PENDIENTE.
+# Los workers (`python manage.py procesar_cola`) toman los trabajos pendientes de a
+# varios (hasta OCR_TAMANO_LOTE) para leer sus escaneos con un solo OCR agrupado.
+
+MAX_INTENTOS = 3
+# Si un worker muere a mitad de un trabajo, lo devolvemos a la cola pasado este tiempo
+TIEMPO_MAXIMO_PROCESANDO = timedelta(minutes=10)
+# Cada cuánto revisa un worker en marcha si hay trabajos colgados (no solo al arrancar)
+INTERVALO_RECUPERACION = timedelta(minutes=1)
+
+
+def encolar(auditoria):
+    """Crea el trabajo pendiente para una auditoría recién subida."""
+    return TrabajoAuditoria.objects.create(auditoria=auditoria)
+
+
+def encolar_carga(auditoria, archivo):
+    """
+    Carga en modo cola: pasa el archivo a soportes_soat/ (un rename, o reutiliza una copia
+    idéntica) y crea auditoría y trabajo en una sola transacción. Retorna el trabajo.
+    """
+    guardar_archivo_carga(auditoria, archivo)
+    with transaction.atomic():
+        auditoria.save()
+        return encolar(auditoria)
+
+
+def reclamar_siguiente():
+    """
+    Toma el trabajo PENDIENTE más antiguo y lo marca PROCESANDO.
+    El UPDATE condicionado al estado garantiza que dos workers no tomen el mismo
+    trabajo (funciona igual en SQLite y en PostgreSQL, sin SELECT FOR UPDATE).
+    """
+    while True:
+        trabajo = TrabajoAuditoria.objects.filter(estado='PENDIENTE').order_by('fecha_creacion', 'id').first()
+        if trabajo is None:
+            return None
+
+        tomados = TrabajoAuditoria.objects.filter(pk=trabajo.pk, estado='PENDIENTE').update(
+            estado='PROCESANDO',
+            fecha_inicio=timezone.now(),
+            intentos=trabajo.intentos + 1,
+        )
+        if tomados:
+            trabajo.refresh_from_db()
+            return trabajo
+        # Otro worker lo tomó primero: intentamos con el siguiente
+
+
+def recuperar_trabajos_colgados():
+    """Devuelve a la cola los trabajos que quedaron PROCESANDO por un worker caído."""
+    limite = timezone.now() - TIEMPO_MAXIMO_PROCESANDO
+    colgados = TrabajoAuditoria.objects.filter(estado='PROCESANDO', fecha_inicio__lt=limite)
+    reintentables = colgados.filter(intentos__lt=MAX_INTENTOS).update(estado='PENDIENTE')
+    colgados.update(estado='ERROR', mensaje="El procesamiento excedió el número de intentos.", fecha_fin=timezone.now())
+    return reintentables
+
+
+def _sin_auditoria(trabajo):
+    trabajo.estado = 'ERROR'
+    trabajo.mensaje = "La auditoría fue eliminada antes de procesarse."
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save()
+    return trabajo
+
+
+def _cerrar_trabajo(trabajo, resultado_ocr=None, error=None):
+    """Deja el estado final del trabajo según el resultado del OCR (o el error)."""
+    auditoria = trabajo.auditoria
+    if error is not None:
+        # Error catastrófico (ej: EasyOCR falló por memoria)
+        descartar_auditoria(auditoria)
+        trabajo.auditoria = None
+        trabajo.estado = 'ERROR'
+        trabajo.mensaje = f"Error interno del servidor: {error}"[:255]
+    elif resultado_ocr['exito']:
+        trabajo.estado = 'TERMINADO'
+        trabajo.mensaje = mensaje_exito(resultado_ocr)
+    else:
+        # El OCR no leyó nada: borramos el registro (el archivo lo recoge barrer_soportes)
+        descartar_auditoria(auditoria)
+        trabajo.auditoria = None
+        trabajo.estado = 'ERROR'
+        trabajo.mensaje = resultado_ocr['mensaje'][:255]
+
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save()
+    return trabajo
+
+
+def _medir_espera(trabajo):
+    """Etapa 'espera_cola': desde que se encoló hasta que un worker lo tomó."""
+    if trabajo.fecha_inicio is None:
+        return
+    espera = round((trabajo.fecha_inicio - trabajo.fecha_creacion).total_seconds(), 4)
+    trabajo.auditoria.tiempos = dict(trabajo.auditoria.tiempos, espera_cola=espera)
+    observar({'espera_cola': espera})
+
+
+def ejecutar_trabajo(trabajo, espera_medida=False):
+    """Corre OCR + RUNT para un trabajo ya reclamado y deja su estado final."""
+    if trabajo.auditoria is None:
+        return _sin_auditoria(trabajo)
+    if not espera_medida:
+        _medir_espera(trabajo)
+
+    try:
+        resultado_ocr = procesar_auditoria(trabajo.auditoria)
+    except Exception as e:
+        return _cerrar_trabajo(trabajo, error=e)
+    return _cerrar_trabajo(trabajo, resultado_ocr)
+
+
+def ejecutar_trabajos(trabajos):
+    """Como `ejecutar_trabajo`, pero con el OCR de todos los trabajos agrupado."""
+    validos = [t for t in trabajos if t.auditoria is not None]
+    for trabajo in trabajos:
+        if trabajo.auditoria is None:
+            _sin_auditoria(trabajo)
+    if len(validos) <= 1:
+        return [ejecutar_trabajo(t) for t in validos]
+
+    for trabajo in validos:
+        _medir_espera(trabajo)
+    try:
+        resultados = procesar_auditorias([t.auditoria for t in validos])
+    except Exception:
+        # Si el lote falla no sabemos qué documento fue: los procesamos uno a uno
+        return [ejecutar_trabajo(t, espera_medida=True) for t in validos]
+    return [_cerrar_trabajo(t, r) for t, r in zip(validos, resultados)]
+
+
+def procesar_pendientes(limite=None, tamano_lote=None):
+    """
+    Procesa trabajos hasta vaciar la cola (o hasta `limite`). Retorna cuántos procesó.
+    Reclama hasta `tamano_lote` trabajos a la vez (solo los que ya están pendientes:
+    no espera a que lleguen más).
+    """
+    tamano_lote = max(1, tamano_lote or settings.OCR_TAMANO_LOTE)
+    procesados = 0
+    while limite is None or procesados < limite:
+        close_old_connections()
+        cupo = tamano_lote if limite is None else min(tamano_lote, limite - procesados)
+        trabajos = []
+        while len(trabajos) < cupo:
+            trabajo = reclamar_siguiente()
+            if trabajo is None:
+                break
+            trabajos.append(trabajo)
+        if not trabajos:
+            break
+        ejecutar_trabajos(trabajos)
+        procesados += len(trabajos)
+    return procesados
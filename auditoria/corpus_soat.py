@@ -0,0 +1,349 @@
+import hashlib
+import json
+import os
+import random
+import unicodedata
+
+from .OCR.lector_soat import TEXTO_REF
+
+# ---------------------------------------------------------
+# CORPUS SINTÉTICO DE SOAT (GOLDEN) PARA BENCHMARKS Y PRECISIÓN
+# ---------------------------------------------------------
+# Los SOAT reales tienen datos personales: no se versionan. En su lugar generamos un
+# corpus determinista (misma semilla = mismos documentos) a partir de plantillas tipo
+# TEXTO_REF, con placa, monto, tomador, etc. al azar y ruido de OCR.
+#
+# Cada caso trae:
+# - 'texto': el texto limpio (lo que daría pdfplumber en un PDF digital)
+# - 'texto_ocr': una sola línea con errores típicos de OCR (O/0, I/1, S/5, B/8,
+#   tildes perdidas, palabras pegadas, placa con guion, monto con puntos)
+# - 'formato': cómo se materializa en archivo (digital, varias_paginas, escaneo, foto)
+# - 'placa' y 'monto' esperados
+#
+# El manifiesto versionado (datos_prueba/corpus_soat_v<N>.json) guarda las respuestas
+# esperadas y la huella de cada texto: si el generador cambia, la verificación falla y
+# hay que subir VERSION_CORPUS (y regenerar el manifiesto y la línea base).
+
+VERSION_CORPUS = "1"
+SEMILLA = 20240314
+CASOS_POR_DEFECTO = 60
+
+CARPETA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos_prueba')
+RUTA_MANIFIESTO = os.path.join(CARPETA_DATOS, f'corpus_soat_v{VERSION_CORPUS}.json')
+
+FORMATOS = (
+    ('digital', 0.5),
+    ('varias_paginas', 0.15),
+    ('escaneo', 0.2),
+    ('foto', 0.15),
+)
+
+NOMBRES = ("JUAN", "MARIA", "CARLOS", "ANDREA", "LUIS", "PAOLA", "JORGE", "DIANA", "FELIPE", "LAURA")
+APELLIDOS = ("PEREZ", "GOMEZ", "RODRIGUEZ", "MARTINEZ", "LOPEZ", "CASTRO", "ROJAS", "VARGAS", "MORENO", "SUAREZ")
+MARCAS = ("CHEVROLET", "RENAULT", "MAZDA", "KIA", "TOYOTA", "NISSAN", "HYUNDAI", "YAMAHA", "KENWORTH")
+CLASES = ("AUTOMOVIL", "CAMIONETA", "MOTOCICLETA", "CAMPERO", "CARGA O MIXTO")
+ASEGURADORAS = ("SURAMERICANA", "AXA COLPATRIA", "PREVISORA", "MUNDIAL", "BOLIVAR")
+CIUDADES = ("BOGOTA D.C", "MEDELLIN", "CALI", "BARRANQUILLA", "BUCARAMANGA")
+
+# Plantilla de otra aseguradora (mismo formato regulado, otro orden y otras etiquetas)
+PLANTILLA_GENERICA = """
+{aseguradora} S.A. NIT. {nit}
+SEGURO OBLIGATORIO DE DAÑOS CORPORALES CAUSADOS A LAS PERSONAS EN ACCIDENTES DE TRÁNSITO SOAT
+No. DE PÓLIZA {poliza} FECHA DE EXPEDICIÓN {fecha} VIGENCIA DESDE {fecha} HASTA {fecha_fin}
+PLACA No. {placa} CLASE VEHÍCULO {clase} SERVICIO PARTICULAR CILINDRAJE {cilindraje} MODELO {modelo}
+MARCA {marca} LÍNEA {linea} CARROCERÍA SEDAN PASAJEROS {pasajeros}
+No. MOTOR {motor} No. CHASIS {chasis} CAPACIDAD TON. 0.00
+APELLIDOS Y NOMBRES DEL TOMADOR {tomador} TELÉFONO DEL TOMADOR {telefono}
+TIPO DE DOCUMENTO CC No. DE DOCUMENTO {documento} CIUDAD RESIDENCIA TOMADOR {ciudad}
+CÓDIGO DE ASEGURADORA AT{codigo} SUCURSAL EXPEDIDORA {sucursal} CIUDAD EXPEDICIÓN {ciudad}
+TARIFA {tarifa} PRIMA SOAT $ {prima} CONTRIBUCIÓN $ {contribucion} TASA RUNT $ 1800
+TOTAL A PAGAR LEGALES {monto}
+AMPAROS POR VICTIMA HASTA: GASTOS MÉDICOS QUIRÚRGICOS FARMACÉUTICOS Y HOSPITALARIOS 800 SALARIOS
+INCAPACIDAD PERMANENTE 180 MUERTE Y GASTOS FUNERARIOS 750 GASTOS DE TRANSPORTE 10
+MÍNIMOS LEGALES DIARIOS VIGENTES
+FIRMA AUTORIZADA
+"""
+
+PORTADA = """
+Señores ADRES
+Asunto: Radicación de soportes del vehículo
+Adjuntamos la póliza vigente del vehículo para su revisión dentro del proceso de reclamación.
+Quedamos atentos a cualquier requerimiento adicional por parte de la entidad.
+Cordialmente, el área de reclamaciones de la institución prestadora de servicios de salud.
+"""
+
+# Confusiones visuales típicas de EasyOCR (en los dos sentidos)
+CONFUSIONES = {'O': '0', '0': 'O', 'I': '1', '1': 'I', 'S': '5', '5': 'S', 'B': '8', '8': 'B', 'Z': '2'}
+
+
+# --- Generación de casos ---
+
+def placa_al_azar(rng):
+    letras = "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ") for _ in range(3))
+    return f"{letras}{rng.randint(0, 999):03d}"
+
+
+def formato_monto(rng, monto):
+    """Cómo aparece el total en el documento: '$ 1191000', '$1.191.000', '1,191,000'..."""
+    opcion = rng.randrange(4)
+    if opcion == 0:
+        return f"$ {monto}"
+    if opcion == 1:
+        return "$" + f"{monto:,}".replace(",", ".")
+    if opcion == 2:
+        return f"$ {monto:,}"
+    return str(monto)
+
+
+def elegir_formato(rng):
+    valor = rng.random()
+    for formato, peso in FORMATOS:
+        valor -= peso
+        if valor < 0:
+            return formato
+    return FORMATOS[-1][0]
+
+
+def texto_seguros_del_estado(rng, placa, monto):
+    """TEXTO_REF con otros datos del vehículo, del tomador y de la póliza."""
+    reemplazos = {
+        "ASA534": placa,
+        "$ 1191000": formato_monto(rng, monto),
+        "13706700001810": str(rng.randint(10 ** 13, 10 ** 14 - 1)),
+        "GUEVARA TELLEZ, JENNY MARCELA": f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}, {rng.choice(NOMBRES)}",
+        "1026261589": str(rng.randint(10 ** 7, 10 ** 10)),
+        "8053739": str(rng.randint(10 ** 6, 10 ** 7 - 1)),
+        "KENWORTH": rng.choice(MARCAS),
+        "1998": str(rng.randint(1990, 2024)),
+        "11866782": str(rng.randint(10 ** 7, 10 ** 8 - 1)),
+    }
+    texto = TEXTO_REF
+    for original, nuevo in reemplazos.items():
+        texto = texto.replace(original, nuevo)
+    return texto
+
+
+def texto_generico(rng, placa, monto):
+    prima = monto * 2 // 3
+    return PLANTILLA_GENERICA.format(
+        aseguradora=rng.choice(ASEGURADORAS),
+        nit=f"{rng.randint(800, 899)}.{rng.randint(100, 999)}.{rng.randint(100, 999)}-{rng.randint(0, 9)}",
+        poliza=rng.randint(10 ** 11, 10 ** 12 - 1),
+        fecha=f"{rng.randint(2021, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        fecha_fin=f"{rng.randint(2025, 2026)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        placa=placa,
+        clase=rng.choice(CLASES),
+        cilindraje=rng.choice((125, 1300, 1600, 2000, 2400)),
+        modelo=rng.randint(1995, 2024),
+        marca=rng.choice(MARCAS),
+        linea=rng.choice(("SPARK", "LOGAN", "CX-5", "PICANTO", "HILUX", "NMAX")),
+        pasajeros=rng.randint(2, 7),
+        motor=rng.randint(10 ** 7, 10 ** 9),
+        chasis=f"9{rng.randint(10 ** 9, 10 ** 10)}",
+        tomador=f"{rng.choice(APELLIDOS)} {rng.choice(NOMBRES)}",
+        telefono=rng.randint(3000000000, 3209999999),
+        documento=rng.randint(10 ** 7, 10 ** 10),
+        ciudad=rng.choice(CIUDADES),
+        codigo=rng.randint(1000, 9999),
+        sucursal=rng.randint(1, 99),
+        tarifa=rng.choice((110, 120, 330, 510, 610)),
+        prima=prima,
+        contribucion=monto - prima - 1800,
+        monto=formato_monto(rng, monto),
+    )
+
+
+def ruido_ocr(rng, texto, placa, prob_caracter=0.03, prob_pegar=0.01):
+    """
+    Texto como lo devolvería el OCR de página completa: una sola línea, tildes perdidas
+    a veces, confusiones O/0, I/1, S/5, B/8 y palabras pegadas. La placa se altera con
+    las mismas confusiones (es el caso que `validar_y_corregir_placa` debe recuperar).
+    """
+    palabras = []
+    for palabra in texto.split():
+        if palabra == placa:
+            if rng.random() < 0.15:
+                palabra = f"{palabra[:3]}-{palabra[3:]}"
+            palabra = "".join(CONFUSIONES.get(c, c) if rng.random() < 0.1 else c for c in palabra)
+        else:
+            if rng.random() < 0.3:
+                palabra = "".join(c for c in unicodedata.normalize('NFD', palabra) if not unicodedata.combining(c))
+            palabra = "".join(CONFUSIONES.get(c, c) if rng.random() < prob_caracter else c for c in palabra)
+        if palabras and rng.random() < prob_pegar:
+            palabras[-1] += palabra
+        else:
+            palabras.append(palabra)
+    return " ".join(palabras)
+
+
+def generar_corpus(casos=CASOS_POR_DEFECTO, semilla=SEMILLA):
+    """Lista determinista de casos (ver el encabezado del módulo)."""
+    rng = random.Random(f"{VERSION_CORPUS}:{semilla}")
+    corpus = []
+    for n in range(casos):
+        placa = placa_al_azar(rng)
+        monto = rng.randrange(200_000, 2_500_000, 100)
+        plantilla = 'seguros_del_estado' if rng.random() < 0.6 else 'soat_generico'
+        generar = texto_seguros_del_estado if plantilla == 'seguros_del_estado' else texto_generico
+        texto = generar(rng, placa, monto)
+        corpus.append({
+            'id': f"soat_{n:03d}",
+            'formato': elegir_formato(rng),
+            'plantilla': plantilla,
+            'placa': placa,
+            'monto': monto,
+            'texto': texto,
+            'texto_ocr': ruido_ocr(rng, texto, placa),
+        })
+    return corpus
+
+
+# --- Manifiesto versionado ---
+
+def huella(caso):
+    return hashlib.sha1((caso['texto'] + "\x00" + caso['texto_ocr']).encode('utf-8')).hexdigest()[:16]
+
+
+def manifiesto(corpus):
+    return {
+        'version': VERSION_CORPUS,
+        'semilla': SEMILLA,
+        'casos': [
+            {k: caso[k] for k in ('id', 'formato', 'plantilla', 'placa', 'monto')} | {'huella': huella(caso)}
+            for caso in corpus
+        ],
+    }
+
+
+def verificar_manifiesto(corpus, ruta=RUTA_MANIFIESTO):
+    """Lista de diferencias entre el corpus generado y el manifiesto versionado (vacía si coinciden)."""
+    with open(ruta, encoding='utf-8') as f:
+        guardado = json.load(f)
+    actual = manifiesto(corpus)
+    if guardado.get('version') != actual['version']:
+        return [f"versión del manifiesto {guardado.get('version')} != {actual['version']}"]
+    diferencias = [
+        f"{nuevo['id']}: {viejo} != {nuevo}"
+        for viejo, nuevo in zip(guardado['casos'], actual['casos']) if viejo != nuevo
+    ]
+    if len(guardado['casos']) != len(actual['casos']):
+        diferencias.append(f"{len(guardado['casos'])} casos en el manifiesto, {len(actual['casos'])} generados")
+    return diferencias
+
+
+def guardar_manifiesto(corpus, ruta=RUTA_MANIFIESTO):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto(corpus), f, ensure_ascii=False, indent=1)
+        f.write("\n")
+
+
+# --- Materialización en archivos ---
+
+def pdf_con_texto(paginas):
+    """PDF digital mínimo (Helvetica, un renglón por línea), una página por texto. Retorna los bytes."""
+    objetos = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    hojas = []
+    for texto in paginas:
+        lineas = []
+        for n, linea in enumerate(texto.strip().splitlines()[:60]):
+            linea = linea.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            lineas.append(f"BT /F1 9 Tf 30 {770 - n * 12} Td ({linea}) Tj ET")
+        contenido = "\n".join(lineas).encode('latin-1', 'replace')
+        objetos.append(f"<< /Length {len(contenido)} >>\nstream\n".encode('latin-1') + contenido + b"\nendstream")
+        objetos.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objetos)} 0 R >>")
+        hojas.append(f"{len(objetos)} 0 R")
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(hojas)}] /Count {len(hojas)} >>"
+
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for n, objeto in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        cuerpo = objeto if isinstance(objeto, bytes) else objeto.encode('latin-1')
+        salida += f"{n} 0 obj\n".encode() + cuerpo + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    salida += "".join(f"{p:010d} 00000 n \n" for p in posiciones).encode()
+    salida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+    return bytes(salida)
+
+
+def pagina_escaneada(texto, ruta_pdf, dpi=300):
+    """Dibuja el texto en una página carta y la guarda como PDF solo-imagen (como un escaneo)."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    ancho, alto = int(8.5 * dpi), int(11 * dpi)
+    imagen = Image.new('L', (ancho, alto), 255)
+    dibujo = ImageDraw.Draw(imagen)
+    try:
+        fuente = ImageFont.load_default(size=dpi // 8)
+    except TypeError:  # Pillow < 10.1
+        fuente = ImageFont.load_default()
+    margen = dpi // 3
+    y = margen
+    for linea in texto.strip().splitlines():
+        dibujo.text((margen, y), linea[:95], fill=0, font=fuente)
+        y += dpi // 6
+        if y > alto - margen:
+            break
+    imagen.save(ruta_pdf, resolution=dpi)
+    return ruta_pdf
+
+
+def foto_celular(texto, ruta_jpg, ancho=4000, alto=3000, angulo=0.0, semilla=0):
+    """Foto grande (12 MP) con el texto, como las que suben desde el celular (inclinada y con grano)."""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    imagen = Image.new('RGB', (ancho, alto), (235, 235, 228))
+    dibujo = ImageDraw.Draw(imagen)
+    for i, linea in enumerate(texto.strip().splitlines()[:60]):
+        dibujo.text((200, 150 + i * 45), linea[:95], fill=(20, 20, 20))
+    if angulo:
+        imagen = imagen.rotate(angulo, resample=Image.BILINEAR, fillcolor=(235, 235, 228))
+    if semilla:
+        grano = np.random.default_rng(semilla).normal(0, 8, (alto, ancho, 1))
+        imagen = Image.fromarray(np.clip(np.asarray(imagen, dtype=np.int16) + grano, 0, 255).astype(np.uint8))
+    imagen.save(ruta_jpg, quality=90)
+    return ruta_jpg
+
+
+def escribir_archivo(caso, carpeta):
+    """Escribe el documento del caso según su formato. Retorna la ruta."""
+    base = os.path.join(carpeta, caso['id'])
+    formato = caso['formato']
+    if formato == 'digital':
+        ruta = base + '.pdf'
+        with open(ruta, 'wb') as f:
+            f.write(pdf_con_texto([caso['texto']]))
+    elif formato == 'varias_paginas':
+        # Portada sin datos del vehículo y la póliza en la página 2
+        ruta = base + '.pdf'
+        with open(ruta, 'wb') as f:
+            f.write(pdf_con_texto([PORTADA, caso['texto']]))
+    elif formato == 'escaneo':
+        ruta = pagina_escaneada(caso['texto'], base + '.pdf', dpi=150)
+    else:
+        semilla = int(caso['id'].split('_')[1]) + 1
+        ruta = foto_celular(caso['texto'], base + '.jpg', ancho=2400, alto=1800,
+                            angulo=(semilla % 5 - 2) * 0.8, semilla=semilla)
+    return ruta
+
+
+def escribir_corpus(corpus, carpeta, formatos=None):
+    """Materializa los casos (opcionalmente solo algunos formatos). Retorna [(caso, ruta)]."""
+    os.makedirs(carpeta, exist_ok=True)
+    return [(caso, escribir_archivo(caso, carpeta)) for caso in corpus if formatos is None or caso['formato'] in formatos]
+
+
+def acierta(caso, resultado):
+    """(placa correcta, monto correcto) de un resultado de extracción contra el caso."""
+    if not resultado:
+        return False, False
+    monto = resultado.get('monto')
+    try:
+        monto = int(monto) if monto is not None else None
+    except (TypeError, ValueError):
+        monto = None
+    return resultado.get('placa') == caso['placa'], monto == caso['monto']
@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.db.models import Count
+
+from .models import Auditoria, BandaTexto, HuellaAuditoria
+from .OCR.huellas import bandas_lsh, distancia_hamming, similitud_firmas
+
+# ---------------------------------------------------------
+# DUPLICADOS Y CASI-DUPLICADOS ENTRE AUDITORÍAS
+# ---------------------------------------------------------
+# Al guardar una auditoría se indexan sus huellas (OCR/huellas.py, calculadas al leer el
+# documento) y se busca si ya había otra igual o casi igual. Cada búsqueda va por un
+# índice, nunca recorre la tabla:
+# 1. ARCHIVO: mismo SHA-256 y misma página (índice de hash_archivo).
+# 2. TEXTO: la misma póliza aunque sea otro archivo (re-escaneo, otra foto, o con la placa
+#    cambiada). Candidatas: las que comparten alguna banda LSH (BandaTexto.clave);
+#    se confirma con el Jaccard estimado de las firmas >= DUPLICADOS_UMBRAL_TEXTO.
+# 3. IMAGEN: misma placa y la página a <= DUPLICADOS_DISTANCIA_IMAGEN bits de pHash.
+#    El pHash solo no alcanza (todas las pólizas de una plantilla se ven iguales a
+#    32x32), así que solo se compara contra las de la misma placa (índice de placa).
+# 4. PLACA: la placa ya apareció en otra auditoría.
+# Solo se miran auditorías anteriores (id menor): en un lote, la segunda copia apunta a
+# la primera y no al revés.
+
+
+def indexar(pares):
+    """Guarda las huellas de `pares` [(auditoria ya guardada, póliza de extraer_datos_soat)] en bloque."""
+    huellas, bandas = [], []
+    for auditoria, poliza in pares:
+        texto, imagen = poliza.get('huella_texto'), poliza.get('huella_imagen')
+        if texto is None and imagen is None:
+            continue
+        huellas.append(HuellaAuditoria(auditoria=auditoria, texto=texto, imagen=imagen))
+        if texto is not None:
+            bandas.extend(BandaTexto(auditoria=auditoria, clave=clave) for clave in bandas_lsh(texto))
+    HuellaAuditoria.objects.bulk_create(huellas, batch_size=500)
+    BandaTexto.objects.bulk_create(bandas, batch_size=2000)
+
+
+def parecidas_por_texto(huella_texto, antes_de):
+    """(id, similitud) de la auditoría anterior a `antes_de` con el texto más parecido, o None."""
+    candidatas = list(
+        BandaTexto.objects.filter(clave__in=bandas_lsh(huella_texto), auditoria_id__lt=antes_de)
+        .values('auditoria_id').annotate(bandas=Count('id')).order_by('-bandas', '-auditoria_id')
+        .values_list('auditoria_id', flat=True)[:settings.DUPLICADOS_MAX_CANDIDATAS]
+    )
+    if not candidatas:
+        return None
+    firmas = HuellaAuditoria.objects.filter(auditoria_id__in=candidatas).values_list('auditoria_id', 'texto')
+    return max(((auditoria_id, similitud_firmas(huella_texto, firma)) for auditoria_id, firma in firmas),
+               key=lambda par: (par[1], par[0]), default=None)
+
+
+def buscar_duplicado(auditoria, huella_texto=None, huella_imagen=None):
+    """(tipo_duplicado, id de la auditoría original) de la coincidencia más fuerte, o ('', None)."""
+    anteriores = Auditoria.objects.filter(id__lt=auditoria.id)
+
+    if auditoria.hash_archivo:
+        original = (
+            anteriores.filter(hash_archivo=auditoria.hash_archivo, pagina_soat=auditoria.pagina_soat)
+            .order_by('-id').values_list('id', flat=True).first()
+        )
+        if original:
+            return 'ARCHIVO', original
+
+    if huella_texto is not None:
+        parecida = parecidas_por_texto(huella_texto, auditoria.id)
+        if parecida and parecida[1] >= settings.DUPLICADOS_UMBRAL_TEXTO:
+            return 'TEXTO', parecida[0]
+
+    if not auditoria.placa_detectada:
+        return '', None
+    misma_placa = list(
+        anteriores.filter(placa_detectada=auditoria.placa_detectada)
+        .order_by('-id').values_list('id', 'huella__imagen')[:settings.DUPLICADOS_MAX_CANDIDATAS]
+    )
+    if huella_imagen is not None:
+        distancias = [
+            (distancia_hamming(huella_imagen, imagen), -auditoria_id)
+            for auditoria_id, imagen in misma_placa if imagen is not None
+        ]
+        if distancias and min(distancias)[0] <= settings.DUPLICADOS_DISTANCIA_IMAGEN:
+            return 'IMAGEN', -min(distancias)[1]
+    if misma_placa:
+        return 'PLACA', misma_placa[0][0]
+    return '', None
+
+
+def registrar_huellas(pares):
+    """
+    Indexa las huellas de `pares` [(auditoria ya guardada, póliza)] y marca las que resultan
+    duplicadas (tipo_duplicado y duplicado_de). Retorna las auditorías marcadas.
+    """
+    indexar(pares)
+    marcadas = []
+    for auditoria, poliza in pares:
+        tipo, original = buscar_duplicado(auditoria, poliza.get('huella_texto'), poliza.get('huella_imagen'))
+        if tipo:
+            auditoria.tipo_duplicado, auditoria.duplicado_de_id = tipo, original
+            marcadas.append(auditoria)
+    Auditoria.objects.bulk_update(marcadas, ['tipo_duplicado', 'duplicado_de'], batch_size=500)
+    return marcadas
@@ -1,5 +1,6 @@
 from django import forms
 from .models import Auditoria
+from .subidas import validar_paginas
 
 class CargaForm(forms.ModelForm):
     class Meta:
@@ -8,4 +9,52 @@ class CargaForm(forms.ModelForm):
         # Aquí le ponemos estilo "Bootstrap" para que se vea bonito
         widgets = {
             'archivo_soat': forms.ClearableFileInput(attrs={'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+
+    def __init__(self, *args, rechazo=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if rechazo:
+            # El archivo se rechazó mientras subía (ver subidas.py) y no llegó: el error de "requerido" dice por qué
+            self.fields['archivo_soat'].error_messages['required'] = rechazo
+
+    def clean_archivo_soat(self):
+        archivo = self.cleaned_data['archivo_soat']
+        validar_paginas(archivo)  # Antes del OCR: PDF dañados o demasiado largos
+        return archivo
+
+
+class MultiplesArchivosInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultiplesArchivosField(forms.FileField):
+    """Campo que acepta varios archivos en un mismo input."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultiplesArchivosInput(attrs={'class': 'form-control', 'multiple': True}))
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        limpiar_uno = super().clean
+        if isinstance(data, (list, tuple)):
+            return [limpiar_uno(d, initial) for d in data]
+        return [limpiar_uno(data, initial)]
+
+
+class CargaLoteForm(forms.Form):
+    # Carga masiva: un ZIP o varios PDF/imágenes a la vez
+    archivos = MultiplesArchivosField()
+
+
+class FiltroDashboardForm(forms.Form):
+    """Filtros del dashboard (por GET). Todos opcionales."""
+    placa = forms.CharField(max_length=10, required=False, widget=forms.TextInput(attrs={'placeholder': 'Placa (o inicio)'}))
+    resultado = forms.ChoiceField(choices=[('', 'Todos')] + Auditoria.RESULTADOS, required=False)
+    desde = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    hasta = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        datos = super().clean()
+        if datos.get('desde') and datos.get('hasta') and datos['desde'] > datos['hasta']:
+            raise forms.ValidationError("La fecha inicial no puede ser posterior a la final.")
+        return datos
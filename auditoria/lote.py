@@ -0,0 +1,220 @@
+import logging
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+
+from .models import Auditoria, TrabajoAuditoria
+from .procesamiento import (
+    VERSION_REGLA, analizar_archivos, auditorias_adicionales, copia_de_resultado, decidir_resultado, polizas_de,
+)
+from .runt import consultar_runt_lote, version_registro
+from .resumen import registrar_creadas
+from .OCR.cliente_api import normalizar_placa
+from .almacenamiento import CARPETA_SOPORTES
+from .cache_contenido import guardar_archivo_deduplicado
+from .duplicados import registrar_huellas
+from .metricas import observar, registrar_resultado
+
+# ---------------------------------------------------------
+# INGESTA MASIVA (ZIP, CARPETA O VARIOS ARCHIVOS)
+# ---------------------------------------------------------
+
+EXTENSIONES_SOPORTADAS = {'.pdf', '.jpg', '.jpeg', '.png'}
+TAMANO_MAXIMO_MIEMBRO = 20 * 1024 * 1024  # 20MB por documento dentro del ZIP (evita "zip bombs")
+
+logger = logging.getLogger(__name__)
+
+
+def es_soportado(nombre):
+    return os.path.splitext(nombre)[1].lower() in EXTENSIONES_SOPORTADAS
+
+
+def iterar_documentos(origen):
+    """
+    Genera (nombre, archivo_abierto) para cada documento soportado de una carpeta o un ZIP.
+    Los miembros del ZIP se leen uno a uno como stream: nunca se extrae todo a disco.
+    `origen` puede ser una ruta o un archivo subido (UploadedFile).
+    """
+    if isinstance(origen, (str, os.PathLike)) and os.path.isdir(origen):
+        for nombre in sorted(os.listdir(origen)):
+            ruta = os.path.join(origen, nombre)
+            if os.path.isfile(ruta) and es_soportado(nombre):
+                with open(ruta, 'rb') as archivo:
+                    yield nombre, archivo
+        return
+
+    with zipfile.ZipFile(origen) as zf:
+        for info in zf.infolist():
+            nombre = os.path.basename(info.filename)
+            if info.is_dir() or not nombre or not es_soportado(nombre):
+                continue
+            if info.file_size > TAMANO_MAXIMO_MIEMBRO:
+                logger.warning("%s omitido: supera el tamaño máximo", nombre)
+                continue
+            with zf.open(info) as miembro:
+                yield nombre, miembro
+
+
+def guardar_documento(nombre, archivo):
+    """
+    Copia el stream al almacenamiento de soportes (o reutiliza una copia idéntica).
+    Retorna (nombre_guardado, hash_archivo).
+    """
+    return guardar_archivo_deduplicado(CARPETA_SOPORTES + nombre, archivo)
+
+
+def _inicializar_worker():
+    # Los procesos hijos no deben reutilizar las conexiones a la BD del padre.
+    # El modelo OCR se carga una vez por proceso (motor_ocr) y se reutiliza entre documentos.
+    connections.close_all()
+
+
+def _analizar_en_worker(guardados):
+    # Cada tarea lleva varios documentos: sus escaneos se leen con un solo OCR agrupado.
+    # Solo OCR: el RUNT se consulta al final, para todas las placas del lote a la vez.
+    # Las métricas de este proceso hijo se perderían: las registra el padre al recoger
+    resultados = analizar_archivos(
+        [(default_storage.path(nombre_guardado), hash_archivo) for nombre_guardado, hash_archivo in guardados],
+        verificar_runt=False,
+        registrar_metricas=False,
+    )
+    return [guardado + (resultado_ocr,) for guardado, resultado_ocr in zip(guardados, resultados)]
+
+
+def procesar_lote(documentos, procesos=None, encolar=False, tamano_lote=None):
+    """
+    Procesa muchos documentos en paralelo y crea sus Auditoria con bulk_create.
+
+    - `documentos`: iterable de (nombre, archivo_abierto), ej: `iterar_documentos(...)`.
+    - `encolar=True`: no analiza aquí; crea las auditorías PENDIENTE y sus trabajos
+      para que los procese `manage.py procesar_cola`.
+    - `tamano_lote`: documentos por tarea de cada worker (OCR agrupado). Por defecto
+      `settings.OCR_TAMANO_LOTE`.
+
+    Retorna un reporte con totales y throughput (documentos por segundo).
+    """
+    inicio = time.perf_counter()
+    procesos = procesos or os.cpu_count() or 1
+    tamano_lote = max(1, tamano_lote or settings.OCR_TAMANO_LOTE)
+    exitosos = []
+    polizas = []  # Póliza de extraer_datos_soat de cada auditoría de `exitosos` (con sus huellas)
+    fallidos = []
+
+    if encolar:
+        guardados = [guardar_documento(nombre, archivo) for nombre, archivo in documentos]
+        auditorias = Auditoria.objects.bulk_create([
+            Auditoria(archivo_soat=nombre, hash_archivo=hash_archivo) for nombre, hash_archivo in guardados
+        ])
+        registrar_creadas(auditorias)
+        TrabajoAuditoria.objects.bulk_create([TrabajoAuditoria(auditoria=a) for a in auditorias])
+        return _reporte(len(guardados), len(guardados), 0, inicio, encolados=True)
+
+    guardado_en = {}  # nombre_guardado -> segundos de guardar_archivo
+    # Archivos idénticos en el lote: solo el primero va a un worker; los demás toman su resultado
+    enviados = set()  # Hashes ya enviados
+    repetidos = []  # (nombre_guardado, hash_archivo) de los que no se enviaron
+    leidos = {}  # hash_archivo -> resultado del primero
+
+    def registrar(nombre_guardado, hash_archivo, resultado_ocr):
+        leidos.setdefault(hash_archivo, resultado_ocr)
+        resultado_ocr.setdefault('tiempos', {})['guardar_archivo'] = guardado_en.get(nombre_guardado, 0.0)
+        registrar_resultado(resultado_ocr)
+        if resultado_ocr['exito']:
+            auditoria = Auditoria(
+                archivo_soat=nombre_guardado,
+                hash_archivo=hash_archivo,
+                placa_detectada=resultado_ocr['placa'],
+                monto_detectado=resultado_ocr['monto'],
+                pagina_soat=resultado_ocr.get('pagina', 1),
+                origen=(resultado_ocr.get('origen') or '')[:30],
+                confianza=resultado_ocr.get('confianza'),
+                evidencia=resultado_ocr.get('evidencia'),
+                tiempos=resultado_ocr['tiempos'],
+            )
+            # PDF multipóliza: una auditoría más por cada póliza adicional
+            exitosos.extend([auditoria] + auditorias_adicionales(auditoria, resultado_ocr))
+            polizas.extend(polizas_de(resultado_ocr))
+        else:
+            # Lectura fallida: el archivo queda sin auditoría y lo recoge `barrer_soportes`
+            fallidos.append((nombre_guardado, resultado_ocr['mensaje']))
+
+    def recoger(futuro, guardados):
+        try:
+            for resultado in futuro.result():
+                registrar(*resultado)
+        except Exception as e:
+            # Error catastrófico en el worker (ej: EasyOCR falló por memoria)
+            for nombre_guardado, hash_archivo in guardados:
+                registrar(nombre_guardado, hash_archivo, {'exito': False, 'mensaje': f"Error interno: {e}"})
+
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_worker) as pool:
+        # Ventana acotada de tareas en vuelo: así no cargamos el lote completo en memoria
+        en_vuelo = {}
+        grupo = []
+
+        def enviar(guardados):
+            en_vuelo[pool.submit(_analizar_en_worker, guardados)] = guardados
+            while len(en_vuelo) >= procesos * 2:
+                listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    recoger(futuro, en_vuelo.pop(futuro))
+
+        for nombre, archivo in documentos:
+            inicio_guardado = time.perf_counter()
+            guardado = guardar_documento(nombre, archivo)
+            guardado_en[guardado[0]] = round(time.perf_counter() - inicio_guardado, 4)
+            if guardado[1] in enviados:
+                repetidos.append(guardado)
+                continue
+            enviados.add(guardado[1])
+            grupo.append(guardado)
+            if len(grupo) >= tamano_lote:
+                enviar(grupo)
+                grupo = []
+        if grupo:
+            enviar(grupo)
+        for futuro, guardados in en_vuelo.items():
+            recoger(futuro, guardados)
+    for nombre_guardado, hash_archivo in repetidos:
+        registrar(nombre_guardado, hash_archivo, copia_de_resultado(leidos[hash_archivo]))
+
+    # Validación API (El Juez) de todas las placas con pocos requests
+    inicio_runt = time.perf_counter()
+    registro = version_registro()
+    verificaciones = consultar_runt_lote([a.placa_detectada for a in exitosos])
+    runt = round((time.perf_counter() - inicio_runt) / max(1, len(exitosos)), 4)
+    for auditoria in exitosos:
+        auditoria.resultado = decidir_resultado(verificaciones[normalizar_placa(auditoria.placa_detectada)])
+        auditoria.version_regla, auditoria.version_registro = VERSION_REGLA, registro
+        auditoria.tiempos = dict(auditoria.tiempos, runt=runt)
+
+    inicio_bd = time.perf_counter()
+    Auditoria.objects.bulk_create(exitosos, batch_size=500)
+    registrar_creadas(exitosos)
+    registrar_huellas(list(zip(exitosos, polizas)))
+    bd = (time.perf_counter() - inicio_bd) / max(1, len(exitosos))
+    for _ in exitosos:
+        observar({'runt': runt, 'bd': bd})
+
+    total = len(exitosos) + len(fallidos)
+    reporte = _reporte(total, len(exitosos), len(fallidos), inicio)
+    reporte['errores'] = fallidos
+    return reporte
+
+
+def _reporte(total, exitosos, fallidos, inicio, encolados=False):
+    segundos = time.perf_counter() - inicio
+    return {
+        'total': total,
+        'exitosos': exitosos,
+        'fallidos': fallidos,
+        'encolados': encolados,
+        'segundos': segundos,
+        'docs_por_segundo': total / segundos if segundos > 0 else 0.0,
+    }
@@ -0,0 +1,41 @@
+import os
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auditoria.lote import iterar_documentos, procesar_lote
+
+
+class Command(BaseCommand):
+    help = "Audita en lote todos los SOAT (PDF, JPG, PNG) de una carpeta o de un archivo ZIP."
+
+    def add_arguments(self, parser):
+        parser.add_argument('origen', help="Carpeta o archivo .zip con los documentos.")
+        parser.add_argument('--procesos', type=int, default=None, help="Procesos en paralelo (por defecto: núcleos de CPU).")
+        parser.add_argument('--lote', type=int, default=None, help="Documentos por tarea de OCR agrupado (por defecto OCR_TAMANO_LOTE).")
+        parser.add_argument('--encolar', action='store_true', help="Solo crear los trabajos para `procesar_cola`.")
+
+    def handle(self, *args, **opciones):
+        origen = opciones['origen']
+        if not os.path.isdir(origen) and not (os.path.isfile(origen) and origen.lower().endswith('.zip')):
+            raise CommandError(f"'{origen}' no es una carpeta ni un archivo .zip")
+
+        try:
+            reporte = procesar_lote(
+                iterar_documentos(origen), procesos=opciones['procesos'], encolar=opciones['encolar'],
+                tamano_lote=opciones['lote'],
+            )
+        except zipfile.BadZipFile as e:
+            raise CommandError(f"'{origen}' no es un ZIP válido: {e}")
+
+        for nombre, mensaje in reporte.get('errores', []):
+            self.stderr.write(f"❌ {nombre}: {mensaje}")
+
+        if reporte['encolados']:
+            self.stdout.write(self.style.SUCCESS(f"{reporte['total']} documentos encolados en {reporte['segundos']:.2f}s"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{reporte['total']} documentos | {reporte['exitosos']} exitosos | {reporte['fallidos']} fallidos | "
+            f"{reporte['segundos']:.2f}s | {reporte['docs_por_segundo']:.2f} docs/seg"
+        ))
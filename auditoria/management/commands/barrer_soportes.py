@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from auditoria.almacenamiento import barrer_huerfanos, reubicar_soportes
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra por lotes los soportes que ninguna auditoría usa (y las subidas temporales abandonadas). "
+        "Pensado para correr en un cron, fuera de las peticiones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help="Archivos revisados por consulta a la BD.")
+        parser.add_argument('--gracia-minutos', type=int, default=settings.SOPORTES_GRACIA_BARRIDO_MIN,
+                            help="No se borran archivos más nuevos (cargas que todavía no insertan su auditoría).")
+        parser.add_argument('--simular', action='store_true', help="Solo contar, sin borrar ni mover nada.")
+        parser.add_argument('--reubicar', action='store_true',
+                            help="Antes de barrer, pasar los archivos de la carpeta plana a su ruta por contenido.")
+
+    def handle(self, *args, **opciones):
+        lote, simular = max(1, opciones['lote']), opciones['simular']
+        prefijo = "[simulación] " if simular else ""
+
+        if opciones['reubicar']:
+            reporte = reubicar_soportes(tamano_lote=lote, simular=simular)
+            self.stdout.write(
+                f"{prefijo}Reubicados: {reporte['reubicados']} archivo(s) "
+                f"({reporte['faltantes']} referenciados que ya no están en disco)"
+            )
+
+        reporte = barrer_huerfanos(tamano_lote=lote, gracia_minutos=opciones['gracia_minutos'], simular=simular)
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}Revisados {reporte['revisados']} | huérfanos borrados {reporte['borrados']} "
+            f"({reporte['bytes'] / (1024 * 1024):.1f} MB) | subidas temporales {reporte['temporales']}"
+        ))
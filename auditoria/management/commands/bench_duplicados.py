@@ -0,0 +1,149 @@
+import random
+import statistics
+import time
+from collections import Counter
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from auditoria.corpus_soat import placa_al_azar, texto_generico, texto_seguros_del_estado
+from auditoria.duplicados import buscar_duplicado, indexar
+from auditoria.models import Auditoria, BandaTexto, HuellaAuditoria
+from auditoria.OCR.huellas import bandas_lsh, desde_bytes, firma_texto
+from auditoria.OCR.lector_soat import SHINGLES_PLANTILLAS
+
+SEMILLA = 2024
+TAMANO_BLOQUE = 5000
+
+
+def percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(fraccion * len(ordenados)))]
+
+
+def poliza_al_azar(rng):
+    """(placa, texto, plantilla) de una póliza sintética (mismo generador del corpus de bench_soat)."""
+    placa = placa_al_azar(rng)
+    monto = rng.randrange(200_000, 2_500_000, 100)
+    if rng.random() < 0.6:
+        return placa, texto_seguros_del_estado(rng, placa, monto), 0
+    return placa, texto_generico(rng, placa, monto), 1
+
+
+def imagen_de_plantilla(rng, bases, plantilla):
+    """pHash sintético: el de la plantilla con 0 a 6 bits cambiados (lo que se ve entre pólizas reales)."""
+    valor = bases[plantilla]
+    for bit in rng.sample(range(64), rng.randint(0, 6)):
+        valor ^= 1 << bit
+    return valor - (1 << 64) if valor >= 1 << 63 else valor
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la búsqueda de duplicados (duplicados.py) con muchas auditorías guardadas: "
+        "por defecto 100.000 pólizas sintéticas. Todo corre en una transacción que se deshace "
+        "al final: la BD queda como estaba."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auditorias', type=int, default=100_000, help="Auditorías guardadas antes de medir.")
+        parser.add_argument('--consultas', type=int, default=200,
+                            help="Cargas nuevas a revisar: la mitad copias editadas de guardadas, la mitad nuevas.")
+
+    def handle(self, *args, **opciones):
+        rng = random.Random(SEMILLA)
+        total, consultas = opciones['auditorias'], max(2, opciones['consultas'])
+        bases = [rng.getrandbits(64), rng.getrandbits(64)]
+
+        with transaction.atomic():
+            guardadas = self.poblar(rng, bases, total)
+            self.medir(rng, bases, guardadas, consultas)
+            transaction.set_rollback(True)
+
+    def poblar(self, rng, bases, total):
+        """Inserta `total` auditorías con sus huellas. Retorna una muestra [(auditoria, texto, póliza)]."""
+        muestra = []
+        segundos_huellas = segundos_bd = 0.0
+        for inicio in range(0, total, TAMANO_BLOQUE):
+            pares = []
+            inicio_huellas = time.perf_counter()
+            for _ in range(min(TAMANO_BLOQUE, total - inicio)):
+                placa, texto, plantilla = poliza_al_azar(rng)
+                auditoria = Auditoria(archivo_soat='bench.pdf', placa_detectada=placa, resultado='APROBADO')
+                pares.append((auditoria, texto, {
+                    'huella_texto': firma_texto(texto, SHINGLES_PLANTILLAS),
+                    'huella_imagen': imagen_de_plantilla(rng, bases, plantilla),
+                }))
+            segundos_huellas += time.perf_counter() - inicio_huellas
+
+            inicio_bd = time.perf_counter()
+            Auditoria.objects.bulk_create([auditoria for auditoria, _, _ in pares], batch_size=500)
+            indexar([(auditoria, poliza) for auditoria, _, poliza in pares])
+            segundos_bd += time.perf_counter() - inicio_bd
+            muestra.extend(rng.sample(pares, min(len(pares), 50)))
+            self.stdout.write(f"  {inicio + len(pares)}/{total} auditorías guardadas", ending='\r')
+
+        self.stdout.write(
+            f"\nPoblado: {total} auditorías, {BandaTexto.objects.count()} bandas LSH | "
+            f"huellas {segundos_huellas / total * 1000:.2f} ms/doc, inserción {segundos_bd / total * 1000:.2f} ms/doc"
+        )
+        return muestra
+
+    def medir(self, rng, bases, guardadas, consultas):
+        siguiente = Auditoria.objects.order_by('-id').values_list('id', flat=True).first() + 1
+        casos = []  # (auditoria sin guardar, póliza, id de la copiada o None)
+        for auditoria, texto, poliza in rng.sample(guardadas, min(len(guardadas), consultas // 2)):
+            # Copia editada: la misma póliza (y la misma imagen) con otra placa
+            placa = placa_al_azar(rng)
+            copia = {
+                'huella_texto': firma_texto(texto.replace(auditoria.placa_detectada, placa), SHINGLES_PLANTILLAS),
+                'huella_imagen': poliza['huella_imagen'],
+            }
+            casos.append((Auditoria(id=siguiente, placa_detectada=placa), copia, auditoria.id))
+        while len(casos) < consultas:
+            placa, texto, plantilla = poliza_al_azar(rng)
+            nueva = {'huella_texto': firma_texto(texto, SHINGLES_PLANTILLAS),
+                     'huella_imagen': imagen_de_plantilla(rng, bases, plantilla)}
+            casos.append((Auditoria(id=siguiente, placa_detectada=placa), nueva, None))
+
+        tiempos, candidatas, encontradas, nuevas = [], [], 0, Counter()
+        for auditoria, poliza, copiada in casos:
+            inicio = time.perf_counter()
+            tipo, original = buscar_duplicado(auditoria, poliza['huella_texto'], poliza['huella_imagen'])
+            tiempos.append(time.perf_counter() - inicio)
+            candidatas.append(
+                BandaTexto.objects.filter(clave__in=bandas_lsh(poliza['huella_texto']))
+                .values('auditoria_id').distinct().count()
+            )
+            if copiada is not None:
+                encontradas += tipo == 'TEXTO' and original == copiada
+            else:
+                nuevas[tipo or 'sin marca'] += 1
+
+        copias = sum(1 for _, _, copiada in casos if copiada is not None)
+        self.stdout.write(
+            f"Búsqueda con índice ({len(casos)} cargas): p50 {statistics.median(tiempos) * 1000:.2f} ms, "
+            f"p95 {percentil(tiempos, 0.95) * 1000:.2f} ms | candidatas por carga: "
+            f"media {statistics.mean(candidatas):.1f}, máx {max(candidatas)}"
+        )
+        self.stdout.write(
+            f"Copias editadas encontradas: {encontradas}/{copias} | "
+            f"nuevas: {dict(nuevas)} (IMAGEN/PLACA solo si la placa al azar ya estaba guardada)"
+        )
+
+        # Referencia: sin índice hay que traer todas las firmas y comparar contra cada una
+        inicio = time.perf_counter()
+        firmas = np.stack([
+            desde_bytes(bytes(firma))
+            for firma in HuellaAuditoria.objects.exclude(texto=None).values_list('texto', flat=True).iterator()
+        ])
+        lectura = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        for _, poliza, _ in casos:
+            (firmas == desde_bytes(poliza['huella_texto'])).mean(axis=1).argmax()
+        comparacion = (time.perf_counter() - inicio) / len(casos)
+        self.stdout.write(self.style.SUCCESS(
+            f"Sin índice: {lectura * 1000:.0f} ms leyendo {len(firmas)} firmas + "
+            f"{comparacion * 1000:.2f} ms comparando por carga"
+        ))
@@ -0,0 +1,446 @@
+import difflib
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import re
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auditoria import corpus_soat
+from auditoria.corpus_soat import foto_celular, pagina_escaneada
+from auditoria.OCR import lector_soat, preprocesamiento
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta `funcion` varias veces y retorna los tiempos en segundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def _extraer_legado(texto):
+    """Como se hacía antes: Matcher nuevo y pipeline completo de spaCy en cada documento."""
+    from spacy.matcher import Matcher
+
+    nlp = lector_soat.obtener_nlp()
+    doc = nlp(texto)
+    matcher = Matcher(nlp.vocab)
+    for nombre, patrones in lector_soat.PATRONES_ANCLA.items():
+        matcher.add(nombre, patrones)
+    return matcher(doc)
+
+
+def _validar_placa_legado(palabra_raw):
+    """Como se hacía antes: `for` sobre la lista negra y dos str.maketrans nuevos por palabra."""
+    if "/" in palabra_raw:
+        return None
+    limpio = palabra_raw.strip(".,;:()[]-").upper()
+    for prohibida in {"VATIOS", "CILINDRAJE", "MODELO", "CLASE", "DATOS", "MOTOR", "SERIE", "CHASIS", "POLIZA",
+                      "TOTAL", "VALOR", "FECHA", "DESDE", "HASTA", "MOTOS", "AUTO", "SITIO"}:
+        if prohibida in limpio:
+            return None
+    if len(limpio) < 6 or len(limpio) > 7:
+        return None
+    limpio = limpio.replace("-", "")
+    letras = limpio[:3].translate(str.maketrans("015", "OIS"))
+    numeros = limpio[3:].translate(str.maketrans("OISBZ", "01582"))
+    return letras + numeros if letras.isalpha() and numeros.isdigit() else None
+
+
+def _cargar_legado(ruta, modo_pdf):
+    """Como se hacía antes: RGB a 300 DPI copiado a np.array; las fotos a resolución completa."""
+    import numpy as np
+    import pdfplumber
+    from PIL import Image
+
+    if modo_pdf:
+        with pdfplumber.open(ruta) as pdf:
+            return np.array(pdf.pages[0].to_image(resolution=300).original)
+    with Image.open(ruta) as im:
+        return np.array(im.convert('RGB'))
+
+
+def _medir_carga(variante, ruta, modo_pdf):
+    """Corre en un proceso nuevo para que el RSS pico no arrastre lo de otras variantes."""
+    preprocesamiento.reiniciar_mediciones()
+    base = preprocesamiento.rss_actual_mb()
+    inicio = time.perf_counter()
+    if variante == 'legado':
+        with preprocesamiento.medir_etapa('decodificar'):
+            imagen = _cargar_legado(ruta, modo_pdf)
+    else:
+        imagen = preprocesamiento.preparar_imagen(ruta, modo_pdf=modo_pdf)
+    return {
+        'segundos': time.perf_counter() - inicio,
+        'forma': imagen.shape,
+        'mb_imagen': imagen.nbytes / (1024 * 1024),
+        'pico_sobre_base_mb': preprocesamiento.rss_pico_mb() - base,
+        'etapas': preprocesamiento.ultimas_mediciones(),
+    }
+
+
+# --- Corpus golden: rendimiento, memoria y precisión con umbrales de regresión ---
+
+RUTA_LINEA_BASE = os.path.join(corpus_soat.CARPETA_DATOS, 'bench_linea_base.json')
+
+
+def percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fraccion))]
+
+
+def proporcion(aciertos):
+    aciertos = list(aciertos)
+    return round(sum(aciertos) / len(aciertos), 4) if aciertos else None
+
+
+def medir_corpus(funcion, entradas, rondas):
+    """
+    Llama `funcion(entrada)` para cada entrada: `rondas` pasadas cronometradas y una
+    pasada aparte con tracemalloc (que vuelve lento cada malloc y falsearía los tiempos).
+    Retorna (resultados de la primera pasada, métricas de rendimiento).
+    """
+    latencias, resultados = [], None
+    for _ in range(rondas):
+        ronda = []
+        for entrada in entradas:
+            inicio = time.perf_counter()
+            ronda.append(funcion(entrada))
+            latencias.append(time.perf_counter() - inicio)
+        resultados = resultados or ronda
+
+    pico = 0
+    tracemalloc.start()
+    try:
+        for entrada in entradas:
+            tracemalloc.reset_peak()
+            antes = tracemalloc.get_traced_memory()[0]
+            funcion(entrada)
+            pico = max(pico, tracemalloc.get_traced_memory()[1] - antes)
+    finally:
+        tracemalloc.stop()
+
+    return resultados, {
+        'por_segundo': round(len(latencias) / sum(latencias), 1),
+        'p50_ms': round(statistics.median(latencias) * 1000, 3),
+        'p95_ms': round(percentil(latencias, 0.95) * 1000, 3),
+        'memoria_pico_kb': round(pico / 1024, 1),
+    }
+
+
+def maquina():
+    """Identifica el hardware: los tiempos de la línea base solo valen en la misma máquina."""
+    return f"{platform.machine()} {platform.processor() or platform.system()} {os.cpu_count()} CPU / Python {platform.python_version()}"
+
+
+def evaluar_corpus(casos, carpeta, rondas=4, con_ocr=False):
+    """Rendimiento y precisión de cada función del pipeline sobre el corpus. Retorna el reporte (dict)."""
+    lector_soat.obtener_extractor()  # Extractor construido antes de medir
+    funciones = {}
+
+    # 1. validar_y_corregir_placa: cada palabra del texto con ruido de OCR
+    palabras = [palabra for caso in casos for palabra in caso['texto_ocr'].split()]
+    validadas, metricas = medir_corpus(lector_soat.validar_y_corregir_placa, palabras, rondas)
+    por_caso, i = [], 0
+    for caso in casos:
+        n = len(caso['texto_ocr'].split())
+        por_caso.append(set(filter(None, validadas[i:i + n])))
+        i += n
+    metricas['precision_placa'] = proporcion(caso['placa'] in placas for caso, placas in zip(casos, por_caso))
+    metricas['falsos_positivos_por_doc'] = round(sum(len(p - {c['placa']}) for c, p in zip(casos, por_caso)) / len(casos), 3)
+    funciones['validar_y_corregir_placa'] = metricas
+
+    # 2. extraer_con_inteligencia_hibrida: texto completo con ruido de OCR
+    resultados, metricas = medir_corpus(lector_soat.extraer_con_inteligencia_hibrida, [c['texto_ocr'] for c in casos], rondas)
+    aciertos = [corpus_soat.acierta(caso, r) for caso, r in zip(casos, resultados)]
+    metricas['precision_placa'] = proporcion(a for a, _ in aciertos)
+    metricas['precision_monto'] = proporcion(b for _, b in aciertos)
+    funciones['extraer_con_inteligencia_hibrida'] = metricas
+
+    # 3. evaluar_similitud contra TEXTO_REF (la precisión es la del clasificador de plantillas)
+    _, metricas = medir_corpus(lambda texto: lector_soat.evaluar_similitud(lector_soat.TEXTO_REF, texto),
+                               [c['texto'] for c in casos], rondas)
+    metricas['precision_plantilla'] = proporcion(
+        lector_soat.CLASIFICADOR.clasificar(caso['texto'])['plantilla'] == caso['plantilla'] for caso in casos
+    )
+    funciones['evaluar_similitud'] = metricas
+
+    # 4. extraer_datos_soat sobre archivos: PDF digitales siempre; escaneos y fotos solo con EasyOCR
+    grupos = [('extraer_datos_soat[pdf digital]', ('digital', 'varias_paginas'), rondas)]
+    if con_ocr:
+        grupos.append(('extraer_datos_soat[ocr]', ('escaneo', 'foto'), 1))
+    for nombre, formatos, rondas_grupo in grupos:
+        archivos = corpus_soat.escribir_corpus(casos, carpeta, formatos)
+        if not archivos:
+            continue
+        resultados, metricas = medir_corpus(lector_soat.extraer_datos_soat, [ruta for _, ruta in archivos], rondas_grupo)
+        aciertos = [corpus_soat.acierta(caso, r) for (caso, _), r in zip(archivos, resultados)]
+        metricas['precision_placa'] = proporcion(a for a, _ in aciertos)
+        metricas['precision_monto'] = proporcion(b for _, b in aciertos)
+        metricas['documentos'] = len(archivos)
+        funciones[nombre] = metricas
+
+    return {'version_corpus': corpus_soat.VERSION_CORPUS, 'casos': len(casos), 'maquina': maquina(), 'funciones': funciones}
+
+
+def comparar_con_linea_base(actual, base, tolerancia_precision=0.01, tolerancia_tiempo=0.5, tolerancia_memoria=0.25):
+    """
+    Compara un reporte de `evaluar_corpus` con la línea base. Retorna (regresiones, avisos).
+    - Precisión: regresión si baja más de `tolerancia_precision` (puntos, 0.01 = 1%).
+    - p95: regresión si sube más de `tolerancia_tiempo` (fracción), solo en la misma máquina;
+      en otra máquina queda como aviso.
+    - Memoria pico (tracemalloc, no depende del hardware): regresión si sube más de `tolerancia_memoria`.
+    """
+    regresiones, avisos = [], []
+    misma_maquina = actual.get('maquina') == base.get('maquina')
+    for nombre, metricas_base in base['funciones'].items():
+        metricas = actual['funciones'].get(nombre)
+        if metricas is None:
+            avisos.append(f"{nombre}: no se midió en esta corrida")
+            continue
+        for clave, valor_base in metricas_base.items():
+            valor = metricas.get(clave)
+            if valor is None or valor_base is None:
+                continue
+            if clave.startswith('precision') and valor < valor_base - tolerancia_precision:
+                regresiones.append(f"{nombre}: {clave} {valor:.2%} (línea base {valor_base:.2%})")
+            elif clave == 'p95_ms' and valor > valor_base * (1 + tolerancia_tiempo) + 0.05:  # +50 µs: resolución del reloj
+                mensaje = f"{nombre}: p95 {valor:.3f} ms (línea base {valor_base:.3f} ms)"
+                (regresiones if misma_maquina else avisos).append(mensaje)
+            elif clave == 'memoria_pico_kb' and valor > valor_base * (1 + tolerancia_memoria) + 64:
+                regresiones.append(f"{nombre}: memoria pico {valor:.0f} KB (línea base {valor_base:.0f} KB)")
+    return regresiones, avisos
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmarks del pipeline de extracción de SOAT."
+
+    SUITES = ['extraccion', 'candidatos', 'clasificador', 'regiones', 'preprocesamiento', 'lote_ocr', 'corpus']
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='*', help=f"Suites a ejecutar: {', '.join(self.SUITES)} (por defecto todas).")
+        parser.add_argument('--repeticiones', type=int, default=200)
+        # Suite 'corpus'
+        parser.add_argument('--casos', type=int, default=corpus_soat.CASOS_POR_DEFECTO, help="Casos del corpus sintético.")
+        parser.add_argument('--linea-base', default=RUTA_LINEA_BASE, help="JSON con la línea base de precisión y tiempos.")
+        parser.add_argument('--verificar', action='store_true', help="Fallar (código 1) si hay regresiones contra la línea base.")
+        parser.add_argument('--guardar-linea-base', action='store_true',
+                            help="Guardar esta corrida como línea base (y el manifiesto del corpus).")
+        parser.add_argument('--tolerancia-precision', type=float, default=0.01, help="Caída de precisión permitida (0.01 = 1 punto).")
+        parser.add_argument('--tolerancia-tiempo', type=float, default=0.5, help="Aumento de p95 permitido (0.5 = +50%%).")
+
+    def handle(self, *args, **opciones):
+        desconocidas = set(opciones['suites']) - set(self.SUITES)
+        if desconocidas:
+            raise CommandError(f"Suites desconocidas: {', '.join(sorted(desconocidas))}")
+
+        self.opciones = opciones
+        for suite in opciones['suites'] or self.SUITES:
+            getattr(self, f'bench_{suite}')(opciones['repeticiones'])
+
+    def reportar(self, nombre, tiempos, documentos=1):
+        por_doc = [t / documentos for t in tiempos]
+        self.stdout.write(
+            f"  {nombre:<32} p50 {statistics.median(por_doc) * 1e6:>10.1f} µs/doc   "
+            f"min {min(por_doc) * 1e6:>10.1f} µs/doc"
+        )
+
+    def bench_extraccion(self, repeticiones):
+        texto = lector_soat.TEXTO_REF
+        textos = [texto] * 32
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Extracción placa/monto ({len(texto)} caracteres por documento)"))
+
+        # Cargamos spaCy y construimos los extractores antes de medir
+        spacy_ext = lector_soat.obtener_extractor('spacy')
+        regex_ext = lector_soat.obtener_extractor('regex')
+
+        self.reportar("antes: Matcher + nlp() por doc", medir(lambda: _extraer_legado(texto), repeticiones))
+        self.reportar("spaCy precompilado (make_doc)", medir(lambda: spacy_ext.extraer(texto), repeticiones))
+        self.reportar("spaCy por lote (nlp.pipe x32)", medir(lambda: spacy_ext.extraer_lote(textos), repeticiones // 8 or 1), len(textos))
+        self.reportar("regex de anclas", medir(lambda: regex_ext.extraer(texto), repeticiones))
+        escaner = lector_soat.obtener_extractor('escaner')
+        self.reportar("escáner de una pasada", medir(lambda: escaner.extraer(texto), repeticiones))
+
+    def bench_candidatos(self, repeticiones):
+        """Textos de OCR grandes (varias pólizas con ruido seguidas): throughput por motor y precisión."""
+        casos = corpus_soat.generar_corpus()
+        self.stdout.write(self.style.MIGRATE_HEADING("Escáner de candidatos sobre salidas de OCR grandes"))
+
+        palabras = [palabra for caso in casos for palabra in caso['texto_ocr'].split()]
+        for nombre, validar in (("antes: validar placa por palabra", _validar_placa_legado),
+                                ("validar placa precompilado", lector_soat.validar_y_corregir_placa)):
+            self.reportar(nombre, medir(lambda: [validar(p) for p in palabras], max(repeticiones // 20, 1)), len(palabras))
+
+        extractores = [(motor, lector_soat.obtener_extractor(motor)) for motor in ('spacy', 'regex', 'escaner')]
+        for documentos in (1, 16, 256):
+            # Pólizas con ruido pegadas en un solo texto, como la salida de un PDF escaneado largo
+            texto = " ".join(casos[i % len(casos)]['texto_ocr'] for i in range(documentos))
+            megas = len(texto.encode('utf-8')) / (1024 * 1024)
+            self.stdout.write(f"  {documentos} póliza(s), {megas * 1024:.0f} KB")
+            for motor, extractor in extractores:
+                segundos = min(medir(lambda: extractor.extraer(texto), max(repeticiones // (10 * documentos), 3)))
+                self.stdout.write(f"    {motor:<10} {segundos * 1000:>9.2f} ms  {megas / segundos:>7.1f} MB/s")
+
+        # Precisión por motor sobre el corpus con ruido (un documento a la vez)
+        for motor, extractor in extractores:
+            aciertos = [corpus_soat.acierta(caso, extractor.extraer(caso['texto_ocr'])) for caso in casos]
+            self.stdout.write(
+                f"  {motor:<10} placa {proporcion(a for a, _ in aciertos):.1%}  monto {proporcion(b for _, b in aciertos):.1%}"
+            )
+
+    def bench_clasificador(self, repeticiones):
+        texto_ref = lector_soat.TEXTO_REF
+        # Otro SOAT de la misma aseguradora: cambian números y datos del tomador
+        texto = re.sub(r"\d", "7", texto_ref).replace("GUEVARA TELLEZ, JENNY MARCELA", "PEREZ GOMEZ, JUAN")
+        self.stdout.write(self.style.MIGRATE_HEADING("Clasificación digital vs escaneado"))
+
+        def difflib_legado():
+            s1 = " ".join(texto_ref.split()).lower()
+            s2 = " ".join(texto.split()).lower()
+            return difflib.SequenceMatcher(None, s1, s2).ratio() * 100
+
+        self.reportar("antes: difflib vs TEXTO_REF", medir(difflib_legado, max(repeticiones // 10, 1)))
+        self.reportar(
+            f"huellas ({len(lector_soat.CLASIFICADOR.plantillas)} plantillas)",
+            medir(lambda: lector_soat.CLASIFICADOR.clasificar(texto), repeticiones),
+        )
+
+    def bench_regiones(self, repeticiones):
+        self.stdout.write(self.style.MIGRATE_HEADING("OCR página completa vs regiones de interés"))
+        if importlib.util.find_spec('easyocr') is None:
+            self.stdout.write(self.style.WARNING("  EasyOCR no está instalado: suite omitida"))
+            return
+
+        repeticiones = max(repeticiones // 50, 3)  # El OCR es lento: pocas repeticiones bastan
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = pagina_escaneada(lector_soat.TEXTO_REF, os.path.join(carpeta, 'escaneo.pdf'))
+            lector_soat.obtener_pool().precalentar()
+
+            self.reportar(
+                "página completa (300 DPI)",
+                medir(lambda: lector_soat.obtener_palabras_con_ocr(ruta, modo_pdf=True), repeticiones),
+            )
+            self.reportar(
+                "regiones (DPI adaptativo)",
+                medir(lambda: lector_soat.obtener_texto_por_regiones(ruta, modo_pdf=True), repeticiones),
+            )
+            plantilla, texto = lector_soat.obtener_texto_por_regiones(ruta, modo_pdf=True)
+            self.stdout.write(f"  plantilla: {plantilla} | datos: {lector_soat.extraer_con_inteligencia_hibrida(texto or '')}")
+
+    def bench_preprocesamiento(self, repeticiones):
+        self.stdout.write(self.style.MIGRATE_HEADING("Rasterización/decodificación: memoria por etapa"))
+        contexto = multiprocessing.get_context('spawn')
+        with tempfile.TemporaryDirectory() as carpeta:
+            documentos = [
+                ("escaneo PDF", pagina_escaneada(lector_soat.TEXTO_REF, os.path.join(carpeta, 'escaneo.pdf')), True),
+                ("foto 12 MP", foto_celular(lector_soat.TEXTO_REF, os.path.join(carpeta, 'foto.jpg')), False),
+            ]
+            for nombre, ruta, modo_pdf in documentos:
+                for variante in ('legado', 'acotado'):
+                    with contexto.Pool(1) as pool:
+                        r = pool.apply(_medir_carga, (variante, ruta, modo_pdf))
+                    etapas = ", ".join(
+                        f"{e['etapa']} {e['segundos'] * 1000:.0f} ms/+{e['crecimiento_pico_mb']:.0f} MB" for e in r['etapas']
+                    )
+                    self.stdout.write(
+                        f"  {nombre:<12} {variante:<8} {r['segundos'] * 1000:>7.0f} ms  "
+                        f"imagen {r['forma']} {r['mb_imagen']:>5.1f} MB  pico +{r['pico_sobre_base_mb']:>6.1f} MB  [{etapas}]"
+                    )
+
+    def bench_lote_ocr(self, repeticiones):
+        self.stdout.write(self.style.MIGRATE_HEADING("OCR por lote (readtext_batched) en CPU"))
+        if importlib.util.find_spec('easyocr') is None:
+            self.stdout.write(self.style.WARNING("  EasyOCR no está instalado: suite omitida"))
+            return
+
+        documentos = 16
+        with tempfile.TemporaryDirectory() as carpeta:
+            imagenes = []
+            for i in range(documentos):
+                # Cada página con datos distintos, para que no sea el mismo tensor repetido
+                texto = lector_soat.TEXTO_REF.replace("ASA534", f"ASA{500 + i}")
+                ruta = pagina_escaneada(texto, os.path.join(carpeta, f'escaneo_{i}.pdf'))
+                imagenes.append(lector_soat.cargar_imagen(ruta, modo_pdf=True, alto_objetivo=1600, reutilizar=False))
+
+            pool = lector_soat.obtener_pool()
+            pool.precalentar()
+            self.stdout.write(f"  {documentos} páginas de {imagenes[0].shape}, hilos torch: {pool.hilos or 'auto'}")
+
+            def reportar_lote(nombre, funcion):
+                segundos = min(medir(funcion, max(repeticiones // 100, 1)))
+                self.stdout.write(f"  {nombre:<32} {documentos / segundos:>8.2f} docs/seg")
+
+            reportar_lote("antes: readtext una por una", lambda: [pool.leer(im, detail=0) for im in imagenes])
+            for tamano in (1, 4, 16):
+                reportar_lote(
+                    f"readtext_batched (lote {tamano})",
+                    lambda: pool.leer_lote(imagenes, tamano_grupo=tamano, batch_size=16, detail=0),
+                )
+
+    def bench_corpus(self, repeticiones):
+        opciones = self.opciones
+        casos = corpus_soat.generar_corpus(opciones['casos'])
+        con_ocr = importlib.util.find_spec('easyocr') is not None
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Corpus golden v{corpus_soat.VERSION_CORPUS}: {len(casos)} casos"
+            + ("" if con_ocr else " (sin EasyOCR: escaneos y fotos omitidos)")
+        ))
+
+        completo = opciones['casos'] == corpus_soat.CASOS_POR_DEFECTO
+        if completo and not opciones['guardar_linea_base'] and os.path.exists(corpus_soat.RUTA_MANIFIESTO):
+            diferencias = corpus_soat.verificar_manifiesto(casos)
+            if diferencias:
+                raise CommandError(
+                    "El generador del corpus cambió: suba VERSION_CORPUS y regenere con --guardar-linea-base.\n  "
+                    + "\n  ".join(diferencias[:5])
+                )
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            reporte = evaluar_corpus(casos, carpeta, rondas=max(1, repeticiones // 50), con_ocr=con_ocr)
+
+        for nombre, m in reporte['funciones'].items():
+            precisiones = "  ".join(f"{k.replace('precision_', '')} {v:.1%}" for k, v in m.items() if k.startswith('precision'))
+            self.stdout.write(
+                f"  {nombre:<34} {m['por_segundo']:>10.1f}/s  p50 {m['p50_ms']:>8.3f} ms  p95 {m['p95_ms']:>8.3f} ms  "
+                f"mem {m['memoria_pico_kb']:>7.1f} KB  {precisiones}"
+            )
+
+        if opciones['guardar_linea_base']:
+            if not completo:
+                raise CommandError(f"La línea base se guarda con el corpus completo ({corpus_soat.CASOS_POR_DEFECTO} casos).")
+            corpus_soat.guardar_manifiesto(casos)
+            with open(opciones['linea_base'], 'w', encoding='utf-8') as f:
+                json.dump(reporte, f, ensure_ascii=False, indent=1)
+                f.write("\n")
+            self.stdout.write(self.style.SUCCESS(f"  Línea base guardada en {opciones['linea_base']}"))
+            return
+
+        if not os.path.exists(opciones['linea_base']):
+            self.stdout.write(self.style.WARNING("  Sin línea base: use --guardar-linea-base para crearla"))
+            return
+        with open(opciones['linea_base'], encoding='utf-8') as f:
+            base = json.load(f)
+        if base.get('version_corpus') != reporte['version_corpus'] or base.get('casos') != reporte['casos']:
+            self.stdout.write(self.style.WARNING("  La línea base es de otro corpus: no se compara"))
+            return
+
+        regresiones, avisos = comparar_con_linea_base(
+            reporte, base, opciones['tolerancia_precision'], opciones['tolerancia_tiempo'],
+        )
+        for aviso in avisos:
+            self.stdout.write(self.style.WARNING(f"  aviso: {aviso}"))
+        for regresion in regresiones:
+            self.stdout.write(self.style.ERROR(f"  REGRESIÓN: {regresion}"))
+        if not regresiones:
+            self.stdout.write(self.style.SUCCESS("  Sin regresiones contra la línea base"))
+        elif opciones['verificar']:
+            raise CommandError(f"{len(regresiones)} regresión(es) contra la línea base")
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auditoria.OCR.cliente_api import URL_RUNT
+from auditoria.runt import importar_registros, leer_api_paginada, leer_fuente, ultima_marca_actualizacion
+
+
+class Command(BaseCommand):
+    help = "Importa (o refresca) el espejo local del RUNT desde la API de datos.gov.co o un export CSV/JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archivo', help="Export local del dataset (.csv, .json o .jsonl).")
+        parser.add_argument('--url', default=URL_RUNT, help="Endpoint Socrata del dataset.")
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help="Solo traer de la API las filas modificadas desde la última sincronización.",
+        )
+
+    def handle(self, *args, **opciones):
+        if opciones['archivo'] and opciones['incremental']:
+            raise CommandError("--incremental solo aplica a la API: un archivo siempre es el dataset completo.")
+        inicio = time.perf_counter()
+
+        if opciones['archivo']:
+            fuente = opciones['archivo']
+            filas = leer_fuente(fuente)
+            incremental = False
+        else:
+            fuente = opciones['url']
+            desde = ultima_marca_actualizacion() if opciones['incremental'] else None
+            incremental = desde is not None
+            if incremental:
+                self.stdout.write(f"Refresco incremental desde {desde}")
+            filas = leer_api_paginada(fuente, desde=desde)
+
+        sincronizacion = importar_registros(filas, fuente, incremental=incremental)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{sincronizacion.registros} vehículos importados, {sincronizacion.eliminados} eliminados "
+            f"en {time.perf_counter() - inicio:.1f}s"
+        ))
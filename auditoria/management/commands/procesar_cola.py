@@ -0,0 +1,103 @@
+import logging
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from auditoria.cola import INTERVALO_RECUPERACION, procesar_pendientes, recuperar_trabajos_colgados
+from auditoria.metricas import TIPO_CONTENIDO, exponer
+
+logger = logging.getLogger(__name__)
+
+
+class ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        cuerpo = exponer().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', TIPO_CONTENIDO)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass  # Sin una línea en consola por cada consulta de Prometheus
+
+
+def servir_metricas(puerto):
+    """Expone las métricas de este proceso worker en http://0.0.0.0:<puerto>/metrics (hilo aparte)."""
+    servidor = ThreadingHTTPServer(('0.0.0.0', puerto), ManejadorMetricas)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def bucle_worker(intervalo, una_vez, tamano_lote=None, puerto_metricas=None):
+    """Ciclo de un proceso worker: procesa la cola y duerme cuando está vacía."""
+    # Cada proceso abre sus propias conexiones (no se pueden compartir tras el fork)
+    connections.close_all()
+    if puerto_metricas:
+        servir_metricas(puerto_metricas)
+
+    # Al arrancar ya se recuperaron (handle): la primera revisión es pasado un intervalo.
+    # Así un worker caído no deja trabajos colgados hasta el próximo reinicio de los demás.
+    siguiente_recuperacion = time.monotonic() + INTERVALO_RECUPERACION.total_seconds()
+    while True:
+        if time.monotonic() >= siguiente_recuperacion:
+            recuperados = recuperar_trabajos_colgados()
+            if recuperados:
+                logger.warning("Trabajos colgados devueltos a la cola: %d", recuperados)
+            siguiente_recuperacion = time.monotonic() + INTERVALO_RECUPERACION.total_seconds()
+        procesados = procesar_pendientes(tamano_lote=tamano_lote)
+        if una_vez:
+            return
+        if not procesados:
+            time.sleep(intervalo)
+
+
+class Command(BaseCommand):
+    help = "Procesa la cola de auditorías pendientes (OCR + RUNT) con un pool de procesos locales."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=1, help="Número de procesos worker.")
+        parser.add_argument('--intervalo', type=float, default=1.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument('--lote', type=int, default=None, help="Trabajos por pasada de OCR agrupado (por defecto OCR_TAMANO_LOTE).")
+        parser.add_argument('--una-vez', action='store_true', help="Vaciar la cola y terminar (sin quedarse escuchando).")
+        parser.add_argument('--metricas-puerto', type=int, default=None,
+                            help="Exponer /metrics (Prometheus) de cada worker desde este puerto (uno por proceso: puerto, puerto+1, ...).")
+
+    def handle(self, *args, **opciones):
+        procesos = max(1, opciones['procesos'])
+        intervalo = opciones['intervalo']
+        una_vez = opciones['una_vez']
+        tamano_lote = opciones['lote']
+        puerto = opciones['metricas_puerto']
+
+        recuperados = recuperar_trabajos_colgados()
+        if recuperados:
+            self.stdout.write(f"Trabajos colgados devueltos a la cola: {recuperados}")
+
+        self.stdout.write(f"Procesando cola con {procesos} proceso(s)...")
+
+        if procesos == 1:
+            bucle_worker(intervalo, una_vez, tamano_lote, puerto)
+            return
+
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=bucle_worker,
+                args=(intervalo, una_vez, tamano_lote, puerto + i if puerto else None),
+                daemon=True,
+            )
+            for i in range(procesos)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
@@ -0,0 +1,204 @@
+import asyncio
+import statistics
+import string
+import threading
+import time
+from collections import Counter
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from auditoria.models import Auditoria, CacheExtraccion, TrabajoAuditoria
+from auditoria.procesamiento import descartar_auditoria
+from auditoria.OCR.lector_soat import TEXTO_REF
+from auditoria.corpus_soat import pdf_con_texto
+
+
+def placa_numero(n):
+    """Placa válida y distinta para cada número (AAA000, AAA001, ...)."""
+    letras = ""
+    resto = n // 1000
+    for _ in range(3):
+        resto, i = divmod(resto, 26)
+        letras = string.ascii_uppercase[i] + letras
+    return f"{letras}{n % 1000:03d}"
+
+
+def soat_numero(n):
+    """PDF digital de SOAT con placa propia: cada carga tiene otro hash (sin cache ni deduplicación)."""
+    return pdf_con_texto([TEXTO_REF.replace("ASA534", placa_numero(n))])
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga: varios usuarios subiendo SOAT (PDF digitales) al mismo tiempo contra "
+        "la vista de carga, para medir latencia y errores de la base de datos bajo escrituras concurrentes. "
+        "Para comparar despliegues: --url contra gunicorn (WSGI) y contra uvicorn (ASGI), o --interfaz ambas en proceso."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=8, help="Hilos subiendo en paralelo.")
+        parser.add_argument('--cargas', type=int, default=10, help="Cargas por usuario.")
+        parser.add_argument('--url', default=None, help="URL de la vista de carga de un servidor corriendo (ej: gunicorn). "
+                                                        "Sin --url se llama a la vista dentro de este proceso.")
+        parser.add_argument('--interfaz', choices=['wsgi', 'asgi', 'ambas'], default='wsgi',
+                            help="En proceso: hilos contra el WSGIHandler, corrutinas de un event loop contra el "
+                                 "ASGIHandler, o las dos rondas seguidas para compararlas.")
+        parser.add_argument('--sincrono', action='store_true', help="En proceso: OCR + RUNT dentro de la petición.")
+        parser.add_argument('--runt-api', action='store_true', help="En proceso: consultar la API real del RUNT (por defecto el espejo local).")
+        parser.add_argument('--conservar', action='store_true', help="No borrar las auditorías creadas por la prueba.")
+
+    def handle(self, *args, **opciones):
+        usuarios, cargas = max(1, opciones['usuarios']), max(1, opciones['cargas'])
+        ultima_auditoria = Auditoria.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        ultimo_trabajo = TrabajoAuditoria.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        if opciones['url']:
+            enviar = self.enviar_remoto(opciones['url'])
+            ajustes = override_settings()
+            interfaces = ['remota']
+        else:
+            enviar = self.enviar_local
+            ajustes = override_settings(
+                AUDITORIA_ASINCRONA=not opciones['sincrono'],
+                RUNT_BACKEND='api' if opciones['runt_api'] else 'local',
+                ALLOWED_HOSTS=['localhost', 'testserver'],  # AsyncClient siempre manda Host: testserver
+            )
+            interfaces = ['wsgi', 'asgi'] if opciones['interfaz'] == 'ambas' else [opciones['interfaz']]
+
+        reportes = {}
+        with ajustes:
+            for ronda, interfaz in enumerate(interfaces):
+                # Los PDF se arman antes de medir (otros en cada ronda: sin cache ni deduplicación)
+                documentos = [
+                    [soat_numero((ronda * usuarios + u) * cargas + c) for c in range(cargas)] for u in range(usuarios)
+                ]
+                if interfaz == 'asgi':
+                    segundos, latencias, estados = self.correr_asgi(documentos)
+                else:
+                    segundos, latencias, estados = self.correr_hilos(documentos, enviar)
+                reportes[interfaz] = self.reportar(interfaz, usuarios * cargas, segundos, latencias, estados)
+
+        if len(reportes) > 1:
+            wsgi, asgi = reportes['wsgi'], reportes['asgi']
+            self.stdout.write(self.style.MIGRATE_HEADING("ASGI vs WSGI"))
+            self.stdout.write(
+                f"  cargas/seg x{asgi['por_segundo'] / wsgi['por_segundo']:.2f} | "
+                f"p95 {asgi['p95'] * 1000:.0f} ms vs {wsgi['p95'] * 1000:.0f} ms"
+            )
+
+        if not opciones['conservar']:
+            self.limpiar(ultima_auditoria, ultimo_trabajo)
+
+    # --- Usuarios concurrentes ---
+
+    def correr_hilos(self, documentos, enviar):
+        """Un hilo por usuario (como los workers de gunicorn o un servidor remoto)."""
+        latencias, estados = [], Counter()
+        candado = threading.Lock()
+
+        def usuario(pdfs):
+            sesion = None
+            try:
+                for pdf in pdfs:
+                    inicio = time.perf_counter()
+                    try:
+                        sesion, estado = enviar(sesion, pdf)
+                    except Exception as e:
+                        estado = f"excepción: {type(e).__name__}: {e}"[:120]
+                    with candado:
+                        latencias.append(time.perf_counter() - inicio)
+                        estados[estado] += 1
+            finally:
+                connection.close()  # Cada hilo tiene su propia conexión a la BD
+
+        hilos = [threading.Thread(target=usuario, args=(pdfs,)) for pdfs in documentos]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return time.perf_counter() - inicio, latencias, estados
+
+    def correr_asgi(self, documentos):
+        """Todos los usuarios como corrutinas de un solo event loop contra el ASGIHandler (como un worker de uvicorn)."""
+        latencias, estados = [], Counter()
+        url = reverse('carga_soportes')
+
+        async def usuario(pdfs):
+            cliente = AsyncClient()
+            for pdf in pdfs:
+                inicio = time.perf_counter()
+                try:
+                    respuesta = await cliente.post(
+                        url, {'archivo_soat': SimpleUploadedFile('soat.pdf', pdf, 'application/pdf')},
+                        headers={'X-Requested-With': 'XMLHttpRequest'},
+                    )
+                    estado = respuesta.status_code
+                except Exception as e:
+                    estado = f"excepción: {type(e).__name__}: {e}"[:120]
+                latencias.append(time.perf_counter() - inicio)
+                estados[estado] += 1
+
+        async def todos():
+            await asyncio.gather(*(usuario(pdfs) for pdfs in documentos))
+
+        inicio = time.perf_counter()
+        asyncio.run(todos())
+        return time.perf_counter() - inicio, latencias, estados
+
+    # --- Envío ---
+
+    def enviar_local(self, cliente, pdf):
+        cliente = cliente or Client(HTTP_HOST='localhost', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        respuesta = cliente.post(reverse('carga_soportes'), {'archivo_soat': SimpleUploadedFile('soat.pdf', pdf, 'application/pdf')})
+        return cliente, respuesta.status_code
+
+    def enviar_remoto(self, url):
+        import requests
+
+        def enviar(sesion, pdf):
+            if sesion is None:
+                sesion = requests.Session()
+                sesion.get(url, timeout=30)  # Cookie CSRF
+            respuesta = sesion.post(
+                url,
+                files={'archivo_soat': ('soat.pdf', pdf, 'application/pdf')},
+                headers={'X-CSRFToken': sesion.cookies.get('csrftoken', ''), 'X-Requested-With': 'XMLHttpRequest', 'Referer': url},
+                allow_redirects=False,
+                timeout=120,
+            )
+            return sesion, respuesta.status_code
+
+        return enviar
+
+    # --- Reporte y limpieza ---
+
+    def reportar(self, interfaz, total, segundos, latencias, estados):
+        ordenadas = sorted(latencias)
+        p95 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))]
+        p99 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"[{interfaz}] {total} cargas en {segundos:.2f}s ({total / segundos:.1f} cargas/seg)"
+        ))
+        self.stdout.write(
+            f"  latencia p50 {statistics.median(ordenadas) * 1000:.0f} ms | p95 {p95 * 1000:.0f} ms | "
+            f"p99 {p99 * 1000:.0f} ms | máx {ordenadas[-1] * 1000:.0f} ms"
+        )
+        for estado, cantidad in estados.most_common():
+            ok = estado in (202, 302)  # 200 = la vista devolvió el formulario con un error
+            linea = f"  {estado}: {cantidad}"
+            self.stdout.write(self.style.SUCCESS(linea) if ok else self.style.ERROR(linea))
+        return {'por_segundo': total / segundos, 'p95': p95}
+
+    def limpiar(self, ultima_auditoria, ultimo_trabajo):
+        creadas = list(Auditoria.objects.filter(id__gt=ultima_auditoria))
+        hashes = {a.hash_archivo for a in creadas}
+        for auditoria in creadas:
+            descartar_auditoria(auditoria)
+        TrabajoAuditoria.objects.filter(id__gt=ultimo_trabajo).delete()
+        CacheExtraccion.objects.filter(hash_archivo__in=hashes).delete()
+        self.stdout.write(f"  Limpieza: {len(creadas)} auditorías de prueba borradas")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auditoria.reauditoria import TAMANO_LOTE, VersionRegistroDesconocida, reauditar
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelve a decidir el veredicto (FRAUDE/APROBADO) de las auditorías cuya regla o foto del RUNT "
+        "cambió desde que se auditaron, con la placa ya leída (sin repetir el OCR)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=1, help="Procesos en paralelo (cada uno toma lotes completos).")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Auditorías por lote (una consulta al RUNT y una transacción).")
+        parser.add_argument('--simular', action='store_true', help="Solo contar qué cambiaría, sin escribir.")
+        parser.add_argument('--forzar', action='store_true', help="Revisar todas las auditorías con placa, aunque sus versiones estén al día.")
+
+    def handle(self, *args, **opciones):
+        prefijo = "[simulación] " if opciones['simular'] else ""
+
+        def progreso(revisadas, total, cambiadas):
+            self.stdout.write(f"  {revisadas}/{total} revisadas | {cambiadas} cambiaron")
+
+        try:
+            reporte = reauditar(
+                tamano_lote=max(1, opciones['lote']), procesos=max(1, opciones['procesos']),
+                simular=opciones['simular'], forzar=opciones['forzar'], progreso=progreso,
+            )
+        except VersionRegistroDesconocida as error:
+            raise CommandError(f"{error} (--forzar)")
+
+        for (antes, despues), cantidad in sorted(reporte['transiciones'].items()):
+            self.stdout.write(f"  {antes} -> {despues}: {cantidad}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}Regla {reporte['regla']} / RUNT {reporte['registro']}: {reporte['revisadas']} revisadas, "
+            f"{reporte['cambiadas']} cambiaron de veredicto en {reporte['segundos']:.2f}s"
+        ))
+        if reporte['sin_verificar']:
+            self.stdout.write(self.style.WARNING(
+                f"{reporte['sin_verificar']} no se pudieron verificar en el RUNT: quedan como estaban "
+                "y se revisarán en la próxima pasada."
+            ))
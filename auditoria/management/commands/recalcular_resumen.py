@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from auditoria.resumen import recalcular_resumen
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los contadores diarios del dashboard (ResumenDiario) desde la tabla de auditorías."
+
+    def handle(self, *args, **opciones):
+        dias = recalcular_resumen()
+        self.stdout.write(self.style.SUCCESS(f"Resumen recalculado: {dias} día(s)"))
@@ -0,0 +1,253 @@
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+
+from .OCR.motor_ocr import leer_configuracion, obtener_pool
+from .OCR.preprocesamiento import PICOS_POR_ETAPA
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# TIEMPOS POR ETAPA Y MÉTRICAS PROMETHEUS
+# ---------------------------------------------------------
+# Cada etapa del pipeline se mide con `medir_etapa` (OCR/preprocesamiento.py):
+#   guardar_archivo, cache, pdfplumber, clasificacion, rasterizar/decodificar,
+#   enderezar, binarizar, ocr_regiones, ocr, extraccion, runt, bd (y espera_cola en modo asíncrono)
+# Los tiempos de cada documento se guardan en `Auditoria.tiempos` y se acumulan en
+# histogramas en memoria que la vista /metrics expone en formato de texto de Prometheus,
+# junto con el mayor RSS pico del proceso al terminar cada etapa. Los picos viajan con el
+# resultado ('picos_rss', ver `picos_por_etapa`): el OCR suele correr en otro proceso.
+# Los histogramas viven en la memoria de cada proceso. Con varios workers de gunicorn /
+# uvicorn detrás de un mismo puerto, cada scrape cae en un worker al azar: los contadores
+# saltarían de uno a otro (y bajarían). Para eso está METRICAS_DIRECTORIO: cada proceso
+# vuelca su estado a un archivo propio de esa carpeta en cada documento y /metrics suma
+# todos los archivos (los de workers que ya murieron también: los contadores no bajan).
+# Vacíe la carpeta al reiniciar el servicio. Sin carpeta, /metrics es solo del proceso
+# que atiende (sirve con un solo worker, o con `procesar_cola --metricas-puerto`, que
+# abre un puerto por proceso).
+
+# Límites superiores (segundos) de las cubetas: de 5 ms (texto nativo) a 1 min (OCR en CPU)
+CUBETAS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histograma:
+    """Histograma acumulativo al estilo Prometheus (cuenta por cubeta, suma y total)."""
+
+    def __init__(self, cubetas=CUBETAS):
+        self.cubetas = tuple(cubetas)
+        self.cuentas = [0] * len(self.cubetas)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.cubetas):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+    def acumuladas(self):
+        """(límite, observaciones <= límite) por cubeta, como las reporta Prometheus."""
+        acumulado = 0
+        for limite, cuenta in zip(self.cubetas, self.cuentas):
+            acumulado += cuenta
+            yield limite, acumulado
+
+
+_candado = threading.Lock()
+_histogramas = {}  # etapa -> Histograma
+_documentos = Counter()  # (origen, exito) -> documentos analizados
+_picos = {}  # etapa -> mayor RSS pico (MB) de los documentos registrados
+_archivo = {'pid': None, 'ruta': None}  # Archivo de este proceso en METRICAS_DIRECTORIO
+
+
+def tiempos_por_etapa(mediciones, repartir=1):
+    """Suma por etapa (segundos, redondeados a 0.1 ms) de una lista de `medir_etapa`, dividida entre `repartir`."""
+    tiempos = {}
+    for medicion in mediciones:
+        tiempos[medicion['etapa']] = tiempos.get(medicion['etapa'], 0.0) + medicion['segundos']
+    return {etapa: round(segundos / repartir, 4) for etapa, segundos in tiempos.items()}
+
+
+def picos_por_etapa(mediciones):
+    """Mayor RSS pico (MB, redondeado a 0.1) al terminar cada etapa, de una lista de `medir_etapa`."""
+    picos = {}
+    for medicion in mediciones:
+        picos[medicion['etapa']] = max(picos.get(medicion['etapa'], 0.0), medicion['rss_pico_mb'])
+    return {etapa: round(pico, 1) for etapa, pico in picos.items()}
+
+
+def _acumular_picos(total, picos):
+    for etapa, pico in picos.items():
+        total[etapa] = max(total.get(etapa, 0.0), pico)
+
+
+def _acumular(tiempos):
+    for etapa, segundos in tiempos.items():
+        histograma = _histogramas.get(etapa)
+        if histograma is None:
+            histograma = _histogramas[etapa] = Histograma()
+        histograma.observar(segundos)
+
+
+def observar(tiempos):
+    """Acumula en los histogramas los tiempos (etapa -> segundos) de un documento."""
+    with _candado:
+        _acumular(tiempos)
+        _volcar()
+
+
+def registrar_resultado(resultado_ocr):
+    """Cuenta un documento analizado y acumula los tiempos de sus etapas."""
+    origen = resultado_ocr.get('origen') if resultado_ocr['exito'] else 'sin lectura'
+    with _candado:
+        _acumular(resultado_ocr.get('tiempos') or {})
+        _acumular_picos(_picos, resultado_ocr.get('picos_rss') or {})
+        _documentos[(origen or 'desconocido', bool(resultado_ocr['exito']))] += 1
+        _volcar()
+
+
+def reiniciar_metricas():
+    with _candado:
+        _histogramas.clear()
+        _documentos.clear()
+        _picos.clear()
+        _archivo.update(pid=None, ruta=None)
+
+
+# --- Estado compartido entre procesos (METRICAS_DIRECTORIO) ---
+
+def _estado():
+    """Estado de este proceso como datos simples (JSON). Llamar con `_candado` tomado."""
+    pool = obtener_pool().metricas()
+    picos = dict(_picos)
+    _acumular_picos(picos, PICOS_POR_ETAPA)  # Lo medido en este mismo proceso
+    return {
+        'histogramas': {etapa: [h.cuentas, h.suma, h.total] for etapa, h in _histogramas.items()},
+        'documentos': [[origen, exito, cantidad] for (origen, exito), cantidad in _documentos.items()],
+        'picos_rss': picos,
+        'modelo_cargado': int(pool['cargado']),
+        'espera_cupo': pool['segundos_espera_cupo'],
+    }
+
+
+def _volcar():
+    """Escribe el estado de este proceso en su archivo de METRICAS_DIRECTORIO (si hay). Con `_candado` tomado."""
+    directorio = leer_configuracion('METRICAS_DIRECTORIO', '')
+    if not directorio:
+        return
+    if _archivo['pid'] != os.getpid():
+        # Nombre único por proceso (no solo el pid: se reutiliza y pisaría el de un worker muerto)
+        nombre = f"metricas_{os.getpid()}_{uuid.uuid4().hex[:8]}.json"
+        _archivo.update(pid=os.getpid(), ruta=os.path.join(directorio, nombre))
+    temporal = _archivo['ruta'] + '.tmp'
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(_estado(), f)
+        os.replace(temporal, _archivo['ruta'])  # Quien lee nunca ve un archivo a medias
+    except OSError:
+        logger.warning("No se pudieron volcar las métricas a %s", directorio, exc_info=True)
+
+
+def _sumar(total, estado):
+    """Suma `estado` (de `_estado`) sobre `total`."""
+    for etapa, (cuentas, suma, conteo) in estado['histogramas'].items():
+        acumulado = total['histogramas'].setdefault(etapa, [[0] * len(CUBETAS), 0.0, 0])
+        acumulado[0] = [a + b for a, b in zip(acumulado[0], cuentas)]
+        acumulado[1] += suma
+        acumulado[2] += conteo
+    for origen, exito, cantidad in estado['documentos']:
+        total['documentos'][(origen, exito)] += cantidad
+    _acumular_picos(total['picos_rss'], estado.get('picos_rss', {}))  # El peor proceso, no la suma
+    total['modelo_cargado'] += estado['modelo_cargado']
+    total['espera_cupo'] += estado['espera_cupo']
+
+
+def _estado_total():
+    """Estado de este proceso más el de los archivos de los demás en METRICAS_DIRECTORIO."""
+    total = {'histogramas': {}, 'documentos': Counter(), 'picos_rss': {}, 'modelo_cargado': 0, 'espera_cupo': 0.0}
+    with _candado:
+        _sumar(total, _estado())
+        propio = _archivo['ruta'] if _archivo['pid'] == os.getpid() else None
+    directorio = leer_configuracion('METRICAS_DIRECTORIO', '')
+    if directorio and os.path.isdir(directorio):
+        for ruta in glob.glob(os.path.join(directorio, 'metricas_*.json')):
+            if ruta == propio:
+                continue
+            try:
+                with open(ruta, encoding='utf-8') as f:
+                    _sumar(total, json.load(f))
+            except (OSError, ValueError, KeyError, TypeError):
+                logger.warning("Archivo de métricas ilegible: %s", ruta)
+    return total
+
+
+# --- Exposición en formato de texto de Prometheus (versión 0.0.4) ---
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exponer():
+    """
+    Texto de /metrics: histogramas y RSS pico por etapa, documentos por origen y estado del pool OCR.
+    De este proceso más los de METRICAS_DIRECTORIO.
+    """
+    estado = _estado_total()
+    histogramas = {}
+    for etapa, (cuentas, suma, total) in sorted(estado['histogramas'].items()):
+        histograma = Histograma()
+        histograma.cuentas = cuentas
+        histogramas[etapa] = (list(histograma.acumuladas()), suma, total)
+    documentos = sorted(estado['documentos'].items())
+
+    lineas = [
+        "# HELP soat_etapa_segundos Duración de cada etapa del pipeline de auditoría por documento.",
+        "# TYPE soat_etapa_segundos histogram",
+    ]
+    for etapa, (cubetas, suma, total) in histogramas.items():
+        etapa = _etiqueta(etapa)
+        for limite, acumulado in cubetas:
+            lineas.append(f'soat_etapa_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}')
+        lineas.append(f'soat_etapa_segundos_bucket{{etapa="{etapa}",le="+Inf"}} {total}')
+        lineas.append(f'soat_etapa_segundos_sum{{etapa="{etapa}"}} {_numero(suma)}')
+        lineas.append(f'soat_etapa_segundos_count{{etapa="{etapa}"}} {total}')
+
+    lineas += [
+        "# HELP soat_etapa_rss_pico_megabytes Mayor RSS pico de un proceso al terminar cada etapa.",
+        "# TYPE soat_etapa_rss_pico_megabytes gauge",
+    ]
+    for etapa, pico in sorted(estado['picos_rss'].items()):
+        lineas.append(f'soat_etapa_rss_pico_megabytes{{etapa="{_etiqueta(etapa)}"}} {_numero(float(pico))}')
+
+    lineas += [
+        "# HELP soat_documentos_total Documentos analizados por origen del texto.",
+        "# TYPE soat_documentos_total counter",
+    ]
+    for (origen, exito), cantidad in documentos:
+        lineas.append(f'soat_documentos_total{{origen="{_etiqueta(origen)}",exito="{str(exito).lower()}"}} {cantidad}')
+
+    # Solo contadores del pool: reportar no carga EasyOCR
+    lineas += [
+        "# HELP soat_ocr_modelo_cargado Procesos con EasyOCR ya cargado (1 o 0 sin METRICAS_DIRECTORIO).",
+        "# TYPE soat_ocr_modelo_cargado gauge",
+        f"soat_ocr_modelo_cargado {estado['modelo_cargado']}",
+        "# HELP soat_ocr_espera_cupo_segundos_total Tiempo esperando un cupo libre del pool OCR.",
+        "# TYPE soat_ocr_espera_cupo_segundos_total counter",
+        f"soat_ocr_espera_cupo_segundos_total {_numero(estado['espera_cupo'])}",
+    ]
+    return "\n".join(lineas) + "\n"
+
@@ -0,0 +1,30 @@
+# Generated by Django 5.1 on 2026-10-18 13:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'En cola'), ('PROCESANDO', 'Procesando'), ('TERMINADO', 'Terminado'), ('ERROR', 'Error')], db_index=True, default='PENDIENTE', max_length=20)),
+                ('mensaje', models.CharField(blank=True, default='', max_length=255)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('auditoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos', to='auditoria.auditoria')),
+            ],
+            options={
+                'ordering': ['fecha_creacion'],
+            },
+        ),
+    ]
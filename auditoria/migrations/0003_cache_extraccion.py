@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0002_trabajoauditoria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditoria',
+            name='hash_archivo',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='CacheExtraccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash_archivo', models.CharField(max_length=64)),
+                ('version_pipeline', models.CharField(max_length=20)),
+                ('placa', models.CharField(max_length=10)),
+                ('monto', models.CharField(blank=True, default='', max_length=50)),
+                ('origen', models.CharField(blank=True, default='', max_length=30)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('ultimo_acceso', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('aciertos', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hash_archivo', 'version_pipeline'), name='cache_unica_por_contenido')],
+            },
+        ),
+    ]
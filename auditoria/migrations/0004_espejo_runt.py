@@ -0,0 +1,36 @@
+# Generated by Django 5.1 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0003_cache_extraccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SincronizacionRunt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('fuente', models.CharField(max_length=255)),
+                ('incremental', models.BooleanField(default=False)),
+                ('registros', models.PositiveIntegerField(default=0)),
+                ('marca_actualizacion', models.CharField(blank=True, default='', max_length=40)),
+            ],
+            options={
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VehiculoRunt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('placa', models.CharField(max_length=10, unique=True)),
+                ('datos', models.JSONField(default=dict)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0004_espejo_runt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaRunt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('placa', models.CharField(max_length=10, unique=True)),
+                ('existe', models.BooleanField()),
+                ('datos', models.JSONField(blank=True, null=True)),
+                ('expira', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0005_consulta_runt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditoria',
+            name='pagina_soat',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
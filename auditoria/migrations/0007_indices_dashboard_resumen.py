@@ -0,0 +1,62 @@
+# Generated by Django 5.1 on 2026-10-18 13:42
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+CAMPOS = {'PENDIENTE': 'pendientes', 'APROBADO': 'aprobados', 'FRAUDE': 'fraudes'}
+
+
+def poblar_resumen(apps, schema_editor):
+    # Contadores iniciales a partir de las auditorías que ya existen
+    Auditoria = apps.get_model('auditoria', 'Auditoria')
+    ResumenDiario = apps.get_model('auditoria', 'ResumenDiario')
+
+    por_dia = defaultdict(dict)
+    filas = (
+        Auditoria.objects.annotate(dia=TruncDate('fecha_creacion'))
+        .values('dia', 'resultado').annotate(cantidad=Count('id')).order_by()
+    )
+    for fila in filas:
+        if fila['resultado'] in CAMPOS:
+            por_dia[fila['dia']][CAMPOS[fila['resultado']]] = fila['cantidad']
+    ResumenDiario.objects.bulk_create([ResumenDiario(fecha=dia, **campos) for dia, campos in por_dia.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0006_pagina_soat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('pendientes', models.PositiveIntegerField(default=0)),
+                ('aprobados', models.PositiveIntegerField(default=0)),
+                ('fraudes', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='auditoria',
+            name='placa_detectada',
+            field=models.CharField(blank=True, db_index=True, max_length=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='auditoria',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='auditoria_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditoria',
+            index=models.Index(fields=['resultado', '-fecha_creacion', '-id'], name='auditoria_resultado_fecha_idx'),
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0007_indices_dashboard_resumen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditoria',
+            name='origen',
+            field=models.CharField(blank=True, default='', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='auditoria',
+            name='tiempos',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1 on 2026-10-18 14:34
+
+import re
+
+from django.db import migrations, models
+
+
+def normalizar_montos(apps, schema_editor):
+    # Antes el monto era texto: lo que no quede como número entero pasa a NULL
+    Auditoria = apps.get_model('auditoria', 'Auditoria')
+    for id_auditoria, monto in Auditoria.objects.exclude(monto_detectado=None).values_list('id', 'monto_detectado').iterator():
+        digitos = re.sub(r'\D', '', str(monto))
+        if not digitos or digitos != monto:
+            Auditoria.objects.filter(pk=id_auditoria).update(monto_detectado=digitos or None)
+    # La cache se regenera sola (además cambió VERSION_PIPELINE)
+    apps.get_model('auditoria', 'CacheExtraccion').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0008_tiempos_por_etapa'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_montos, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='auditoria',
+            name='confianza',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auditoria',
+            name='evidencia',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cacheextraccion',
+            name='confianza',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cacheextraccion',
+            name='evidencia',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='auditoria',
+            name='monto_detectado',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cacheextraccion',
+            name='monto',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
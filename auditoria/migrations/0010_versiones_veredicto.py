@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0009_evidencia_ocr_monto_entero'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditoria',
+            name='version_registro',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='auditoria',
+            name='version_regla',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
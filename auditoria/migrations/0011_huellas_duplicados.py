@@ -0,0 +1,50 @@
+# Generated by Django 5.1 on 2026-10-18 14:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0010_versiones_veredicto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HuellaAuditoria',
+            fields=[
+                ('auditoria', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='huella', serialize=False, to='auditoria.auditoria')),
+                ('texto', models.BinaryField(blank=True, null=True)),
+                ('imagen', models.BigIntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='auditoria',
+            name='duplicado_de',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicados', to='auditoria.auditoria'),
+        ),
+        migrations.AddField(
+            model_name='auditoria',
+            name='tipo_duplicado',
+            field=models.CharField(blank=True, choices=[('ARCHIVO', 'Mismo archivo'), ('TEXTO', 'Mismo contenido'), ('IMAGEN', 'Misma placa e imagen'), ('PLACA', 'Misma placa')], db_index=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='cacheextraccion',
+            name='huella_imagen',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cacheextraccion',
+            name='huella_texto',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='BandaTexto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.BigIntegerField(db_index=True)),
+                ('auditoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bandas_texto', to='auditoria.auditoria')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0011_huellas_duplicados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sincronizacionrunt',
+            name='eliminados',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
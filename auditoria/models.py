@@ -8,8 +8,14 @@ class Auditoria(models.Model):
     archivo_soat = models.FileField(upload_to='soportes_soat/') 
     
     # Datos que la IA va a "leer" (al principio estarán vacíos)
-    placa_detectada = models.CharField(max_length=10, blank=True, null=True)
-    monto_detectado = models.CharField(max_length=50, blank=True, null=True)
+    placa_detectada = models.CharField(max_length=10, blank=True, null=True, db_index=True)
+    monto_detectado = models.PositiveIntegerField(blank=True, null=True)
+
+    # Confianza del OCR en la placa/monto (0 a 1; None si salieron del texto nativo o de las
+    # regiones) y las palabras de la página con caja y confianza (blob de OCR/palabras.py):
+    # con esto una lectura dudosa se vuelve a puntuar sin repetir el OCR
+    confianza = models.FloatField(blank=True, null=True, db_index=True)
+    evidencia = models.BinaryField(blank=True, null=True)
     
     # El veredicto del sistema
     RESULTADOS = [
@@ -19,5 +25,189 @@ class Auditoria(models.Model):
     ]
     resultado = models.CharField(max_length=20, choices=RESULTADOS, default='PENDIENTE')
 
+    # Con qué se decidió el veredicto: versión de la regla (procesamiento.VERSION_REGLA) y
+    # foto del RUNT (runt.version_registro). `manage.py reaudit` revisa las que quedaron viejas
+    version_regla = models.CharField(max_length=20, blank=True, default='')
+    version_registro = models.CharField(max_length=40, blank=True, default='')
+
+    # SHA-256 del archivo: permite reutilizar el archivo guardado y el resultado del OCR
+    hash_archivo = models.CharField(max_length=64, blank=True, default='', db_index=True)
+
+    # Página del PDF donde está la póliza (un PDF multipóliza genera una auditoría por póliza)
+    pagina_soat = models.PositiveSmallIntegerField(default=1)
+
+    # De dónde salió el texto (Digital, OCR Scan, OCR Imagen...) y segundos por etapa del
+    # pipeline ({'pdfplumber': 0.012, 'ocr': 3.4, 'runt': 0.2, ...}, ver metricas.py)
+    origen = models.CharField(max_length=30, blank=True, default='')
+    tiempos = models.JSONField(default=dict, blank=True)
+
+    # Auditoría anterior de la que esta parece una copia y por qué (ver duplicados.py).
+    # Si hay varias, se marca la más fuerte: mismo archivo > misma póliza (texto) > misma
+    # placa y misma página (imagen) > solo la misma placa
+    DUPLICADOS = [
+        ('ARCHIVO', 'Mismo archivo'),
+        ('TEXTO', 'Mismo contenido'),
+        ('IMAGEN', 'Misma placa e imagen'),
+        ('PLACA', 'Misma placa'),
+    ]
+    tipo_duplicado = models.CharField(max_length=10, choices=DUPLICADOS, blank=True, default='', db_index=True)
+    duplicado_de = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicados',
+    )
+
+    class Meta:
+        indexes = [
+            # Dashboard: paginación por cursor (ORDER BY fecha_creacion DESC, id DESC), con o sin filtro de resultado
+            models.Index(fields=['-fecha_creacion', '-id'], name='auditoria_fecha_id_idx'),
+            models.Index(fields=['resultado', '-fecha_creacion', '-id'], name='auditoria_resultado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Auditoria {self.id} - {self.fecha_creacion}"
+
+class TrabajoAuditoria(models.Model):
+    """
+    Cola de trabajos en la base de datos (sin broker externo).
+    Cada carga crea un trabajo PENDIENTE y el comando `procesar_cola`
+    ejecuta el OCR + la consulta al RUNT por fuera de la petición web.
+    """
+    ESTADOS = [
+        ('PENDIENTE', 'En cola'),
+        ('PROCESANDO', 'Procesando'),
+        ('TERMINADO', 'Terminado'),
+        ('ERROR', 'Error'),
+    ]
+
+    # Si la lectura falla borramos la auditoría, pero el trabajo se queda para informar el error
+    auditoria = models.ForeignKey(Auditoria, on_delete=models.SET_NULL, null=True, blank=True, related_name='trabajos')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='PENDIENTE', db_index=True)
+    mensaje = models.CharField(max_length=255, blank=True, default='')
+    intentos = models.PositiveSmallIntegerField(default=0)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['fecha_creacion']
+
+    def __str__(self):
+        return f"Trabajo {self.id} - {self.estado}"
+
+
+class CacheExtraccion(models.Model):
+    """
+    Resultado de extracción guardado por contenido del archivo (SHA-256 + versión del pipeline).
+    Si el mismo SOAT se vuelve a subir, no repetimos pdfplumber / EasyOCR / spaCy.
+    """
+    hash_archivo = models.CharField(max_length=64)
+    version_pipeline = models.CharField(max_length=20)
+
+    placa = models.CharField(max_length=10)
+    monto = models.PositiveIntegerField(blank=True, null=True)
+    origen = models.CharField(max_length=30, blank=True, default='')
+    confianza = models.FloatField(blank=True, null=True)
+    evidencia = models.BinaryField(blank=True, null=True)
+    huella_texto = models.BinaryField(blank=True, null=True)
+    huella_imagen = models.BigIntegerField(blank=True, null=True)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    ultimo_acceso = models.DateTimeField(auto_now_add=True, db_index=True)  # Para el desalojo LRU / TTL
+    aciertos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hash_archivo', 'version_pipeline'], name='cache_unica_por_contenido'),
+        ]
+
+    def __str__(self):
+        return f"Cache {self.hash_archivo[:12]} - {self.placa}"
+
+
+class HuellaAuditoria(models.Model):
+    """
+    Huellas de la página de la póliza, calculadas al leerla (OCR/huellas.py): MinHash del
+    texto propio de la póliza y pHash de la imagen. Se comparan sin volver a abrir el archivo.
+    """
+    auditoria = models.OneToOneField(Auditoria, on_delete=models.CASCADE, primary_key=True, related_name='huella')
+    texto = models.BinaryField(blank=True, null=True)  # uint32[NUM_PERMUTACIONES]
+    imagen = models.BigIntegerField(blank=True, null=True)  # 64 bits, con signo
+
+    def __str__(self):
+        return f"Huella de la auditoría {self.auditoria_id}"
+
+
+class BandaTexto(models.Model):
+    """
+    Índice LSH de las huellas de texto: una fila por banda de la firma. Las auditorías que
+    comparten alguna clave con una carga nueva son las únicas candidatas a duplicado.
+    """
+    auditoria = models.ForeignKey(Auditoria, on_delete=models.CASCADE, related_name='bandas_texto')
+    clave = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"Banda {self.clave} - auditoría {self.auditoria_id}"
+
+
+class VehiculoRunt(models.Model):
+    """
+    Copia local del dataset de vehículos del RUNT (datos.gov.co, g7i9-xkxz).
+    La placa va normalizada (mayúsculas, sin guiones ni espacios) y es única:
+    la consulta es una búsqueda por índice, sin llamar a la API.
+    """
+    placa = models.CharField(max_length=10, unique=True)
+    datos = models.JSONField(default=dict)  # Fila original: marca, modelo, clase, etc.
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.placa
+
+
+class SincronizacionRunt(models.Model):
+    """Bitácora de cada importación del espejo local del RUNT."""
+    fecha = models.DateTimeField(auto_now_add=True)
+    fuente = models.CharField(max_length=255)
+    incremental = models.BooleanField(default=False)
+    registros = models.PositiveIntegerField(default=0)
+    eliminados = models.PositiveIntegerField(default=0)  # Vehículos que ya no venían (solo importación completa)
+    # Mayor ':updated_at' de Socrata visto en esta importación (punto de partida de la siguiente)
+    marca_actualizacion = models.CharField(max_length=40, blank=True, default='')
+
+    class Meta:
+        ordering = ['-fecha']
+
+    def __str__(self):
+        return f"Sincronización {self.id} - {self.registros} registros"
+
+
+class ConsultaRunt(models.Model):
+    """Cache compartida (entre workers) de las respuestas de la API del RUNT, positivas y negativas."""
+    placa = models.CharField(max_length=10, unique=True)
+    existe = models.BooleanField()
+    datos = models.JSONField(null=True, blank=True)
+    expira = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.placa} - {'existe' if self.existe else 'no existe'}"
+
+
+class ResumenDiario(models.Model):
+    """
+    Contadores por día (de creación de la auditoría) y resultado, para el tablero.
+    Se mantienen al crear, cambiar de resultado o borrar auditorías (ver resumen.py),
+    así el dashboard no hace COUNT(*) sobre toda la tabla en cada visita.
+    """
+    fecha = models.DateField(unique=True)
+    pendientes = models.PositiveIntegerField(default=0)
+    aprobados = models.PositiveIntegerField(default=0)
+    fraudes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-fecha']
+
+    @property
+    def total(self):
+        return self.pendientes + self.aprobados + self.fraudes
+
     def __str__(self):
-        return f"Auditoria {self.id} - {self.fecha_creacion}"
\ No newline at end of file
+        return f"{self.fecha}: {self.fraudes} fraudes / {self.aprobados} aprobados"
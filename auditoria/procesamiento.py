@@ -0,0 +1,244 @@
+import copy
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Auditoria
+from .OCR.lector_soat import extraer_datos_soat, extraer_datos_soat_lote
+from .OCR.cliente_api import normalizar_placa
+from .runt import consultar_runt, consultar_runt_lote, version_registro
+from .resumen import registrar_creadas
+from .duplicados import registrar_huellas
+from .cache_contenido import calcular_hash, buscar_en_cache, guardar_en_cache, asignar_archivo_deduplicado
+from .metricas import observar, picos_por_etapa, registrar_resultado, tiempos_por_etapa
+from .OCR.preprocesamiento import medir_etapa, reiniciar_mediciones, ultimas_mediciones
+
+
+# Súbala cuando cambie `decidir_resultado`: `manage.py reaudit` vuelve a decidir las auditorías
+# con otra versión (sin repetir el OCR)
+VERSION_REGLA = "1"
+
+
+def decidir_resultado(api_check):
+    """
+    El Juez: si la placa está en la lista de activos del RUNT la marcamos FRAUDE
+    (lógica inversa, según la regla de negocio), si no, APROBADO.
+    """
+    return 'FRAUDE' if api_check['existe'] else 'APROBADO'
+
+
+def marcar_versiones(resultados, registro):
+    """Anota en cada resultado exitoso y sus pólizas con qué regla y qué foto del RUNT se decidió."""
+    for resultado_ocr in resultados:
+        for poliza in [resultado_ocr] + polizas_de(resultado_ocr):
+            poliza['version_regla'] = VERSION_REGLA
+            poliza['version_registro'] = registro
+
+
+def polizas_de(resultado_ocr):
+    """Pólizas de un resultado exitoso: la lista de 'polizas' (multipóliza) o el resultado mismo."""
+    return resultado_ocr.get('polizas') or [resultado_ocr]
+
+
+def mensaje_exito(resultado_ocr):
+    mensaje = f"¡Lectura exitosa! Placa: {resultado_ocr['placa']}"
+    adicionales = len(polizas_de(resultado_ocr)) - 1
+    if adicionales:
+        mensaje += f" (+{adicionales} póliza(s) más en el mismo PDF)"
+    return mensaje
+
+
+def verificar_en_runt(resultados):
+    """Llena 'resultado' en cada póliza de los resultados exitosos, con una sola consulta por lote."""
+    exitosos = [r for r in resultados if r['exito']]
+    polizas = [p for r in exitosos for p in polizas_de(r)]
+    if not polizas:
+        return
+    # La versión se toma antes de consultar: si el RUNT cambia en medio, la auditoría queda vieja
+    marcar_versiones(exitosos, version_registro())
+    # Validación API (El Juez)
+    if len(polizas) == 1:
+        verificaciones = {normalizar_placa(polizas[0]['placa']): consultar_runt(polizas[0]['placa'])}
+    else:
+        verificaciones = consultar_runt_lote([p['placa'] for p in polizas])
+    aplicar_veredictos(exitosos, verificaciones)
+
+
+def aplicar_veredictos(exitosos, verificaciones):
+    """
+    Decide cada póliza de los resultados exitosos con `verificaciones` {placa normalizada:
+    respuesta del RUNT}. Compartido con el camino asíncrono (asincrono.py), que consulta distinto.
+    """
+    for resultado_ocr in exitosos:
+        polizas = polizas_de(resultado_ocr)
+        for poliza in polizas:
+            poliza['resultado'] = decidir_resultado(verificaciones[normalizar_placa(poliza['placa'])])
+        resultado_ocr['resultado'] = polizas[0]['resultado']
+
+
+def analizar_archivo(ruta_archivo, hash_archivo=None, verificar_runt=True, multipoliza=None, registrar_metricas=True):
+    """
+    OCR + validación RUNT sobre un archivo en disco (se puede ejecutar en un proceso worker).
+    Antes de leer el archivo consulta la cache por contenido (SHA-256).
+    Retorna el diccionario de `extraer_datos_soat` más la clave 'resultado' si hubo éxito
+    y 'tiempos' (segundos por etapa).
+    Con `verificar_runt=False` solo extrae (la ingesta por lote consulta el RUNT de una vez).
+    """
+    return analizar_archivos([(ruta_archivo, hash_archivo)], verificar_runt, multipoliza, registrar_metricas)[0]
+
+
+def analizar_archivos(archivos, verificar_runt=True, multipoliza=None, registrar_metricas=True):
+    """
+    Versión por lote de `analizar_archivo`. `archivos`: lista de (ruta, hash_archivo o None).
+    Los que no están en cache se leen juntos (OCR agrupado) y el RUNT se consulta de una vez.
+    Con `multipoliza` (por defecto settings.SOAT_MULTIPOLIZA) cada resultado trae sus
+    'polizas' y no se usa la cache (solo guarda la primera póliza del archivo).
+    En un lote el OCR es compartido: el tiempo de cada etapa se reparte en partes iguales.
+    Con `registrar_metricas=False` no se acumulan en /metrics (ej: en un proceso hijo que
+    devuelve los resultados al padre, que es quien los registra).
+    Retorna la lista de resultados en el mismo orden.
+    """
+    if multipoliza is None:
+        multipoliza = settings.SOAT_MULTIPOLIZA
+
+    reiniciar_mediciones()
+    with medir_etapa('cache'):
+        hashes = [hash_archivo or calcular_hash(ruta) for ruta, hash_archivo in archivos]
+        resultados = [None if multipoliza else buscar_en_cache(hash_archivo) for hash_archivo in hashes]
+
+    # Archivos idénticos dentro del lote: se lee el primero y los demás toman su resultado
+    primero_con_hash = {}
+    for i, resultado in enumerate(resultados):
+        if resultado is None:
+            primero_con_hash.setdefault(hashes[i], i)
+    faltantes = list(primero_con_hash.values())
+    if len(faltantes) == 1:
+        # Un solo documento: lectura perezosa directa, sin preparar un lote
+        lecturas = [extraer_datos_soat(archivos[faltantes[0]][0], multipoliza)]
+    elif faltantes:
+        lecturas = extraer_datos_soat_lote([archivos[i][0] for i in faltantes], multipoliza)
+    else:
+        lecturas = []
+    with medir_etapa('cache'):
+        for i, resultado_ocr in zip(faltantes, lecturas):
+            guardar_en_cache(hashes[i], resultado_ocr)
+            resultados[i] = resultado_ocr
+        for i, resultado in enumerate(resultados):
+            if resultado is None:
+                resultados[i] = copia_de_resultado(resultados[primero_con_hash[hashes[i]]])
+
+    if verificar_runt:
+        with medir_etapa('runt'):
+            verificar_en_runt(resultados)
+
+    mediciones = ultimas_mediciones()
+    tiempos = tiempos_por_etapa(mediciones, repartir=len(archivos))
+    picos = picos_por_etapa(mediciones)
+    for resultado_ocr in resultados:
+        resultado_ocr['tiempos'] = dict(tiempos)
+        resultado_ocr['picos_rss'] = dict(picos)
+        if registrar_metricas:
+            registrar_resultado(resultado_ocr)
+    return resultados
+
+
+def copia_de_resultado(resultado_ocr):
+    """Resultado de un archivo idéntico a otro ya leído (cada auditoría necesita su propio diccionario)."""
+    copia = copy.deepcopy(resultado_ocr)
+    if copia['exito']:
+        copia['desde_cache'] = True
+    return copia
+
+
+def auditorias_adicionales(auditoria, resultado_ocr):
+    """Auditorías (sin guardar) para las pólizas 2..n de un PDF multipóliza, con el mismo archivo."""
+    return [
+        Auditoria(
+            archivo_soat=auditoria.archivo_soat.name,
+            hash_archivo=auditoria.hash_archivo,
+            placa_detectada=poliza['placa'],
+            monto_detectado=poliza['monto'],
+            resultado=poliza.get('resultado', 'PENDIENTE'),
+            pagina_soat=poliza['pagina'],
+            origen=poliza.get('origen', '')[:30],
+            version_regla=poliza.get('version_regla', ''),
+            version_registro=poliza.get('version_registro', ''),
+            confianza=poliza.get('confianza'),
+            evidencia=poliza.get('evidencia'),
+            tiempos=dict(auditoria.tiempos),
+        )
+        for poliza in polizas_de(resultado_ocr)[1:]
+    ]
+
+
+def guardar_resultado(auditoria, resultado_ocr):
+    """
+    Llena placa, monto, resultado, página, origen, evidencia y tiempos de la auditoría, crea las de
+    las demás pólizas e indexa sus huellas (marcando duplicados, ver duplicados.py), todo en una
+    sola transacción (un solo turno del bloqueo de escritura en SQLite). La etapa 'bd' va solo a /metrics: no cabe en la fila que se está escribiendo.
+    """
+    auditoria.placa_detectada = resultado_ocr['placa']
+    auditoria.monto_detectado = resultado_ocr['monto']
+    auditoria.resultado = resultado_ocr['resultado']
+    auditoria.version_regla = resultado_ocr.get('version_regla', '')
+    auditoria.version_registro = resultado_ocr.get('version_registro', '')
+    auditoria.pagina_soat = resultado_ocr.get('pagina', 1)
+    auditoria.origen = (resultado_ocr.get('origen') or '')[:30]
+    auditoria.confianza = resultado_ocr.get('confianza')
+    auditoria.evidencia = resultado_ocr.get('evidencia')
+    # Se suman a las etapas previas de la carga (guardar_archivo, espera_cola)
+    auditoria.tiempos = {**auditoria.tiempos, **resultado_ocr.get('tiempos', {})}
+
+    inicio = time.perf_counter()
+    with transaction.atomic():
+        auditoria.save()
+        adicionales = auditorias_adicionales(auditoria, resultado_ocr)
+        if adicionales:
+            Auditoria.objects.bulk_create(adicionales)
+            registrar_creadas(adicionales)
+        registrar_huellas(list(zip([auditoria] + adicionales, polizas_de(resultado_ocr))))
+    observar({'bd': time.perf_counter() - inicio})
+
+
+def procesar_auditoria(auditoria):
+    """
+    Ejecuta OCR + validación RUNT sobre una auditoría que ya tiene su archivo en disco.
+    Llena placa, monto y resultado y guarda el registro.
+    Retorna el diccionario de `extraer_datos_soat` (con 'exito' y 'mensaje').
+    """
+    resultado_ocr = analizar_archivo(auditoria.archivo_soat.path, auditoria.hash_archivo)
+
+    if resultado_ocr['exito']:
+        guardar_resultado(auditoria, resultado_ocr)
+
+    return resultado_ocr
+
+
+def guardar_archivo_carga(auditoria, archivo):
+    """Pone el archivo subido en soportes_soat/ (o reutiliza una copia idéntica) y mide la etapa 'guardar_archivo'."""
+    inicio = time.perf_counter()
+    asignar_archivo_deduplicado(auditoria, archivo)
+    tiempos = {'guardar_archivo': round(time.perf_counter() - inicio, 4)}
+    auditoria.tiempos = {**(auditoria.tiempos or {}), **tiempos}
+    observar(tiempos)
+    return auditoria
+
+
+def procesar_auditorias(auditorias):
+    """`procesar_auditoria` para varias auditorías a la vez (OCR agrupado). Retorna sus resultados."""
+    resultados = analizar_archivos([(a.archivo_soat.path, a.hash_archivo) for a in auditorias])
+
+    for auditoria, resultado_ocr in zip(auditorias, resultados):
+        if resultado_ocr['exito']:
+            guardar_resultado(auditoria, resultado_ocr)
+
+    return resultados
+
+
+def descartar_auditoria(auditoria):
+    """
+    Borra el registro de una lectura fallida. El archivo no se toca aquí: otra carga del
+    mismo contenido puede estar usándolo; si quedó huérfano lo borra `barrer_soportes`.
+    """
+    auditoria.delete()
@@ -0,0 +1,134 @@
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.db import connections, transaction
+
+from .models import Auditoria
+from .OCR.cliente_api import normalizar_placa
+from .procesamiento import VERSION_REGLA, decidir_resultado
+from .resumen import aplicar_cambios, dia_de
+from .runt import consultar_runt_lote, version_registro
+
+# ---------------------------------------------------------
+# RE-AUDITORÍA CUANDO CAMBIA LA REGLA O EL RUNT
+# ---------------------------------------------------------
+# El veredicto (FRAUDE / APROBADO) se decide una vez, al cargar. Cada auditoría guarda
+# con qué se decidió: VERSION_REGLA y la foto del RUNT (runt.version_registro). Cuando
+# alguna cambia, `manage.py reaudit` vuelve a decidir desde la placa guardada, sin OCR:
+# 1. Solo entran las auditorías con placa y alguna versión distinta de la actual.
+# 2. Se reparten por lotes de ids entre procesos; cada lote es una consulta al RUNT
+#    (consultar_runt_lote) y una transacción: UPDATE de las versiones de todo el lote y
+#    bulk_update del resultado solo de las que cambiaron.
+# 3. Los contadores del tablero (ResumenDiario) se ajustan con los cambios de cada lote
+#    (bulk_update no dispara las señales).
+# Si no se sabe la foto actual del RUNT (la API no dio sus metadatos) no se re-audita:
+# todo parecería desactualizado. Con `forzar` sí, y se anota la versión vacía.
+# Con la API, las placas se consultan sin cache (una respuesta guardada puede ser de antes
+# de la foto que se va a anotar) y en modo estricto: si la API falla, esas auditorías
+# quedan como estaban y sin la versión nueva, para que la siguiente pasada las revise.
+
+TAMANO_LOTE = 1000
+
+
+class VersionRegistroDesconocida(Exception):
+    """No se pudo identificar la foto actual del RUNT (runt.version_registro vacía)."""
+
+
+CAMPOS_LECTURA = ('id', 'fecha_creacion', 'placa_detectada', 'resultado')
+
+
+def con_placa():
+    return Auditoria.objects.exclude(placa_detectada__isnull=True).exclude(placa_detectada='')
+
+
+def desactualizadas(regla=VERSION_REGLA, registro=None):
+    """Auditorías con placa cuyo veredicto se decidió con otra regla u otra foto del RUNT."""
+    return con_placa().exclude(version_regla=regla, version_registro=registro or version_registro())
+
+
+def reauditar_lote(ids, regla, registro, simular=False):
+    """
+    Vuelve a decidir las auditorías de `ids`. Retorna (revisadas, Counter de (antes, después)
+    con solo los veredictos que cambiaron, sin verificar). Las que el RUNT no pudo verificar
+    no se tocan ni cuentan como revisadas.
+    """
+    auditorias = list(Auditoria.objects.filter(id__in=ids).only(*CAMPOS_LECTURA))
+    verificaciones = consultar_runt_lote([a.placa_detectada for a in auditorias], usar_cache=False, estricto=True)
+    verificadas = [a for a in auditorias if normalizar_placa(a.placa_detectada) in verificaciones]
+
+    cambiadas, transiciones, deltas = [], Counter(), Counter()
+    for auditoria in verificadas:
+        nuevo = decidir_resultado(verificaciones[normalizar_placa(auditoria.placa_detectada)])
+        if nuevo == auditoria.resultado:
+            continue
+        transiciones[(auditoria.resultado, nuevo)] += 1
+        dia = dia_de(auditoria.fecha_creacion)
+        deltas[(dia, auditoria.resultado)] -= 1
+        deltas[(dia, nuevo)] += 1
+        auditoria.resultado = nuevo
+        cambiadas.append(auditoria)
+
+    if not simular:
+        with transaction.atomic():
+            Auditoria.objects.filter(id__in=[a.id for a in verificadas]).update(
+                version_regla=regla, version_registro=registro,
+            )
+            Auditoria.objects.bulk_update(cambiadas, ['resultado'], batch_size=500)
+            aplicar_cambios(deltas)
+    return len(verificadas), transiciones, len(auditorias) - len(verificadas)
+
+
+def _inicializar_worker():
+    # Los procesos hijos no deben reutilizar las conexiones a la BD del padre
+    connections.close_all()
+
+
+def reauditar(tamano_lote=TAMANO_LOTE, procesos=1, simular=False, forzar=False, progreso=None):
+    """
+    Re-audita las auditorías desactualizadas (todas las que tienen placa con `forzar`).
+    `progreso(revisadas, total, cambiadas)` se llama al terminar cada lote.
+    Retorna {'total', 'revisadas', 'sin_verificar', 'cambiadas', 'transiciones', 'segundos',
+    'regla', 'registro'}.
+    """
+    inicio = time.perf_counter()
+    regla, registro = VERSION_REGLA, version_registro()
+    if not registro and not forzar:
+        raise VersionRegistroDesconocida(
+            "No se pudo identificar la versión actual del RUNT: sin ella todas las auditorías parecen "
+            "desactualizadas. Reintente, o use forzar para revisarlas todas."
+        )
+    consulta = con_placa() if forzar else desactualizadas(regla, registro)
+    ids = list(consulta.order_by('id').values_list('id', flat=True))
+    lotes = [ids[i:i + tamano_lote] for i in range(0, len(ids), tamano_lote)]
+
+    revisadas, sin_verificar, transiciones = 0, 0, Counter()
+
+    def recoger(revisadas_lote, transiciones_lote, sin_verificar_lote):
+        nonlocal revisadas, sin_verificar
+        revisadas += revisadas_lote
+        sin_verificar += sin_verificar_lote
+        transiciones.update(transiciones_lote)
+        if progreso:
+            progreso(revisadas, len(ids), sum(transiciones.values()))
+
+    if procesos <= 1 or len(lotes) <= 1:
+        for lote in lotes:
+            recoger(*reauditar_lote(lote, regla, registro, simular))
+    else:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_worker) as pool:
+            futuros = [pool.submit(reauditar_lote, lote, regla, registro, simular) for lote in lotes]
+            for futuro in as_completed(futuros):
+                recoger(*futuro.result())
+
+    return {
+        'total': len(ids),
+        'revisadas': revisadas,
+        'sin_verificar': sin_verificar,
+        'cambiadas': sum(transiciones.values()),
+        'transiciones': dict(transiciones),
+        'segundos': time.perf_counter() - inicio,
+        'regla': regla,
+        'registro': registro,
+    }
@@ -0,0 +1,106 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.utils import timezone
+
+from .models import Auditoria, ResumenDiario
+
+# ---------------------------------------------------------
+# CONTADORES DIARIOS DEL TABLERO (MANTENIDOS INCREMENTALMENTE)
+# ---------------------------------------------------------
+# Cada vez que una auditoría se crea, cambia de resultado o se borra, sumamos o
+# restamos 1 en la fila del día. Las señales cubren save()/delete(); bulk_create
+# no las dispara, así que esos lugares llaman a `registrar_creadas`.
+# `recalcular_resumen()` (manage.py recalcular_resumen) reconstruye todo desde cero.
+
+CAMPOS = {'PENDIENTE': 'pendientes', 'APROBADO': 'aprobados', 'FRAUDE': 'fraudes'}
+_DIFERIDO = object()  # _resultado_guardado de una instancia cargada sin la columna resultado
+
+
+def dia_de(fecha):
+    return timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+
+
+def aplicar_cambios(cambios):
+    """`cambios`: {(dia, resultado): delta}. Un UPDATE con F() por día (sin leer y reescribir)."""
+    por_dia = defaultdict(dict)
+    for (dia, resultado), delta in cambios.items():
+        campo = CAMPOS.get(resultado)
+        if campo and delta:
+            por_dia[dia][campo] = por_dia[dia].get(campo, 0) + delta
+
+    for dia, deltas in por_dia.items():
+        ResumenDiario.objects.get_or_create(fecha=dia)
+        ResumenDiario.objects.filter(fecha=dia).update(**{campo: F(campo) + delta for campo, delta in deltas.items()})
+
+
+def registrar_creadas(auditorias):
+    """Suma al resumen las auditorías creadas con bulk_create."""
+    aplicar_cambios(Counter((dia_de(a.fecha_creacion), a.resultado) for a in auditorias))
+    for auditoria in auditorias:
+        auditoria._resultado_guardado = auditoria.resultado
+
+
+def recalcular_resumen():
+    """Reconstruye todos los contadores con un GROUP BY (para arreglar desfases o poblarlos la primera vez)."""
+    filas = (
+        Auditoria.objects.annotate(dia=TruncDate('fecha_creacion'))
+        .values('dia', 'resultado').annotate(cantidad=Count('id')).order_by()
+    )
+    por_dia = defaultdict(dict)
+    for fila in filas:
+        campo = CAMPOS.get(fila['resultado'])
+        if campo:
+            por_dia[fila['dia']][campo] = fila['cantidad']
+
+    ResumenDiario.objects.all().delete()
+    ResumenDiario.objects.bulk_create([ResumenDiario(fecha=dia, **campos) for dia, campos in por_dia.items()])
+    return len(por_dia)
+
+
+# --- Señales ---
+
+def _recordar_resultado(sender, instance, **kwargs):
+    # Resultado que tiene la fila en la BD (None si es nueva, _DIFERIDO si se cargó sin esa columna)
+    if instance.pk is None:
+        instance._resultado_guardado = None
+    elif 'resultado' in instance.get_deferred_fields():
+        instance._resultado_guardado = _DIFERIDO
+    else:
+        instance._resultado_guardado = instance.resultado
+
+
+def _leer_diferido(sender, instance, update_fields=None, **kwargs):
+    # Cargada con .only()/.defer(): el resultado anterior se lee de la BD antes de pisarlo
+    if instance._resultado_guardado is not _DIFERIDO:
+        return
+    if update_fields is not None and 'resultado' not in update_fields:
+        return
+    instance._resultado_guardado = (
+        Auditoria.objects.filter(pk=instance.pk).values_list('resultado', flat=True).first()
+    )
+
+
+def _al_guardar(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'resultado' not in update_fields:
+        return
+    dia = dia_de(instance.fecha_creacion)
+    if created:
+        aplicar_cambios({(dia, instance.resultado): 1})
+    elif instance._resultado_guardado and instance._resultado_guardado != instance.resultado:
+        aplicar_cambios({(dia, instance._resultado_guardado): -1, (dia, instance.resultado): 1})
+    instance._resultado_guardado = instance.resultado
+
+
+def _al_borrar(sender, instance, **kwargs):
+    aplicar_cambios({(dia_de(instance.fecha_creacion), instance._resultado_guardado or instance.resultado): -1})
+
+
+def conectar_senales():
+    post_init.connect(_recordar_resultado, sender=Auditoria, dispatch_uid='resumen_init')
+    pre_save.connect(_leer_diferido, sender=Auditoria, dispatch_uid='resumen_pre_save')
+    pre_delete.connect(_leer_diferido, sender=Auditoria, dispatch_uid='resumen_pre_delete')
+    post_save.connect(_al_guardar, sender=Auditoria, dispatch_uid='resumen_save')
+    post_delete.connect(_al_borrar, sender=Auditoria, dispatch_uid='resumen_delete')
@@ -0,0 +1,333 @@
+import csv
+import json
+import logging
+import re
+import threading
+import time
+from datetime import timedelta
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import VehiculoRunt, SincronizacionRunt, ConsultaRunt
+from .OCR.cliente_api import URL_RUNT, ClienteRunt, ClienteRuntAsync, normalizar_placa
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# ESPEJO LOCAL DEL RUNT
+# ---------------------------------------------------------
+# `manage.py importar_runt` descarga (o lee de un archivo) el dataset completo y lo
+# guarda en VehiculoRunt. Con RUNT_BACKEND = 'local' cada auditoría hace una
+# búsqueda por índice en la BD en vez de una llamada HTTP a datos.gov.co.
+
+TAMANO_PAGINA_API = 50000  # Máximo que permite Socrata por página
+TAMANO_LOTE_BD = 2000
+_SEPARADORES_JSON = re.compile(r'[\s,\[\]]*')
+
+
+def consultar_runt_local(placa_buscada):
+    """Misma respuesta que `ClienteRunt.consultar` (la API), pero contra la tabla local."""
+    datos = (
+        VehiculoRunt.objects.filter(placa=normalizar_placa(placa_buscada))
+        .values_list('datos', flat=True)
+        .first()
+    )
+    if datos is None:
+        return {'existe': False, 'datos': None}
+    return {'existe': True, 'datos': datos}
+
+
+async def consultar_runt_local_async(placa_buscada):
+    """`consultar_runt_local` con el ORM asíncrono (vistas ASGI)."""
+    datos = await (
+        VehiculoRunt.objects.filter(placa=normalizar_placa(placa_buscada))
+        .values_list('datos', flat=True)
+        .afirst()
+    )
+    if datos is None:
+        return {'existe': False, 'datos': None}
+    return {'existe': True, 'datos': datos}
+
+
+def consultar_runt_local_lote(placas):
+    """Versión por lote de `consultar_runt_local`: una sola consulta con placa IN (...)."""
+    normalizadas = {normalizar_placa(p) for p in placas if p}
+    encontrados = dict(VehiculoRunt.objects.filter(placa__in=normalizadas).values_list('placa', 'datos'))
+    return {
+        placa: {'existe': True, 'datos': encontrados[placa]} if placa in encontrados else {'existe': False, 'datos': None}
+        for placa in normalizadas
+    }
+
+
+class CacheRuntBD:
+    """Segundo nivel de cache del ClienteRunt, guardado en la tabla ConsultaRunt."""
+
+    def obtener(self, placa):
+        fila = ConsultaRunt.objects.filter(placa=placa, expira__gt=timezone.now()).values('existe', 'datos').first()
+        if fila is None:
+            return None
+        return {'existe': fila['existe'], 'datos': fila['datos'] if fila['existe'] else None}
+
+    def guardar(self, placa, resultado, ttl):
+        ConsultaRunt.objects.update_or_create(placa=placa, defaults=self._campos(resultado, ttl))
+
+    # Versiones para ClienteRuntAsync (ORM asíncrono)
+
+    async def aobtener(self, placa):
+        fila = await ConsultaRunt.objects.filter(placa=placa, expira__gt=timezone.now()).values('existe', 'datos').afirst()
+        if fila is None:
+            return None
+        return {'existe': fila['existe'], 'datos': fila['datos'] if fila['existe'] else None}
+
+    async def aguardar(self, placa, resultado, ttl):
+        await ConsultaRunt.objects.aupdate_or_create(placa=placa, defaults=self._campos(resultado, ttl))
+
+    @staticmethod
+    def _campos(resultado, ttl):
+        return {
+            'existe': resultado['existe'],
+            'datos': resultado['datos'],
+            'expira': timezone.now() + timedelta(seconds=ttl),
+        }
+
+
+_cliente = None
+_candado_cliente = threading.Lock()
+
+
+def obtener_cliente_runt():
+    """ClienteRunt del proceso (el único: usa RUNT_URL), con cache en memoria + BD y los TTL de settings."""
+    global _cliente
+    if _cliente is None:
+        with _candado_cliente:
+            if _cliente is None:
+                _cliente = ClienteRunt(
+                    url=settings.RUNT_URL,
+                    ttl=settings.RUNT_CACHE_TTL,
+                    ttl_negativo=settings.RUNT_CACHE_TTL_NEGATIVO,
+                    max_entradas=settings.RUNT_CACHE_MAX_ENTRADAS,
+                    cache_secundario=CacheRuntBD(),
+                )
+    return _cliente
+
+
+_cliente_async = None
+
+
+def obtener_cliente_runt_async():
+    """ClienteRuntAsync del proceso (vistas ASGI), con la misma configuración que `obtener_cliente_runt`."""
+    global _cliente_async
+    if _cliente_async is None:
+        with _candado_cliente:
+            if _cliente_async is None:
+                _cliente_async = ClienteRuntAsync(
+                    url=settings.RUNT_URL,
+                    ttl=settings.RUNT_CACHE_TTL,
+                    ttl_negativo=settings.RUNT_CACHE_TTL_NEGATIVO,
+                    max_entradas=settings.RUNT_CACHE_MAX_ENTRADAS,
+                    cache_secundario=CacheRuntBD(),
+                )
+    return _cliente_async
+
+
+def consultar_runt(placa_buscada):
+    """Punto único de consulta: usa el backend configurado en settings.RUNT_BACKEND."""
+    if settings.RUNT_BACKEND == 'local':
+        return consultar_runt_local(placa_buscada)
+    return obtener_cliente_runt().consultar(placa_buscada)
+
+
+async def consultar_runt_async(placa_buscada):
+    """`consultar_runt` sin bloquear el event loop: ORM asíncrono o httpx según RUNT_BACKEND."""
+    if settings.RUNT_BACKEND == 'local':
+        return await consultar_runt_local_async(placa_buscada)
+    return await obtener_cliente_runt_async().aconsultar(placa_buscada)
+
+
+def consultar_runt_lote(placas, usar_cache=True, estricto=False):
+    """
+    Consulta muchas placas a la vez. Retorna {placa_normalizada: resultado}.
+    Con la API, `usar_cache` y `estricto` van a `ClienteRunt.consultar_lote`.
+    """
+    if settings.RUNT_BACKEND == 'local':
+        return consultar_runt_local_lote(placas)
+    return obtener_cliente_runt().consultar_lote(placas, usar_cache=usar_cache, estricto=estricto)
+
+
+# --- Versión del registro (para re-auditar cuando cambia) ---
+
+_version_api = {'valor': '', 'expira': 0.0}
+_candado_version = threading.Lock()
+
+
+def url_metadatos(url_recurso):
+    """Metadatos Socrata del dataset: .../resource/<id>.json -> .../api/views/<id>.json"""
+    base, _, recurso = url_recurso.rpartition('/resource/')
+    return f"{base}/api/views/{recurso.split('.')[0]}.json"
+
+
+def version_registro_api():
+    """
+    Foto del dataset en datos.gov.co: 'rowsUpdatedAt' de sus metadatos (cambia solo cuando
+    se publican filas). Se pide una vez cada RUNT_VERSION_TTL por proceso; si la API no
+    responde queda la última conocida, o '' si nunca respondió.
+    """
+    with _candado_version:
+        if _version_api['expira'] > time.monotonic():
+            return _version_api['valor']
+        try:
+            respuesta = requests.get(url_metadatos(settings.RUNT_URL), timeout=10)
+            respuesta.raise_for_status()
+            _version_api['valor'] = f"api:{int(respuesta.json()['rowsUpdatedAt'])}"
+        except (requests.RequestException, ValueError, KeyError, TypeError):
+            logger.warning("No se pudo leer la versión del dataset RUNT en %s", settings.RUNT_URL, exc_info=True)
+        _version_api['expira'] = time.monotonic() + settings.RUNT_VERSION_TTL
+        return _version_api['valor']
+
+
+def version_registro():
+    """
+    Identifica la "foto" del RUNT contra la que se decide un veredicto (ver reauditoria.py).
+    Espejo local: la última importación. API: la última publicación del dataset.
+    '' si no se sabe.
+    """
+    if settings.RUNT_BACKEND == 'local':
+        ultima = SincronizacionRunt.objects.order_by('-fecha', '-id').values_list('id', flat=True).first()
+        return f"local:{ultima or 0}"
+    return version_registro_api()
+
+
+async def aversion_registro():
+    """`version_registro` con el ORM asíncrono (vistas ASGI)."""
+    if settings.RUNT_BACKEND == 'local':
+        ultima = await SincronizacionRunt.objects.order_by('-fecha', '-id').values_list('id', flat=True).afirst()
+        return f"local:{ultima or 0}"
+    return await sync_to_async(version_registro_api, thread_sensitive=False)()
+
+
+# --- Lectores del dataset (todos como streams, fila por fila) ---
+
+def leer_csv(ruta):
+    with open(ruta, newline='', encoding='utf-8-sig') as f:
+        yield from csv.DictReader(f)
+
+
+def leer_json(ruta, tamano_bloque=1024 * 1024):
+    """
+    Lee un arreglo JSON (export de Socrata) o JSON Lines sin cargar todo el archivo:
+    decodifica objeto por objeto sobre un buffer que se va rellenando.
+    """
+    decodificador = json.JSONDecoder()
+    with open(ruta, encoding='utf-8-sig') as f:
+        buffer, posicion = "", 0
+        fin_archivo = False
+        while True:
+            # Saltamos separadores del arreglo: espacios, comas y corchetes. Se avanza un
+            # índice en vez de recortar el buffer: recortarlo copia el bloque en cada fila.
+            posicion = _SEPARADORES_JSON.match(buffer, posicion).end()
+            if posicion == len(buffer):
+                if fin_archivo:
+                    return
+                buffer, posicion = f.read(tamano_bloque), 0
+                fin_archivo = not buffer
+                continue
+            try:
+                fila, posicion_siguiente = decodificador.raw_decode(buffer, posicion)
+            except json.JSONDecodeError:
+                bloque = f.read(tamano_bloque)
+                if not bloque:
+                    raise
+                # Objeto cortado al final del bloque: solo aquí se compacta el buffer
+                buffer, posicion = buffer[posicion:] + bloque, 0
+                continue
+            posicion = posicion_siguiente
+            yield fila
+
+
+def leer_api_paginada(url=URL_RUNT, desde=None, tamano_pagina=TAMANO_PAGINA_API):
+    """
+    Descarga el dataset de la API por páginas ($limit/$offset).
+    Con `desde` solo trae las filas modificadas después de esa marca (':updated_at').
+    """
+    sesion = requests.Session()
+    offset = 0
+    while True:
+        params = {
+            '$select': ':*, *',  # Incluye los campos de sistema (:updated_at)
+            '$order': ':id',
+            '$limit': tamano_pagina,
+            '$offset': offset,
+        }
+        if desde:
+            params['$where'] = f":updated_at > '{desde}'"
+        respuesta = sesion.get(url, params=params, timeout=60)
+        respuesta.raise_for_status()
+        pagina = respuesta.json()
+        if not pagina:
+            return
+        yield from pagina
+        offset += len(pagina)
+
+
+def leer_fuente(fuente):
+    """Elige el lector según la fuente: URL, .csv o .json/.jsonl."""
+    if fuente.startswith('http://') or fuente.startswith('https://'):
+        return leer_api_paginada(fuente)
+    if fuente.lower().endswith('.csv'):
+        return leer_csv(fuente)
+    return leer_json(fuente)
+
+
+# --- Importación ---
+
+def importar_registros(filas, fuente, incremental=False):
+    """
+    Inserta o actualiza (upsert) las filas en VehiculoRunt por lotes.
+    Una importación completa además borra los vehículos que ya no vienen en el dataset.
+    Retorna la SincronizacionRunt creada.
+    """
+    inicio = timezone.now()
+    total = 0
+    marca = ''
+    lote = {}
+
+    def volcar():
+        VehiculoRunt.objects.bulk_create(
+            [VehiculoRunt(placa=placa, datos=datos, fecha_actualizacion=timezone.now()) for placa, datos in lote.items()],
+            update_conflicts=True,
+            unique_fields=['placa'],
+            update_fields=['datos', 'fecha_actualizacion'],
+        )
+        lote.clear()
+
+    for fila in filas:
+        placa = normalizar_placa(fila.get('placa'))
+        if not placa:
+            continue
+        marca = max(marca, fila.get(':updated_at', ''))
+        # Guardamos solo las columnas de datos (sin los campos de sistema de Socrata)
+        lote[placa] = {k: v for k, v in fila.items() if not k.startswith(':')}
+        total += 1
+        if len(lote) >= TAMANO_LOTE_BD:
+            volcar()
+    if lote:
+        volcar()
+
+    eliminados = 0
+    if not incremental and total:
+        # Todo lo que vino quedó con fecha_actualizacion >= inicio: lo anterior ya no está
+        # en el dataset. Una fuente vacía no borra nada (más probable un export roto).
+        eliminados, _ = VehiculoRunt.objects.filter(fecha_actualizacion__lt=inicio).delete()
+
+    return SincronizacionRunt.objects.create(
+        fuente=fuente[:255], incremental=incremental, registros=total, eliminados=eliminados,
+        marca_actualizacion=marca,
+    )
+
+
+def ultima_marca_actualizacion():
+    ultima = SincronizacionRunt.objects.exclude(marca_actualizacion='').first()
+    return ultima.marca_actualizacion if ultima else None
@@ -0,0 +1,151 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+# ---------------------------------------------------------
+# SUBIDA DEL SOAT POR BLOQUES (HASH Y FORMATO AL VUELO)
+# ---------------------------------------------------------
+# Antes: Django juntaba la subida completa (en memoria o en /tmp), el formulario la
+# copiaba a MEDIA_ROOT/soportes_soat/, se volvía a leer para el SHA-256 y, si el formato
+# no servía o la lectura fallaba, se borraba otra vez.
+#
+# Ahora, para los campos de SOAT:
+# 1. Los bloques se escriben a disco (FILE_UPLOAD_TEMP_DIR) a medida que llegan y el
+#    SHA-256 se calcula en la misma pasada.
+# 2. La firma (primeros bytes) del primer bloque decide el formato: lo que no sea PDF,
+#    JPG o PNG se rechaza sin escribir nada, diga lo que diga la extensión del nombre.
+# 3. Al pasar SOAT_TAMANO_MAXIMO_MB se corta la subida y se borra lo escrito.
+# 4. El formulario revisa el número de páginas del PDF (pdfium, sin extraer texto).
+# La carga síncrona lee el archivo donde quedó y solo lo pasa a soportes_soat/ si la
+# lectura tuvo éxito: un rename, porque la carpeta temporal está en el mismo disco.
+
+CAMPOS_SOAT = {'archivo_soat'}
+
+# (firma, extensión, dónde puede empezar la firma). El PDF admite basura antes de %PDF-
+FIRMAS = (
+    (b'%PDF-', '.pdf', 1024),
+    (b'\xff\xd8\xff', '.jpg', 0),
+    (b'\x89PNG\r\n\x1a\n', '.png', 0),
+)
+EXTENSIONES_POR_FORMATO = {'.pdf': {'.pdf'}, '.jpg': {'.jpg', '.jpeg'}, '.png': {'.png'}}
+
+
+def detectar_formato(cabecera):
+    """Extensión ('.pdf', '.jpg' o '.png') según la firma de los primeros bytes, o None."""
+    for firma, extension, margen in FIRMAS:
+        if cabecera.startswith(firma) or (margen and firma in cabecera[:margen]):
+            return extension
+    return None
+
+
+def nombre_con_formato(nombre, formato):
+    """El nombre con la extensión del formato real (un PDF llamado foto.jpg pasa a foto.pdf)."""
+    base, extension = os.path.splitext(nombre)
+    return nombre if extension.lower() in EXTENSIONES_POR_FORMATO[formato] else base + formato
+
+
+def motivo_rechazo(request, campo='archivo_soat'):
+    """Por qué se rechazó el archivo de `campo` durante la subida, o None."""
+    return getattr(request, 'rechazos_subida', {}).get(campo)
+
+
+class ArchivoSoatSubido(TemporaryUploadedFile):
+    """Subida ya escrita en disco, con su SHA-256 y el formato según la firma."""
+
+    def __init__(self, name, content_type, charset, content_type_extra, formato):
+        super().__init__(name, content_type, 0, charset, content_type_extra)
+        self.formato = formato
+        self.hash_archivo = None
+
+
+class SubidaSoatHandler(FileUploadHandler):
+    """
+    Handler de subida para los campos de CAMPOS_SOAT (los demás pasan al siguiente
+    handler de FILE_UPLOAD_HANDLERS). Los rechazos quedan en `request.rechazos_subida`.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.activo = False  # La carpeta FILE_UPLOAD_TEMP_DIR se crea al arrancar (apps.py)
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.activo = field_name in CAMPOS_SOAT
+        # Django cierra `handler.file` al saltar un archivo: no dejamos el de una subida anterior
+        self.__dict__.pop('file', None)
+        self.sha = hashlib.sha256()
+        self.limite = settings.SOAT_TAMANO_MAXIMO_MB * 1024 * 1024
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.activo:
+            return raw_data
+
+        if start == 0:
+            formato = detectar_formato(raw_data)
+            if formato is None:
+                self.rechazar("El archivo no es un PDF, JPG ni PNG.")
+            self.file = ArchivoSoatSubido(
+                nombre_con_formato(self.file_name, formato), self.content_type, self.charset,
+                self.content_type_extra, formato,
+            )
+        if start + len(raw_data) > self.limite:
+            self.rechazar(f"El archivo supera el tamaño máximo ({settings.SOAT_TAMANO_MAXIMO_MB} MB).")
+
+        self.file.write(raw_data)
+        self.sha.update(raw_data)
+        return None  # Los bloques no siguen a los demás handlers
+
+    def file_complete(self, file_size):
+        if not self.activo or not hasattr(self, 'file'):
+            return None  # Otro campo, o archivo vacío (el formulario lo rechaza)
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.hash_archivo = self.sha.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()  # NamedTemporaryFile: cerrar es borrar
+
+    def rechazar(self, motivo):
+        """Descarta el archivo (Django cierra y borra lo escrito) y deja el motivo en el request."""
+        if self.request is not None:
+            if not hasattr(self.request, 'rechazos_subida'):
+                self.request.rechazos_subida = {}
+            self.request.rechazos_subida[self.field_name] = motivo
+        raise SkipFile(motivo)
+
+
+def contar_paginas(archivo):
+    """Páginas de un PDF subido (pdfium lee la tabla de páginas, no el contenido)."""
+    import pypdfium2 as pdfium
+
+    if hasattr(archivo, 'temporary_file_path'):
+        origen = archivo.temporary_file_path()
+    else:
+        origen = archivo.read()
+        archivo.seek(0)
+    pdf = pdfium.PdfDocument(origen)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def validar_paginas(archivo):
+    """ValidationError si el PDF está dañado o pasa de SOAT_MAX_PAGINAS_ARCHIVO páginas."""
+    formato = getattr(archivo, 'formato', None) or os.path.splitext(archivo.name)[1].lower()
+    if formato != '.pdf':
+        return
+    try:
+        paginas = contar_paginas(archivo)
+    except Exception:
+        raise ValidationError("El PDF está dañado o protegido con contraseña.")
+    if paginas > settings.SOAT_MAX_PAGINAS_ARCHIVO:
+        raise ValidationError(
+            f"El PDF tiene {paginas} páginas; el máximo es {settings.SOAT_MAX_PAGINAS_ARCHIVO}."
+        )
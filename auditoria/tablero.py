@@ -0,0 +1,145 @@
+import base64
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ResumenDiario
+from .OCR.cliente_api import normalizar_placa
+
+# ---------------------------------------------------------
+# DASHBOARD: FILTROS, PAGINACIÓN POR CURSOR Y RESUMEN
+# ---------------------------------------------------------
+# Con decenas de miles de auditorías no se puede pintar la tabla completa ni usar
+# OFFSET (la BD igual recorre todas las filas saltadas). Paginamos por cursor:
+# "las N siguientes a (fecha, id)", que usa el índice (fecha_creacion, id).
+
+TAMANO_PAGINA = 50
+DIAS_RESUMEN = 14
+
+# Columnas que pinta la tabla (el resto no se trae de la BD)
+COLUMNAS_TABLA = (
+    'id', 'fecha_creacion', 'archivo_soat', 'placa_detectada', 'monto_detectado', 'resultado', 'pagina_soat',
+    'tipo_duplicado', 'duplicado_de',
+)
+
+
+def inicio_del_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def filtrar(consulta, placa=None, resultado=None, desde=None, hasta=None):
+    """Filtros sobre columnas indexadas (rangos, nada de funciones sobre la columna)."""
+    if placa:
+        placa = normalizar_placa(placa)
+        # Prefijo como rango: usa el índice de placa igual en SQLite y PostgreSQL
+        consulta = consulta.filter(placa_detectada__gte=placa, placa_detectada__lt=placa + '\uffff')
+    if resultado:
+        consulta = consulta.filter(resultado=resultado)
+    if desde:
+        consulta = consulta.filter(fecha_creacion__gte=inicio_del_dia(desde))
+    if hasta:
+        consulta = consulta.filter(fecha_creacion__lt=inicio_del_dia(hasta + timedelta(days=1)))
+    return consulta
+
+
+# --- Cursor ---
+
+def codificar_cursor(auditoria):
+    valor = f"{auditoria.fecha_creacion.isoformat()}|{auditoria.id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Retorna (fecha, id) o None si el cursor no es válido."""
+    try:
+        valor = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        fecha, id_auditoria = valor.rsplit('|', 1)
+        fecha = parse_datetime(fecha)
+        return (fecha, int(id_auditoria)) if fecha else None
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def _plan_pagina(consulta, despues, antes, tamano):
+    """(consulta de la página con una fila de más, hacia_atras, posicion_despues)."""
+    posicion_despues = decodificar_cursor(despues) if despues else None
+    posicion_antes = decodificar_cursor(antes) if antes else None
+
+    if posicion_antes:
+        fecha, id_auditoria = posicion_antes
+        consulta = (
+            consulta.filter(Q(fecha_creacion__gt=fecha) | Q(fecha_creacion=fecha, id__gt=id_auditoria))
+            .order_by('fecha_creacion', 'id')[:tamano + 1]
+        )
+        return consulta, True, None
+    if posicion_despues:
+        fecha, id_auditoria = posicion_despues
+        consulta = consulta.filter(Q(fecha_creacion__lt=fecha) | Q(fecha_creacion=fecha, id__lt=id_auditoria))
+    return consulta.order_by('-fecha_creacion', '-id')[:tamano + 1], False, posicion_despues
+
+
+def _armar_pagina(filas, hacia_atras, posicion_despues, tamano):
+    if hacia_atras:
+        hay_anterior, hay_siguiente = len(filas) > tamano, True
+        registros = filas[:tamano][::-1]
+    else:
+        hay_anterior, hay_siguiente = posicion_despues is not None, len(filas) > tamano
+        registros = filas[:tamano]
+
+    return {
+        'registros': registros,
+        'cursor_siguiente': codificar_cursor(registros[-1]) if registros and hay_siguiente else None,
+        'cursor_anterior': codificar_cursor(registros[0]) if registros and hay_anterior else None,
+    }
+
+
+def paginar(consulta, despues=None, antes=None, tamano=TAMANO_PAGINA):
+    """
+    Página de `consulta` ordenada por (fecha_creacion, id) descendente.
+    `despues`: cursor de la última fila vista (página siguiente, más antigua).
+    `antes`: cursor de la primera fila vista (página anterior, más reciente).
+    Retorna {'registros', 'cursor_siguiente', 'cursor_anterior'} (cursores en None si no hay más).
+    """
+    consulta, hacia_atras, posicion_despues = _plan_pagina(consulta, despues, antes, tamano)
+    return _armar_pagina(list(consulta), hacia_atras, posicion_despues, tamano)
+
+
+async def apaginar(consulta, despues=None, antes=None, tamano=TAMANO_PAGINA):
+    """`paginar` con el ORM asíncrono (vistas ASGI)."""
+    consulta, hacia_atras, posicion_despues = _plan_pagina(consulta, despues, antes, tamano)
+    return _armar_pagina([fila async for fila in consulta], hacia_atras, posicion_despues, tamano)
+
+
+# --- Resumen ---
+
+SUMAS_RESUMEN = {'pendientes': Sum('pendientes'), 'aprobados': Sum('aprobados'), 'fraudes': Sum('fraudes')}
+
+
+def _filas_resumen(desde, hasta):
+    filas = ResumenDiario.objects.all()
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    return filas
+
+
+def _armar_resumen(totales, por_dia):
+    totales = {campo: valor or 0 for campo, valor in totales.items()}
+    totales['total'] = sum(totales.values())
+    return {'totales': totales, 'por_dia': por_dia}
+
+
+def resumen_periodo(desde=None, hasta=None, dias=DIAS_RESUMEN):
+    """Totales del periodo y los últimos `dias` días, leídos de ResumenDiario (una fila por día)."""
+    filas = _filas_resumen(desde, hasta)
+    return _armar_resumen(filas.aggregate(**SUMAS_RESUMEN), list(filas.order_by('-fecha')[:dias]))
+
+
+async def aresumen_periodo(desde=None, hasta=None, dias=DIAS_RESUMEN):
+    """`resumen_periodo` con el ORM asíncrono (vistas ASGI)."""
+    filas = _filas_resumen(desde, hasta)
+    totales = await filas.aaggregate(**SUMAS_RESUMEN)
+    return _armar_resumen(totales, [fila async for fila in filas.order_by('-fecha')[:dias]])
@@ -1,3 +1,1443 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import cola
+from .cache_contenido import buscar_en_cache, guardar_archivo_deduplicado, guardar_en_cache, purgar_cache
+from .almacenamiento import barrer_huerfanos, reubicar_soportes, ruta_por_hash
+from .duplicados import registrar_huellas
+from .lote import _analizar_en_worker, iterar_documentos, procesar_lote
+from .metricas import CUBETAS, Histograma, exponer, registrar_resultado, reiniciar_metricas
+from .models import Auditoria, CacheExtraccion, TrabajoAuditoria, VehiculoRunt, SincronizacionRunt, ConsultaRunt, ResumenDiario
+import numpy as np
+
+from .OCR.cliente_api import ClienteRunt, ClienteRuntAsync
+from .OCR.motor_ocr import PoolLectoresOCR
+from .OCR.regiones import leer_regiones, leer_regiones_lote
+from .OCR.preprocesamiento import preparar_imagen
+from .OCR.candidatos import escanear_candidatos, resolver_candidatos, validar_y_corregir_placa
+from .OCR.lector_soat import (
+    CLASIFICADOR, SHINGLES_PLANTILLAS, TEXTO_REF, TEXTO_SOAT_GENERICO, ExtractorSoat, extraer_con_inteligencia_hibrida, extraer_datos_soat,
+    extraer_datos_soat_lote, extraer_de_pagina, repuntuar_evidencia,
+)
+from .OCR.palabras import PalabrasOCR, buscar_por_geometria
+from .OCR.huellas import bandas_lsh, distancia_hamming, firma_texto, hash_perceptual, similitud_firmas
+from .management.commands.bench_soat import comparar_con_linea_base
+from .management.commands.procesar_cola import bucle_worker
+from .procesamiento import VERSION_REGLA, analizar_archivos
+from .reauditoria import desactualizadas, reauditar
+from .resumen import recalcular_resumen, registrar_creadas
+from .tablero import filtrar, paginar
+from .corpus_soat import acierta, escribir_corpus, generar_corpus, pdf_con_texto, verificar_manifiesto
+from .runt import CacheRuntBD, consultar_runt, consultar_runt_local, importar_registros, leer_csv, leer_json, version_registro
+
+DATOS_PRUEBA = Path(__file__).resolve().parent / 'datos_prueba'
+
+
+class EspejoRuntTests(TestCase):
+    """El dataset de muestra hace las veces de la API de datos.gov.co."""
+
+    def test_importar_json_normaliza_placas(self):
+        call_command('importar_runt', archivo=str(DATOS_PRUEBA / 'runt_muestra.json'), stdout=StringIO())
+
+        self.assertEqual(VehiculoRunt.objects.count(), 3)
+        self.assertTrue(VehiculoRunt.objects.filter(placa='BOG123').exists())
+        self.assertEqual(SincronizacionRunt.objects.get().marca_actualizacion, '2025-11-05T08:30:00.000Z')
+
+    def test_leer_json_por_bloques_pequenos(self):
+        filas = list(leer_json(DATOS_PRUEBA / 'runt_muestra.json', tamano_bloque=16))
+        self.assertEqual([f['placa'] for f in filas], ['ASA534', 'bog-123', 'XYZ98D'])
+
+    def test_leer_json_lines_con_objetos_cortados(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = Path(carpeta) / 'runt.jsonl'
+            ruta.write_text("".join(json.dumps({'placa': f'AAA{i:03d}', 'n': i}) + "\n" for i in range(500)))
+            filas = list(leer_json(ruta, tamano_bloque=7))
+        self.assertEqual([f['n'] for f in filas], list(range(500)))
+
+    def test_reimportar_completo_actualiza_y_borra_los_que_faltan(self):
+        call_command('importar_runt', archivo=str(DATOS_PRUEBA / 'runt_muestra.json'), stdout=StringIO())
+        call_command('importar_runt', archivo=str(DATOS_PRUEBA / 'runt_muestra.csv'), stdout=StringIO())
+
+        self.assertEqual(set(VehiculoRunt.objects.values_list('placa', flat=True)), {'ASA534', 'MED456'})
+        self.assertEqual(VehiculoRunt.objects.get(placa='ASA534').datos['modelo'], '1999')
+        self.assertEqual(SincronizacionRunt.objects.first().eliminados, 2)
+
+    def test_importacion_incremental_no_borra(self):
+        call_command('importar_runt', archivo=str(DATOS_PRUEBA / 'runt_muestra.json'), stdout=StringIO())
+        importar_registros(leer_csv(DATOS_PRUEBA / 'runt_muestra.csv'), 'api', incremental=True)
+
+        self.assertEqual(VehiculoRunt.objects.count(), 4)
+
+    def test_incremental_con_archivo_se_rechaza(self):
+        with self.assertRaises(CommandError):
+            call_command('importar_runt', archivo=str(DATOS_PRUEBA / 'runt_muestra.json'), incremental=True)
+        self.assertFalse(VehiculoRunt.objects.exists())
+
+    @override_settings(RUNT_BACKEND='local')
+    def test_consulta_local(self):
+        call_command('importar_runt', archivo=str(DATOS_PRUEBA / 'runt_muestra.csv'), stdout=StringIO())
+
+        self.assertTrue(consultar_runt('med-456')['existe'])
+        self.assertEqual(consultar_runt_local('ASA534')['datos']['marca'], 'KENWORTH')
+        self.assertEqual(consultar_runt('ZZZ999'), {'existe': False, 'datos': None})
+
+
+class ApiRuntFalsa(BaseHTTPRequestHandler):
+    """Servidor HTTP local que imita el endpoint Socrata del RUNT."""
+    vehiculos = {'ASA534': {'placa': 'ASA534', 'marca': 'KENWORTH'}, 'BOG123': {'placa': 'BOG123', 'marca': 'CHEVROLET'}}
+    peticiones = []
+    publicado = 1700000000  # rowsUpdatedAt de los metadatos; None: la API falla
+    caido = False  # True: las consultas de placas fallan (los metadatos no)
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        self.peticiones.append(params)
+        if self.path.startswith('/api/views/'):
+            if self.publicado is None:
+                self.send_error(503)
+                return
+            filas = {'id': 'g7i9-xkxz', 'rowsUpdatedAt': self.publicado}
+        elif self.caido:
+            self.send_error(503)
+            return
+        elif 'placa' in params:
+            filas = [v for p, v in self.vehiculos.items() if p == params['placa'][0]]
+        else:
+            # $where placa in ('A', 'B')
+            filas = [v for p, v in self.vehiculos.items() if f"'{p}'" in params['$where'][0]]
+        cuerpo = json.dumps(filas).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorRuntMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), ApiRuntFalsa)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.servidor.server_port}/resource/g7i9-xkxz.json"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        ApiRuntFalsa.peticiones.clear()
+
+
+class ClienteRuntTests(ServidorRuntMixin, SimpleTestCase):
+
+    def test_cache_positiva_y_negativa(self):
+        cliente = ClienteRunt(url=self.url)
+
+        self.assertTrue(cliente.consultar('asa-534')['existe'])
+        self.assertTrue(cliente.consultar('ASA534')['existe'])
+        self.assertFalse(cliente.consultar('ZZZ999')['existe'])
+        self.assertFalse(cliente.consultar('ZZZ999')['existe'])
+
+        self.assertEqual(len(ApiRuntFalsa.peticiones), 2)
+
+    def test_ttl_negativo_vencido_vuelve_a_consultar(self):
+        cliente = ClienteRunt(url=self.url, ttl_negativo=0)
+        cliente.consultar('ZZZ999')
+        cliente.consultar('ZZZ999')
+        self.assertEqual(len(ApiRuntFalsa.peticiones), 2)
+
+    def test_cache_en_memoria_acotada(self):
+        cliente = ClienteRunt(url=self.url, ttl_negativo=0, max_entradas=2)
+        cliente.consultar('ZZZ999')
+        self.assertIsNone(cliente._leer_memoria('ZZZ999'))  # Vencida: se saca al leerla
+        self.assertNotIn('ZZZ999', cliente._cache)
+
+        cliente.consultar_lote(['ASA534', 'BOG123'])
+        cliente.consultar('ASA534')  # La más usada se queda
+        cliente.consultar_lote(['ASA534', 'MED456'])
+        self.assertEqual(list(cliente._cache), ['ASA534', 'MED456'])  # BOG123 salió
+        self.assertEqual(len(ApiRuntFalsa.peticiones), 3)
+
+    def test_consultas_concurrentes_comparten_una_llamada(self):
+        cliente = ClienteRunt(url=self.url)
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(cliente.consultar('BOG123'))) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertTrue(all(r['existe'] for r in resultados))
+        self.assertLessEqual(len(ApiRuntFalsa.peticiones), 2)
+
+    def test_consulta_por_lote_en_un_solo_request(self):
+        cliente = ClienteRunt(url=self.url)
+        resultados = cliente.consultar_lote(['ASA534', 'bog-123', 'ZZZ999'])
+
+        self.assertEqual(len(ApiRuntFalsa.peticiones), 1)
+        self.assertEqual({p: r['existe'] for p, r in resultados.items()}, {'ASA534': True, 'BOG123': True, 'ZZZ999': False})
+
+        # Ya quedaron en cache
+        cliente.consultar('ZZZ999')
+        self.assertEqual(len(ApiRuntFalsa.peticiones), 1)
+
+
+    async def test_cliente_async_comparte_llamada_y_cache(self):
+        cliente = ClienteRuntAsync(url=self.url)
+        resultados = await asyncio.gather(*(cliente.aconsultar('bog-123') for _ in range(8)))
+        self.assertTrue(all(r['existe'] for r in resultados))
+
+        self.assertFalse((await cliente.aconsultar('ZZZ999'))['existe'])
+        await cliente.aconsultar('zzz 999')  # Cache negativa
+        self.assertEqual(len(ApiRuntFalsa.peticiones), 2)
+        await cliente.cerrar()
+
+
+class CacheRuntBDTests(ServidorRuntMixin, TestCase):
+
+    def test_cache_en_bd_compartida_entre_clientes(self):
+        ClienteRunt(url=self.url, cache_secundario=CacheRuntBD()).consultar('ASA534')
+        self.assertTrue(ConsultaRunt.objects.get(placa='ASA534').existe)
+
+        # Un cliente nuevo (otro worker) no vuelve a llamar a la API
+        ClienteRunt(url=self.url, cache_secundario=CacheRuntBD()).consultar('ASA534')
+        self.assertEqual(len(ApiRuntFalsa.peticiones), 1)
+
+
+class CargaDiferidaTests(SimpleTestCase):
+    # Presupuesto de importación de las vistas (sin spaCy ni EasyOCR debería ser muy inferior)
+    PRESUPUESTO_SEGUNDOS = 2.0
+
+    def test_importar_vistas_no_carga_modelos(self):
+        codigo = (
+            "import json, os, sys, time\n"
+            "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SimuladorAdres.settings')\n"
+            "import django; django.setup()\n"
+            "inicio = time.perf_counter()\n"
+            "import auditoria.views\n"
+            "print(json.dumps({'segundos': time.perf_counter() - inicio,"
+            " 'pesados': [m for m in ('spacy', 'easyocr', 'torch') if m in sys.modules]}))\n"
+        )
+        salida = subprocess.run(
+            [sys.executable, '-c', codigo], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent.parent,
+        )
+        medicion = json.loads(salida.stdout.strip().splitlines()[-1])
+
+        self.assertEqual(medicion['pesados'], [])
+        self.assertLess(medicion['segundos'], self.PRESUPUESTO_SEGUNDOS)
+
+    def test_extraccion_con_pipeline_liviano(self):
+        datos = extraer_con_inteligencia_hibrida("No. DE PÓLIZA PLACA No. ASA534 CLASE ... LEGALES $ 1191000")
+        self.assertEqual(datos, {'placa': 'ASA534', 'monto': 1191000})
+
+
+class ClasificadorPlantillasTests(SimpleTestCase):
+
+    def test_reconoce_otra_poliza_de_la_misma_plantilla(self):
+        otra_poliza = TEXTO_REF.replace("ASA534", "BOG123").replace("GUEVARA TELLEZ, JENNY MARCELA", "PEREZ GOMEZ, JUAN")
+        clasificacion = CLASIFICADOR.clasificar(otra_poliza)
+
+        self.assertTrue(clasificacion['digital'])
+        self.assertEqual(clasificacion['plantilla'], 'seguros_del_estado')
+
+    def test_reconoce_formato_generico_de_otra_aseguradora(self):
+        clasificacion = CLASIFICADOR.clasificar(TEXTO_SOAT_GENERICO + " Seguros Bolívar S.A. línea de atención")
+        self.assertEqual(clasificacion['plantilla'], 'soat_generico')
+
+    def test_pdf_escaneado_sin_texto(self):
+        self.assertEqual(CLASIFICADOR.clasificar(""), {'digital': False, 'plantilla': None, 'similitud': 0.0})
+        self.assertFalse(CLASIFICADOR.clasificar("ÿþ 0x1 página escaneada")['digital'])
+
+
+class RegionesTests(SimpleTestCase):
+    pagina = np.zeros((1100, 850), dtype=np.uint8)
+
+    def test_solo_reconoce_los_recortes_de_la_plantilla(self):
+        recortes = []
+        textos = [['SEGUROS DEL ESTADO S.A.'], ['PLACA No.', 'ASA534'], ['TOTAL A PAGAR', '$ 1191000']]
+
+        def leer(recorte):
+            recortes.append(recorte.shape)
+            return textos[len(recortes) - 1]
+
+        plantilla, texto = leer_regiones(self.pagina, leer)
+
+        self.assertEqual(plantilla, 'seguros_del_estado')
+        self.assertEqual(texto, 'PLACA No. ASA534 TOTAL A PAGAR $ 1191000')
+        self.assertEqual(len(recortes), 3)  # Encabezado y las dos regiones de esa plantilla, ninguna otra
+        self.assertLess(sum(alto * ancho for alto, ancho in recortes), self.pagina.size)
+
+    def test_sin_anclas_no_aplica_ninguna_plantilla(self):
+        self.assertEqual(leer_regiones(self.pagina, lambda recorte: ['texto', 'ilegible']), (None, None))
+
+    def test_formato_desconocido_solo_lee_el_encabezado(self):
+        pixeles = []
+
+        def leer(recorte):
+            pixeles.append(recorte.size)
+            return ['CERTIFICADO', 'DE', 'TRADICIÓN']
+
+        self.assertEqual(leer_regiones(self.pagina, leer), (None, None))
+        # Luego viene la página completa: las regiones no deben sumar más que la franja del encabezado
+        self.assertEqual(len(pixeles), 1)
+        self.assertLessEqual(sum(pixeles), 0.12 * self.pagina.size)
+
+    def test_por_lote_agrupa_los_recortes_de_todas_las_paginas(self):
+        llamadas = []
+
+        def leer_lote(recortes):
+            llamadas.append(len(recortes))
+            if len(llamadas) == 1:
+                # Página 0 es de Seguros del Estado; la 1 no se parece a ninguna plantilla
+                return [['SEGUROS DEL ESTADO'], ['nada']]
+            return [['PLACA', 'ASA534'], ['TOTAL A PAGAR']]
+
+        resultados = leer_regiones_lote([self.pagina, self.pagina], leer_lote)
+
+        self.assertEqual(resultados, [('seguros_del_estado', 'PLACA ASA534 TOTAL A PAGAR'), (None, None)])
+        self.assertEqual(llamadas, [2, 2])  # Encabezados de todas y regiones de las reconocidas
+
+
+class PreprocesamientoTests(SimpleTestCase):
+    def test_foto_grande_queda_en_gris_y_dentro_del_presupuesto(self):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = str(Path(carpeta) / 'foto.jpg')
+            Image.new('RGB', (4000, 3000), (240, 240, 240)).save(ruta)
+            gris = preparar_imagen(ruta, max_pixeles=2_000_000)
+
+        self.assertEqual(gris.dtype, np.uint8)
+        self.assertEqual(gris.ndim, 2)
+        self.assertLessEqual(gris.size, 2_000_000)
+
+    def test_alto_objetivo_reduce_la_foto(self):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = str(Path(carpeta) / 'foto.png')
+            Image.new('L', (1200, 1600), 255).save(ruta)
+            gris = preparar_imagen(ruta, alto_objetivo=800, deskew=False)
+
+        self.assertEqual(gris.shape, (800, 600))
+
+
+class LectorContador:
+    """Lector falso que cuenta cuántas lecturas corren a la vez."""
+
+    def __init__(self, espera=0.05):
+        self.espera = espera
+        self.activas = self.max_activas = 0
+        self._candado = threading.Lock()
+
+    def readtext(self, imagen, **kwargs):
+        with self._candado:
+            self.activas += 1
+            self.max_activas = max(self.max_activas, self.activas)
+        time.sleep(self.espera)
+        with self._candado:
+            self.activas -= 1
+        return [imagen]
+
+
+class PoolLectoresTests(SimpleTestCase):
+    def en_paralelo(self, pool, hilos):
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            return list(ejecutor.map(pool.leer, range(hilos)))
+
+    def test_el_lector_se_carga_una_vez_por_proceso(self):
+        creados = []
+
+        def crear_lector():
+            time.sleep(0.05)  # Ventana para que los demás hilos lleguen mientras carga
+            creados.append(LectorContador(espera=0))
+            return creados[-1]
+
+        pool = PoolLectoresOCR(max_concurrencia=4, usar_gpu=False)
+        with mock.patch.object(pool, '_crear_lector', side_effect=crear_lector), \
+                self.assertLogs('auditoria.OCR.motor_ocr', 'INFO') as registros:
+            self.assertEqual(self.en_paralelo(pool, 8), [[i] for i in range(8)])
+            self.assertEqual(len(creados), 1)
+            self.assertEqual((pool.metricas()['cargas'], pool.metricas()['cargado']), (1, True))
+
+            pool._pid = -1  # Como si el lector se hubiera cargado antes de un fork
+            pool.leer(0)
+        self.assertEqual(len(creados), 2)
+        self.assertEqual(len([r for r in registros.output if "EasyOCR cargado" in r]), 2)
+
+    def test_cupos_limitan_las_lecturas_simultaneas(self):
+        pool = PoolLectoresOCR(max_concurrencia=2, usar_gpu=False)
+        lector = LectorContador()
+        pool._lector, pool._pid = lector, os.getpid()
+
+        self.en_paralelo(pool, 6)
+
+        self.assertEqual(lector.max_activas, 2)
+        metricas = pool.metricas()
+        self.assertEqual((metricas['inferencias'], metricas['cargas']), (6, 0))
+        self.assertGreater(metricas['segundos_espera_cupo'], 0)
+
+
+class LectorFalso:
+    """Imita readtext_batched: exige imágenes del mismo tamaño y 'lee' el valor de la esquina."""
+
+    def __init__(self):
+        self.lotes = []
+
+    def readtext_batched(self, imagenes, batch_size=1, detail=1):
+        if len({im.shape for im in imagenes}) != 1:
+            raise ValueError("readtext_batched requiere imágenes del mismo tamaño")
+        self.lotes.append(len(imagenes))
+        return [[str(int(im[0, 0]))] for im in imagenes]
+
+
+class OcrPorLoteTests(SimpleTestCase):
+    def test_rellena_agrupa_y_respeta_el_orden(self):
+        pool = PoolLectoresOCR(usar_gpu=False)
+        pool._lector, pool._pid = LectorFalso(), os.getpid()
+        imagenes = [np.full((100 + 10 * i, 80), i, dtype=np.uint8) for i in (3, 1, 4, 0, 2)]
+
+        resultados = pool.leer_lote(imagenes, tamano_grupo=2, detail=0)
+
+        self.assertEqual(resultados, [['3'], ['1'], ['4'], ['0'], ['2']])
+        self.assertEqual(pool._lector.lotes, [2, 2, 1])
+        self.assertEqual(pool.metricas()['inferencias'], 5)
+
+
+class PdfVariasPaginasTests(SimpleTestCase):
+    portada = "Señores ADRES\n" + " ".join(["Radicamos el soporte de la póliza del vehículo para su revisión."] * 4)
+
+    def setUp(self):
+        # Si alguna página pasa por OCR, este lector "ve" TEXTO_REF y cuenta la lectura
+        self.lector = LectorLento()
+
+    def extraer(self, paginas, extraer=extraer_datos_soat, **kwargs):
+        pool = PoolLectoresOCR(usar_gpu=False)
+        pool._lector, pool._pid = self.lector, os.getpid()
+        with tempfile.TemporaryDirectory() as carpeta, \
+                mock.patch('auditoria.OCR.lector_soat.obtener_pool', return_value=pool):
+            ruta = Path(carpeta) / 'soat.pdf'
+            ruta.write_bytes(pdf_con_texto(paginas))
+            if extraer is extraer_datos_soat_lote:
+                return extraer([str(ruta)], **kwargs)[0]
+            return extraer(str(ruta), **kwargs)
+
+    def test_portada_no_impide_leer_la_poliza(self):
+        resultado = self.extraer([self.portada, TEXTO_REF])
+
+        self.assertTrue(resultado['exito'])
+        self.assertEqual((resultado['placa'], resultado['monto'], resultado['pagina']), ('ASA534', 1191000, 2))
+        self.assertEqual(resultado['origen'], 'Digital')
+        self.assertEqual(self.lector.lecturas, 0)  # La portada tiene texto real: no pasa por OCR
+
+    def test_portada_sola_no_pasa_por_ocr(self):
+        for extraer in (extraer_datos_soat, extraer_datos_soat_lote):
+            self.assertFalse(self.extraer([self.portada], extraer)['exito'])
+        self.assertEqual(self.lector.lecturas, 0)
+
+    def test_salida_temprana_al_tener_placa_y_monto(self):
+        resultado = self.extraer([TEXTO_REF, self.portada, self.portada])
+        self.assertEqual(resultado['paginas_leidas'], 1)
+
+    def test_multipoliza_una_por_placa(self):
+        resultado = self.extraer([TEXTO_REF, TEXTO_REF.replace('ASA534', 'BCD123')], multipoliza=True)
+
+        self.assertEqual([(p['placa'], p['pagina']) for p in resultado['polizas']], [('ASA534', 1), ('BCD123', 2)])
+
+    def test_capa_de_texto_basura_pasa_por_ocr(self):
+        # PDF escaneado "buscable": la capa de texto es el OCR del escáner y la placa solo está en la imagen
+        basura = " ".join(["5EGUR0 0BL1GAT0R10 P0L1ZA VEH1CUL0 T0MAD0R"] * 6)
+        for extraer in (extraer_datos_soat, extraer_datos_soat_lote):
+            resultado = self.extraer([basura], extraer)
+
+            self.assertTrue(resultado['exito'])
+            self.assertEqual((resultado['placa'], resultado['monto']), ('ASA534', 1191000))
+            self.assertTrue(resultado['origen'].startswith('OCR Scan'))
+
+
+def como_readtext(texto, forma, confianza=0.9):
+    """Salida de readtext(detail=1) para `texto`: una fila por línea y las palabras de izquierda a derecha."""
+    alto, ancho = forma[:2]
+    lineas = texto.strip().splitlines()
+    resultados = []
+    for fila, linea in enumerate(lineas):
+        y0, y1 = fila * alto / len(lineas), (fila + 0.8) * alto / len(lineas)
+        x = 0.0
+        for palabra in linea.split():
+            x1 = x + len(palabra) * ancho / 200
+            resultados.append(([[x, y0], [x1, y0], [x1, y1], [x, y1]], palabra, confianza))
+            x = x1 + ancho / 200
+    return resultados
+
+
+class LectorLento:
+    """readtext que tarda `espera` segundos y solo 'lee' la póliza en imágenes de más de `alto_minimo` píxeles."""
+
+    def __init__(self, espera=0.0, alto_minimo=0):
+        self.espera, self.alto_minimo = espera, alto_minimo
+        self.lecturas = 0
+
+    def readtext(self, imagen, detail=1):
+        self.lecturas += 1
+        time.sleep(self.espera)
+        if imagen.shape[0] <= self.alto_minimo:
+            return []
+        return como_readtext(TEXTO_REF, imagen.shape) if detail else TEXTO_REF.split()
+
+
+@override_settings(SOAT_MODO_CARRERA=True, SOAT_PLAZO_DOCUMENTO_S=5)
+class ModoCarreraTests(SimpleTestCase):
+    def extraer(self, lector, contenido, nombre):
+        pool = PoolLectoresOCR(usar_gpu=False)
+        pool._lector, pool._pid = lector, os.getpid()
+        with tempfile.TemporaryDirectory() as carpeta, mock.patch('auditoria.OCR.lector_soat.obtener_pool', return_value=pool):
+            ruta = Path(carpeta) / nombre
+            ruta.write_bytes(contenido)
+            inicio = time.perf_counter()
+            resultado = extraer_datos_soat(str(ruta))
+            return resultado, time.perf_counter() - inicio
+
+    def foto(self, alto):
+        from PIL import Image
+
+        salida = io.BytesIO()
+        Image.fromarray(np.full((alto, alto * 3 // 4), 255, dtype=np.uint8)).save(salida, format='PNG')
+        return salida.getvalue()
+
+    def test_texto_nativo_gana_sin_esperar_el_ocr(self):
+        resultado, segundos = self.extraer(LectorLento(espera=2), pdf_con_texto([TEXTO_REF]), 'soat.pdf')
+
+        self.assertEqual((resultado['placa'], resultado['origen']), ('ASA534', 'Digital'))
+        self.assertLess(segundos, 1.5)
+
+    def test_escala_a_alta_resolucion_si_el_ocr_rapido_falla(self):
+        resultado, _ = self.extraer(LectorLento(alto_minimo=2000), self.foto(2400), 'soat.png')
+
+        self.assertEqual((resultado['placa'], resultado['monto'], resultado['origen']), ('ASA534', 1191000, 'OCR Imagen'))
+
+    @override_settings(SOAT_PLAZO_DOCUMENTO_S=0.3)
+    def test_plazo_agotado(self):
+        resultado, segundos = self.extraer(LectorLento(espera=1), self.foto(800), 'soat.png')
+
+        self.assertFalse(resultado['exito'])
+        self.assertTrue(resultado['plazo_agotado'])
+        self.assertLess(segundos, 0.9)
+
+
+class PalabrasOcrTests(SimpleTestCase):
+    def palabras(self, fragmentos):
+        """fragmentos: [(texto, (x0, y0, x1, y1), confianza)] en coordenadas relativas."""
+        return PalabrasOCR([f[0] for f in fragmentos], [f[1] for f in fragmentos], [f[2] for f in fragmentos])
+
+    def test_valor_debajo_o_a_la_derecha_del_ancla(self):
+        palabras = self.palabras([
+            ("BOG123", (0.70, 0.01, 0.80, 0.03), 0.99),  # Otra placa en el encabezado, lejos del ancla
+            ("PLACA No.", (0.30, 0.10, 0.40, 0.12), 0.95),
+            ("ASA 534", (0.31, 0.13, 0.39, 0.15), 0.80),
+            ("TOTAL A PAGAR", (0.05, 0.50, 0.25, 0.52), 0.90),
+            ("$ 1.191.000", (0.30, 0.50, 0.40, 0.52), 0.70),
+            ("$ 57.000", (0.05, 0.60, 0.15, 0.62), 0.99),
+        ])
+
+        placa, confianza = buscar_por_geometria(palabras, 'placa')
+        self.assertEqual(placa, 'ASA534')
+        self.assertAlmostEqual(confianza, 0.80, places=5)
+        self.assertEqual(buscar_por_geometria(palabras, 'monto')[0], 1191000)
+        self.assertEqual(extraer_de_pagina(palabras.texto, palabras)['placa'], 'ASA534')
+
+    def test_evidencia_compacta_ida_y_vuelta(self):
+        salida_ocr = como_readtext(TEXTO_REF, (2200, 1700))
+        palabras = PalabrasOCR.desde_readtext(salida_ocr, (2200, 1700))
+        blob = palabras.a_bytes()
+        copia = PalabrasOCR.desde_bytes(blob)
+
+        # Mucho menos que guardar la salida de readtext como JSON con coordenadas enteras
+        como_json = json.dumps([[[[int(x), int(y)] for x, y in caja], texto, conf] for caja, texto, conf in salida_ocr])
+        self.assertLess(len(blob) * 4, len(como_json))
+        self.assertEqual(copia.textos, palabras.textos)
+        np.testing.assert_allclose(copia.cajas, palabras.cajas, atol=1e-4)
+        np.testing.assert_allclose(copia.confianzas, palabras.confianzas, atol=1 / 255)
+
+    def test_resultado_con_confianza_y_evidencia_repuntuable(self):
+        from PIL import Image
+
+        pool = PoolLectoresOCR(usar_gpu=False)
+        pool._lector, pool._pid = LectorLento(), os.getpid()
+        with tempfile.TemporaryDirectory() as carpeta, override_settings(OCR_REGIONES=False), \
+                mock.patch('auditoria.OCR.lector_soat.obtener_pool', return_value=pool):
+            ruta = Path(carpeta) / 'soat.png'
+            Image.new('L', (600, 800), 255).save(ruta)
+            resultado = extraer_datos_soat(str(ruta))
+
+        self.assertEqual((resultado['placa'], resultado['monto'], resultado['confianza']), ('ASA534', 1191000, 0.9))
+        self.assertEqual(
+            repuntuar_evidencia(resultado['evidencia']), {'placa': 'ASA534', 'monto': 1191000, 'confianza': 0.902},
+        )
+
+
+class DashboardTests(TestCase):
+    def crear(self, cantidad, **campos):
+        auditorias = Auditoria.objects.bulk_create([Auditoria(archivo_soat='soportes_soat/x.pdf', **campos) for _ in range(cantidad)])
+        registrar_creadas(auditorias)
+        return auditorias
+
+    def resumen_de_hoy(self):
+        fila = ResumenDiario.objects.get()
+        return fila.pendientes, fila.aprobados, fila.fraudes
+
+    def test_paginacion_por_cursor_recorre_todo_sin_repetir(self):
+        self.crear(25)
+        vistos, cursor = [], None
+        while True:
+            pagina = paginar(Auditoria.objects.only('id', 'fecha_creacion'), despues=cursor, tamano=10)
+            vistos += [a.id for a in pagina['registros']]
+            cursor = pagina['cursor_siguiente']
+            if cursor is None:
+                break
+
+        esperado = list(Auditoria.objects.order_by('-fecha_creacion', '-id').values_list('id', flat=True))
+        self.assertEqual(vistos, esperado)
+
+        # Volver atrás desde la segunda página da la primera
+        segunda = paginar(Auditoria.objects.all(), despues=paginar(Auditoria.objects.all(), tamano=10)['cursor_siguiente'], tamano=10)
+        primera = paginar(Auditoria.objects.all(), antes=segunda['cursor_anterior'], tamano=10)
+        self.assertEqual([a.id for a in primera['registros']], esperado[:10])
+        self.assertIsNone(primera['cursor_anterior'])
+
+    def test_contadores_siguen_creacion_cambio_y_borrado(self):
+        auditoria = Auditoria.objects.create(archivo_soat='soportes_soat/a.pdf')
+        self.crear(2, resultado='APROBADO')
+        self.assertEqual(self.resumen_de_hoy(), (1, 2, 0))
+
+        auditoria.resultado = 'FRAUDE'
+        auditoria.save()
+        self.assertEqual(self.resumen_de_hoy(), (0, 2, 1))
+
+        Auditoria.objects.get(pk=auditoria.pk).delete()
+        self.assertEqual(self.resumen_de_hoy(), (0, 2, 0))
+
+        recalcular_resumen()
+        self.assertEqual(self.resumen_de_hoy(), (0, 2, 0))
+
+    def test_contadores_con_resultado_diferido(self):
+        auditoria = Auditoria.objects.create(archivo_soat='soportes_soat/a.pdf')
+
+        sin_resultado = Auditoria.objects.only('id', 'fecha_creacion').get(pk=auditoria.pk)
+        sin_resultado.resultado = 'APROBADO'
+        sin_resultado.save()
+        self.assertEqual(self.resumen_de_hoy(), (0, 1, 0))
+
+        Auditoria.objects.defer('resultado').get(pk=auditoria.pk).delete()
+        self.assertEqual(self.resumen_de_hoy(), (0, 0, 0))
+
+    def test_filtros_y_vista(self):
+        self.crear(3, placa_detectada='ASA534', resultado='FRAUDE')
+        self.crear(2, placa_detectada='BCD123', resultado='APROBADO')
+
+        self.assertEqual(filtrar(Auditoria.objects.all(), placa='asa-5').count(), 3)
+        self.assertEqual(filtrar(Auditoria.objects.all(), resultado='APROBADO').count(), 2)
+
+        respuesta = self.client.get(reverse('dashboard'), {'placa': 'BCD'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.context['registros']), 2)
+        self.assertEqual(respuesta.context['resumen']['totales']['fraudes'], 3)
+
+
+class CargaSincronaMixin:
+    """Carga síncrona con MEDIA_ROOT temporal y RUNT local."""
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.carpeta = Path(carpeta.name)
+        self.subidas = self.carpeta / 'subidas_tmp'
+        self.subidas.mkdir()
+        ajustes = override_settings(MEDIA_ROOT=carpeta.name, FILE_UPLOAD_TEMP_DIR=str(self.subidas),
+                                    AUDITORIA_ASINCRONA=False, RUNT_BACKEND='local')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+
+class CargaUnaEscrituraTests(CargaSincronaMixin, TestCase):
+    def subir(self, texto, nombre):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(reverse('carga_soportes'), {
+                'archivo_soat': SimpleUploadedFile(nombre, pdf_con_texto([texto]), 'application/pdf'),
+            })
+        escrituras = [c['sql'] for c in consultas.captured_queries
+                      if '"auditoria_auditoria"' in c['sql'] and c['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        return respuesta, escrituras
+
+    def test_lectura_exitosa_inserta_una_sola_vez(self):
+        respuesta, escrituras = self.subir(TEXTO_REF, 'soat.pdf')
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(len(escrituras), 1)
+        self.assertTrue(escrituras[0].startswith('INSERT'))
+        self.assertEqual(Auditoria.objects.get().placa_detectada, 'ASA534')
+
+    def test_lectura_fallida_no_escribe_ni_deja_archivo(self):
+        respuesta, escrituras = self.subir("Documento sin datos del vehículo", 'basura.pdf')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(escrituras, [])
+        self.assertFalse(Auditoria.objects.exists())
+        self.assertEqual(list(self.carpeta.rglob('*.pdf')), [])
+
+
+class SubidaSoatTests(CargaSincronaMixin, TestCase):
+    def subir(self, nombre, contenido):
+        return self.client.post(
+            reverse('carga_soportes'), {'archivo_soat': SimpleUploadedFile(nombre, contenido)},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+    def archivos_en_disco(self):
+        return [p for p in self.carpeta.rglob('*') if p.is_file()]
+
+    def test_rechaza_por_firma_sin_escribir_nada(self):
+        respuesta = self.subir('soat.pdf', b'GIF89a' + b'\x00' * 5000)
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn("no es un PDF, JPG ni PNG", respuesta.json()['mensaje'])
+        self.assertEqual(self.archivos_en_disco(), [])
+        self.assertFalse(Auditoria.objects.exists())
+
+    @override_settings(SOAT_TAMANO_MAXIMO_MB=1)
+    def test_corta_la_subida_al_pasar_el_tamano_maximo(self):
+        respuesta = self.subir('grande.pdf', b'%PDF-1.4\n' + b'0' * (1024 * 1024))
+        self.assertIn("tamaño máximo (1 MB)", respuesta.json()['mensaje'])
+        self.assertEqual(self.archivos_en_disco(), [])
+
+    @override_settings(SOAT_MAX_PAGINAS_ARCHIVO=2)
+    def test_rechaza_pdf_con_demasiadas_paginas(self):
+        respuesta = self.subir('largo.pdf', pdf_con_texto([TEXTO_REF] * 3))
+        self.assertIn("tiene 3 páginas", respuesta.json()['mensaje'])
+
+    def test_extension_segun_la_firma_y_hash_de_la_subida(self):
+        contenido = pdf_con_texto([TEXTO_REF])
+        respuesta = self.subir('foto_del_soat.jpg', contenido)  # Un PDF con nombre de foto
+        self.assertEqual(respuesta.status_code, 302)
+
+        auditoria = Auditoria.objects.get()
+        self.assertTrue(auditoria.archivo_soat.name.endswith('.pdf'))
+        self.assertEqual(auditoria.hash_archivo, hashlib.sha256(contenido).hexdigest())
+        self.assertEqual(auditoria.placa_detectada, 'ASA534')
+        self.assertEqual(list(self.subidas.iterdir()), [])  # La subida pasó a soportes_soat/ (rename)
+
+
+class AlmacenamientoSoportesTests(CargaSincronaMixin, TestCase):
+    def test_ruta_por_contenido_sin_copias_repetidas(self):
+        contenido = pdf_con_texto([TEXTO_REF])
+        hash_pdf = hashlib.sha256(contenido).hexdigest()
+        primero = default_storage.save('soportes_soat/a.pdf', ContentFile(contenido))
+        segundo = default_storage.save('soportes_soat/b.PDF', ContentFile(contenido))
+        self.assertEqual(primero, f'soportes_soat/{hash_pdf[:2]}/{hash_pdf[2:4]}/{hash_pdf}.pdf')
+        self.assertEqual(segundo, primero)
+        self.assertEqual(len([p for p in self.carpeta.rglob('*.pdf')]), 1)
+
+    @override_settings(SOPORTES_COMPRIMIR_DESDE_MB=0)
+    def test_fotos_grandes_se_recomprimen(self):
+        from PIL import Image
+
+        foto = io.BytesIO()
+        ruido = np.random.default_rng(0).integers(0, 255, (600, 800, 3), dtype=np.uint8)
+        Image.fromarray(ruido).save(foto, 'JPEG', quality=100)
+        nombre = default_storage.save('soportes_soat/foto.jpg', ContentFile(foto.getvalue()))
+        self.assertLess(default_storage.size(nombre), len(foto.getvalue()))
+        with default_storage.open(nombre) as guardada, Image.open(guardada) as im:
+            self.assertEqual(im.size, (800, 600))
+        # El nombre es el hash de lo que se subió, no de lo guardado
+        self.assertIn(hashlib.sha256(foto.getvalue()).hexdigest(), nombre)
+
+    def test_documento_con_range(self):
+        contenido = pdf_con_texto([TEXTO_REF])
+        nombre = default_storage.save('soportes_soat/soat.pdf', ContentFile(contenido))
+        auditoria = Auditoria.objects.create(archivo_soat=nombre, hash_archivo='abc')
+        url = reverse('ver_soporte', args=[auditoria.id])
+
+        completo = self.client.get(url)
+        self.assertEqual(completo.status_code, 200)
+        self.assertEqual(b''.join(completo.streaming_content), contenido)
+        self.assertEqual(completo['Accept-Ranges'], 'bytes')
+
+        tramo = self.client.get(url, HTTP_RANGE='bytes=0-4')
+        self.assertEqual(tramo.status_code, 206)
+        self.assertEqual(b''.join(tramo.streaming_content), b'%PDF-')
+        self.assertEqual(tramo['Content-Range'], f'bytes 0-4/{len(contenido)}')
+
+        final = self.client.get(url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(final.streaming_content), contenido[-3:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={len(contenido)}-').status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"abc"').status_code, 304)
+
+    def test_barrido_respeta_usados_y_gracia(self):
+        usado = default_storage.save('soportes_soat/usado.pdf', ContentFile(b'%PDF-usado'))
+        huerfano = default_storage.save('soportes_soat/huerfano.pdf', ContentFile(b'%PDF-huerfano'))
+        reciente = default_storage.save('soportes_soat/reciente.pdf', ContentFile(b'%PDF-reciente'))
+        Auditoria.objects.create(archivo_soat=usado)
+        viejo = time.time() - 2 * 3600
+        for nombre in (usado, huerfano):
+            os.utime(default_storage.path(nombre), (viejo, viejo))
+
+        simulado = barrer_huerfanos(gracia_minutos=60, simular=True)
+        self.assertEqual((simulado['revisados'], simulado['borrados']), (3, 1))
+        self.assertTrue(default_storage.exists(huerfano))
+
+        barrer_huerfanos(tamano_lote=2, gracia_minutos=60)
+        self.assertTrue(default_storage.exists(usado))
+        self.assertTrue(default_storage.exists(reciente))
+        self.assertFalse(default_storage.exists(huerfano))
+        self.assertFalse(os.path.exists(os.path.dirname(default_storage.path(huerfano))))  # Carpeta vacía
+
+    def test_reutilizar_un_archivo_le_devuelve_la_gracia(self):
+        # Todas sus auditorías se borraron hace rato y el mismo contenido vuelve a subirse
+        contenido = b'%PDF-otra vez'
+        nombre = default_storage.save('soportes_soat/soat.pdf', ContentFile(contenido))
+        viejo = time.time() - 2 * 3600
+        os.utime(default_storage.path(nombre), (viejo, viejo))
+
+        self.assertEqual(guardar_archivo_deduplicado('soportes_soat/soat.pdf', ContentFile(contenido))[0], nombre)
+        self.assertEqual(default_storage.save('soportes_soat/copia.pdf', ContentFile(contenido)), nombre)
+        # Entre guardar el archivo e insertar su auditoría, el barrido no lo toca
+        self.assertEqual(barrer_huerfanos(gracia_minutos=60)['borrados'], 0)
+        self.assertTrue(default_storage.exists(nombre))
+
+    def test_reubicar_la_carpeta_plana(self):
+        plano = self.carpeta / 'soportes_soat' / 'viejo.pdf'
+        plano.parent.mkdir()
+        plano.write_bytes(b'%PDF-plano')
+        auditoria = Auditoria.objects.create(archivo_soat='soportes_soat/viejo.pdf')
+
+        self.assertEqual(reubicar_soportes()['reubicados'], 1)
+        auditoria.refresh_from_db()
+        hash_plano = hashlib.sha256(b'%PDF-plano').hexdigest()
+        self.assertEqual(auditoria.archivo_soat.name, ruta_por_hash('soportes_soat/viejo.pdf', hash_plano))
+        self.assertEqual(auditoria.hash_archivo, hash_plano)
+        self.assertTrue(default_storage.exists(auditoria.archivo_soat.name))
+        self.assertFalse(plano.exists())
+
+
+class CacheContenidoTests(CargaSincronaMixin, TestCase):
+    exito = {'exito': True, 'placa': 'ASA534', 'monto': 1191000, 'origen': 'Digital (Nativo)'}
+
+    def entrada(self, hash_archivo, dias=0):
+        guardar_en_cache(hash_archivo, self.exito)
+        CacheExtraccion.objects.filter(hash_archivo=hash_archivo).update(
+            ultimo_acceso=timezone.now() - timedelta(days=dias),
+        )
+
+    def test_ttl_y_fallos(self):
+        self.entrada('a' * 64)
+        self.entrada('b' * 64, dias=settings.CACHE_EXTRACCION_TTL_DIAS + 1)
+        guardar_en_cache('c' * 64, {'exito': False, 'mensaje': "No pudimos detectar la PLACA"})
+
+        acierto = buscar_en_cache('a' * 64)
+        self.assertEqual((acierto['placa'], acierto['monto'], acierto['desde_cache']), ('ASA534', 1191000, True))
+        self.assertEqual(CacheExtraccion.objects.get(hash_archivo='a' * 64).aciertos, 1)
+        self.assertIsNone(buscar_en_cache('b' * 64))  # Vencida
+        self.assertIsNone(buscar_en_cache('c' * 64))  # Los fallos nunca se guardan
+        purgar_cache()
+        self.assertEqual(list(CacheExtraccion.objects.values_list('hash_archivo', flat=True)), ['a' * 64])
+
+    @override_settings(CACHE_EXTRACCION_MAX_ENTRADAS=2)
+    def test_desalojo_lru(self):
+        for hash_archivo, dias in (('a' * 64, 3), ('b' * 64, 2), ('c' * 64, 1)):
+            self.entrada(hash_archivo, dias)
+        buscar_en_cache('a' * 64)  # La más vieja vuelve a usarse: sale la siguiente
+
+        purgar_cache()
+        self.assertEqual(set(CacheExtraccion.objects.values_list('hash_archivo', flat=True)), {'a' * 64, 'c' * 64})
+
+    def test_otra_version_del_pipeline_invalida(self):
+        self.entrada('a' * 64)
+        with mock.patch('auditoria.cache_contenido.VERSION_PIPELINE', 'siguiente'):
+            self.assertIsNone(buscar_en_cache('a' * 64))
+            purgar_cache()
+        self.assertFalse(CacheExtraccion.objects.exists())
+
+    def test_archivos_identicos_se_guardan_una_vez(self):
+        nombre, hash_archivo = guardar_archivo_deduplicado('soportes_soat/a.pdf', ContentFile(b'%PDF-igual'))
+        self.assertEqual(guardar_archivo_deduplicado('soportes_soat/b.pdf', ContentFile(b'%PDF-igual')),
+                         (nombre, hash_archivo))
+        self.assertNotEqual(guardar_archivo_deduplicado('soportes_soat/a.pdf', ContentFile(b'%PDF-otro'))[0], nombre)
+        self.assertEqual(len(list(self.carpeta.rglob('*.pdf'))), 2)
+
+        # Una copia que todavía está en la carpeta plana se encuentra por el hash de su auditoría
+        plano = self.carpeta / 'soportes_soat' / 'viejo.pdf'
+        plano.write_bytes(b'%PDF-plano')
+        hash_plano = hashlib.sha256(b'%PDF-plano').hexdigest()
+        Auditoria.objects.create(archivo_soat='soportes_soat/viejo.pdf', hash_archivo=hash_plano)
+        self.assertEqual(guardar_archivo_deduplicado('soportes_soat/nuevo.pdf', ContentFile(b'%PDF-plano')),
+                         ('soportes_soat/viejo.pdf', hash_plano))
+
+    def test_archivos_identicos_en_un_lote_se_leen_una_vez(self):
+        rutas = []
+        for nombre in ('a.pdf', 'b.pdf', 'c.pdf'):
+            rutas.append(self.carpeta / nombre)
+            rutas[-1].write_bytes(pdf_con_texto([TEXTO_REF if nombre != 'c.pdf' else TEXTO_REF + " COPIA"]))
+
+        with mock.patch('auditoria.procesamiento.extraer_datos_soat_lote',
+                        side_effect=extraer_datos_soat_lote) as leer_lote:
+            resultados = analizar_archivos([(str(ruta), None) for ruta in rutas], verificar_runt=False)
+
+        self.assertEqual(len(leer_lote.call_args.args[0]), 2)  # b.pdf es a.pdf: no se vuelve a leer
+        self.assertEqual([r['placa'] for r in resultados], ['ASA534'] * 3)
+        self.assertTrue(resultados[1]['desde_cache'])
+        self.assertIsNot(resultados[1], resultados[0])
+
+
+def zip_con(miembros):
+    """Bytes de un ZIP con {nombre_dentro_del_zip: contenido}."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for nombre, contenido in miembros.items():
+            zf.writestr(nombre, contenido)
+    return buffer.getvalue()
+
+
+class PoolEnLinea:
+    """
+    Reemplaza al ProcessPoolExecutor de lote.py: corre cada tarea al enviarla, en este hilo.
+    La BD de pruebas está en memoria y dentro de una transacción: otro proceso no la ve.
+    """
+
+    def __init__(self, max_workers=None, initializer=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *error):
+        return False
+
+    def submit(self, funcion, *args):
+        futuro = Future()
+        try:
+            futuro.set_result(funcion(*args))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+
+
+class ColaTests(TestCase):
+    def encolar(self, **campos):
+        auditoria = Auditoria.objects.create(archivo_soat='soportes_soat/a.pdf')
+        return TrabajoAuditoria.objects.create(auditoria=auditoria, **campos)
+
+    def test_reclamar_siguiente_salta_el_que_otro_worker_tomo(self):
+        primero, segundo = self.encolar(), self.encolar()
+        update_original = QuerySet.update
+
+        def otro_worker_primero(queryset, **campos):
+            # Entre el SELECT y el UPDATE de este worker, otro toma el mismo trabajo
+            if campos.get('estado') == 'PROCESANDO' and not otro_worker_primero.hecho:
+                otro_worker_primero.hecho = True
+                update_original(TrabajoAuditoria.objects.filter(pk=primero.pk), estado='PROCESANDO', intentos=1)
+            return update_original(queryset, **campos)
+        otro_worker_primero.hecho = False
+
+        with mock.patch.object(QuerySet, 'update', otro_worker_primero):
+            reclamado = cola.reclamar_siguiente()
+
+        self.assertEqual((reclamado.pk, reclamado.estado, reclamado.intentos), (segundo.pk, 'PROCESANDO', 1))
+        self.assertEqual(TrabajoAuditoria.objects.get(pk=primero.pk).intentos, 1)  # Solo el otro worker lo contó
+        self.assertIsNone(cola.reclamar_siguiente())
+
+    def test_recuperar_trabajos_colgados(self):
+        hace_rato = timezone.now() - cola.TIEMPO_MAXIMO_PROCESANDO - timedelta(minutes=1)
+        reintentable = self.encolar(estado='PROCESANDO', fecha_inicio=hace_rato, intentos=1)
+        agotado = self.encolar(estado='PROCESANDO', fecha_inicio=hace_rato, intentos=cola.MAX_INTENTOS)
+        en_curso = self.encolar(estado='PROCESANDO', fecha_inicio=timezone.now(), intentos=1)
+
+        self.assertEqual(cola.recuperar_trabajos_colgados(), 1)
+        estados = dict(TrabajoAuditoria.objects.values_list('pk', 'estado'))
+        self.assertEqual(
+            [estados[t.pk] for t in (reintentable, agotado, en_curso)], ['PENDIENTE', 'ERROR', 'PROCESANDO'],
+        )
+
+    def test_worker_recupera_colgados_mientras_corre(self):
+        with mock.patch('auditoria.management.commands.procesar_cola.INTERVALO_RECUPERACION', timedelta(0)), \
+                mock.patch('auditoria.management.commands.procesar_cola.procesar_pendientes', return_value=0), \
+                mock.patch('auditoria.management.commands.procesar_cola.recuperar_trabajos_colgados',
+                           return_value=0) as recuperar, \
+                mock.patch('auditoria.management.commands.procesar_cola.time.sleep',
+                           side_effect=[None, None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                bucle_worker(intervalo=1, una_vez=False)
+        self.assertEqual(recuperar.call_count, 3)
+
+    def test_si_el_lote_falla_se_procesan_uno_a_uno(self):
+        trabajos = [self.encolar(estado='PROCESANDO', fecha_inicio=timezone.now()) for _ in range(2)]
+        exito = {'exito': True, 'placa': 'ASA534'}
+
+        with mock.patch('auditoria.cola.procesar_auditorias', side_effect=MemoryError("sin memoria")), \
+                mock.patch('auditoria.cola.procesar_auditoria', side_effect=[exito, RuntimeError("EasyOCR")]) as uno:
+            cola.ejecutar_trabajos(trabajos)
+
+        self.assertEqual(uno.call_count, 2)
+        terminado, fallido = [TrabajoAuditoria.objects.get(pk=t.pk) for t in trabajos]
+        self.assertEqual((terminado.estado, terminado.mensaje), ('TERMINADO', "¡Lectura exitosa! Placa: ASA534"))
+        self.assertEqual((fallido.estado, fallido.auditoria), ('ERROR', None))
+        self.assertIn("EasyOCR", fallido.mensaje)
+        self.assertEqual(Auditoria.objects.count(), 1)  # La fallida se borró
+
+    def test_estado_trabajo_json(self):
+        trabajo = self.encolar()
+        self.assertEqual(self.client.get(reverse('estado_trabajo', args=[trabajo.id])).json(), {
+            'trabajo': trabajo.id, 'estado': 'PENDIENTE', 'mensaje': '',
+            'auditoria': {'id': trabajo.auditoria_id, 'placa': None, 'monto': None, 'resultado': 'PENDIENTE',
+                          'duplicado': None, 'duplicado_de': None},
+        })
+
+        Auditoria.objects.all().delete()
+        TrabajoAuditoria.objects.filter(pk=trabajo.pk).update(estado='ERROR', mensaje="No pudimos detectar la PLACA")
+        self.assertEqual(self.client.get(reverse('estado_trabajo', args=[trabajo.id])).json(), {
+            'trabajo': trabajo.id, 'estado': 'ERROR', 'mensaje': "No pudimos detectar la PLACA", 'auditoria': None,
+        })
+
+
+class LoteTests(CargaSincronaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        call_command('importar_runt', archivo=str(DATOS_PRUEBA / 'runt_muestra.csv'), stdout=StringIO())
+        self.zip = self.carpeta / 'soportes.zip'
+        self.zip.write_bytes(zip_con({
+            'lote/soat.pdf': pdf_con_texto([TEXTO_REF]),
+            'lote/basura.pdf': pdf_con_texto(["Documento sin datos del vehículo"]),
+            'lote/vacia/': b'',
+            'lote/notas.txt': b'no es un soporte',
+        }))
+
+    def test_iterar_documentos_de_zip_y_carpeta(self):
+        with mock.patch('auditoria.lote.TAMANO_MAXIMO_MIEMBRO', 1000), self.assertLogs('auditoria.lote', 'WARNING'):
+            del_zip = [nombre for nombre, _ in iterar_documentos(str(self.zip))]
+        self.assertEqual(del_zip, ['basura.pdf'])  # soat.pdf supera el máximo: se omite sin leerlo
+        self.assertEqual([nombre for nombre, _ in iterar_documentos(str(self.zip))], ['soat.pdf', 'basura.pdf'])
+
+        carpeta = self.carpeta / 'carpeta'
+        carpeta.mkdir()
+        (carpeta / 'b.png').write_bytes(b'png')
+        (carpeta / 'a.PDF').write_bytes(b'pdf')
+        (carpeta / 'c.docx').write_bytes(b'docx')
+        self.assertEqual([(n, a.read()) for n, a in iterar_documentos(carpeta)], [('a.PDF', b'pdf'), ('b.png', b'png')])
+
+    def test_procesar_lote_encolado(self):
+        reporte = procesar_lote(iterar_documentos(str(self.zip)), encolar=True)
+
+        self.assertEqual((reporte['total'], reporte['encolados']), (2, True))
+        self.assertEqual(TrabajoAuditoria.objects.filter(estado='PENDIENTE').count(), 2)
+        self.assertEqual(ResumenDiario.objects.get().pendientes, 2)
+
+    def test_procesar_lote_guarda_solo_las_exitosas(self):
+        with mock.patch('auditoria.lote.ProcessPoolExecutor', PoolEnLinea):
+            reporte = procesar_lote(iterar_documentos(str(self.zip)), procesos=2, tamano_lote=1)
+
+        self.assertEqual((reporte['exitosos'], reporte['fallidos']), (1, 1))
+        self.assertEqual(len(reporte['errores']), 1)
+        auditoria = Auditoria.objects.get()
+        self.assertEqual((auditoria.placa_detectada, auditoria.resultado), ('ASA534', 'FRAUDE'))
+        self.assertTrue(auditoria.version_registro.startswith('local:'))
+
+    def test_documentos_identicos_en_el_lote_se_leen_una_vez(self):
+        self.zip.write_bytes(zip_con({'a.pdf': pdf_con_texto([TEXTO_REF]), 'copia.pdf': pdf_con_texto([TEXTO_REF])}))
+        with mock.patch('auditoria.lote.ProcessPoolExecutor', PoolEnLinea), \
+                mock.patch('auditoria.lote._analizar_en_worker', side_effect=_analizar_en_worker) as worker:
+            reporte = procesar_lote(iterar_documentos(str(self.zip)), tamano_lote=1)
+
+        self.assertEqual(worker.call_count, 1)
+        self.assertEqual(reporte['exitosos'], 2)
+        original, copia = Auditoria.objects.order_by('id')
+        self.assertEqual((copia.placa_detectada, copia.tipo_duplicado, copia.duplicado_de_id),
+                         ('ASA534', 'ARCHIVO', original.id))
+
+    def test_audit_batch(self):
+        salida = StringIO()
+        call_command('audit_batch', str(self.zip), '--encolar', stdout=salida)
+        self.assertIn("2 documentos encolados", salida.getvalue())
+
+        corrupto = self.carpeta / 'corrupto.zip'
+        corrupto.write_bytes(b'PK no es un zip')
+        with self.assertRaisesMessage(CommandError, "no es un ZIP válido"):
+            call_command('audit_batch', str(corrupto))
+        with self.assertRaises(CommandError):
+            call_command('audit_batch', str(self.carpeta / 'no_existe'))
+
+    def test_carga_lote_web_solo_encola(self):
+        archivo = SimpleUploadedFile('soportes.zip', self.zip.read_bytes(), 'application/zip')
+        respuesta = self.client.post(reverse('carga_lote'), {'archivos': [archivo]}, follow=True)
+        self.assertContains(respuesta, "requiere la cola de trabajos")
+        self.assertFalse(Auditoria.objects.exists())
+
+        with override_settings(AUDITORIA_ASINCRONA=True):
+            archivo.seek(0)
+            self.client.post(reverse('carga_lote'), {'archivos': [archivo]})
+            self.assertEqual(TrabajoAuditoria.objects.count(), 2)
+
+            corrupto = SimpleUploadedFile('roto.zip', b'PK no es un zip', 'application/zip')
+            respuesta = self.client.post(reverse('carga_lote'), {'archivos': [corrupto]}, follow=True)
+        self.assertContains(respuesta, "No se pudo leer el ZIP")
+        self.assertEqual(TrabajoAuditoria.objects.count(), 2)
+
+
+class VistasAsgiTests(CargaSincronaMixin, TestCase):
+    async def test_carga_sincrona_con_ocr_en_el_pool(self):
+        respuesta = await self.async_client.post(reverse('carga_soportes'), {
+            'archivo_soat': SimpleUploadedFile('soat.pdf', pdf_con_texto([TEXTO_REF]), 'application/pdf'),
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        auditoria = await Auditoria.objects.aget()
+        self.assertEqual((auditoria.placa_detectada, auditoria.resultado), ('ASA534', 'APROBADO'))
+        self.assertTrue({'extraccion', 'runt', 'guardar_archivo'} <= set(auditoria.tiempos))
+
+    async def test_estado_y_dashboard(self):
+        auditoria = await Auditoria.objects.acreate(archivo_soat='soportes_soat/a.pdf', placa_detectada='ASA534')
+        trabajo = await TrabajoAuditoria.objects.acreate(auditoria=auditoria, estado='TERMINADO')
+
+        estado = await self.async_client.get(reverse('estado_trabajo', args=[trabajo.id]))
+        self.assertEqual(estado.json()['auditoria']['placa'], 'ASA534')
+        self.assertEqual((await self.async_client.get(reverse('estado_trabajo', args=[trabajo.id + 1]))).status_code, 404)
+
+        tablero = await self.async_client.get(reverse('dashboard'), {'placa': 'ASA'})
+        self.assertEqual([r.id for r in tablero.context['registros']], [auditoria.id])
+
+
+@override_settings(RUNT_BACKEND='local')
+class ReauditoriaTests(TestCase):
+    def test_solo_revisa_las_desactualizadas_y_ajusta_el_resumen(self):
+        call_command('importar_runt', archivo=str(DATOS_PRUEBA / 'runt_muestra.csv'), stdout=StringIO())
+        en_runt = Auditoria.objects.create(archivo_soat='a.pdf', placa_detectada='ASA534', resultado='APROBADO')
+        fuera = Auditoria.objects.create(archivo_soat='b.pdf', placa_detectada='BOG123', resultado='APROBADO')
+        Auditoria.objects.create(archivo_soat='c.pdf')  # Pendiente, sin placa: no entra
+
+        simulado = reauditar(simular=True)
+        self.assertEqual(simulado['cambiadas'], 1)
+        self.assertEqual(Auditoria.objects.get(pk=en_runt.pk).resultado, 'APROBADO')
+
+        reporte = reauditar(tamano_lote=1)
+        self.assertEqual((reporte['revisadas'], reporte['transiciones']), (2, {('APROBADO', 'FRAUDE'): 1}))
+        self.assertEqual(Auditoria.objects.get(pk=en_runt.pk).resultado, 'FRAUDE')
+        resumen = ResumenDiario.objects.get()
+        self.assertEqual((resumen.pendientes, resumen.aprobados, resumen.fraudes), (1, 1, 1))
+        self.assertEqual(reauditar()['total'], 0)  # Nada cambió desde la última pasada
+
+        # Nueva importación del RUNT (trae BOG123): solo eso cambia el veredicto
+        call_command('importar_runt', archivo=str(DATOS_PRUEBA / 'runt_muestra.json'), stdout=StringIO())
+        salida = StringIO()
+        call_command('reaudit', stdout=salida)
+
+        self.assertEqual(Auditoria.objects.get(pk=fuera.pk).resultado, 'FRAUDE')
+        self.assertIn("2 revisadas, 1 cambiaron", salida.getvalue())
+        self.assertEqual(ResumenDiario.objects.get().fraudes, 2)
+
+
+class ReauditoriaApiTests(ServidorRuntMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        ajustes = override_settings(RUNT_BACKEND='api', RUNT_URL=self.url)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        cache_version = mock.patch.dict('auditoria.runt._version_api', valor='', expira=0.0)
+        cache_version.start()
+        self.addCleanup(cache_version.stop)
+        ApiRuntFalsa.publicado = 1700000000
+        self.addCleanup(setattr, ApiRuntFalsa, 'publicado', 1700000000)
+        self.addCleanup(setattr, ApiRuntFalsa, 'caido', False)
+        cliente = mock.patch('auditoria.runt._cliente', None)  # Uno nuevo, con RUNT_URL = self.url
+        cliente.start()
+        self.addCleanup(cliente.stop)
+
+    def test_version_es_la_publicacion_del_dataset(self):
+        self.assertEqual(version_registro(), 'api:1700000000')
+        Auditoria.objects.create(archivo_soat='a.pdf', placa_detectada='ASA534', resultado='FRAUDE',
+                                 version_regla=VERSION_REGLA, version_registro=version_registro())
+        self.assertEqual(len(ApiRuntFalsa.peticiones), 1)  # La segunda vino de la cache del proceso
+
+        self.assertEqual(reauditar()['total'], 0)  # El paso del tiempo no la desactualiza
+        ApiRuntFalsa.publicado = 1800000000
+        with mock.patch.dict('auditoria.runt._version_api', expira=0.0):
+            self.assertEqual(desactualizadas().count(), 1)
+
+    def test_sin_version_pide_forzar(self):
+        ApiRuntFalsa.publicado = None
+        Auditoria.objects.create(archivo_soat='a.pdf', placa_detectada='ASA534', resultado='FRAUDE')
+
+        with self.assertLogs('auditoria.runt', 'WARNING'), self.assertRaises(CommandError):
+            call_command('reaudit', stdout=StringIO())
+
+    def test_api_caida_no_cambia_ni_marca_las_auditorias(self):
+        auditoria = Auditoria.objects.create(archivo_soat='a.pdf', placa_detectada='ASA534', resultado='FRAUDE',
+                                             version_regla=VERSION_REGLA, version_registro='api:1')
+        # Respuesta guardada antes de la publicación actual: la re-auditoría no la usa
+        ConsultaRunt.objects.create(placa='ASA534', existe=False, expira=timezone.now() + timedelta(hours=1))
+
+        ApiRuntFalsa.caido = True
+        with self.assertLogs('auditoria.OCR.cliente_api', 'WARNING'):
+            reporte = reauditar()
+        self.assertEqual((reporte['revisadas'], reporte['sin_verificar'], reporte['cambiadas']), (0, 1, 0))
+        auditoria.refresh_from_db()
+        self.assertEqual((auditoria.resultado, auditoria.version_registro), ('FRAUDE', 'api:1'))
+
+        ApiRuntFalsa.caido = False
+        self.assertEqual(reauditar()['revisadas'], 1)
+        auditoria.refresh_from_db()  # Con la cache vieja habría pasado a APROBADO
+        self.assertEqual((auditoria.resultado, auditoria.version_registro), ('FRAUDE', 'api:1700000000'))
+
+
+class HuellasTests(SimpleTestCase):
+    def test_firma_de_texto_ignora_la_plantilla(self):
+        corpus = generar_corpus(casos=2)
+        original = firma_texto(corpus[0]['texto'], SHINGLES_PLANTILLAS)
+        placa_cambiada = firma_texto(corpus[0]['texto'].replace(corpus[0]['placa'], 'ZZZ999'), SHINGLES_PLANTILLAS)
+        otra_poliza = firma_texto(corpus[1]['texto'], SHINGLES_PLANTILLAS)
+
+        self.assertGreater(similitud_firmas(original, placa_cambiada), 0.8)
+        self.assertTrue(set(bandas_lsh(original)) & set(bandas_lsh(placa_cambiada)))
+        self.assertLess(similitud_firmas(original, otra_poliza), 0.5)
+        # Solo el texto de las regiones (placa y monto) no alcanza para una firma
+        self.assertIsNone(firma_texto("PLACA No. ASA534 TOTAL A PAGAR 1191000", SHINGLES_PLANTILLAS))
+
+    def test_phash_sobrevive_reduccion_y_grano(self):
+        import cv2
+
+        rng = np.random.default_rng(7)
+        pagina = np.full((1100, 850), 240, dtype=np.uint8)
+        for _ in range(40):  # Bloques oscuros como renglones de texto
+            x, y = rng.integers(0, 700), rng.integers(0, 1050)
+            pagina[y:y + 20, x:x + int(rng.integers(40, 150))] = 30
+        reducida = cv2.resize(pagina, (425, 550), interpolation=cv2.INTER_AREA)
+        con_grano = np.clip(reducida + rng.normal(0, 8, reducida.shape), 0, 255).astype(np.uint8)
+
+        self.assertLessEqual(distancia_hamming(hash_perceptual(pagina), hash_perceptual(con_grano)), 6)
+        self.assertGreater(distancia_hamming(hash_perceptual(pagina), hash_perceptual(pagina.T.copy())), 6)
+
+    def test_huella_de_imagen_sale_del_dibujo_del_ocr(self):
+        from PIL import Image
+
+        from .OCR import preprocesamiento
+
+        pool = PoolLectoresOCR(usar_gpu=False)
+        pool._lector, pool._pid = LectorLento(), os.getpid()
+        with tempfile.TemporaryDirectory() as carpeta, \
+                mock.patch('auditoria.OCR.lector_soat.obtener_pool', return_value=pool), \
+                mock.patch.object(preprocesamiento, 'decodificar_imagen', wraps=preprocesamiento.decodificar_imagen) as decodificar, \
+                mock.patch.object(preprocesamiento, 'rasterizar_pdf', wraps=preprocesamiento.rasterizar_pdf) as rasterizar:
+            foto = Path(carpeta) / 'soat.png'
+            Image.new('L', (600, 800), 255).save(foto)
+            digital = Path(carpeta) / 'soat.pdf'
+            digital.write_bytes(pdf_con_texto([generar_corpus(casos=1)[0]['texto']]))
+
+            de_foto = extraer_datos_soat(str(foto))
+            de_pdf = extraer_datos_soat(str(digital))
+
+        self.assertIsNotNone(de_foto['huella_imagen'])
+        self.assertEqual(decodificar.call_count, 1)  # La foto se decodifica una vez, para el OCR
+        # El PDF digital no se dibuja: sin huella de imagen, le basta la de texto
+        self.assertIsNone(de_pdf['huella_imagen'])
+        self.assertIsNotNone(de_pdf['huella_texto'])
+        rasterizar.assert_not_called()
+
+
+class DuplicadosTests(CargaSincronaMixin, TestCase):
+    def subir(self, texto, nombre):
+        self.client.post(reverse('carga_soportes'), {
+            'archivo_soat': SimpleUploadedFile(nombre, pdf_con_texto([texto]), 'application/pdf'),
+        })
+        return Auditoria.objects.latest('id')
+
+    def test_marca_la_coincidencia_mas_fuerte_con_una_anterior(self):
+        corpus = generar_corpus(casos=3)  # 0 y 2 son de la misma plantilla; 1 de otra
+        placa = corpus[0]['placa']
+        original = self.subir(corpus[0]['texto'], 'a.pdf')
+        mismo_archivo = self.subir(corpus[0]['texto'], 'a_otra_vez.pdf')
+        placa_cambiada = self.subir(corpus[0]['texto'].replace(placa, 'ZZZ999'), 'b.pdf')
+        misma_pagina = self.subir(corpus[2]['texto'].replace(corpus[2]['placa'], placa), 'c.pdf')
+        misma_placa = self.subir(corpus[1]['texto'].replace(corpus[1]['placa'], placa), 'd.pdf')
+
+        marcas = [(a.tipo_duplicado, a.duplicado_de_id) for a in Auditoria.objects.order_by('id')]
+        self.assertEqual(marcas, [
+            ('', None),
+            ('ARCHIVO', original.id),
+            ('TEXTO', mismo_archivo.id),  # Empate con el original: gana la más reciente
+            ('PLACA', mismo_archivo.id),  # PDF digital: no se dibuja, no hay huella de imagen
+            ('PLACA', misma_pagina.id),
+        ])
+        self.assertEqual(placa_cambiada.placa_detectada, 'ZZZ999')
+        self.assertIsNone(misma_placa.huella.imagen)
+        self.assertContains(self.client.get(reverse('dashboard')), 'repetida', count=4)
+
+    def test_misma_placa_y_pagina_parecida_es_imagen(self):
+        anteriores = [Auditoria.objects.create(archivo_soat=f'{i}.jpg', placa_detectada='ASA534') for i in range(2)]
+        nueva = Auditoria.objects.create(archivo_soat='c.jpg', placa_detectada='ASA534')
+        registrar_huellas([
+            (anteriores[0], {'huella_imagen': 0b1011}),
+            (anteriores[1], {'huella_imagen': -1}),  # Otra página: 64 bits en 1
+            (nueva, {'huella_imagen': 0b1001}),
+        ])
+
+        nueva.refresh_from_db()
+        self.assertEqual((nueva.tipo_duplicado, nueva.duplicado_de_id), ('IMAGEN', anteriores[0].id))
+
+    def test_bench_no_deja_filas(self):
+        salida = StringIO()
+        call_command('bench_duplicados', auditorias=300, consultas=10, stdout=salida)
+        self.assertIn("Copias editadas encontradas: 5/5", salida.getvalue())
+        self.assertFalse(Auditoria.objects.exists())
+
+
+class MetricasTests(CargaSincronaMixin, TestCase):
+    def test_histograma_acumulado(self):
+        histograma = Histograma(cubetas=(0.1, 1.0))
+        for valor in (0.05, 0.5, 0.7, 3.0):
+            histograma.observar(valor)
+        self.assertEqual(list(histograma.acumuladas()), [(0.1, 1), (1.0, 3)])
+        self.assertEqual(histograma.total, 4)
+        self.assertAlmostEqual(histograma.suma, 4.25)
+
+    def test_apagadas_por_defecto(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 404)
+
+    @override_settings(METRICAS_HABILITADAS=True)
+    def test_carga_guarda_tiempos_y_los_expone(self):
+        reiniciar_metricas()
+        self.client.post(reverse('carga_soportes'), {
+            'archivo_soat': SimpleUploadedFile('soat.pdf', pdf_con_texto([TEXTO_REF]), 'application/pdf'),
+        })
+
+        auditoria = Auditoria.objects.get()
+        self.assertEqual(auditoria.origen, 'Digital')
+        for etapa in ('guardar_archivo', 'cache', 'pdfplumber', 'clasificacion', 'extraccion', 'runt'):
+            self.assertIn(etapa, auditoria.tiempos)
+
+        respuesta = self.client.get(reverse('metricas'))
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = respuesta.content.decode()
+        self.assertIn('soat_etapa_segundos_count{etapa="pdfplumber"} 1', texto)
+        self.assertIn('soat_etapa_segundos_bucket{etapa="bd",le="+Inf"} 1', texto)
+        self.assertIn(f'soat_etapa_segundos_bucket{{etapa="extraccion",le="{CUBETAS[-1]}"}}', texto)
+        self.assertIn('soat_documentos_total{origen="Digital",exito="true"} 1', texto)
+        self.assertIn('# TYPE soat_etapa_rss_pico_megabytes gauge', texto)
+        self.assertIn('soat_etapa_rss_pico_megabytes{etapa="pdfplumber"} ', texto)
+
+    def test_directorio_suma_los_procesos(self):
+        reiniciar_metricas()
+        directorio = self.carpeta / 'metricas'
+        with override_settings(METRICAS_DIRECTORIO=str(directorio)):
+            registrar_resultado({'exito': True, 'origen': 'Digital', 'tiempos': {'cache': 0.002}})
+            propio = list(directorio.glob('metricas_*.json'))
+            self.assertEqual(len(propio), 1)
+            # Otro worker con el mismo estado, pero que llegó a más memoria en el OCR
+            otro = json.loads(propio[0].read_text())
+            otro['picos_rss'] = {'ocr': 1e6}
+            (directorio / 'metricas_99999_otro.json').write_text(json.dumps(otro))
+
+            texto = exponer()
+        self.assertIn('soat_etapa_segundos_count{etapa="cache"} 2', texto)
+        self.assertIn('soat_etapa_segundos_bucket{etapa="cache",le="0.005"} 2', texto)
+        self.assertIn('soat_documentos_total{origen="Digital",exito="true"} 2', texto)
+        self.assertIn('soat_etapa_rss_pico_megabytes{etapa="ocr"} 1000000.0', texto)
+        reiniciar_metricas()
+
+
+class CorpusGoldenTests(SimpleTestCase):
+    def test_corpus_determinista_y_versionado(self):
+        corpus = generar_corpus()
+        self.assertEqual(corpus, generar_corpus())
+        self.assertEqual(verificar_manifiesto(corpus), [])
+
+    def test_pdf_digitales_del_corpus(self):
+        casos = [c for c in generar_corpus() if c['formato'] in ('digital', 'varias_paginas')][:4]
+        with tempfile.TemporaryDirectory() as carpeta:
+            for caso, ruta in escribir_corpus(casos, carpeta):
+                self.assertEqual(acierta(caso, extraer_datos_soat(ruta)), (True, True), caso['id'])
+
+    def test_regresiones_contra_linea_base(self):
+        base = {'maquina': 'A', 'funciones': {'f': {'precision_placa': 0.95, 'p95_ms': 10.0, 'memoria_pico_kb': 100.0}}}
+
+        def reporte(maquina, **metricas):
+            return {'maquina': maquina, 'funciones': {'f': dict(base['funciones']['f'], **metricas)}}
+
+        self.assertEqual(comparar_con_linea_base(reporte('A', precision_placa=0.945), base), ([], []))
+        regresiones, _ = comparar_con_linea_base(reporte('A', precision_placa=0.90), base)
+        self.assertIn('precision_placa', regresiones[0])
+
+        # Más lento: regresión en la misma máquina, solo aviso en otra
+        self.assertEqual(len(comparar_con_linea_base(reporte('A', p95_ms=20.0), base)[0]), 1)
+        regresiones, avisos = comparar_con_linea_base(reporte('B', p95_ms=20.0), base)
+        self.assertEqual((len(regresiones), len(avisos)), (0, 1))
+
+
+class ExtractorSoatTests(SimpleTestCase):
+    def test_motores_de_anclas_encuentran_placa_y_monto(self):
+        texto = "POLIZA SOAT PLACA No. G8K-659 VIGENCIA 2024 VALORES LEGALES $1.191.000"
+        for motor in ('spacy', 'regex'):
+            self.assertEqual(ExtractorSoat(motor).extraer(texto), {'placa': 'GBK659', 'monto': 1191000}, motor)
+
+    def test_sin_ancla_busca_la_placa_en_la_cabecera(self):
+        for motor in ('spacy', 'regex'):
+            self.assertEqual(ExtractorSoat(motor).extraer("SOAT ASA534 VIGENTE"), {'placa': 'ASA534', 'monto': None}, motor)
+
+    def test_lote_da_lo_mismo_que_uno_por_uno(self):
+        textos = [TEXTO_REF, TEXTO_SOAT_GENERICO, "SIN DATOS"]
+        for motor in ExtractorSoat.MOTORES:
+            extractor = ExtractorSoat(motor)
+            self.assertEqual(extractor.extraer_lote(textos), [extractor.extraer(texto) for texto in textos], motor)
+
+    def test_motor_desconocido(self):
+        with self.assertRaises(ValueError):
+            ExtractorSoat('tesseract')
+
+
+class EscanerCandidatosTests(SimpleTestCase):
+    def test_placa_anclada_fuera_de_la_cabecera(self):
+        relleno = " ".join(["ABC123"] + ["texto"] * 100)
+        candidatos = escanear_candidatos(f"{relleno} PLACA No. G8K-659 TOTAL A PAGAR LEGALE5 $1.191.0O0")
+
+        self.assertEqual([c.valor for c in candidatos['placa']], ['GBK659', 'ABC123'])
+        self.assertEqual(resolver_candidatos(candidatos), {'placa': 'GBK659', 'monto': 1191000})
+
+    def test_placas_de_moto_y_falsos_positivos(self):
+        self.assertEqual(validar_y_corregir_placa("ABC12D"), "ABC12D")
+        for palabra in ("VAT1OS", "M0TOS", "CILINDRAJE/VATIOS", "810500", "ABC1234"):
+            self.assertIsNone(validar_y_corregir_placa(palabra), palabra)
+
+    def test_monto_sin_ancla_no_es_el_total(self):
+        datos = resolver_candidatos(escanear_candidatos("PLACA ASA534 PRIMA SOAT $ 792800"))
+        self.assertEqual(datos, {'placa': 'ASA534', 'monto': None})
+
+    def test_motores_coinciden_en_el_texto_de_referencia(self):
+        for motor in ExtractorSoat.MOTORES:
+            self.assertEqual(extraer_con_inteligencia_hibrida(TEXTO_REF, motor), {'placa': 'ASA534', 'monto': 1191000}, motor)
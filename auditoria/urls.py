@@ -5,7 +5,12 @@ urlpatterns = [
     # Cuando alguien entre a "nada" (la raíz de auditoria), muéstrale la carga_soportes
     path('', views.carga_soportes, name='carga_soportes'),
     path('dashboard/', views.dashboard, name='dashboard'), # <--- NUEVA RUTA
+    path('lote/', views.carga_lote, name='carga_lote'), # Carga masiva (ZIP o varios archivos)
 
     # Nueva ruta: recibe un número entero (<int:id_auditoria>)
     path('borrar/<int:id_auditoria>/', views.eliminar_auditoria, name='eliminar_auditoria'),
+    path('soporte/<int:id_auditoria>/', views.ver_soporte, name='ver_soporte'),  # Documento con Range (206)
+
+    # Estado de un trabajo en cola (JSON para el loader)
+    path('estado/<int:id_trabajo>/', views.estado_trabajo, name='estado_trabajo'),
 ]
\ No newline at end of file
@@ -1,81 +1,191 @@
-from django.shortcuts import render, redirect, get_object_or_404 # <--- Agrega get_object_or_404
+import zipfile
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404 # <--- Agrega get_object_or_404
 from django.contrib import messages # <--- IMPORTANTE: Para mandar mensajes al HTML
-from .forms import CargaForm
-from .models import Auditoria  # <--- IMPORTANTE: Traemos la tabla
-# Importamos tu nuevo script lector
-from .OCR.lector_soat import extraer_datos_soat 
-# Importamos la nueva función
-from .OCR.cliente_api import consultar_runt_publico
-
-def carga_soportes(request):
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from .forms import CargaForm, CargaLoteForm, FiltroDashboardForm
+from .models import Auditoria, TrabajoAuditoria  # <--- IMPORTANTE: Traemos la tabla
+# OCR + RUNT (se ejecuta en el worker de la cola, o aquí mismo en modo síncrono)
+from .procesamiento import mensaje_exito
+from .asincrono import auditar_carga_async
+from .cola import encolar_carga
+from .lote import iterar_documentos, procesar_lote, es_soportado
+from .almacenamiento import respuesta_soporte
+from .subidas import motivo_rechazo
+from .tablero import COLUMNAS_TABLA, apaginar, aresumen_periodo, filtrar
+from .metricas import TIPO_CONTENIDO, exponer
+
+def formulario_carga(request):
+    """CargaForm de la petición, ya validado. Leer request.FILES escribe la subida a disco (subidas.py)."""
+    form = CargaForm(request.POST, request.FILES, rechazo=motivo_rechazo(request))
+    form.is_valid()
+    return form
+
+
+async def carga_soportes(request):
     if request.method == 'POST':
-        form = CargaForm(request.POST, request.FILES)
+        # El archivo ya llegó escrito a disco, con su hash y su formato revisado (subidas.py).
+        # Leer el cuerpo y contar páginas bloquea: fuera del event loop (sin BD, en cualquier hilo)
+        form = await sync_to_async(formulario_carga, thread_sensitive=False)(request)
         if form.is_valid():
-            # 1. Guardamos temporalmente para tener el archivo en disco
-            auditoria = form.save()
-            
-            # 2. Ejecutamos tu Super Script
+            auditoria, archivo = form.save(commit=False), form.cleaned_data['archivo_soat']
+
+            # 1. Modo asíncrono: el OCR y el RUNT los corre el worker (`manage.py procesar_cola`)
+            if settings.AUDITORIA_ASINCRONA:
+                # Archivo a soportes_soat/ (un rename, o reutiliza uno idéntico); auditoría y trabajo en una transacción
+                trabajo = await sync_to_async(encolar_carga)(auditoria, archivo)
+                url_estado = reverse('estado_trabajo', args=[trabajo.id])
+
+                # El loader de carga.html envía el formulario por fetch y consulta el estado
+                if es_peticion_ajax(request):
+                    return JsonResponse({'trabajo': trabajo.id, 'estado': trabajo.estado, 'url_estado': url_estado}, status=202)
+
+                messages.success(request, "Documento recibido. La auditoría quedó en cola de análisis.")
+                return redirect('dashboard')
+
+            # 2. Modo síncrono (sin worker): el Super Script corre durante la petición, pero el
+            # OCR va al pool de procesos y el RUNT por el cliente async (asincrono.py).
+            # El archivo se guarda y la auditoría se inserta solo si la lectura tuvo éxito (sin borrar después)
             try:
-                ruta_pdf = auditoria.archivo_soat.path
-                resultado_ocr = extraer_datos_soat(ruta_pdf)
+                resultado_ocr = await auditar_carga_async(auditoria, archivo)
                 
-                # 3. VERIFICAMOS SI TUVO ÉXITO
+                # VERIFICAMOS SI TUVO ÉXITO
                 if resultado_ocr['exito']:
-                    # --- ÉXITO: Guardamos datos y auditamos ---
-                    auditoria.placa_detectada = resultado_ocr['placa']
-                    auditoria.monto_detectado = resultado_ocr['monto']
-                    
-                    # Validación API (El Juez)
-                    api_check = consultar_runt_publico(resultado_ocr['placa'])
-                    
-                    if api_check['existe']:
-                         # Lógica inversa: Si está en la lista de activos, lo marcamos FRAUDE (según tu indicación)
-                        auditoria.resultado = 'FRAUDE'
-                        # auditoria.reporte_ia = ... (Aquí llamarías a tu generador GPT si quieres)
-                    else:
-                        auditoria.resultado = 'APROBADO'
-                    
-                    auditoria.save()
-                    messages.success(request, f"¡Lectura exitosa! Placa: {resultado_ocr['placa']}")
+                    messages.success(request, mensaje_exito(resultado_ocr))
                     return redirect('dashboard')
                 
                 else:
-                    # --- FALLO: El OCR no leyó nada ---
-                    # 1. Borramos el registro y el archivo basura
-                    auditoria.archivo_soat.delete() # Borra archivo
-                    auditoria.delete() # Borra de BD
-                    
-                    # 2. Mandamos el mensaje de error al usuario
+                    # --- FALLO: El OCR no leyó nada (el archivo nunca llegó a soportes_soat/) ---
                     messages.error(request, f"❌ {resultado_ocr['mensaje']}")
                     # Nos quedamos en la misma página para que intente de nuevo
             
             except Exception as e:
                 # Error catastrófico (ej: EasyOCR falló por memoria)
-                auditoria.delete()
                 messages.error(request, f"Error interno del servidor: {e}")
 
+        elif es_peticion_ajax(request):
+            return JsonResponse({'estado': 'ERROR', 'mensaje': " ".join(form.errors.get('archivo_soat', ["Formulario inválido"]))}, status=400)
+
     else:
         form = CargaForm()
         
-    return render(request, 'auditoria/carga.html', {'form': form})
+    # render lee los mensajes de la sesión (BD): va por sync_to_async
+    return await sync_to_async(render)(request, 'auditoria/carga.html', {
+        'form': form,
+        'form_lote': CargaLoteForm(),
+        'asincrona': settings.AUDITORIA_ASINCRONA,
+    })
+
+
+def carga_lote(request):
+    """Carga masiva: un ZIP o varios archivos, que se encolan para los workers de la cola."""
+    if request.method != 'POST':
+        return redirect('carga_soportes')
+
+    # Sin worker el lote tendría que analizarse dentro de la petición (un pool de procesos por
+    # request, minutos de espera): en modo síncrono la carga masiva va por `manage.py audit_batch`
+    if not settings.AUDITORIA_ASINCRONA:
+        messages.error(request, "❌ La carga masiva requiere la cola de trabajos (AUDITORIA_ASINCRONA). "
+                                "Sin ella, use `python manage.py audit_batch`.")
+        return redirect('carga_soportes')
+
+    form = CargaLoteForm(request.POST, request.FILES)
+    if not form.is_valid():
+        messages.error(request, "❌ Debe seleccionar un ZIP o al menos un documento.")
+        return redirect('carga_soportes')
+
+    def documentos():
+        for archivo in form.cleaned_data['archivos']:
+            if archivo.name.lower().endswith('.zip'):
+                yield from iterar_documentos(archivo)
+            elif es_soportado(archivo.name):
+                yield archivo.name, archivo
+
+    try:
+        reporte = procesar_lote(documentos(), encolar=True)
+    except (zipfile.BadZipFile, OSError) as e:
+        # No se creó ninguna auditoría: lo ya copiado a soportes_soat/ lo recoge barrer_soportes
+        messages.error(request, f"❌ No se pudo leer el ZIP: {e}")
+        return redirect('carga_soportes')
+
+    messages.success(request, f"{reporte['total']} documentos recibidos y en cola de análisis.")
+    return redirect('dashboard')
+
+
+def es_peticion_ajax(request):
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+
+async def estado_trabajo(request, id_trabajo):
+    """Endpoint JSON que consulta el loader de carga.html mientras el worker procesa (ORM asíncrono)."""
+    trabajo = await aget_object_or_404(TrabajoAuditoria.objects.select_related('auditoria'), pk=id_trabajo)
+    datos = {
+        'trabajo': trabajo.id,
+        'estado': trabajo.estado,
+        'mensaje': trabajo.mensaje,
+        'auditoria': None,
+    }
+    if trabajo.auditoria:
+        datos['auditoria'] = {
+            'id': trabajo.auditoria.id,
+            'placa': trabajo.auditoria.placa_detectada,
+            'monto': trabajo.auditoria.monto_detectado,
+            'resultado': trabajo.auditoria.resultado,
+            'duplicado': trabajo.auditoria.tipo_duplicado or None,
+            'duplicado_de': trabajo.auditoria.duplicado_de_id,
+        }
+    return JsonResponse(datos)
 
 # NUEVA FUNCIÓN: EL DASHBOARD
-def dashboard(request):
-    # "Select * from Auditoria order by fecha desc"
-    registros = Auditoria.objects.all().order_by('-fecha_creacion')
-    return render(request, 'auditoria/dashboard.html', {'registros': registros})
+async def dashboard(request):
+    # Solo las columnas de la tabla, filtradas en la BD y de a una página (cursor, sin OFFSET)
+    filtros = FiltroDashboardForm(request.GET)
+    criterios = filtros.cleaned_data if filtros.is_valid() else {}
+    consulta = filtrar(Auditoria.objects.only(*COLUMNAS_TABLA), **criterios)
+    pagina = await apaginar(consulta, despues=request.GET.get('despues'), antes=request.GET.get('antes'))
+    resumen = await aresumen_periodo(criterios.get('desde'), criterios.get('hasta'))
+
+    # Los enlaces de paginación conservan los filtros
+    parametros = request.GET.copy()
+    parametros.pop('despues', None)
+    parametros.pop('antes', None)
+
+    return await sync_to_async(render)(request, 'auditoria/dashboard.html', {
+        'registros': pagina['registros'],
+        'cursor_siguiente': pagina['cursor_siguiente'],
+        'cursor_anterior': pagina['cursor_anterior'],
+        'filtros': filtros,
+        'parametros': parametros.urlencode(),
+        'resumen': resumen,
+    })
 
 
 def eliminar_auditoria(request, id_auditoria):
     # Buscamos la auditoria por su ID único
     registro = get_object_or_404(Auditoria, pk=id_auditoria)
     
-    # 1. Borramos el archivo físico del disco
-    if registro.archivo_soat:
-        registro.archivo_soat.delete()
-    
-    # 2. Borramos el registro de la base de datos
+    # 1. Borramos el registro de la base de datos. El archivo físico lo borra
+    #    `manage.py barrer_soportes` si ninguna otra auditoría comparte la misma copia
     registro.delete()
     
-    # 3. Volvemos al dashboard
-    return redirect('dashboard')
\ No newline at end of file
+    # 2. Volvemos al dashboard
+    return redirect('dashboard')
+
+
+def ver_soporte(request, id_auditoria):
+    """El documento de una auditoría, por bloques y con Range (el visor de PDF pide de a pedazos)."""
+    registro = get_object_or_404(Auditoria.objects.only('archivo_soat', 'hash_archivo'), pk=id_auditoria)
+    if not registro.archivo_soat or not default_storage.exists(registro.archivo_soat.name):
+        raise Http404("El documento ya no está en el almacenamiento.")
+    return respuesta_soporte(request, registro.archivo_soat.name, registro.hash_archivo)
+
+
+def metricas(request):
+    """Histogramas de tiempo por etapa en formato Prometheus (del proceso o de todos los workers, ver metricas.py)."""
+    if not settings.METRICAS_HABILITADAS:
+        raise Http404
+    return HttpResponse(exponer(), content_type=TIPO_CONTENIDO)
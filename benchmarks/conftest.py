@@ -0,0 +1,43 @@
+"""
+Suite de pytest-benchmark del pipeline de extracción (corpus golden de auditoria/corpus_soat.py).
+
+    pip install pytest pytest-benchmark
+    pytest benchmarks --benchmark-autosave                       # guarda la corrida en .benchmarks/
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:25%
+
+La precisión se verifica siempre contra auditoria/datos_prueba/bench_linea_base.json;
+los tiempos, contra la corrida guardada con --benchmark-autosave en la misma máquina.
+"""
+import os
+import sys
+
+import django
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SimuladorAdres.settings')
+django.setup()
+
+
+@pytest.fixture(scope='session')
+def corpus():
+    from auditoria import corpus_soat
+
+    return corpus_soat.generar_corpus()
+
+
+@pytest.fixture(scope='session')
+def linea_base():
+    import json
+
+    from auditoria.management.commands.bench_soat import RUTA_LINEA_BASE
+
+    with open(RUTA_LINEA_BASE, encoding='utf-8') as f:
+        return json.load(f)['funciones']
+
+
+@pytest.fixture(scope='session')
+def pdfs_digitales(corpus, tmp_path_factory):
+    from auditoria import corpus_soat
+
+    return corpus_soat.escribir_corpus(corpus, tmp_path_factory.mktemp('corpus'), formatos=('digital', 'varias_paginas'))
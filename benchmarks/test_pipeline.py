@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from auditoria import corpus_soat  # noqa: E402
+from auditoria.OCR import lector_soat  # noqa: E402
+
+TOLERANCIA_PRECISION = 0.01
+
+
+def proporcion(aciertos):
+    aciertos = list(aciertos)
+    return sum(aciertos) / len(aciertos)
+
+
+def test_manifiesto_del_corpus(corpus):
+    assert corpus_soat.verificar_manifiesto(corpus) == []
+
+
+def test_validar_y_corregir_placa(benchmark, corpus, linea_base):
+    palabras = [caso['texto_ocr'].split() for caso in corpus]
+
+    def validar_todo():
+        return [{lector_soat.validar_y_corregir_placa(p) for p in doc} for doc in palabras]
+
+    placas = benchmark(validar_todo)
+    precision = proporcion(caso['placa'] in encontradas for caso, encontradas in zip(corpus, placas))
+    assert precision >= linea_base['validar_y_corregir_placa']['precision_placa'] - TOLERANCIA_PRECISION
+
+
+def test_extraer_con_inteligencia_hibrida(benchmark, corpus, linea_base):
+    lector_soat.obtener_extractor()
+    resultados = benchmark(lambda: [lector_soat.extraer_con_inteligencia_hibrida(c['texto_ocr']) for c in corpus])
+    aciertos = [corpus_soat.acierta(caso, r) for caso, r in zip(corpus, resultados)]
+    base = linea_base['extraer_con_inteligencia_hibrida']
+    assert proporcion(a for a, _ in aciertos) >= base['precision_placa'] - TOLERANCIA_PRECISION
+    assert proporcion(b for _, b in aciertos) >= base['precision_monto'] - TOLERANCIA_PRECISION
+
+
+def test_escanear_candidatos_texto_grande(benchmark, corpus):
+    # Todas las pólizas con ruido en un solo texto (~250 KB): el escáner es lineal en el tamaño
+    texto = " ".join(caso['texto_ocr'] for caso in corpus)
+    candidatos = benchmark(lector_soat.escanear_candidatos, texto)
+    placas = {c.valor for c in candidatos['placa']}
+    assert proporcion(caso['placa'] in placas for caso in corpus) >= 0.99
+
+
+def test_evaluar_similitud(benchmark, corpus):
+    textos = [caso['texto'] for caso in corpus]
+    similitudes = benchmark(lambda: [lector_soat.evaluar_similitud(lector_soat.TEXTO_REF, t) for t in textos])
+    # Las pólizas de la misma aseguradora se parecen más a TEXTO_REF que las genéricas
+    propias = [s for s, c in zip(similitudes, corpus) if c['plantilla'] == 'seguros_del_estado']
+    otras = [s for s, c in zip(similitudes, corpus) if c['plantilla'] != 'seguros_del_estado']
+    assert min(propias) > max(otras)
+
+
+def test_extraer_datos_soat_pdf_digital(benchmark, pdfs_digitales, linea_base):
+    resultados = benchmark.pedantic(
+        lambda: [lector_soat.extraer_datos_soat(str(ruta)) for _, ruta in pdfs_digitales], rounds=3, iterations=1,
+    )
+    aciertos = [corpus_soat.acierta(caso, r) for (caso, _), r in zip(pdfs_digitales, resultados)]
+    base = linea_base['extraer_datos_soat[pdf digital]']
+    assert proporcion(a for a, _ in aciertos) >= base['precision_placa'] - TOLERANCIA_PRECISION
+    assert proporcion(b for _, b in aciertos) >= base['precision_monto'] - TOLERANCIA_PRECISION